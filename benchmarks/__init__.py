@@ -0,0 +1,196 @@
+"""ClusterML Micro-benchmarks - hot paths of the master, timed in isolation.
+
+Benchmarks are registered with ``@benchmark(name, sizes=...)``. The
+decorated function receives a dataset size, does its setup, and returns the
+callable to time. Stateful operations can return ``(run, reset)`` instead;
+``reset`` restores the starting state before each timed call and is not
+timed.
+
+Run with ``python -m benchmarks`` (see ``benchmarks/__main__.py``).
+"""
+
+import gc
+import math
+import platform
+import statistics
+import subprocess
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+Case = Union[Callable[[], object], Tuple[Callable[[], object], Callable[[], object]]]
+
+
+@dataclass
+class Benchmark:
+    name: str
+    sizes: Tuple[int, ...]
+    setup: Callable[[int], Case]
+
+
+@dataclass
+class Result:
+    """Per-call timings of one benchmark at one size, in seconds."""
+    name: str
+    size: int
+    median: float
+    min: float
+    mean: float
+    stdev: float
+    rounds: int
+    iterations: int
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}[{self.size}]"
+
+
+@dataclass
+class Comparison:
+    key: str
+    baseline: float
+    current: float
+    threshold: float
+
+    @property
+    def change(self) -> float:
+        """Relative change of the median (+0.25 = 25% slower)."""
+        return self.current / self.baseline - 1.0 if self.baseline else 0.0
+
+    @property
+    def regressed(self) -> bool:
+        return self.change > self.threshold
+
+
+BENCHMARKS: Dict[str, Benchmark] = {}
+
+
+def benchmark(name: str, sizes: Iterable[int] = (1,)):
+    """Register a benchmark. ``sizes`` are the default dataset sizes."""
+
+    def decorator(setup: Callable[[int], Case]) -> Callable[[int], Case]:
+        if name in BENCHMARKS:
+            raise ValueError(f"Benchmark {name} already registered")
+        BENCHMARKS[name] = Benchmark(name, tuple(sizes), setup)
+        return setup
+
+    return decorator
+
+
+def load_all() -> Dict[str, Benchmark]:
+    """Import every benchmark module so it registers itself."""
+    from benchmarks import (  # noqa: F401
+        bench_datasets,
+        bench_logs,
+        bench_models,
+        bench_resources,
+        bench_scheduler,
+        bench_store,
+        bench_worker,
+    )
+    return BENCHMARKS
+
+
+def _time_round(run: Callable, reset: Optional[Callable], iterations: int) -> float:
+    if reset is None:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            run()
+        return time.perf_counter() - start
+    total = 0.0
+    for _ in range(iterations):
+        reset()
+        start = time.perf_counter()
+        run()
+        total += time.perf_counter() - start
+    return total
+
+
+def measure(bench: Benchmark, size: int, rounds: int = 5, min_round_seconds: float = 0.1) -> Result:
+    """Time ``bench`` at ``size``: calibrate iterations per round, then take ``rounds`` rounds."""
+    case = bench.setup(size)
+    run, reset = case if isinstance(case, tuple) else (case, None)
+
+    # Calibrate so one round takes at least min_round_seconds (like timeit.autorange)
+    iterations = 1
+    while True:
+        elapsed = _time_round(run, reset, iterations)
+        if elapsed >= min_round_seconds or iterations >= 1_000_000:
+            break
+        iterations = max(iterations * 2, int(iterations * min_round_seconds / max(elapsed, 1e-9)))
+
+    per_call: List[float] = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()  # collections would land in random rounds
+    try:
+        for _ in range(rounds):
+            per_call.append(_time_round(run, reset, iterations) / iterations)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return Result(
+        name=bench.name,
+        size=size,
+        median=statistics.median(per_call),
+        min=min(per_call),
+        mean=statistics.fmean(per_call),
+        stdev=statistics.stdev(per_call) if len(per_call) > 1 else 0.0,
+        rounds=rounds,
+        iterations=iterations,
+    )
+
+
+def environment() -> Dict[str, str]:
+    """Machine description stored with results: baselines only compare on like hardware."""
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5, check=False
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        revision = ""
+    return {
+        "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "git_revision": revision,
+    }
+
+
+def to_json(results: List[Result]) -> Dict:
+    return {"environment": environment(), "results": [asdict(r) for r in results]}
+
+
+def compare(
+    results: List[Result],
+    baseline: Dict,
+    threshold: float,
+    overrides: Optional[Dict[str, float]] = None,
+) -> List[Comparison]:
+    """Compare medians against a saved results file.
+
+    ``overrides`` maps a benchmark name (or ``name[size]``) to its own
+    threshold. Benchmarks missing from the baseline are skipped.
+    """
+    overrides = overrides or {}
+    saved = {f"{r['name']}[{r['size']}]": r["median"] for r in baseline.get("results", [])}
+    comparisons = []
+    for result in results:
+        if result.key not in saved:
+            continue
+        limit = overrides.get(result.key, overrides.get(result.name, threshold))
+        comparisons.append(Comparison(result.key, saved[result.key], result.median, limit))
+    return comparisons
+
+
+def format_seconds(seconds: float) -> str:
+    if seconds == 0 or math.isnan(seconds):
+        return "0"
+    for unit, scale in (("s", 1.0), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
@@ -0,0 +1,99 @@
+"""Run the micro-benchmarks and compare against a baseline.
+
+Usage (from the project root):
+    python -m benchmarks                                  # all benchmarks, default sizes
+    python -m benchmarks -k store --sizes 1000            # subset, fixed size
+    python -m benchmarks --out results.json               # save machine-readable results
+    python -m benchmarks --save-baseline                  # write benchmarks/baseline.json
+    python -m benchmarks --baseline benchmarks/baseline.json --threshold 0.2 \\
+        --threshold-for scheduler.tick.assign=0.5         # exit 1 on regressions
+
+Thresholds are relative slowdowns of the median per call (0.2 = 20%).
+"""
+
+import argparse
+import json
+import os
+import sys
+
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+from benchmarks import compare, format_seconds, load_all, measure, to_json
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(prog="python -m benchmarks", description="ClusterML micro-benchmarks")
+    p.add_argument("-k", "--filter", default="", help="Only benchmarks whose name contains this")
+    p.add_argument("--sizes", default="", help="Comma-separated sizes overriding each benchmark's defaults")
+    p.add_argument("--rounds", type=int, default=5)
+    p.add_argument("--min-round-seconds", type=float, default=0.1, help="Calibrate iterations to at least this per round")
+    p.add_argument("--out", help="Write results as JSON to this path")
+    p.add_argument("--baseline", help="Compare against this results file")
+    p.add_argument("--save-baseline", action="store_true", help=f"Write results to {os.path.relpath(DEFAULT_BASELINE)}")
+    p.add_argument("--threshold", type=float, default=0.2, help="Allowed median slowdown (default 0.2 = 20%%)")
+    p.add_argument(
+        "--threshold-for",
+        action="append",
+        default=[],
+        metavar="NAME=T",
+        help="Per-benchmark threshold, by name or name[size]; repeatable",
+    )
+    p.add_argument("--list", action="store_true", help="List benchmarks and exit")
+    return p.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    benchmarks = [b for name, b in sorted(load_all().items()) if args.filter in name]
+    if args.list:
+        for b in benchmarks:
+            print(f"{b.name:<36} sizes={','.join(map(str, b.sizes))}")
+        return 0
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+
+    results = []
+    print(f"{'benchmark':<44}{'median':>12}{'min':>12}{'stdev':>12}{'iters':>10}")
+    for bench in benchmarks:
+        for size in sizes or bench.sizes:
+            result = measure(bench, size, rounds=args.rounds, min_round_seconds=args.min_round_seconds)
+            results.append(result)
+            print(
+                f"{result.key:<44}{format_seconds(result.median):>12}{format_seconds(result.min):>12}"
+                f"{format_seconds(result.stdev):>12}{result.iterations:>10}",
+                flush=True,
+            )
+
+    data = to_json(results)
+    for path in filter(None, [args.out, DEFAULT_BASELINE if args.save_baseline else None]):
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2)
+        print(f"\nResults written to {path}")
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    overrides = {}
+    for item in args.threshold_for:
+        name, _, value = item.rpartition("=")
+        overrides[name] = float(value)
+
+    comparisons = compare(results, baseline, args.threshold, overrides)
+    print(f"\nAgainst {args.baseline} (recorded {baseline.get('environment', {}).get('timestamp', '?')}):")
+    regressions = 0
+    for c in comparisons:
+        mark = "REGRESSION" if c.regressed else "ok"
+        regressions += c.regressed
+        print(f"  {c.key:<42}{format_seconds(c.baseline):>12} -> {format_seconds(c.current):<12}{c.change:+8.1%}  {mark}")
+    if baseline.get("environment", {}).get("platform") != data["environment"]["platform"]:
+        print("  note: baseline was recorded on a different platform")
+    print(f"\n{regressions} regression(s) over {len(comparisons)} compared benchmark(s)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
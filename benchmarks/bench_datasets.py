@@ -0,0 +1,57 @@
+"""Dataset serving benchmarks: mapped views versus buffered file reads of a shard."""
+
+import asyncio
+import hashlib
+import os
+import tempfile
+
+from benchmarks import benchmark
+from core.protocols.models import ArtifactManifest
+from master.app.api.datasets import ChunkRangeResponse
+from master.app.artifacts import ChunkStore, chunk_spans
+
+_CHUNK = 4 * 1024 * 1024
+
+
+def _shard(size_mib: int):
+    """A ``ChunkStore`` holding one shard of ``size_mib`` MiB, and the shard's manifest."""
+    chunks = ChunkStore(tempfile.mkdtemp(prefix="clusterml-bench-"))
+    digests = []
+
+    async def body(data: bytes):
+        yield data
+
+    for _ in range(max(1, size_mib * 1024 * 1024 // _CHUNK)):
+        data = os.urandom(_CHUNK)
+        digest = hashlib.sha256(data).hexdigest()
+        asyncio.run(chunks.put(digest, body(data)))
+        digests.append(digest)
+    return chunks, ArtifactManifest(name="shard", size=len(digests) * _CHUNK, chunk_size=_CHUNK, chunks=digests)
+
+
+@benchmark("datasets.serve_shard.mmap", sizes=(16, 64))
+def bench_serve_mapped(size):
+    """Send a ``size`` MiB shard through ``ChunkRangeResponse`` to a server that discards it."""
+    chunks, manifest = _shard(size)
+
+    async def sink(message):
+        pass
+
+    def run():
+        response = ChunkRangeResponse(chunks, chunk_spans(manifest), 200, {})
+        asyncio.run(response({"type": "http"}, None, sink))
+
+    return run, None
+
+
+@benchmark("datasets.serve_shard.buffered", sizes=(16, 64))
+def bench_serve_buffered(size):
+    """The same shard read into a new buffer per piece, as a plain file response would."""
+    chunks, manifest = _shard(size)
+
+    def run():
+        for digest, start, end in chunk_spans(manifest):
+            for _ in chunks.read(digest, start, end):
+                pass
+
+    return run, None
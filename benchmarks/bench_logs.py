@@ -0,0 +1,43 @@
+"""Job output shipping benchmarks: worker-side buffering and master-side ingest."""
+
+import gzip
+
+from benchmarks import benchmark
+from core.protocols.models import LogBatch, LogChunk
+from master.app.logs import LogStore
+from worker.app.client import MasterClient
+from worker.app.logs import LogShipper
+
+_LINE = "epoch 3 step 1200 loss=0.41873 acc=0.8812 lr=3.0e-04\n"
+
+
+@benchmark("logs.shipper.write", sizes=(1_000,))
+def bench_shipper_write(size):
+    shipper = LogShipper(MasterClient("http://master"))
+
+    def run():
+        for _ in range(size):
+            shipper.write("job-1", "stdout", _LINE)
+
+    def reset():
+        shipper._jobs.clear()
+        shipper.buffered_bytes = 0
+
+    return run, reset
+
+
+@benchmark("logs.ingest_batch", sizes=(100, 1_000))
+def bench_ingest(size):
+    """Decompress, parse and store one batch of ``size`` lines from 4 jobs."""
+    per_job = size // 4
+    chunks = [LogChunk(job_id=f"job-{j}", offset=0, data=_LINE * per_job) for j in range(4)]
+    body = gzip.compress(LogBatch(worker_id="w", chunks=chunks).model_dump_json().encode(), 1)
+    state = {}
+
+    def run():
+        state["store"].ingest(LogBatch.model_validate_json(gzip.decompress(body)))
+
+    def reset():
+        state["store"] = LogStore()
+
+    return run, reset
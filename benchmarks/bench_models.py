@@ -0,0 +1,63 @@
+"""Pydantic model construction, validation and copy benchmarks.
+
+Sizes are the number of labels and environment variables on the job.
+"""
+
+import json
+
+from benchmarks import benchmark
+from core.protocols.models import (
+    EnvVar,
+    HeartbeatRequest,
+    Job,
+    JobSpec,
+    JobStatus,
+    ResourceInfo,
+)
+
+SIZES = (0, 50)
+
+
+def _job_kwargs(size: int) -> dict:
+    return {
+        "name": "bench",
+        "labels": {f"k{i}": f"v{i}" for i in range(size)},
+        "spec": JobSpec(image="python:3.11", command=["python", "train.py"], env=[EnvVar(name=f"E{i}", value=str(i)) for i in range(size)]),
+    }
+
+
+@benchmark("models.job.construct", sizes=SIZES)
+def job_construct(size):
+    kwargs = _job_kwargs(size)
+    return lambda: Job(**kwargs)
+
+
+@benchmark("models.job.validate_json", sizes=SIZES)
+def job_validate_json(size):
+    payload = Job(**_job_kwargs(size)).model_dump_json()
+    return lambda: Job.model_validate_json(payload)
+
+
+@benchmark("models.job.dump_json", sizes=SIZES)
+def job_dump_json(size):
+    job = Job(**_job_kwargs(size))
+    return job.model_dump_json
+
+
+@benchmark("models.job.model_copy", sizes=SIZES)
+def job_model_copy(size):
+    """The store's copy-on-write update path."""
+    job = Job(**_job_kwargs(size))
+    return lambda: job.model_copy(update={"status": JobStatus.RUNNING})
+
+
+@benchmark("models.heartbeat.validate", sizes=(0, 8))
+def heartbeat_validate(size):
+    payload = json.dumps(
+        {
+            "worker_id": "w",
+            "resources": ResourceInfo(cpu_cores=16, memory_total_mb=65536).model_dump(),
+            "active_jobs": [f"job-{i}" for i in range(size)],
+        }
+    )
+    return lambda: HeartbeatRequest.model_validate_json(payload)
@@ -0,0 +1,26 @@
+"""Resource parsing and fit-check benchmarks."""
+
+from benchmarks import benchmark
+from core.utils.resources import check_resources_fit, parse_cpu, parse_memory
+
+
+@benchmark("resources.parse_cpu")
+def bench_parse_cpu(size):
+    return lambda: parse_cpu("2500m")
+
+
+@benchmark("resources.parse_memory")
+def bench_parse_memory(size):
+    return lambda: parse_memory("16Gi")
+
+
+@benchmark("resources.check_resources_fit")
+def bench_check_resources_fit(size):
+    return lambda: check_resources_fit(
+        required_cpu="4",
+        required_memory="16Gi",
+        required_gpu=1,
+        available_cpu_cores=32,
+        available_memory_mb=131072,
+        available_gpu=4,
+    )
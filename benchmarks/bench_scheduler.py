@@ -0,0 +1,78 @@
+"""Scheduler benchmarks: one scheduling pass over clusters of growing size."""
+
+from benchmarks import benchmark
+from benchmarks.bench_store import _registration
+from core.protocols.models import (
+    JobCreate,
+    JobSpec,
+    NodeStatus,
+    ResourceRequirements,
+    VolumeMount,
+)
+from master.app.jobs import JobManager
+from master.app.nodes import NodeManager
+from master.app.scheduler import Scheduler
+from master.app.storage import InMemoryStore
+
+SIZES = (100, 1_000, 5_000)
+PENDING = 20
+
+
+def _cluster(nodes: int):
+    store = InMemoryStore()
+    job_manager = JobManager(store)
+    node_manager = NodeManager(store, job_manager=job_manager)
+    for i in range(nodes):
+        node = store.register_node(_registration(i))
+        store.update_node(node.id, status=NodeStatus.ONLINE)
+    return store, job_manager, Scheduler(store, job_manager, node_manager)
+
+
+@benchmark("scheduler.tick.idle", sizes=SIZES)
+def tick_idle(size):
+    """No queued jobs: the cost of node health checks alone."""
+    _, _, scheduler = _cluster(size)
+    return scheduler._tick
+
+
+@benchmark("scheduler.tick.unschedulable", sizes=SIZES)
+def tick_unschedulable(size):
+    """Queued jobs that fit nowhere: every job is checked against every node."""
+    _, job_manager, scheduler = _cluster(size)
+    too_big = JobSpec(image="i", resources=ResourceRequirements(cpu="64", memory="1Ti"))
+    for i in range(PENDING):
+        job_manager.create(JobCreate(name=f"big-{i}", spec=too_big))
+    return scheduler._tick
+
+
+@benchmark("scheduler.tick.assign", sizes=SIZES)
+def tick_assign(size):
+    """Place PENDING fitting jobs; state is rebuilt (untimed) before each pass."""
+    state = {}
+
+    def reset():
+        _store, job_manager, scheduler = _cluster(size)
+        for i in range(PENDING):
+            job_manager.create(JobCreate(name=f"job-{i}", spec=JobSpec(image="i")))
+        state["scheduler"] = scheduler
+
+    return (lambda: state["scheduler"]._tick()), reset
+
+
+@benchmark("scheduler.tick.locality", sizes=SIZES)
+def tick_locality(size):
+    """Place PENDING jobs reading one dataset; every node reports a full cache summary."""
+    state = {}
+    spec = JobSpec(image="i", volumes=[VolumeMount(name="data", mountPath="data", source="dataset://imagenet")])
+
+    def reset():
+        store, job_manager, scheduler = _cluster(size)
+        for i, node in enumerate(store.list_nodes()):
+            cached = {f"dataset://other-{j}": 1 << 30 for j in range(127)}
+            cached["dataset://imagenet"] = i << 20
+            store.update_node(node.id, cached=cached)
+        for i in range(PENDING):
+            job_manager.create(JobCreate(name=f"job-{i}", spec=spec))
+        state["scheduler"] = scheduler
+
+    return (lambda: state["scheduler"]._tick()), reset
@@ -0,0 +1,92 @@
+"""InMemoryStore benchmarks: listing, updates and node registration."""
+
+import itertools
+
+from benchmarks import benchmark
+from core.protocols.models import (
+    JobCreate,
+    JobSpec,
+    JobStatus,
+    NodeRegister,
+    ResourceInfo,
+)
+from master.app.storage import InMemoryStore
+
+SIZES = (1_000, 10_000, 50_000)
+
+
+def _filled_store(jobs: int = 0, nodes: int = 0) -> InMemoryStore:
+    store = InMemoryStore()
+    statuses = [JobStatus.QUEUED, JobStatus.RUNNING, JobStatus.COMPLETED, JobStatus.FAILED]
+    for i in range(jobs):
+        job = store.create_job(
+            JobCreate(name=f"job-{i}", spec=JobSpec(image="python:3.11"), labels={"team": f"t{i % 10}"})
+        )
+        store.update_job(job.id, status=statuses[i % len(statuses)])
+    for i in range(nodes):
+        store.register_node(_registration(i))
+    return store
+
+
+def _registration(i: int) -> NodeRegister:
+    return NodeRegister(
+        hostname=f"node-{i}",
+        ip_address=f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}",
+        resources=ResourceInfo(cpu_cores=16, memory_total_mb=65536, gpu_count=1),
+    )
+
+
+@benchmark("store.list_jobs", sizes=SIZES)
+def list_jobs(size):
+    store = _filled_store(jobs=size)
+    return lambda: store.list_jobs()
+
+
+@benchmark("store.list_jobs.status", sizes=SIZES)
+def list_jobs_by_status(size):
+    store = _filled_store(jobs=size)
+    return lambda: store.list_jobs(status=JobStatus.RUNNING)
+
+
+@benchmark("store.list_jobs.label", sizes=SIZES)
+def list_jobs_by_label(size):
+    store = _filled_store(jobs=size)
+    return lambda: store.list_jobs(label="team=t3")
+
+
+@benchmark("store.get_pending_jobs", sizes=SIZES)
+def get_pending_jobs(size):
+    store = _filled_store(jobs=size)
+    return store.get_pending_jobs
+
+
+@benchmark("store.update_job", sizes=SIZES)
+def update_job(size):
+    store = _filled_store(jobs=size)
+    ids = itertools.cycle([j.id for j in store.list_jobs(limit=size)])
+    return lambda: store.update_job(next(ids), logs="step done")
+
+
+@benchmark("store.register_node.new", sizes=(100, 1_000, 5_000))
+def register_new_node(size):
+    store = _filled_store(nodes=size)
+    registration = _registration(size)
+    state = {}
+
+    def run():
+        state["node"] = store.register_node(registration)
+
+    def reset():
+        # Drop the node the previous call added, so every call sees ``size`` nodes
+        node = state.pop("node", None)
+        if node is not None:
+            store.remove_node(node.id)
+
+    return run, reset
+
+
+@benchmark("store.register_node.existing", sizes=(100, 1_000, 5_000))
+def register_existing_node(size):
+    store = _filled_store(nodes=size)
+    registrations = itertools.cycle([_registration(i) for i in range(size)])
+    return lambda: store.register_node(next(registrations))
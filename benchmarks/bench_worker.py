@@ -0,0 +1,21 @@
+"""Worker resource sampling benchmarks (reads this machine's /proc)."""
+
+import os
+
+from benchmarks import benchmark
+from worker.app.monitor import ResourceSampler
+
+
+@benchmark("worker.resource_sampler.sample")
+def bench_sample(size):
+    sampler = ResourceSampler(gpu=False)
+    sampler.sample()  # open the files outside the timed loop
+    return sampler.sample
+
+
+@benchmark("worker.resource_sampler.job_usage", sizes=(1, 8))
+def bench_job_usage(size):
+    sampler = ResourceSampler(gpu=False)
+    jobs = {f"job-{i}": os.getpid() for i in range(size)}
+    sampler.job_usage(jobs)
+    return lambda: sampler.job_usage(jobs)
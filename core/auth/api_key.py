@@ -12,8 +12,9 @@ from fastapi import Header, HTTPException, status
 class APIKeyAuth:
     """Dependency that validates the X-API-Key header."""
 
-    def __init__(self, expected_key: Optional[str] = None):
+    def __init__(self, expected_key: Optional[str] = None, allow_open: bool = True):
         self.expected_key = expected_key
+        self.allow_open = allow_open
 
     async def __call__(
         self,
@@ -21,6 +22,11 @@ class APIKeyAuth:
     ) -> Optional[str]:
         # Open access when no key is configured
         if self.expected_key is None:
+            if not self.allow_open:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="Endpoint disabled: no API key configured",
+                )
             return x_api_key
 
         if x_api_key is None:
@@ -17,19 +17,52 @@ class Settings(BaseModel):
     master_host: str = Field(default="0.0.0.0")
     master_port: int = Field(default=8080)
     api_prefix: str = Field(default="/api/v1")
+    master_workers: int = Field(default=1, description="Number of API processes (>1 requires a shared storage backend)")
+    keep_alive_seconds: int = Field(default=75, description="Idle HTTP keep-alive timeout; keep above the worker heartbeat interval")
 
     # Scheduler
     scheduler_interval_seconds: float = Field(default=5.0, description="How often the scheduler runs")
     node_timeout_seconds: float = Field(default=90.0, description="Mark node offline after this many seconds without heartbeat")
     max_concurrent_jobs_per_node: int = Field(default=2)
+    scheduler_lease_seconds: float = Field(default=15.0, description="Leader lease TTL; only the lease holder runs the scheduler")
+    slow_tick_seconds: Optional[float] = Field(default=None, description="Profile scheduler ticks that run longer than this (None = off)")
+    locality_wait_seconds: float = Field(default=30.0, description="Longest a job waits for a busy node that has its inputs cached (0 = never)")
+    fetch_rate_mb: float = Field(default=100.0, description="Assumed MB/s a node fetches job inputs at; a job waits at most as long as the fetch would take")
+    rendezvous_timeout_seconds: float = Field(default=120.0, description="Abort a distributed job whose ranks have not all started this long after placement")
 
     # Auth
     api_key: Optional[str] = Field(default=None, description="API key for authentication (None = open access)")
+    admin_api_key: Optional[str] = Field(default=None, description="Key for admin endpoints such as the profiler (None = disabled unless dev_mode)")
 
     # Storage
     storage_backend: str = Field(default="memory", description="'memory' for dev, 'sqlite' or 'postgres' for prod")
     database_url: Optional[str] = None
 
+    # Replication
+    replica_of: Optional[str] = Field(default=None, description="Primary master URL; set to run this master as a read replica")
+    change_log_size: int = Field(default=10000, description="Store mutations kept in memory for replicas to catch up from")
+    min_revision_wait_seconds: float = Field(default=2.0, description="How long a read with X-Min-Revision waits for a lagging replica")
+
+    # Job output shipped by workers
+    log_max_bytes_per_job: int = Field(default=8 * 1024 * 1024, description="Characters of output kept per job (the tail)")
+    log_max_jobs: int = Field(default=10000, description="Jobs whose output is kept in memory")
+
+    # Job artifacts and datasets
+    artifact_dir: str = Field(default="/tmp/clusterml/artifacts", description="Chunk store and artifact manifests")
+    dataset_dir: str = Field(default="/tmp/clusterml/datasets", description="Chunk store and manifests of uploaded datasets")
+    swarm_ttl_seconds: float = Field(default=180.0, description="Forget a worker's chunks after this long without an announcement")
+    swarm_lease_seconds: float = Field(default=30.0, description="How long one worker has to fetch an unheld chunk from the master before another may")
+
+    # Lightweight Python tasks
+    task_lease_seconds: float = Field(default=30.0, description="Requeue a worker's tasks after this long without a lease request from it")
+    task_session_ttl_seconds: float = Field(default=600.0, description="Drop a client session's tasks and results after this long without a request from it")
+    task_max_attempts: int = Field(default=3, description="Workers a task may be lost with before it fails")
+
+    # Result cache of jobs submitted with cache
+    result_cache_entries: int = Field(default=10000, description="Completed job results kept for reuse, least recently used evicted first (0 = off)")
+    result_cache_ttl_seconds: float = Field(default=86400.0, description="Reuse a cached result for at most this long after its job completed")
+    result_cache_max_bytes: int = Field(default=64 * 1024 * 1024, description="Memory for cached results and artifact manifests, least recently used evicted first")
+
     # Logging
     log_level: str = Field(default="INFO")
     dev_mode: bool = Field(default=False)
@@ -44,13 +77,36 @@ def get_settings() -> Settings:
     return Settings(
         master_host=os.getenv("MASTER_HOST", "0.0.0.0"),
         master_port=int(os.getenv("MASTER_PORT", "8080")),
+        master_workers=int(os.getenv("MASTER_WORKERS", os.getenv("WEB_CONCURRENCY", "1"))),
+        keep_alive_seconds=int(os.getenv("KEEP_ALIVE_TIMEOUT", "75")),
         api_key=os.getenv("API_KEY"),
+        admin_api_key=os.getenv("ADMIN_API_KEY"),
         storage_backend=os.getenv("STORAGE_BACKEND", "memory"),
         database_url=os.getenv("DATABASE_URL"),
+        replica_of=os.getenv("REPLICA_OF"),
+        change_log_size=int(os.getenv("CHANGE_LOG_SIZE", "10000")),
+        min_revision_wait_seconds=float(os.getenv("MIN_REVISION_WAIT", "2.0")),
+        log_max_bytes_per_job=int(os.getenv("LOG_MAX_BYTES_PER_JOB", str(8 * 1024 * 1024))),
+        log_max_jobs=int(os.getenv("LOG_MAX_JOBS", "10000")),
+        artifact_dir=os.getenv("ARTIFACT_DIR", "/tmp/clusterml/artifacts"),
+        dataset_dir=os.getenv("DATASET_DIR", "/tmp/clusterml/datasets"),
+        swarm_ttl_seconds=float(os.getenv("SWARM_TTL", "180")),
+        swarm_lease_seconds=float(os.getenv("SWARM_LEASE", "30")),
+        task_lease_seconds=float(os.getenv("TASK_LEASE", "30")),
+        task_session_ttl_seconds=float(os.getenv("TASK_SESSION_TTL", "600")),
+        task_max_attempts=int(os.getenv("TASK_MAX_ATTEMPTS", "3")),
+        result_cache_entries=int(os.getenv("RESULT_CACHE_ENTRIES", "10000")),
+        result_cache_ttl_seconds=float(os.getenv("RESULT_CACHE_TTL", "86400")),
+        result_cache_max_bytes=int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
         log_level=os.getenv("LOG_LEVEL", "INFO"),
         dev_mode=os.getenv("DEV_MODE", "false").lower() == "true",
         cors_origins=os.getenv("CORS_ORIGINS", "*"),
         scheduler_interval_seconds=float(os.getenv("SCHEDULER_INTERVAL", "5.0")),
         node_timeout_seconds=float(os.getenv("NODE_TIMEOUT", "90.0")),
         max_concurrent_jobs_per_node=int(os.getenv("MAX_CONCURRENT_JOBS", "2")),
+        scheduler_lease_seconds=float(os.getenv("SCHEDULER_LEASE", "15.0")),
+        slow_tick_seconds=float(os.environ["SLOW_TICK_SECONDS"]) if os.getenv("SLOW_TICK_SECONDS") else None,
+        locality_wait_seconds=float(os.getenv("LOCALITY_WAIT", "30")),
+        fetch_rate_mb=float(os.getenv("FETCH_RATE_MB", "100")),
+        rendezvous_timeout_seconds=float(os.getenv("RENDEZVOUS_TIMEOUT", "120")),
     )
@@ -1,36 +1,101 @@
 """ClusterML Protocols - Shared data models and API contracts."""
 
 from core.protocols.models import (
+    Artifact,
+    ArtifactManifest,
+    ArtifactUpload,
+    Checkpoint,
+    ChunkSources,
+    ClusterStatus,
+    Dataset,
+    DatasetCreate,
+    DatasetManifest,
+    DatasetUpload,
+    DistributedConfig,
+    EarlyStopping,
+    EnvVar,
+    HeartbeatRequest,
+    HeartbeatResponse,
     Job,
+    JobAssignment,
     JobCreate,
+    JobEvent,
+    JobPhase,
+    JobResourceUsage,
     JobSpec,
     JobStatus,
+    JobTrace,
     JobUpdate,
+    LatencyReport,
+    LogBatch,
+    LogChunk,
+    MetricRecord,
+    MetricsReport,
     Node,
     NodeRegister,
     NodeStatus,
-    ResourceRequirements,
+    ParameterRange,
+    PhaseLatency,
+    Rendezvous,
+    RendezvousJoin,
+    RendezvousState,
     ResourceInfo,
-    DistributedConfig,
-    EnvVar,
+    ResourceRequirements,
+    SwarmAnnounce,
+    SwarmLocate,
+    Sweep,
+    SweepCreate,
+    SweepObjective,
+    SweepStatus,
+    TaskAssignment,
+    TaskCancel,
+    TaskLease,
+    TaskLeaseResponse,
+    TaskOutcome,
+    TaskResults,
+    TaskStatus,
+    TaskSubmit,
+    TaskSubmitted,
+    TaskWait,
+    TaskWaitResponse,
+    Trial,
+    TrialStatus,
     VolumeMount,
-    HeartbeatRequest,
-    HeartbeatResponse,
-    JobAssignment,
-    ClusterStatus,
 )
 
 __all__ = [
+    "Artifact",
+    "ArtifactManifest",
+    "ArtifactUpload",
+    "Checkpoint",
+    "Dataset",
+    "DatasetCreate",
+    "DatasetManifest",
+    "DatasetUpload",
     "Job",
     "JobCreate",
+    "JobEvent",
+    "JobPhase",
     "JobSpec",
     "JobStatus",
+    "JobTrace",
     "JobUpdate",
+    "LatencyReport",
+    "LogBatch",
+    "LogChunk",
+    "MetricRecord",
+    "MetricsReport",
     "Node",
     "NodeRegister",
     "NodeStatus",
+    "ParameterRange",
+    "PhaseLatency",
+    "Rendezvous",
+    "RendezvousJoin",
+    "RendezvousState",
     "ResourceRequirements",
     "ResourceInfo",
+    "JobResourceUsage",
     "DistributedConfig",
     "EnvVar",
     "VolumeMount",
@@ -38,4 +103,25 @@ __all__ = [
     "HeartbeatResponse",
     "JobAssignment",
     "ClusterStatus",
+    "ChunkSources",
+    "SwarmAnnounce",
+    "SwarmLocate",
+    "EarlyStopping",
+    "Sweep",
+    "SweepCreate",
+    "SweepObjective",
+    "SweepStatus",
+    "Trial",
+    "TrialStatus",
+    "TaskAssignment",
+    "TaskCancel",
+    "TaskLease",
+    "TaskLeaseResponse",
+    "TaskOutcome",
+    "TaskResults",
+    "TaskStatus",
+    "TaskSubmit",
+    "TaskSubmitted",
+    "TaskWait",
+    "TaskWaitResponse",
 ]
@@ -6,11 +6,10 @@ These models enforce a consistent API contract across the system.
 
 from datetime import datetime
 from enum import Enum
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Literal, Optional
 from uuid import uuid4
 
-from pydantic import BaseModel, Field
-
+from pydantic import BaseModel, Field, model_validator
 
 # ─── Enums ──────────────────────────────────────────────────────────────────
 
@@ -26,6 +25,48 @@ class JobStatus(str, Enum):
     CANCELLED = "cancelled"
 
 
+class JobPhase(str, Enum):
+    """Lifecycle milestones recorded in a job's trace."""
+    SUBMITTED = "submitted"
+    QUEUED = "queued"
+    SCHEDULED = "scheduled"
+    DISPATCHED = "dispatched"
+    STARTED = "started"
+    FINISHED = "finished"
+
+
+class RendezvousState(str, Enum):
+    """Progress of the ranks of a distributed job towards starting together."""
+    WAITING = "waiting"
+    READY = "ready"
+    ABORTED = "aborted"
+
+
+class SweepStatus(str, Enum):
+    """Lifecycle states for a hyperparameter sweep."""
+    RUNNING = "running"
+    COMPLETED = "completed"
+    CANCELLED = "cancelled"
+
+
+class TrialStatus(str, Enum):
+    """Outcome of one trial of a sweep."""
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    PRUNED = "pruned"
+    CANCELLED = "cancelled"
+
+
+class TaskStatus(str, Enum):
+    """Lifecycle states for a lightweight Python task."""
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
 class NodeStatus(str, Enum):
     """Health states for a worker node."""
     ONLINE = "online"
@@ -56,6 +97,13 @@ class ResourceInfo(BaseModel):
     gpu_memory_used_mb: int = Field(default=0, description="Used GPU memory in MB")
 
 
+class JobResourceUsage(BaseModel):
+    """Resource usage of one running job's process tree, reported by its worker."""
+    cpu_percent: float = Field(default=0.0, description="CPU usage as % of one core")
+    memory_rss_mb: int = Field(default=0, description="Resident memory in MB")
+    processes: int = Field(default=0, description="Processes in the job's tree")
+
+
 # ─── Job Models ─────────────────────────────────────────────────────────────
 
 
@@ -81,6 +129,25 @@ class DistributedConfig(BaseModel):
     type: str = Field(description="Framework type: pytorch, horovod, mpi")
 
 
+class Rendezvous(BaseModel):
+    """One rank's place in a distributed job, and where the ranks meet."""
+    gang_id: str = Field(description="The distributed job the rank belongs to")
+    rank: int = Field(ge=0)
+    world_size: int = Field(ge=1)
+    local_rank: int = Field(ge=0, description="Rank among the job's ranks on the same node")
+    local_world_size: int = Field(ge=1)
+    master_addr: str = Field(description="Address of rank 0's node")
+    master_port: Optional[int] = Field(default=None, description="Chosen by rank 0's worker when it joins")
+    joined: bool = Field(default=False, description="The rank's worker has reached the barrier")
+    state: RendezvousState = RendezvousState.WAITING
+
+
+class RendezvousJoin(BaseModel):
+    """A worker reaching the rendezvous barrier with one rank of a distributed job."""
+    worker_id: Optional[str] = None
+    master_port: Optional[int] = Field(default=None, ge=1, le=65535, description="Sent by rank 0 only")
+
+
 class JobSpec(BaseModel):
     """The spec section of a job definition."""
     image: str = Field(description="Docker image to run")
@@ -89,6 +156,7 @@ class JobSpec(BaseModel):
     resources: ResourceRequirements = Field(default_factory=ResourceRequirements)
     env: List[EnvVar] = Field(default_factory=list)
     volumes: List[VolumeMount] = Field(default_factory=list)
+    outputs: List[str] = Field(default_factory=list, description="Glob patterns, relative to the working directory, of files uploaded as artifacts")
     distributed: Optional[DistributedConfig] = None
 
 
@@ -97,6 +165,8 @@ class JobCreate(BaseModel):
     name: str = Field(min_length=1, max_length=128, description="Job name")
     labels: Dict[str, str] = Field(default_factory=dict)
     spec: JobSpec
+    cache: bool = Field(default=False, description="Reuse the result of an identical completed job, and offer this one's for reuse")
+    cache_bypass: bool = Field(default=False, description="With cache: run even if a result is cached, and replace it")
 
 
 class JobUpdate(BaseModel):
@@ -104,6 +174,46 @@ class JobUpdate(BaseModel):
     status: Optional[JobStatus] = None
     result: Optional[Dict[str, Any]] = None
     logs: Optional[str] = None
+    seq: Optional[int] = Field(default=None, description="Worker sequence number; an update not above the job's last one is ignored")
+    worker_id: Optional[str] = Field(default=None, description="Reporting worker; ignored unless it is the job's worker")
+
+
+class MetricRecord(BaseModel):
+    """Values a job reported at one step (epoch, iteration, ...) of its progress."""
+    step: int = Field(ge=0)
+    values: Dict[str, float]
+
+
+class MetricsReport(BaseModel):
+    """Intermediate metrics of a running job, sent by its worker, oldest first."""
+    worker_id: Optional[str] = None
+    records: List[MetricRecord]
+
+
+class LogChunk(BaseModel):
+    """A contiguous piece of one job's output (stdout and stderr interleaved)."""
+    job_id: str
+    offset: int = Field(ge=0, description="Position of the first character in the job's output stream")
+    data: str
+
+
+class LogBatch(BaseModel):
+    """Output of any number of jobs shipped by a worker in one request.
+
+    Sent gzip-compressed (``Content-Encoding: gzip``). A chunk that starts
+    before what the master already has is a retry and only its new tail is
+    kept; one that starts after it means the worker dropped output under
+    backpressure, and the gap is marked in the log.
+    """
+    worker_id: Optional[str] = None
+    chunks: List[LogChunk]
+
+
+class JobEvent(BaseModel):
+    """A timestamped lifecycle milestone of a job."""
+    phase: JobPhase
+    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    detail: Optional[str] = Field(default=None, description="e.g. the node for 'scheduled', final status for 'finished'")
 
 
 class Job(BaseModel):
@@ -120,6 +230,248 @@ class Job(BaseModel):
     started_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
     error: Optional[str] = None
+    update_seq: Optional[int] = Field(default=None, description="Sequence number of the last worker update applied")
+    events: List[JobEvent] = Field(default_factory=list, description="Lifecycle trace, oldest first")
+    checkpoint: Optional["Checkpoint"] = Field(default=None, description="Latest saved checkpoint; a requeued job resumes from it")
+    restarts: int = Field(default=0, description="Times the job was requeued after being placed on a worker")
+    stop_requested: bool = Field(default=False, description="Preempted: the worker is to stop it gracefully, then it is requeued")
+    ranks: List[str] = Field(default_factory=list, description="Distributed job: its rank jobs, in rank order, once placed")
+    rendezvous: Optional[Rendezvous] = Field(default=None, description="Rank of a distributed job: its place in it")
+    metrics: Dict[str, float] = Field(default_factory=dict, description="Latest intermediate metrics reported by the job")
+    metrics_step: Optional[int] = Field(default=None, description="Step of the latest metrics")
+    cache_key: Optional[str] = Field(default=None, description="Result cache key of a job submitted with cache")
+    cached_from: Optional[str] = Field(default=None, description="Cache hit: the job whose result and artifacts this one reuses")
+
+
+# ─── Artifact Models ────────────────────────────────────────────────────────
+
+class ArtifactManifest(BaseModel):
+    """A file described as fixed-size chunks, each named by its SHA-256."""
+    name: str = Field(min_length=1, max_length=512, description="Path relative to the job's working directory")
+    size: int = Field(ge=0)
+    chunk_size: int = Field(gt=0, description="Size of every chunk but the last")
+    chunks: List[str] = Field(default_factory=list, description="Hex SHA-256 of each chunk, in order")
+
+
+class Artifact(ArtifactManifest):
+    """A file a job produced, stored on the master."""
+    job_id: str
+    complete: bool = False
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class ArtifactUpload(BaseModel):
+    """Answer to starting (or resuming) an upload: the chunks still to send."""
+    artifact: Artifact
+    missing: List[str] = Field(default_factory=list)
+
+
+class Checkpoint(BaseModel):
+    """A consistent set of checkpoint files, uploaded as chunks, that a job resumes from."""
+    generation: int = Field(ge=1, description="Increases with every checkpoint saved for the job")
+    files: List[ArtifactManifest] = Field(description="Names are relative to the checkpoint directory")
+    worker_id: Optional[str] = Field(default=None, description="Saving worker; must be the job's worker")
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+Job.model_rebuild()
+
+
+# ─── Sweep Models ───────────────────────────────────────────────────────────
+
+class ParameterRange(BaseModel):
+    """Values one hyperparameter takes: a list, or a numeric range to sample."""
+    values: Optional[List[Any]] = Field(default=None, min_length=1, description="Grid points, or choices for random search")
+    min: Optional[float] = None
+    max: Optional[float] = None
+    scale: Literal["linear", "log"] = "linear"
+    integer: bool = Field(default=False, description="Round sampled values to integers")
+
+    @model_validator(mode="after")
+    def _check(self) -> "ParameterRange":
+        if self.values is None:
+            if self.min is None or self.max is None or self.min > self.max:
+                raise ValueError("give either values, or min <= max")
+            if self.scale == "log" and self.min <= 0:
+                raise ValueError("a log scale needs min > 0")
+        return self
+
+
+class SweepObjective(BaseModel):
+    """The metric trials report, and which way is better."""
+    metric: str = Field(min_length=1)
+    goal: Literal["maximize", "minimize"] = "maximize"
+
+
+class EarlyStopping(BaseModel):
+    """Asynchronous successive halving (ASHA) over the steps trials report.
+
+    Rungs are at ``min_step * reduction_factor**k``. A trial reaching a rung
+    goes on only if its objective there is among the best
+    ``1/reduction_factor`` of all trials that reached it.
+    """
+    type: Literal["asha"] = "asha"
+    min_step: int = Field(default=1, ge=1, description="First rung")
+    reduction_factor: int = Field(default=3, ge=2)
+    max_step: Optional[int] = Field(default=None, ge=1, description="No rungs past this step")
+
+
+class SweepCreate(BaseModel):
+    """Payload for starting a hyperparameter sweep.
+
+    Each trial is a job running ``spec`` with ``${name}`` in its command,
+    args and env values replaced by the trial's parameters.
+    """
+    name: str = Field(min_length=1, max_length=100)
+    labels: Dict[str, str] = Field(default_factory=dict)
+    spec: JobSpec
+    parameters: Dict[str, ParameterRange] = Field(min_length=1)
+    objective: SweepObjective
+    algorithm: Literal["grid", "random"] = "random"
+    max_trials: int = Field(default=20, ge=1, description="Trials to run (grid: at most the grid size)")
+    parallelism: int = Field(default=4, ge=1, description="Trials running at once")
+    seed: Optional[int] = Field(default=None, description="Random search seed")
+    early_stopping: Optional[EarlyStopping] = None
+
+
+class Trial(BaseModel):
+    """One set of parameters of a sweep, run as a job."""
+    number: int
+    job_id: str
+    params: Dict[str, Any]
+    status: TrialStatus = TrialStatus.RUNNING
+    step: Optional[int] = Field(default=None, description="Last step the objective was reported at")
+    value: Optional[float] = Field(default=None, description="Objective at that step")
+    rungs: Dict[int, float] = Field(default_factory=dict, description="Objective at each rung reached, by rung step")
+
+
+class Sweep(SweepCreate):
+    """Full sweep representation with its trials."""
+    id: str = Field(default_factory=lambda: str(uuid4()))
+    status: SweepStatus = SweepStatus.RUNNING
+    trials: List[Trial] = Field(default_factory=list)
+    best_trial: Optional[int] = Field(default=None, description="Number of the trial with the best objective")
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    completed_at: Optional[datetime] = None
+
+
+# ─── Task Models ────────────────────────────────────────────────────────────
+
+class TaskSubmit(BaseModel):
+    """A batch of Python tasks submitted by one client session."""
+    session: str = Field(min_length=1, max_length=64, description="Client session the results are delivered to")
+    payloads: List[str] = Field(min_length=1, description="Base64 pickles of (function, args, kwargs)")
+
+
+class TaskSubmitted(BaseModel):
+    """IDs of submitted tasks, in the order of their payloads."""
+    ids: List[str]
+
+
+class TaskAssignment(BaseModel):
+    """A task leased to a worker."""
+    id: str
+    payload: str
+
+
+class TaskLease(BaseModel):
+    """A worker's request for tasks, which also renews the leases of those it holds."""
+    worker_id: str
+    capacity: int = Field(ge=0, description="Most tasks to hand out")
+    running: List[str] = Field(default_factory=list, description="Tasks the worker holds whose results are not yet delivered")
+    wait_seconds: float = Field(default=10.0, ge=0, le=60, description="How long to wait for tasks when none are queued")
+
+
+class TaskLeaseResponse(BaseModel):
+    """Tasks for the worker, and held ones to stop because they were cancelled."""
+    tasks: List[TaskAssignment] = Field(default_factory=list)
+    cancel: List[str] = Field(default_factory=list)
+
+
+class TaskOutcome(BaseModel):
+    """How a task ended."""
+    id: str
+    status: TaskStatus
+    result: Optional[str] = Field(default=None, description="Base64 pickle of ('ok', value) or ('error', exception, traceback)")
+    error: Optional[str] = Field(default=None, description="Why the task ended without a result")
+
+
+class TaskResults(BaseModel):
+    """Outcomes of tasks a worker ran."""
+    worker_id: str
+    results: List[TaskOutcome] = Field(min_length=1)
+
+
+class TaskWait(BaseModel):
+    """A session's request for the outcomes after ``cursor``; earlier ones are acknowledged."""
+    session: str = Field(min_length=1, max_length=64)
+    cursor: int = Field(default=0, ge=0)
+    wait_seconds: float = Field(default=10.0, ge=0, le=60)
+
+
+class TaskWaitResponse(BaseModel):
+    """Outcomes of a session's tasks in the order they ended, and the cursor after them."""
+    cursor: int
+    results: List[TaskOutcome] = Field(default_factory=list)
+
+
+class TaskCancel(BaseModel):
+    """Tasks of a session to cancel."""
+    session: str = Field(min_length=1, max_length=64)
+    ids: List[str] = Field(min_length=1)
+
+
+# ─── Dataset Models ─────────────────────────────────────────────────────────
+
+class DatasetCreate(BaseModel):
+    """Request body to register a dataset: its shards, described as chunked files."""
+    name: str = Field(pattern=r"^[A-Za-z0-9][A-Za-z0-9._@+-]{0,127}$", description="e.g. mnist or imagenet@v2")
+    description: Optional[str] = None
+    labels: Dict[str, str] = Field(default_factory=dict)
+    shards: List[ArtifactManifest] = Field(min_length=1)
+
+
+class Dataset(DatasetCreate):
+    """An immutable dataset stored on the master."""
+    size: int = Field(default=0, ge=0, description="Total bytes over all shards")
+    complete: bool = False
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class DatasetUpload(BaseModel):
+    """Answer to registering (or resuming) a dataset upload: the chunks still to send."""
+    dataset: Dataset
+    missing: List[str] = Field(default_factory=list)
+
+
+class DatasetManifest(BaseModel):
+    """The shards of a dataset one reader needs (every ``num_shards``-th, from ``shard_index``)."""
+    name: str
+    shard_index: int = 0
+    num_shards: int = 1
+    total_shards: int
+    shards: List[ArtifactManifest]
+
+
+# ─── Swarm Models ───────────────────────────────────────────────────────────
+
+class SwarmAnnounce(BaseModel):
+    """Chunks a worker holds and serves to its peers."""
+    peer: str = Field(description="host:port of the worker's chunk server")
+    digests: List[str] = Field(default_factory=list)
+    full: bool = Field(default=False, description="The complete list: forget chunks not in it")
+
+
+class SwarmLocate(BaseModel):
+    """Request for sources of chunks a worker is missing."""
+    peer: Optional[str] = Field(default=None, description="The asking worker's chunk server, if it serves")
+    digests: List[str]
+
+
+class ChunkSources(BaseModel):
+    """Where to fetch a chunk: peers holding it, or the master when none does."""
+    peers: List[str] = Field(default_factory=list)
+    master: bool = False
 
 
 # ─── Node Models ────────────────────────────────────────────────────────────
@@ -132,6 +484,7 @@ class NodeRegister(BaseModel):
     port: int = Field(default=8081)
     resources: ResourceInfo
     labels: Dict[str, str] = Field(default_factory=dict)
+    max_concurrent_jobs: int = Field(default=2, ge=1, description="Jobs the worker runs at once")
     version: str = Field(default="0.1.0")
 
 
@@ -145,6 +498,8 @@ class Node(BaseModel):
     resources: ResourceInfo
     labels: Dict[str, str] = Field(default_factory=dict)
     current_jobs: List[str] = Field(default_factory=list)
+    job_usage: Dict[str, JobResourceUsage] = Field(default_factory=dict, description="Usage per running job, from the last heartbeat")
+    cached: Dict[str, int] = Field(default_factory=dict, description="Bytes of job inputs cached on the node, by source (see core.utils.locality)")
     max_concurrent_jobs: int = Field(default=2)
     registered_at: datetime = Field(default_factory=datetime.utcnow)
     last_heartbeat: Optional[datetime] = None
@@ -159,13 +514,17 @@ class HeartbeatRequest(BaseModel):
     worker_id: str
     resources: ResourceInfo
     active_jobs: List[str] = Field(default_factory=list)
+    job_usage: Dict[str, JobResourceUsage] = Field(default_factory=dict)
     uptime_seconds: float = 0
+    cached: Optional[Dict[str, int]] = Field(default=None, description="Bytes of job inputs cached, by source; None if unchanged since the last heartbeat")
 
 
 class JobAssignment(BaseModel):
     """A job assigned to a worker for execution."""
     job_id: str
     spec: JobSpec
+    checkpoint: Optional[Checkpoint] = Field(default=None, description="Restored into the checkpoint directory before the job starts")
+    rendezvous: Optional[Rendezvous] = Field(default=None, description="Rank of a distributed job: meet the other ranks before starting")
 
 
 class HeartbeatResponse(BaseModel):
@@ -175,6 +534,29 @@ class HeartbeatResponse(BaseModel):
     commands: List[str] = Field(default_factory=list, description="Control commands (e.g. 'drain', 'cancel:job-id')")
 
 
+class JobTrace(BaseModel):
+    """Lifecycle trace of one job with derived phase durations."""
+    job_id: str
+    status: JobStatus
+    events: List[JobEvent] = Field(default_factory=list)
+    durations: Dict[str, float] = Field(default_factory=dict, description="Seconds per phase, e.g. queue_wait")
+
+
+class PhaseLatency(BaseModel):
+    """Rolling latency percentiles of one lifecycle phase."""
+    count: int = 0
+    p50: Optional[float] = None
+    p95: Optional[float] = None
+    p99: Optional[float] = None
+
+
+class LatencyReport(BaseModel):
+    """Rolling lifecycle latency percentiles, optionally for one label."""
+    label: Optional[str] = None
+    window: int = Field(description="Max samples kept per phase")
+    phases: Dict[str, PhaseLatency] = Field(default_factory=dict)
+
+
 class ClusterStatus(BaseModel):
     """Aggregated cluster status."""
     total_nodes: int = 0
@@ -0,0 +1,41 @@
+"""Utility functions for matching job inputs to the inputs a node has cached."""
+
+from typing import Dict, Iterable
+from urllib.parse import urlparse
+
+
+def input_key(source: str) -> str:
+    """Normalize a volume source to the key workers report cached bytes under.
+
+    ``#sha256=`` pins and ``file://`` prefixes are dropped, and every shard
+    of a dataset counts towards the dataset: ``dataset://mnist/train-0.tar``
+    and ``dataset://mnist?shard_index=1&num_shards=4`` are both ``dataset://mnist``.
+
+    Args:
+        source: A ``JobSpec.volumes`` source.
+
+    Returns:
+        The key for ``Node.cached``.
+    """
+    location = source.partition("#")[0]
+    parsed = urlparse(location)
+    if parsed.scheme == "dataset":
+        return f"dataset://{parsed.netloc}"
+    if parsed.scheme == "file":
+        return parsed.path
+    return location
+
+
+def cached_bytes(sources: Iterable[str], cached: Dict[str, int]) -> int:
+    """Bytes of ``sources`` already present according to a node's ``cached`` summary.
+
+    A directory source also counts the files cached from inside it.
+    """
+    total = 0
+    for key in {input_key(source) for source in sources}:
+        if "://" in key:  # datasets and URLs are never directories
+            total += cached.get(key, 0)
+            continue
+        prefix = key.rstrip("/") + "/"
+        total += sum(size for k, size in cached.items() if k == key or k.startswith(prefix))
+    return total
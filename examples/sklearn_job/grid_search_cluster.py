@@ -0,0 +1,36 @@
+"""5-fold x 50-candidate grid search whose fits run on ClusterML workers.
+
+Run it where the master is reachable; the workers need scikit-learn:
+
+    python grid_search_cluster.py --master-url http://master:8080
+"""
+
+import argparse
+import json
+
+import clusterml_sdk.joblib_backend  # noqa: F401  (registers the "clusterml" backend)
+from joblib import parallel_backend
+from sklearn.datasets import load_digits
+from sklearn.model_selection import GridSearchCV
+from sklearn.svm import SVC
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--master-url", default="http://localhost:8080")
+    args = parser.parse_args()
+
+    X, y = load_digits(return_X_y=True)
+    grid = {"C": [0.1, 0.3, 1, 3, 10, 30, 100, 300, 1000, 3000], "gamma": [1e-4, 3e-4, 1e-3, 3e-3, 1e-2]}
+    search = GridSearchCV(SVC(), grid, cv=5, n_jobs=-1, verbose=1)
+
+    # Only the backend changes: batches of fits run as jobs, large arrays are sent once
+    with parallel_backend("clusterml", master_url=args.master_url):
+        search.fit(X / 16.0, y)
+
+    result = {"best_params": search.best_params_, "best_cv_accuracy": round(search.best_score_, 4)}
+    print(f"\nResult: {json.dumps(result, indent=2)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""SGD classifier trained epoch by epoch, reporting accuracy for sweeps."""
+
+import argparse
+import json
+import os
+
+from sklearn.datasets import load_digits
+from sklearn.linear_model import SGDClassifier
+from sklearn.model_selection import train_test_split
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--alpha", type=float, default=1e-4)
+    parser.add_argument("--loss", default="hinge")
+    parser.add_argument("--epochs", type=int, default=27)
+    args = parser.parse_args()
+
+    X, y = load_digits(return_X_y=True)
+    X_train, X_val, y_train, y_val = train_test_split(X / 16.0, y, test_size=0.25, random_state=0)
+    clf = SGDClassifier(alpha=args.alpha, loss=args.loss, random_state=0)
+
+    # One JSON line per epoch; the worker forwards them to the master
+    with open(os.environ.get("CLUSTERML_METRICS_FILE", os.devnull), "a") as metrics:
+        for epoch in range(1, args.epochs + 1):
+            clf.partial_fit(X_train, y_train, classes=list(range(10)))
+            accuracy = clf.score(X_val, y_val)
+            print(f"epoch {epoch}: accuracy {accuracy:.4f}")
+            metrics.write(json.dumps({"step": epoch, "accuracy": accuracy}) + "\n")
+            metrics.flush()
+
+
+if __name__ == "__main__":
+    main()
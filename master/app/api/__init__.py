@@ -1 +1,18 @@
 """Master API Package."""
+
+from fastapi import HTTPException, status
+
+
+def disabled_detail(feature: str) -> str:
+    """Why ``feature`` is off: it keeps state in one master process's memory."""
+    return f"{feature} is disabled: it needs a single master process (MASTER_WORKERS=1)"
+
+
+def single_process_only(component, feature: str):
+    """``component``, or 404 when it was left out because several master processes run.
+
+    See "Multiple API Processes" in docs/setup/master_setup.md.
+    """
+    if component is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=disabled_detail(feature))
+    return component
@@ -0,0 +1,67 @@
+"""Admin API - operator-only diagnostics for the master process.
+
+All endpoints require the admin key in ``X-API-Key`` (``ADMIN_API_KEY``).
+Without a configured key they are disabled, except in dev mode.
+
+Endpoints:
+    GET    /api/v1/admin/profile             - Sample all threads for N seconds (collapsed stacks)
+    GET    /api/v1/admin/profile/slow-ticks  - Profiles captured during slow scheduler ticks
+"""
+
+import logging
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from core.auth.api_key import APIKeyAuth
+from master.app.profiling import ProfilerBusy, SlowTickProfile, profile_for
+
+logger = logging.getLogger(__name__)
+
+# Injected at startup
+_auth = APIKeyAuth(None, allow_open=False)
+_scheduler = None
+
+
+def init(scheduler, admin_api_key: Optional[str], allow_open: bool = False):
+    """Inject dependencies. Called at application startup."""
+    global _auth, _scheduler
+    _auth = APIKeyAuth(admin_api_key, allow_open=allow_open)
+    _scheduler = scheduler
+
+
+async def require_admin(x_api_key: Optional[str] = Header(None, alias="X-API-Key")):
+    """Reject callers without the admin key."""
+    return await _auth(x_api_key)
+
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def profile(
+    seconds: float = Query(5.0, gt=0, le=60, description="How long to sample"),
+    hz: int = Query(100, ge=1, le=1000, description="Samples per second"),
+):
+    """Profile the event loop, scheduler task and all threads; returns collapsed stacks.
+
+    Feed the output to ``flamegraph.pl`` or load it in speedscope.
+    """
+    try:
+        result = await profile_for(seconds, interval_seconds=1.0 / hz)
+    except ProfilerBusy:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    logger.info(f"Profiled master for {result.duration_seconds:.1f}s ({result.samples} samples)")
+    return PlainTextResponse(
+        result.collapsed(),
+        headers={"X-Profile-Samples": str(result.samples)},
+    )
+
+
+@router.get("/profile/slow-ticks", response_model=List[SlowTickProfile])
+async def slow_ticks():
+    """Profiles captured automatically when a scheduler tick exceeded SLOW_TICK_SECONDS."""
+    if _scheduler is None or _scheduler.watchdog is None:
+        return []
+    return _scheduler.watchdog.recent()
@@ -0,0 +1,225 @@
+"""Artifacts API - chunked upload and ranged download of job outputs.
+
+Endpoints:
+    POST   /api/v1/jobs/{id}/artifacts                  - Send a manifest; returns the chunks still missing
+    PUT    /api/v1/artifacts/chunks/{sha256}            - Upload one chunk (raw body)
+    POST   /api/v1/jobs/{id}/artifacts/{name}/complete  - Mark an uploaded artifact downloadable
+    GET    /api/v1/jobs/{id}/artifacts                  - List a job's artifacts
+    GET    /api/v1/jobs/{id}/artifacts/{name}           - Download (supports Range)
+    GET    /api/v1/artifacts/chunks/{sha256}            - Download one chunk
+    PUT    /api/v1/jobs/{id}/checkpoint                 - Commit a checkpoint whose chunks are uploaded
+    GET    /api/v1/jobs/{id}/checkpoint                 - The job's latest checkpoint
+
+Handlers that look up the job are plain functions, run in the threadpool;
+chunk transfers stream asynchronously.
+"""
+
+import logging
+import re
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
+
+from core.protocols.models import (
+    Artifact,
+    ArtifactManifest,
+    ArtifactUpload,
+    Checkpoint,
+    Job,
+)
+from master.app.artifacts import (
+    MAX_CHUNK_SIZE,
+    ArtifactError,
+    check_chunks,
+    etag,
+    is_digest,
+    validate_manifest,
+)
+from master.app.metrics import ARTIFACT_BYTES, ARTIFACT_CHUNKS
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Injected at startup
+_artifact_store = None
+_job_manager = None
+
+_RANGE = re.compile(r"bytes=(\d*)-(\d*)")
+
+
+def init(artifact_store, job_manager):
+    """Inject dependencies. Called at application startup."""
+    global _artifact_store, _job_manager
+    _artifact_store = artifact_store
+    _job_manager = job_manager
+
+
+def _require_job(job_id: str) -> None:
+    if _job_manager.get(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+
+
+def _require_artifact(job_id: str, name: str) -> Artifact:
+    _require_job(job_id)
+    artifact = _artifact_store.get(job_id, name)
+    if artifact is None or not artifact.complete:
+        raise HTTPException(status_code=404, detail=f"Artifact {name} of job {job_id} not found")
+    return artifact
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """The half-open byte range ``[start, end)`` asked for by a single-range ``Range`` header.
+
+    Returns None when the whole body should be sent (no header, or one this
+    endpoint ignores, such as several ranges); raises ``ValueError`` when the
+    range cannot be satisfied.
+    """
+    match = _RANGE.fullmatch(header.strip()) if header else None
+    if match is None or match.group(1) == match.group(2) == "":
+        return None
+    first, last = match.groups()
+    if first == "":  # suffix: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError(header)
+        return max(0, size - length), size
+    start = int(first)
+    end = size if last == "" else min(int(last) + 1, size)
+    if start >= size or start >= end:
+        raise ValueError(header)
+    return start, end
+
+
+def plan_download(request: Request, size: int, tag: str) -> Tuple[int, int, int, Dict[str, str]]:
+    """Status code, byte range ``[start, end)`` and headers of a download of ``size`` bytes.
+
+    Honours a single ``Range`` (unless ``If-Range`` names another version);
+    an unsatisfiable range raises a 416 ``HTTPException``.
+    """
+    headers = {"Accept-Ranges": "bytes", "ETag": tag}
+    byte_range = None
+    if request.headers.get("if-range", tag) == tag:
+        try:
+            byte_range = parse_range(request.headers.get("range"), size)
+        except ValueError:
+            raise HTTPException(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+    start, end = byte_range or (0, size)
+    code = status.HTTP_200_OK
+    if byte_range is not None:
+        code = status.HTTP_206_PARTIAL_CONTENT
+        headers["Content-Range"] = f"bytes {start}-{end - 1}/{size}"
+    headers["Content-Length"] = str(end - start)
+    return code, start, end, headers
+
+
+async def receive_chunk(chunks, digest: str, request: Request) -> bool:
+    """Stream a request body into ``chunks``; True if it was newly stored."""
+    length = request.headers.get("content-length")
+    if length is not None and length.isdigit() and int(length) > MAX_CHUNK_SIZE:
+        raise HTTPException(status_code=413, detail=f"Chunk exceeds {MAX_CHUNK_SIZE} bytes")
+    try:
+        return await chunks.put(digest, request.stream())
+    except ArtifactError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/jobs/{job_id}/artifacts", response_model=ArtifactUpload)
+def begin_upload(job_id: str, manifest: ArtifactManifest):
+    """Start (or resume) an upload: record the manifest and list the chunks to send."""
+    _require_job(job_id)
+    try:
+        return _artifact_store.begin(job_id, manifest)
+    except ArtifactError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.put("/artifacts/chunks/{digest}")
+async def put_chunk(digest: str, request: Request, response: Response):
+    """Store one chunk, streamed to disk and checked against its SHA-256.
+
+    Chunks are shared by all artifacts: one that is already stored is not
+    written again.
+    """
+    stored = await receive_chunk(_artifact_store.chunks, digest, request)
+    ARTIFACT_CHUNKS.labels("stored" if stored else "duplicate").inc()
+    if stored:
+        ARTIFACT_BYTES.inc(_artifact_store.chunks.size(digest))
+        response.status_code = status.HTTP_201_CREATED
+    return {"digest": digest, "stored": stored}
+
+
+@router.get("/artifacts/chunks/{digest}")
+async def get_chunk(digest: str):
+    """One stored chunk, e.g. of a checkpoint being restored."""
+    if not is_digest(digest) or not _artifact_store.chunks.has(digest):
+        raise HTTPException(status_code=404, detail=f"Chunk {digest} not found")
+    return StreamingResponse(
+        _artifact_store.chunks.read(digest),
+        headers={"Content-Length": str(_artifact_store.chunks.size(digest))},
+        media_type="application/octet-stream",
+    )
+
+
+@router.post("/jobs/{job_id}/artifacts/{name:path}/complete", response_model=Artifact)
+def complete_upload(job_id: str, name: str):
+    """Mark an artifact complete once every chunk in its manifest is stored."""
+    _require_job(job_id)
+    try:
+        return _artifact_store.complete(job_id, name)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"No upload of {name} for job {job_id}")
+    except ArtifactError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.put("/jobs/{job_id}/checkpoint", response_model=Job)
+def commit_checkpoint(job_id: str, checkpoint: Checkpoint):
+    """Make ``checkpoint`` the one the job resumes from.
+
+    Every chunk must already be stored, the generation must be newer than
+    the job's current checkpoint and the sender must be the job's worker
+    (409 otherwise), so a checkpoint is never half-uploaded and a worker the
+    job was taken from cannot overwrite its successor's.
+    """
+    _require_job(job_id)
+    try:
+        for manifest in checkpoint.files:
+            validate_manifest(manifest)
+            check_chunks(_artifact_store.chunks, manifest)
+        return _job_manager.save_checkpoint(job_id, checkpoint)
+    except (ArtifactError, ValueError) as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.get("/jobs/{job_id}/checkpoint", response_model=Checkpoint)
+def get_checkpoint(job_id: str):
+    """The checkpoint a requeued job resumes from."""
+    _require_job(job_id)
+    checkpoint = _job_manager.get(job_id).checkpoint
+    if checkpoint is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} has no checkpoint")
+    return checkpoint
+
+
+@router.get("/jobs/{job_id}/artifacts", response_model=List[Artifact])
+def list_artifacts(job_id: str):
+    """Complete artifacts of a job."""
+    _require_job(job_id)
+    return [a for a in _artifact_store.list(job_id) if a.complete]
+
+
+@router.api_route("/jobs/{job_id}/artifacts/{name:path}", methods=["GET", "HEAD"])
+def download_artifact(job_id: str, name: str, request: Request):
+    """Stream an artifact, or the single byte range asked for with ``Range``."""
+    artifact = _require_artifact(job_id, name)
+    code, start, end, headers = plan_download(request, artifact.size, etag(artifact))
+    if request.method == "HEAD":
+        return Response(status_code=code, headers=headers, media_type="application/octet-stream")
+    return StreamingResponse(
+        _artifact_store.read(artifact, start, end),
+        status_code=code,
+        headers=headers,
+        media_type="application/octet-stream",
+    )
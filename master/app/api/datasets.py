@@ -0,0 +1,181 @@
+"""Datasets API - registration, upload and ranged reads of immutable datasets.
+
+Endpoints:
+    POST   /api/v1/datasets                         - Register a dataset; returns the chunks still missing
+    PUT    /api/v1/datasets/chunks/{sha256}         - Upload one chunk (raw body)
+    GET    /api/v1/datasets/chunks/{sha256}         - Read one chunk (supports Range)
+    GET    /api/v1/datasets                         - List datasets
+    GET    /api/v1/datasets/{name}                  - Get a dataset
+    POST   /api/v1/datasets/{name}/complete         - Freeze an uploaded dataset
+    GET    /api/v1/datasets/{name}/manifest         - Shards for one reader (?shard_index=&num_shards=)
+    GET    /api/v1/datasets/{name}/shards/{shard}   - Read a shard (supports Range)
+"""
+
+import asyncio
+import logging
+from typing import Iterable, List, Tuple
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status
+from starlette.types import Receive, Scope, Send
+
+from core.protocols.models import Dataset, DatasetCreate, DatasetManifest, DatasetUpload
+from master.app.api.artifacts import plan_download, receive_chunk
+from master.app.artifacts import (
+    IO_SIZE,
+    ArtifactError,
+    ChunkStore,
+    chunk_spans,
+    etag,
+    is_digest,
+)
+from master.app.datasets import DatasetExists
+from master.app.metrics import DATASET_BYTES_SERVED
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Injected at startup
+_dataset_store = None
+
+
+def init(dataset_store):
+    """Inject dependencies. Called at application startup."""
+    global _dataset_store
+    _dataset_store = dataset_store
+
+
+class ChunkRangeResponse(Response):
+    """Sends byte spans of chunk files without copying them through Python buffers.
+
+    With a server that implements the ASGI zero-copy extension the spans go
+    out with ``sendfile``. Otherwise each piece is a view of the chunk's
+    shared memory map, which the server hands to the socket; the bytes come
+    straight from the page cache either way.
+    """
+
+    media_type = "application/octet-stream"
+
+    def __init__(self, chunks: ChunkStore, spans: Iterable[Tuple[str, int, int]], status_code: int, headers: dict, send_body: bool = True):
+        super().__init__(status_code=status_code, headers=headers)
+        self.chunks = chunks
+        self.spans = list(spans)
+        self.send_body = send_body
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if self.send_body:
+            if "http.response.zerocopy" in scope.get("extensions", {}):
+                await self._send_zerocopy(send)
+            else:
+                await self._send_mapped(send)
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    async def _send_zerocopy(self, send: Send) -> None:
+        for digest, start, end in self.spans:
+            f = await asyncio.to_thread(open, self.chunks.path(digest), "rb")
+            with f:
+                await send({"type": "http.response.zerocopy", "file": f, "offset": start, "count": end - start, "more_body": True})
+            DATASET_BYTES_SERVED.labels("zerocopy").inc(end - start)
+
+    async def _send_mapped(self, send: Send) -> None:
+        for digest, start, end in self.spans:
+            view = self.chunks.view(digest, start, end)
+            for offset in range(0, len(view), IO_SIZE):
+                await send({"type": "http.response.body", "body": view[offset:offset + IO_SIZE], "more_body": True})
+            DATASET_BYTES_SERVED.labels("mmap").inc(len(view))
+
+
+def _require_dataset(name: str) -> Dataset:
+    dataset = _dataset_store.get(name)
+    if dataset is None or not dataset.complete:
+        raise HTTPException(status_code=404, detail=f"Dataset {name} not found")
+    return dataset
+
+
+def _serve(request: Request, spans_of, size: int, tag: str) -> Response:
+    if request.headers.get("if-none-match") == tag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": tag})
+    code, start, end, headers = plan_download(request, size, tag)
+    # Immutable content: caches may keep it as long as they like
+    headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return ChunkRangeResponse(
+        _dataset_store.chunks, spans_of(start, end), code, headers, send_body=request.method != "HEAD"
+    )
+
+
+@router.post("", response_model=DatasetUpload)
+async def register_dataset(create: DatasetCreate):
+    """Register (or resume uploading) a dataset and list the chunks to send."""
+    try:
+        return _dataset_store.register(create)
+    except DatasetExists as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ArtifactError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.put("/chunks/{digest}")
+async def put_chunk(digest: str, request: Request, response: Response):
+    """Store one chunk, streamed to disk and checked against its SHA-256."""
+    if await receive_chunk(_dataset_store.chunks, digest, request):
+        response.status_code = status.HTTP_201_CREATED
+        return {"digest": digest, "stored": True}
+    return {"digest": digest, "stored": False}
+
+
+@router.api_route("/chunks/{digest}", methods=["GET", "HEAD"])
+async def get_chunk(digest: str, request: Request):
+    """Read one chunk by its hash."""
+    if not is_digest(digest) or not _dataset_store.chunks.has(digest):
+        raise HTTPException(status_code=404, detail=f"Chunk {digest} not found")
+    size = _dataset_store.chunks.size(digest)
+    return _serve(request, lambda start, end: [(digest, start, end)], size, f'"{digest}"')
+
+
+@router.get("", response_model=List[Dataset])
+async def list_datasets():
+    """All datasets, including uploads in progress."""
+    return _dataset_store.list()
+
+
+@router.get("/{name}", response_model=Dataset)
+async def get_dataset(name: str):
+    dataset = _dataset_store.get(name)
+    if dataset is None:
+        raise HTTPException(status_code=404, detail=f"Dataset {name} not found")
+    return dataset
+
+
+@router.post("/{name}/complete", response_model=Dataset)
+async def complete_dataset(name: str):
+    """Freeze a dataset once every chunk of every shard is stored."""
+    try:
+        return _dataset_store.complete(name)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Dataset {name} not found")
+    except ArtifactError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.get("/{name}/manifest", response_model=DatasetManifest)
+async def dataset_manifest(
+    name: str,
+    shard_index: int = Query(0, ge=0, description="This reader's position, e.g. the rank"),
+    num_shards: int = Query(1, ge=1, description="Number of readers splitting the dataset"),
+):
+    """Chunk lists of the shards one reader needs, so it fetches nothing else."""
+    dataset = _require_dataset(name)
+    try:
+        return _dataset_store.manifest(dataset, shard_index, num_shards)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.api_route("/{name}/shards/{shard:path}", methods=["GET", "HEAD"])
+async def read_shard(name: str, shard: str, request: Request):
+    """Read a shard, or the single byte range asked for with ``Range``."""
+    manifest = _dataset_store.shard(_require_dataset(name), shard)
+    if manifest is None:
+        raise HTTPException(status_code=404, detail=f"Shard {shard} of dataset {name} not found")
+    return _serve(request, lambda start, end: chunk_spans(manifest, start, end), manifest.size, etag(manifest))
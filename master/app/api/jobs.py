@@ -6,16 +6,45 @@ Endpoints:
     GET    /api/v1/jobs/{id}     - Get job details
     PUT    /api/v1/jobs/{id}     - Update job (status, result, logs)
     DELETE /api/v1/jobs/{id}     - Cancel a job
+    POST   /api/v1/jobs/{id}/preempt - Stop a job gracefully and requeue it
+    POST   /api/v1/jobs/{id}/rendezvous - A rank's worker joins its distributed job's barrier
+    GET    /api/v1/jobs/{id}/rendezvous - Poll a rank's barrier (ready / aborted)
+    POST   /api/v1/jobs/{id}/metrics - Report intermediate metrics of a running job
     GET    /api/v1/jobs/{id}/logs - Get job logs
+    POST   /api/v1/jobs/logs     - Ingest a batch of job output from a worker (gzip)
     GET    /api/v1/jobs/stats    - Job statistics
+    GET    /api/v1/jobs/latency  - Phase latency percentiles (p50/p95/p99)
+    GET    /api/v1/jobs/{id}/trace - Lifecycle events and phase durations
+
+Handlers are plain functions, which FastAPI runs in its threadpool: store
+calls may block (on another process's SQLite write, for up to the busy
+timeout) and must not stall the event loop. Log ingest reads its body
+asynchronously and hands the store work to a thread.
 """
 
+import asyncio
 import logging
+import zlib
 from typing import Dict, List, Optional
 
-from fastapi import APIRouter, HTTPException, Query, status
-
-from core.protocols.models import Job, JobCreate, JobStatus, JobUpdate
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from pydantic import ValidationError
+
+from core.protocols.models import (
+    Job,
+    JobCreate,
+    JobStatus,
+    JobTrace,
+    JobUpdate,
+    LatencyReport,
+    LogBatch,
+    MetricsReport,
+    Rendezvous,
+    RendezvousJoin,
+)
+from master.app.api import disabled_detail, single_process_only
+from master.app.metrics import LOG_BATCHES, LOG_BYTES
+from master.app.tracing import build_trace
 
 logger = logging.getLogger(__name__)
 
@@ -24,32 +53,86 @@ router = APIRouter()
 # These will be injected at startup (see main.py)
 _job_manager = None
 _scheduler = None
+_log_store = None
+_single_process = True
+
+# Largest log batch accepted after decompression
+MAX_LOG_BATCH_BYTES = 16 * 1024 * 1024
 
 
-def init(job_manager, scheduler):
+def init(job_manager, scheduler, log_store=None, single_process=True):
     """Inject dependencies. Called at application startup."""
-    global _job_manager, _scheduler
+    global _job_manager, _scheduler, _log_store, _single_process
     _job_manager = job_manager
     _scheduler = scheduler
+    _log_store = log_store
+    _single_process = single_process
 
 
 @router.post("", response_model=Job, status_code=status.HTTP_201_CREATED)
-async def submit_job(job_create: JobCreate):
-    """Submit a new job for scheduling."""
+def submit_job(job_create: JobCreate):
+    """Submit a new job for scheduling (or complete it at once from the result cache).
+
+    A ``cache`` submission answers 404 with several master processes, where
+    the result cache is disabled.
+    """
+    if job_create.cache and not _single_process:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=disabled_detail("The result cache"))
     job = _job_manager.create(job_create)
-    # Trigger the scheduler immediately so the job is matched to a node
-    _scheduler.trigger()
+    if job.status == JobStatus.QUEUED:
+        # Trigger the scheduler immediately so the job is matched to a node
+        _scheduler.trigger()
     return job
 
 
 @router.get("/stats", response_model=Dict[str, int])
-async def job_stats():
+def job_stats():
     """Get aggregated job statistics by status."""
     return _job_manager.get_stats()
 
 
+@router.get("/latency", response_model=LatencyReport)
+def job_latency(
+    label: Optional[str] = Query(None, description="Only jobs with this label, e.g. team=ml"),
+):
+    """Rolling p50/p95/p99 of each lifecycle phase over recent jobs."""
+    return _job_manager.latency(label=label)
+
+
+@router.post("/logs")
+async def ingest_logs(request: Request):
+    """Store a batch of job output shipped by a worker.
+
+    The body is a ``LogBatch``, normally gzip-compressed. The whole batch
+    costs one decompress and one parse, whatever its number of lines.
+    Answers 404 with several master processes: workers then stop shipping
+    and rely on the tail sent with the final status.
+    """
+    log_store = single_process_only(_log_store, "Log shipping")
+    body = await request.body()
+    LOG_BYTES.labels("wire").inc(len(body))
+    if request.headers.get("content-encoding", "identity").lower() == "gzip":
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        try:
+            body = decompressor.decompress(body, MAX_LOG_BATCH_BYTES)
+        except zlib.error as e:
+            raise HTTPException(status_code=400, detail=f"Invalid gzip body: {e}")
+        if decompressor.unconsumed_tail:
+            raise HTTPException(status_code=413, detail=f"Log batch exceeds {MAX_LOG_BATCH_BYTES} bytes")
+    elif len(body) > MAX_LOG_BATCH_BYTES:
+        raise HTTPException(status_code=413, detail=f"Log batch exceeds {MAX_LOG_BATCH_BYTES} bytes")
+    LOG_BYTES.labels("raw").inc(len(body))
+    try:
+        batch = LogBatch.model_validate_json(body)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+    LOG_BATCHES.inc()
+    accepted = await asyncio.to_thread(log_store.ingest, batch, known=lambda job_id: _job_manager.get(job_id) is not None)
+    return {"chunks": len(batch.chunks), "accepted": accepted}
+
+
 @router.get("", response_model=List[Job])
-async def list_jobs(
+def list_jobs(
     status_filter: Optional[JobStatus] = Query(None, alias="status"),
     label: Optional[str] = Query(None, description="Filter by label, e.g. team=ml"),
     limit: int = Query(100, ge=1, le=1000),
@@ -60,7 +143,7 @@ async def list_jobs(
 
 
 @router.get("/{job_id}", response_model=Job)
-async def get_job(job_id: str):
+def get_job(job_id: str):
     """Get a single job by ID."""
     job = _job_manager.get(job_id)
     if not job:
@@ -69,7 +152,7 @@ async def get_job(job_id: str):
 
 
 @router.put("/{job_id}", response_model=Job)
-async def update_job(job_id: str, update: JobUpdate):
+def update_job(job_id: str, update: JobUpdate):
     """Update a job's status, result, or logs.
 
     Typically called by worker agents to report progress/completion.
@@ -81,7 +164,7 @@ async def update_job(job_id: str, update: JobUpdate):
 
 
 @router.delete("/{job_id}", response_model=Job)
-async def cancel_job(job_id: str):
+def cancel_job(job_id: str):
     """Cancel a job. No-op if already in a terminal state."""
     job = _job_manager.cancel(job_id)
     if not job:
@@ -89,10 +172,82 @@ async def cancel_job(job_id: str):
     return job
 
 
+@router.post("/{job_id}/preempt", response_model=Job)
+def preempt_job(job_id: str):
+    """Take a job off its worker and queue it again.
+
+    A running job is told to stop gracefully: its worker saves a last
+    checkpoint and reports it QUEUED, and it resumes from that checkpoint
+    wherever it is placed next. No-op unless the job is scheduled or running.
+    Distributed jobs cannot be preempted (409).
+    """
+    try:
+        job = _job_manager.preempt(job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+
+@router.post("/{job_id}/rendezvous", response_model=Rendezvous)
+def join_rendezvous(job_id: str, join: RendezvousJoin):
+    """Join the barrier of a distributed job's rank; rank 0 sends its ``master_port``.
+
+    The answer is ``ready`` (with ``master_port``) once every rank has
+    joined; the worker polls ``GET`` until then. ``aborted`` means the job
+    failed or was cancelled: the rank must not start, or must be stopped.
+    """
+    try:
+        return _job_manager.join_rendezvous(job_id, join)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} is not a rank of a distributed job")
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.get("/{job_id}/rendezvous", response_model=Rendezvous)
+def get_rendezvous(job_id: str):
+    """State of a rank's barrier, polled while waiting and, for aborts, while it runs."""
+    try:
+        return _job_manager.rendezvous(job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} is not a rank of a distributed job")
+
+
+@router.post("/{job_id}/metrics", response_model=Job)
+def report_metrics(job_id: str, report: MetricsReport):
+    """Record a running job's intermediate metrics (steps already reported are ignored).
+
+    Refused (409) unless the job is scheduled or running, and from any
+    worker but the job's own.
+    """
+    try:
+        return _job_manager.report_metrics(job_id, report)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
 @router.get("/{job_id}/logs")
-async def get_job_logs(job_id: str):
-    """Retrieve logs for a job."""
+def get_job_logs(job_id: str):
+    """Retrieve logs for a job.
+
+    Output shipped while the job ran is preferred; the tail reported with the
+    job's final status is the fallback.
+    """
+    job = _job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    shipped = _log_store.read(job_id) if _log_store is not None else None
+    return {"job_id": job_id, "logs": shipped if shipped is not None else job.logs or ""}
+
+
+@router.get("/{job_id}/trace", response_model=JobTrace)
+def get_job_trace(job_id: str):
+    """Lifecycle events of a job and the time spent in each phase."""
     job = _job_manager.get(job_id)
     if not job:
         raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
-    return {"job_id": job_id, "logs": job.logs or ""}
+    return build_trace(job)
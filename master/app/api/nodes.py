@@ -6,6 +6,8 @@ Endpoints:
     GET    /api/v1/nodes/{id}         - Get node details
     DELETE /api/v1/nodes/{id}         - Unregister a node
     POST   /api/v1/nodes/heartbeat    - Worker heartbeat
+
+Like the jobs API, handlers run in the threadpool, off the event loop.
 """
 
 import logging
@@ -14,12 +16,12 @@ from typing import List, Optional
 from fastapi import APIRouter, HTTPException, Query, status
 
 from core.protocols.models import (
+    ClusterStatus,
     HeartbeatRequest,
     HeartbeatResponse,
     Node,
     NodeRegister,
     NodeStatus,
-    ClusterStatus,
 )
 
 logger = logging.getLogger(__name__)
@@ -39,14 +41,14 @@ def init(node_manager, store):
 
 
 @router.post("", response_model=Node, status_code=status.HTTP_201_CREATED)
-async def register_node(registration: NodeRegister):
+def register_node(registration: NodeRegister):
     """Register a worker node with the master."""
     node = _node_manager.register(registration)
     return node
 
 
 @router.get("", response_model=List[Node])
-async def list_nodes(
+def list_nodes(
     status_filter: Optional[NodeStatus] = Query(None, alias="status"),
 ):
     """List all registered worker nodes."""
@@ -54,7 +56,7 @@ async def list_nodes(
 
 
 @router.get("/status", response_model=ClusterStatus)
-async def cluster_status():
+def cluster_status():
     """Get aggregated cluster status."""
     nodes = _node_manager.list_nodes()
     online_nodes = [n for n in nodes if n.status == NodeStatus.ONLINE]
@@ -75,7 +77,7 @@ async def cluster_status():
 
 
 @router.get("/{node_id}", response_model=Node)
-async def get_node(node_id: str):
+def get_node(node_id: str):
     """Get details of a specific worker node."""
     node = _node_manager.get_node(node_id)
     if not node:
@@ -84,14 +86,14 @@ async def get_node(node_id: str):
 
 
 @router.delete("/{node_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def remove_node(node_id: str):
+def remove_node(node_id: str):
     """Unregister a worker node."""
     if not _node_manager.remove_node(node_id):
         raise HTTPException(status_code=404, detail=f"Node {node_id} not found")
 
 
 @router.post("/heartbeat", response_model=HeartbeatResponse)
-async def heartbeat(request: HeartbeatRequest):
+def heartbeat(request: HeartbeatRequest):
     """Process a worker heartbeat.
 
     Workers call this periodically to report health and receive job assignments.
@@ -0,0 +1,52 @@
+"""Replication API - change feed for read replicas and lag reporting.
+
+Endpoints:
+    GET    /api/v1/replication/changes  - Store mutations since a revision (long-poll)
+    GET    /api/v1/replication/status   - Role, revision and replication lag
+"""
+
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request
+
+from master.app.replication import ChangeBatch, ReplicationStatus, read_changes
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Injected at startup
+_store = None
+_follower = None
+
+
+def init(store, follower=None):
+    """Inject dependencies. Called at application startup."""
+    global _store, _follower
+    _store = store
+    _follower = follower
+
+
+@router.get("/changes", response_model=ChangeBatch)
+async def changes(
+    request: Request,
+    since: int = Query(0, ge=0, description="Last revision the caller has applied"),
+    wait: float = Query(0.0, ge=0, le=60, description="Seconds to long-poll when nothing is new"),
+    limit: int = Query(1000, ge=1, le=10000),
+    instance_id: Optional[str] = Query(None, description="Primary instance `since` belongs to, from the last batch"),
+):
+    """Return store mutations newer than `since`, or a full snapshot if the log no longer covers it."""
+    if not hasattr(_store, "changes_since"):
+        raise HTTPException(status_code=501, detail="Storage backend does not publish a change log")
+    return await read_changes(
+        _store, since, wait, limit, abandoned=request.is_disconnected, instance_id=instance_id
+    )
+
+
+@router.get("/status", response_model=ReplicationStatus)
+async def replication_status():
+    """Report this master's replication role and lag."""
+    if _follower is not None:
+        return _follower.status()
+    return ReplicationStatus(role="primary", revision=getattr(_store, "revision", 0))
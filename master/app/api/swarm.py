@@ -0,0 +1,61 @@
+"""Swarm API - tracker for peer-to-peer distribution of dataset chunks.
+
+Endpoints:
+    POST   /api/v1/swarm/announce   - A worker reports the chunks it serves
+    POST   /api/v1/swarm/locate     - Sources (peers, or the master) of chunks a worker lacks
+    GET    /api/v1/swarm/stats      - Peers, tracked chunks and open master leases
+
+With several master processes every endpoint answers 404 (see "Multiple
+API Processes" in docs/setup/master_setup.md): workers then stop announcing
+and fetch chunks straight from the master.
+"""
+
+import logging
+from typing import Dict
+
+from fastapi import APIRouter
+
+from core.protocols.models import ChunkSources, SwarmAnnounce, SwarmLocate
+from master.app.api import single_process_only
+from master.app.metrics import SWARM_SOURCES
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Injected at startup
+_tracker = None
+
+# Chunks per request; keeps one locate call cheap for the tracker
+MAX_DIGESTS = 10000
+
+
+def init(tracker):
+    """Inject dependencies. Called at application startup."""
+    global _tracker
+    _tracker = tracker
+
+
+def _swarm_tracker():
+    return single_process_only(_tracker, "The swarm tracker")
+
+
+@router.post("/announce")
+async def announce(body: SwarmAnnounce):
+    """Record the chunks a worker serves (``full``: all of them, replacing its earlier list)."""
+    _swarm_tracker().announce(body.peer, body.digests[:MAX_DIGESTS], full=body.full)
+    return {"peer": body.peer, "chunks": len(body.digests)}
+
+
+@router.post("/locate", response_model=Dict[str, ChunkSources])
+async def locate(body: SwarmLocate):
+    """Where to fetch each chunk. A chunk with no peers and no master lease is to be asked for again."""
+    answer = _swarm_tracker().locate(body.digests[:MAX_DIGESTS], peer=body.peer)
+    for sources in answer.values():
+        SWARM_SOURCES.labels("peer" if sources.peers else "master" if sources.master else "wait").inc()
+    return answer
+
+
+@router.get("/stats", response_model=Dict[str, int])
+async def stats():
+    return _swarm_tracker().stats()
@@ -0,0 +1,74 @@
+"""Sweeps API - hyperparameter sweeps run as trial jobs.
+
+Endpoints:
+    POST   /api/v1/sweeps       - Start a sweep
+    GET    /api/v1/sweeps       - List sweeps
+    GET    /api/v1/sweeps/{id}  - Get a sweep with its trials and best trial
+    DELETE /api/v1/sweeps/{id}  - Cancel a sweep and its running trials
+
+With several master processes every endpoint answers 404 (see "Multiple
+API Processes" in docs/setup/master_setup.md).
+"""
+
+import logging
+from typing import List
+
+from fastapi import APIRouter, HTTPException, status
+
+from core.protocols.models import Sweep, SweepCreate
+from master.app.api import single_process_only
+from master.app.sweeps import SweepError
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Injected at startup (see main.py)
+_sweep_manager = None
+_scheduler = None
+
+
+def init(sweep_manager, scheduler):
+    """Inject dependencies. Called at application startup."""
+    global _sweep_manager, _scheduler
+    _sweep_manager = sweep_manager
+    _scheduler = scheduler
+
+
+def _sweeps():
+    return single_process_only(_sweep_manager, "The sweep manager")
+
+
+@router.post("", response_model=Sweep, status_code=status.HTTP_201_CREATED)
+def create_sweep(sweep_create: SweepCreate):
+    """Start a sweep; its first trials are queued at once."""
+    try:
+        sweep = _sweeps().create(sweep_create)
+    except SweepError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    _scheduler.trigger()
+    return sweep
+
+
+@router.get("", response_model=List[Sweep])
+def list_sweeps():
+    """List sweeps, newest first."""
+    return _sweeps().list()
+
+
+@router.get("/{sweep_id}", response_model=Sweep)
+def get_sweep(sweep_id: str):
+    """Get a sweep with its trials."""
+    sweep = _sweeps().get(sweep_id)
+    if not sweep:
+        raise HTTPException(status_code=404, detail=f"Sweep {sweep_id} not found")
+    return sweep
+
+
+@router.delete("/{sweep_id}", response_model=Sweep)
+def cancel_sweep(sweep_id: str):
+    """Cancel a sweep: no more trials start and the running ones are cancelled."""
+    sweep = _sweeps().cancel(sweep_id)
+    if not sweep:
+        raise HTTPException(status_code=404, detail=f"Sweep {sweep_id} not found")
+    return sweep
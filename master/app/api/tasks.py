@@ -0,0 +1,93 @@
+"""Tasks API - Python functions run by warm worker processes.
+
+Endpoints:
+    POST   /api/v1/tasks          - Submit a batch of tasks
+    POST   /api/v1/tasks/wait     - Long-poll a session's task outcomes
+    POST   /api/v1/tasks/cancel   - Cancel tasks of a session
+    POST   /api/v1/tasks/lease    - A worker takes tasks (long-poll) and renews its leases
+    POST   /api/v1/tasks/results  - A worker reports outcomes of tasks it ran
+    GET    /api/v1/tasks/stats    - Task statistics
+
+With several master processes every endpoint answers 404 (see "Multiple
+API Processes" in docs/setup/master_setup.md): workers then stop leasing.
+"""
+
+import logging
+from typing import Dict
+
+from fastapi import APIRouter, HTTPException, status
+
+from core.protocols.models import (
+    TaskCancel,
+    TaskLease,
+    TaskLeaseResponse,
+    TaskResults,
+    TaskStatus,
+    TaskSubmit,
+    TaskSubmitted,
+    TaskWait,
+    TaskWaitResponse,
+)
+from master.app.api import single_process_only
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Injected at startup (see main.py)
+_task_queue = None
+
+# Largest task payload accepted (base64 characters)
+MAX_TASK_PAYLOAD = 16 * 1024 * 1024
+
+_ENDED = (TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED)
+
+
+def init(task_queue):
+    """Inject dependencies. Called at application startup."""
+    global _task_queue
+    _task_queue = task_queue
+
+
+def _queue():
+    return single_process_only(_task_queue, "The task queue")
+
+
+@router.post("", response_model=TaskSubmitted, status_code=status.HTTP_201_CREATED)
+async def submit_tasks(submit: TaskSubmit):
+    """Queue a batch of tasks; the ids come back in the order of the payloads."""
+    if any(len(payload) > MAX_TASK_PAYLOAD for payload in submit.payloads):
+        raise HTTPException(status_code=413, detail=f"Task payloads are limited to {MAX_TASK_PAYLOAD} bytes")
+    return TaskSubmitted(ids=_queue().submit(submit))
+
+
+@router.post("/wait", response_model=TaskWaitResponse)
+async def wait_for_tasks(request: TaskWait):
+    """Outcomes of the session's tasks after ``cursor``, which acknowledges those before it."""
+    return await _queue().wait(request)
+
+
+@router.post("/cancel")
+async def cancel_tasks(request: TaskCancel):
+    """Cancel pending and running tasks of a session."""
+    return {"cancelled": _queue().cancel(request)}
+
+
+@router.get("/stats", response_model=Dict[str, int])
+async def task_stats():
+    """Tasks by status, sessions and workers."""
+    return _queue().stats()
+
+
+@router.post("/lease", response_model=TaskLeaseResponse)
+async def lease_tasks(request: TaskLease):
+    """Hand a worker tasks, waiting up to ``wait_seconds`` when none are queued."""
+    return await _queue().lease(request)
+
+
+@router.post("/results")
+async def report_results(results: TaskResults):
+    """Record outcomes of tasks a worker ran."""
+    if any(outcome.status not in _ENDED for outcome in results.results):
+        raise HTTPException(status_code=422, detail="Task outcomes must be completed, failed or cancelled")
+    return {"accepted": _queue().finish(results)}
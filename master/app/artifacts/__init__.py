@@ -0,0 +1,293 @@
+"""Artifact Store - chunked, content-addressed job outputs on the master's disk.
+
+A worker uploads an artifact (``model.pt``, a checkpoint) by first sending
+its manifest: size, chunk size and the SHA-256 of every fixed-size chunk.
+The master answers with the chunks it does not have yet; the worker sends
+only those, one request per chunk, then completes the artifact.
+
+* Chunks are stored once under their hash (``ChunkStore``), so a chunk
+  shared by two artifacts, or two jobs uploading the same weights, is
+  transferred and stored once.
+* An interrupted upload is resumed by sending the manifest again: chunks
+  that arrived are no longer missing.
+* Chunk bodies are streamed to disk while being hashed and installed only
+  if the hash matches; downloads stream chunk files piece by piece. Neither
+  holds more than ``IO_SIZE`` bytes of an artifact in memory, and artifact
+  contents never enter the job record.
+
+Layout under ``root``::
+
+    chunks/ab/abcdef...              one read-only file per chunk hash
+    manifests/<job-id>/<hash>.json   one ``Artifact`` per artifact, by hash of its name
+    tmp/                             chunk uploads in progress
+
+The directory may be shared by several API processes (``MASTER_WORKERS``),
+so on startup only uploads left in ``tmp/`` for over
+``STALE_UPLOAD_SECONDS`` are deleted: a younger file may be another
+process's upload in progress.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import mmap
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from typing import AsyncIterator, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import quote
+
+from core.protocols.models import Artifact, ArtifactManifest, ArtifactUpload
+
+logger = logging.getLogger(__name__)
+
+IO_SIZE = 1 << 20
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+# A chunk upload untouched for this long was interrupted
+STALE_UPLOAD_SECONDS = 3600.0
+
+
+class ArtifactError(Exception):
+    """An upload that cannot be accepted (bad manifest, hash mismatch, missing chunks)."""
+
+
+def is_digest(value: str) -> bool:
+    return len(value) == 64 and all(c in "0123456789abcdef" for c in value)
+
+
+class ChunkStore:
+    """Immutable blobs named by their SHA-256, written atomically.
+
+    ``view()`` maps chunk files into memory and keeps up to ``max_maps`` of
+    them mapped, so concurrent readers of the same chunk share one mapping
+    of the page cache instead of reading it into a buffer each.
+    """
+
+    def __init__(self, root: str, max_maps: int = 256, stale_upload_seconds: float = STALE_UPLOAD_SECONDS):
+        self.root = root
+        self.max_maps = max_maps
+        self._maps: "OrderedDict[str, mmap.mmap]" = OrderedDict()
+        self._tmp = os.path.join(root, "tmp")
+        os.makedirs(self._tmp, exist_ok=True)
+        self._remove_stale_uploads(stale_upload_seconds)
+
+    def _remove_stale_uploads(self, max_age: float) -> None:
+        """Delete leftovers of interrupted uploads, sparing other processes' uploads in progress."""
+        cutoff = time.time() - max_age
+        for name in os.listdir(self._tmp):
+            path = os.path.join(self._tmp, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.unlink(path)
+            except FileNotFoundError:
+                pass  # finished or removed by its process meanwhile
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.root, "chunks", digest[:2], digest)
+
+    def has(self, digest: str) -> bool:
+        return os.path.exists(self.path(digest))
+
+    def size(self, digest: str) -> int:
+        return os.path.getsize(self.path(digest))
+
+    def missing(self, digests: Sequence[str]) -> List[str]:
+        """Digests not stored yet, in first-seen order without repeats."""
+        seen = set()
+        result = []
+        for digest in digests:
+            if digest not in seen and not self.has(digest):
+                result.append(digest)
+            seen.add(digest)
+        return result
+
+    async def put(self, digest: str, body: AsyncIterator[bytes], max_bytes: int = MAX_CHUNK_SIZE) -> bool:
+        """Store a streamed chunk if its content hashes to ``digest``; False if it was already stored."""
+        if not is_digest(digest):
+            raise ArtifactError(f"Invalid chunk digest {digest!r}")
+        if self.has(digest):
+            return False
+        fd, tmp_path = tempfile.mkstemp(dir=self._tmp)
+        h = hashlib.sha256()
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as f:
+                async for piece in body:
+                    size += len(piece)
+                    if size > max_bytes:
+                        raise ArtifactError(f"Chunk exceeds {max_bytes} bytes")
+                    h.update(piece)
+                    f.write(piece)
+                f.flush()
+                await asyncio.to_thread(os.fsync, f.fileno())
+            if h.hexdigest() != digest:
+                raise ArtifactError(f"Chunk content has sha256 {h.hexdigest()}, expected {digest}")
+            final = self.path(digest)
+            os.makedirs(os.path.dirname(final), exist_ok=True)
+            os.chmod(tmp_path, 0o444)
+            try:
+                os.link(tmp_path, final)
+            except FileExistsError:
+                return False  # stored concurrently; same content by definition
+            return True
+        finally:
+            os.unlink(tmp_path)
+
+    def view(self, digest: str, start: int = 0, end: Optional[int] = None) -> memoryview:
+        """A read-only view of bytes ``[start, end)`` of a chunk, backed by a shared memory map.
+
+        The kernel is asked to read the range ahead, so sending the view
+        rarely waits on the disk.
+        """
+        mapped = self._map(digest)
+        end = len(mapped) if end is None else min(end, len(mapped))
+        if end > start and hasattr(mapped, "madvise"):
+            aligned = start - start % mmap.PAGESIZE
+            mapped.madvise(mmap.MADV_WILLNEED, aligned, end - aligned)
+        return memoryview(mapped)[start:end]
+
+    def _map(self, digest: str) -> mmap.mmap:
+        mapped = self._maps.get(digest)
+        if mapped is None:
+            with open(self.path(digest), "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[digest] = mapped
+            if len(self._maps) > self.max_maps:
+                # Not closed: views still being sent keep the mapping alive
+                self._maps.popitem(last=False)
+        else:
+            self._maps.move_to_end(digest)
+        return mapped
+
+    def read(self, digest: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """Bytes ``[start, end)`` of a chunk, in pieces of at most ``IO_SIZE``."""
+        with open(self.path(digest), "rb") as f:
+            f.seek(start)
+            remaining = (end if end is not None else os.fstat(f.fileno()).st_size) - start
+            while remaining > 0:
+                piece = f.read(min(IO_SIZE, remaining))
+                if not piece:
+                    return
+                remaining -= len(piece)
+                yield piece
+
+
+class ArtifactStore:
+    """Artifact manifests per job over a shared ``ChunkStore``."""
+
+    def __init__(self, root: str, chunks: Optional[ChunkStore] = None):
+        self.root = root
+        self.chunks = chunks or ChunkStore(root)
+        self._manifests = os.path.join(root, "manifests")
+        os.makedirs(self._manifests, exist_ok=True)
+
+    def _manifest_path(self, job_id: str, name: str) -> str:
+        # Hashed, so long or nested names map to one short file name
+        return os.path.join(self._manifests, quote(job_id, safe=""), hashlib.sha256(name.encode()).hexdigest()[:40] + ".json")
+
+    def _save(self, artifact: Artifact) -> None:
+        path = self._manifest_path(artifact.job_id, artifact.name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        with os.fdopen(fd, "w") as f:
+            f.write(artifact.model_dump_json())
+        os.replace(tmp_path, path)
+
+    def get(self, job_id: str, name: str) -> Optional[Artifact]:
+        try:
+            with open(self._manifest_path(job_id, name)) as f:
+                return Artifact.model_validate_json(f.read())
+        except FileNotFoundError:
+            return None
+
+    def list(self, job_id: str) -> List[Artifact]:
+        directory = os.path.join(self._manifests, quote(job_id, safe=""))
+        try:
+            names = [n for n in os.listdir(directory) if not n.startswith(".tmp-")]
+        except FileNotFoundError:
+            return []
+        artifacts = []
+        for name in names:
+            with open(os.path.join(directory, name)) as f:
+                artifacts.append(Artifact.model_validate_json(f.read()))
+        return sorted(artifacts, key=lambda a: a.name)
+
+    def link(self, artifact: Artifact, job_id: str) -> Artifact:
+        """Give ``job_id`` a copy of a complete artifact; its chunks are shared, not copied."""
+        linked = artifact.model_copy(update={"job_id": job_id})
+        self._save(linked)
+        return linked
+
+    def begin(self, job_id: str, manifest: ArtifactManifest) -> ArtifactUpload:
+        """Record (or re-send) a manifest and return the chunks still missing."""
+        validate_manifest(manifest)
+        existing = self.get(job_id, manifest.name)
+        if existing is not None and existing.complete and existing.chunks == manifest.chunks and existing.size == manifest.size:
+            return ArtifactUpload(artifact=existing, missing=[])
+        artifact = Artifact(job_id=job_id, **manifest.model_dump())
+        self._save(artifact)
+        return ArtifactUpload(artifact=artifact, missing=self.chunks.missing(artifact.chunks))
+
+    def complete(self, job_id: str, name: str) -> Artifact:
+        """Mark an artifact downloadable once all of its chunks are stored."""
+        artifact = self.get(job_id, name)
+        if artifact is None:
+            raise KeyError(name)
+        if not artifact.complete:
+            check_chunks(self.chunks, artifact)
+            artifact = artifact.model_copy(update={"complete": True})
+            self._save(artifact)
+            logger.info(f"Artifact {name} of job {job_id} complete ({artifact.size} bytes)")
+        return artifact
+
+    def read(self, artifact: Artifact, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """Bytes ``[start, end)`` of an artifact, streamed chunk file by chunk file."""
+        for digest, chunk_start, chunk_end in chunk_spans(artifact, start, end):
+            yield from self.chunks.read(digest, chunk_start, chunk_end)
+
+
+def chunk_spans(manifest: ArtifactManifest, start: int = 0, end: Optional[int] = None) -> Iterator[Tuple[str, int, int]]:
+    """``(digest, start, end)`` within each chunk covering bytes ``[start, end)`` of a file."""
+    end = manifest.size if end is None else min(end, manifest.size)
+    index = start // manifest.chunk_size
+    offset = start - index * manifest.chunk_size
+    position = start
+    while position < end and index < len(manifest.chunks):
+        take = min(manifest.chunk_size - offset, end - position)
+        yield manifest.chunks[index], offset, offset + take
+        position += take
+        index += 1
+        offset = 0
+
+
+def check_chunks(chunks: ChunkStore, manifest: ArtifactManifest) -> None:
+    """Raise ``ArtifactError`` unless every chunk of ``manifest`` is stored with the right size."""
+    missing = chunks.missing(manifest.chunks)
+    if missing:
+        raise ArtifactError(f"{len(missing)} chunks of {manifest.name} have not been uploaded")
+    for index, digest in enumerate(manifest.chunks):
+        expected = min(manifest.chunk_size, manifest.size - index * manifest.chunk_size)
+        if chunks.size(digest) != expected:
+            raise ArtifactError(f"Chunk {index} of {manifest.name} is {chunks.size(digest)} bytes, expected {expected}")
+
+
+def etag(artifact: ArtifactManifest) -> str:
+    """Strong validator: the artifact's content is fully determined by its chunk list."""
+    return '"' + hashlib.sha256(json.dumps(artifact.chunks).encode()).hexdigest()[:32] + '"'
+
+
+def validate_manifest(manifest: ArtifactManifest) -> None:
+    """Raise ``ArtifactError`` unless the chunk list fits the size and the name is a relative path."""
+    if manifest.chunk_size > MAX_CHUNK_SIZE:
+        raise ArtifactError(f"chunk_size may be at most {MAX_CHUNK_SIZE}")
+    expected = -(-manifest.size // manifest.chunk_size)
+    if len(manifest.chunks) != expected:
+        raise ArtifactError(f"{manifest.size} bytes in chunks of {manifest.chunk_size} need {expected} digests, got {len(manifest.chunks)}")
+    bad = next((d for d in manifest.chunks if not is_digest(d)), None)
+    if bad is not None:
+        raise ArtifactError(f"Invalid chunk digest {bad!r}")
+    name = os.path.normpath(manifest.name)
+    if name.startswith(("/", "..")) or name == ".":
+        raise ArtifactError(f"Artifact name {manifest.name!r} must be a relative path")
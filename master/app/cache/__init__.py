@@ -0,0 +1,176 @@
+"""Result Cache - results of completed jobs, reused by identical resubmissions.
+
+A job submitted with ``cache`` is given a ``cache_key``: the SHA-256 of a
+canonical form of its spec. If a job with the same key completed less than
+``ttl_seconds`` ago, the new job is created COMPLETED with that job's
+result and artifacts and is never scheduled. Otherwise it runs as usual,
+and once it completes its result is stored under the key.
+
+* The key covers everything the spec says about the run: image, command,
+  args, env, resources, volumes, outputs and distribution. Name and labels
+  are not part of it. Env is ordered by name (repeated names keep their
+  order), outputs are a set, and CPU and memory are compared by amount, so
+  ``1000m`` and ``1`` are the same request.
+* Inputs must be declared by content: a volume source pinned with
+  ``#sha256=`` or a dataset (immutable once complete, so its name
+  identifies its content). A job with any other source, such as an
+  unpinned URL or a host path, could read different bytes next time; it
+  is not cached and simply runs. The image counts by reference, so pin it
+  by digest (``image@sha256:...``) for the key to follow its content.
+* Only COMPLETED jobs whose outputs were all uploaded are stored. The hit
+  shares the artifacts' chunks: only their manifests are written again.
+* ``cache_bypass`` runs a job even on a hit, and its result replaces the
+  entry; for a job that turned out not to be deterministic, or a bad entry.
+* Entries expire ``ttl_seconds`` after their job completed. Beyond
+  ``max_entries`` entries or ``max_bytes`` of results and artifact
+  manifests (their JSON size), the least recently used entry is evicted;
+  a job whose entry alone exceeds ``max_bytes`` is not stored.
+
+One master process only: see "Multiple API Processes" in
+docs/setup/master_setup.md.
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+from core.protocols.models import Artifact, Job, JobSpec, JobStatus
+from core.utils.resources import parse_cpu, parse_memory
+from master.app.artifacts import ArtifactStore, is_digest
+from master.app.metrics import RESULT_CACHE
+
+logger = logging.getLogger(__name__)
+
+
+def is_declared(source: str) -> bool:
+    """Whether a volume source names its content: pinned with ``#sha256=``, or a dataset."""
+    location, _, fragment = source.partition("#")
+    if fragment.startswith("sha256="):
+        return is_digest(fragment[len("sha256="):].lower())
+    return urlparse(location).scheme == "dataset"
+
+
+def cache_key(spec: JobSpec) -> Optional[str]:
+    """SHA-256 of the canonical form of ``spec``; None if it has inputs not declared by content."""
+    if not all(is_declared(volume.source) for volume in spec.volumes):
+        return None
+    canonical = spec.model_dump(mode="json")
+    canonical["env"] = sorted(canonical["env"], key=lambda e: e["name"])
+    canonical["outputs"] = sorted(set(canonical["outputs"]))
+    resources = canonical["resources"]
+    try:
+        resources["cpu"] = parse_cpu(resources["cpu"])
+        resources["memory"] = parse_memory(resources["memory"])
+    except ValueError:
+        pass  # unparsable amounts are compared as written
+    body = json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+class CachedResult:
+    """What a completed job left: its result and artifacts."""
+
+    __slots__ = ("job_id", "result", "artifacts", "stored_at", "size")
+
+    def __init__(self, job_id: str, result: Dict[str, Any], artifacts: List[Artifact], stored_at: float):
+        self.job_id = job_id
+        self.result = result
+        self.artifacts = artifacts
+        self.stored_at = stored_at
+        self.size = len(json.dumps(result, separators=(",", ":"), default=str)) + sum(
+            len(a.model_dump_json()) for a in artifacts
+        )
+
+
+class ResultCache:
+    """Results of completed jobs by cache key, with TTL and LRU eviction."""
+
+    def __init__(
+        self,
+        artifact_store: Optional[ArtifactStore] = None,
+        max_entries: int = 10000,
+        ttl_seconds: float = 86400.0,
+        clock: Callable[[], float] = time.monotonic,
+        max_bytes: int = 64 * 1024 * 1024,
+    ):
+        self.artifact_store = artifact_store
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.size_bytes = 0
+        self._entries: "OrderedDict[str, CachedResult]" = OrderedDict()
+        self._lock = threading.Lock()  # lookups and records come from threadpool threads
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def key(self, spec: JobSpec) -> Optional[str]:
+        """The spec's cache key, or None (counted as uncacheable) if it has undeclared inputs."""
+        key = cache_key(spec)
+        if key is None:
+            RESULT_CACHE.labels("uncacheable").inc()
+        return key
+
+    def lookup(self, key: str, bypass: bool = False) -> Optional[CachedResult]:
+        """The live entry under ``key``, if any and not bypassed."""
+        if bypass:
+            RESULT_CACHE.labels("bypass").inc()
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.clock() - entry.stored_at > self.ttl_seconds:
+                self._remove(key)
+                RESULT_CACHE.labels("expired").inc()
+                entry = None
+            if entry is None:
+                RESULT_CACHE.labels("miss").inc()
+                return None
+            self._entries.move_to_end(key)
+        RESULT_CACHE.labels("hit").inc()
+        return entry
+
+    def restore(self, entry: CachedResult, job_id: str) -> None:
+        """Give ``job_id`` the artifacts of the entry's job."""
+        if self.artifact_store is None:
+            return  # entries were stored without artifacts
+        for artifact in entry.artifacts:
+            self.artifact_store.link(artifact, job_id)
+
+    def record(self, job: Job) -> None:
+        """Store a finished job's result under its key if it completed with all its outputs.
+
+        Registered as a ``JobManager.on_finished`` callback.
+        """
+        if job.cache_key is None or job.cached_from is not None or job.status != JobStatus.COMPLETED:
+            return
+        result = job.result or {}
+        if "artifact_error" in result:
+            return  # some outputs are missing
+        artifacts: List[Artifact] = []
+        if self.artifact_store is not None:
+            artifacts = [a for a in self.artifact_store.list(job.id) if a.complete]
+        entry = CachedResult(job.id, copy.deepcopy(result), artifacts, self.clock())
+        if entry.size > self.max_bytes:
+            logger.info(f"Job {job.id} ({job.name}): result of {entry.size} bytes is too large to cache")
+            return
+        with self._lock:
+            self._remove(job.cache_key)
+            self._entries[job.cache_key] = entry
+            self.size_bytes += entry.size
+            RESULT_CACHE.labels("stored").inc()
+            while len(self._entries) > self.max_entries or self.size_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                RESULT_CACHE.labels("evicted").inc()
+        logger.info(f"Job {job.id} ({job.name}): result cached under {job.cache_key[:16]}")
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size_bytes -= entry.size
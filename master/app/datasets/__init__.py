@@ -0,0 +1,126 @@
+"""Dataset Store - immutable, chunked datasets served from the master's disk.
+
+A dataset is a named list of shards (files such as ``train-00001.tar``),
+each stored as content-addressed chunks in a ``ChunkStore`` exactly like an
+artifact. Registration sends the shard manifests and returns the chunks the
+master lacks; after those are uploaded the dataset is completed and can no
+longer change. Re-registering a complete dataset with the same shards is a
+no-op, with different shards an error: publish a new name (``mnist@v2``).
+
+Reads are served from memory-mapped chunk files (``ChunkStore.view``), so
+many jobs reading the same dataset share the page cache and one mapping per
+chunk instead of each request reading the file into its own buffers.
+
+Layout under ``root``::
+
+    chunks/ab/abcdef...     one read-only file per chunk hash
+    datasets/<name>.json    one ``Dataset`` per dataset
+    tmp/                    chunk uploads in progress
+"""
+
+import logging
+import os
+import tempfile
+from typing import List, Optional
+
+from core.protocols.models import (
+    ArtifactManifest,
+    Dataset,
+    DatasetCreate,
+    DatasetManifest,
+    DatasetUpload,
+)
+from master.app.artifacts import (
+    ArtifactError,
+    ChunkStore,
+    check_chunks,
+    validate_manifest,
+)
+
+logger = logging.getLogger(__name__)
+
+# Names the API routes use as path segments under /datasets
+_RESERVED = {"chunks"}
+
+
+class DatasetExists(ArtifactError):
+    """A complete dataset with that name already holds different content."""
+
+
+class DatasetStore:
+    """Dataset manifests over a ``ChunkStore``."""
+
+    def __init__(self, root: str, chunks: Optional[ChunkStore] = None):
+        self.root = root
+        self.chunks = chunks or ChunkStore(root)
+        self._datasets = os.path.join(root, "datasets")
+        os.makedirs(self._datasets, exist_ok=True)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self._datasets, name + ".json")
+
+    def _save(self, dataset: Dataset) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self._datasets, prefix=".tmp-")
+        with os.fdopen(fd, "w") as f:
+            f.write(dataset.model_dump_json())
+        os.replace(tmp_path, self._path(dataset.name))
+
+    def get(self, name: str) -> Optional[Dataset]:
+        try:
+            with open(self._path(name)) as f:
+                return Dataset.model_validate_json(f.read())
+        except FileNotFoundError:
+            return None
+
+    def list(self) -> List[Dataset]:
+        names = sorted(n[:-len(".json")] for n in os.listdir(self._datasets) if n.endswith(".json") and not n.startswith(".tmp-"))
+        return [d for d in map(self.get, names) if d is not None]
+
+    def register(self, create: DatasetCreate) -> DatasetUpload:
+        """Record (or re-send) a dataset's shards and return the chunks still missing."""
+        if create.name in _RESERVED:
+            raise ArtifactError(f"Dataset name {create.name!r} is reserved")
+        names = set()
+        for shard in create.shards:
+            validate_manifest(shard)
+            if shard.name in names:
+                raise ArtifactError(f"Shard {shard.name!r} is listed twice")
+            names.add(shard.name)
+        existing = self.get(create.name)
+        if existing is not None and existing.complete:
+            if existing.shards != create.shards:
+                raise DatasetExists(f"Dataset {create.name} is complete and immutable; register a new name")
+            return DatasetUpload(dataset=existing, missing=[])
+        dataset = Dataset(**create.model_dump(), size=sum(s.size for s in create.shards))
+        self._save(dataset)
+        return DatasetUpload(dataset=dataset, missing=self.chunks.missing([d for s in dataset.shards for d in s.chunks]))
+
+    def complete(self, name: str) -> Dataset:
+        """Freeze a dataset once every chunk of every shard is stored."""
+        dataset = self.get(name)
+        if dataset is None:
+            raise KeyError(name)
+        if not dataset.complete:
+            for shard in dataset.shards:
+                check_chunks(self.chunks, shard)
+            dataset = dataset.model_copy(update={"complete": True})
+            self._save(dataset)
+            logger.info(f"Dataset {name} complete ({len(dataset.shards)} shards, {dataset.size} bytes)")
+        return dataset
+
+    @staticmethod
+    def shard(dataset: Dataset, shard_name: str) -> Optional[ArtifactManifest]:
+        return next((s for s in dataset.shards if s.name == shard_name), None)
+
+    @staticmethod
+    def manifest(dataset: Dataset, shard_index: int = 0, num_shards: int = 1) -> DatasetManifest:
+        """The shards reader ``shard_index`` of ``num_shards`` should read: every ``num_shards``-th."""
+        if not 0 <= shard_index < num_shards:
+            raise ValueError(f"shard_index must be in [0, {num_shards})")
+        return DatasetManifest(
+            name=dataset.name,
+            shard_index=shard_index,
+            num_shards=num_shards,
+            total_shards=len(dataset.shards),
+            shards=dataset.shards[shard_index::num_shards],
+        )
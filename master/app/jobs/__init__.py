@@ -1,35 +1,182 @@
-"""Job Management - CRUD and lifecycle operations for jobs."""
+"""Job Management - CRUD and lifecycle operations for jobs.
+
+A job placed on a worker goes back to the queue (``requeue``) when its node
+times out, or when its worker stops it gracefully: after ``preempt``, or
+because the worker itself is shutting down. It keeps its latest
+``Checkpoint``, so wherever it runs next it resumes from there.
+
+A distributed PyTorch job (``spec.distributed.type: pytorch``) is never
+placed itself. The scheduler places all its ranks at once (``place_ranks``),
+each as a job of its own carrying its ``Rendezvous``: rank, world size,
+local rank and rank 0's address. Before starting, each rank's worker joins
+the barrier (``join_rendezvous``), rank 0's with the port it will listen on;
+once all have joined in time, the ranks start together and the job is
+RUNNING. It completes when every rank has completed; any rank failing,
+being stopped or losing its node, or the barrier timing out, aborts it:
+the job fails and its other ranks are cancelled.
+
+Running jobs may report intermediate metrics (``report_metrics``), kept as
+the job's latest ``metrics``. Other components follow jobs through
+``on_metrics`` and ``on_finished`` callbacks, e.g. sweeps pruning trials.
+
+With a ``ResultCache``, a job submitted with ``cache`` whose identical
+predecessor completed is created COMPLETED with that job's result and
+artifacts (``cached_from``), and never queued.
+"""
 
 import logging
-from datetime import datetime
-from typing import Dict, List, Optional
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence
 
 from core.protocols.models import (
+    Checkpoint,
     Job,
     JobCreate,
+    JobEvent,
+    JobPhase,
     JobStatus,
     JobUpdate,
+    LatencyReport,
+    MetricRecord,
+    MetricsReport,
+    Node,
+    Rendezvous,
+    RendezvousJoin,
+    RendezvousState,
 )
+from master.app.cache import CachedResult, ResultCache
+from master.app.logs import LogStore
+from master.app.metrics import JOB_REQUEUES
 from master.app.storage import InMemoryStore
+from master.app.tracing import LifecycleTracker, report_from_jobs
 
 logger = logging.getLogger(__name__)
 
+TERMINAL_STATUSES = (JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED)
+PLACED_STATUSES = (JobStatus.SCHEDULED, JobStatus.RUNNING)
+QUEUED_STATUSES = (JobStatus.PENDING, JobStatus.QUEUED)
+ACTIVE_STATUSES = tuple(s for s in JobStatus if s not in TERMINAL_STATUSES)
+
+# Reads and guarded writes of one change before giving up: each retry means
+# another process changed the job's status in between
+CONFLICT_ATTEMPTS = 10
+
+# ``limit`` for store listings that must see every matching job
+_ALL = 2 ** 62
+
+# Jobs a latency report computed from the store covers
+LATENCY_WINDOW = 1000
+
+FinishedCallback = Callable[[Job], None]
+MetricsCallback = Callable[[Job, List[MetricRecord]], None]
+
+
+def is_distributed(job: Job) -> bool:
+    """Whether the job is placed as a group of ranks rather than on its own."""
+    distributed = job.spec.distributed
+    return distributed is not None and distributed.type == "pytorch" and job.rendezvous is None
+
 
 class JobManager:
     """Manages job lifecycle: create, update status, cancel, query."""
 
-    def __init__(self, store: InMemoryStore):
+    def __init__(
+        self,
+        store: InMemoryStore,
+        tracker: Optional[LifecycleTracker] = None,
+        log_store: Optional[LogStore] = None,
+        rendezvous_timeout_seconds: float = 120.0,
+        result_cache: Optional[ResultCache] = None,
+        latency_from_store: bool = False,
+    ):
         self.store = store
+        # Several processes share the store: each would see only its own transitions
+        self.tracker = None if latency_from_store else tracker or LifecycleTracker()
+        self.log_store = log_store
+        self.rendezvous_timeout = timedelta(seconds=rendezvous_timeout_seconds)
+        self.result_cache = result_cache
+        self._finished_callbacks: List[FinishedCallback] = []
+        self._metrics_callbacks: List[MetricsCallback] = []
+        if result_cache is not None:
+            self.on_finished(result_cache.record)
+
+    def on_finished(self, callback: FinishedCallback) -> None:
+        """Call ``callback(job)`` whenever a job reaches a terminal status."""
+        self._finished_callbacks.append(callback)
+
+    def on_metrics(self, callback: MetricsCallback) -> None:
+        """Call ``callback(job, records)`` with the new records whenever a job reports metrics."""
+        self._metrics_callbacks.append(callback)
+
+    def _transition(
+        self,
+        job_id: str,
+        phase: JobPhase,
+        detail: Optional[str] = None,
+        expect_status: Optional[Sequence[JobStatus]] = None,
+        **fields: Any,
+    ) -> Optional[Job]:
+        """Apply ``fields`` and append a lifecycle event in one store update.
+
+        With ``expect_status`` nothing happens (and None is returned) unless
+        the job is still in one of those statuses when the update is written.
+        """
+        event = JobEvent(phase=phase, detail=detail)
+        job = self.store.update_job(job_id, expect_status=expect_status, append_events=[event], **fields)
+        if job is not None:
+            if self.tracker is not None:
+                self.tracker.record(job, phase)
+            if phase == JobPhase.FINISHED:
+                for callback in self._finished_callbacks:
+                    callback(job)
+        return job
+
+    def latency(self, label: Optional[str] = None) -> LatencyReport:
+        """Phase latency percentiles over recent jobs, or over those carrying ``label``.
+
+        With ``latency_from_store`` they are computed from the events stored
+        with the latest ``LATENCY_WINDOW`` jobs, whichever process handled them.
+        """
+        if self.tracker is not None:
+            return self.tracker.report(label=label)
+        return report_from_jobs(self.store.list_jobs(label=label, limit=LATENCY_WINDOW), LATENCY_WINDOW, label)
 
     def create(self, job_create: JobCreate) -> Job:
-        """Create and enqueue a new job."""
+        """Create and enqueue a new job, or complete it from the result cache."""
+        key = None
+        cache = self.result_cache
+        if job_create.cache and cache is not None:
+            key = cache.key(job_create.spec)
+            if key is not None:
+                cached = cache.lookup(key, bypass=job_create.cache_bypass)
+                if cached is not None:
+                    return self._create_cached(job_create, key, cached, cache)
         job = self.store.create_job(job_create)
+        submitted = JobEvent(phase=JobPhase.SUBMITTED, timestamp=job.created_at)
         # Immediately move to QUEUED
-        self.store.update_job(job.id, status=JobStatus.QUEUED)
-        job.status = JobStatus.QUEUED
+        job = self.store.update_job(
+            job.id,
+            status=JobStatus.QUEUED,
+            events=[submitted, JobEvent(phase=JobPhase.QUEUED)],
+            cache_key=key,
+        )
         logger.info(f"Job {job.id} ({job.name}) → QUEUED")
         return job
 
+    def _create_cached(self, job_create: JobCreate, key: str, cached: CachedResult, cache: ResultCache) -> Job:
+        """Create a job already COMPLETED with a cached result and artifacts."""
+        job = self.store.create_job(job_create)
+        cache.restore(cached, job.id)
+        self.store.update_job(
+            job.id,
+            events=[JobEvent(phase=JobPhase.SUBMITTED, timestamp=job.created_at)],
+            cache_key=key,
+            cached_from=cached.job_id,
+        )
+        logger.info(f"Job {job.id} ({job.name}) → COMPLETED from the cache (result of {cached.job_id})")
+        return self.mark_completed(job.id, result=cached.result)
+
     def get(self, job_id: str) -> Optional[Job]:
         """Get a job by ID."""
         return self.store.get_job(job_id)
@@ -45,22 +192,67 @@ class JobManager:
         return self.store.list_jobs(status=status, label=label, limit=limit, offset=offset)
 
     def update(self, job_id: str, update: JobUpdate) -> Optional[Job]:
-        """Apply an update to a job."""
-        kwargs: Dict = {}
-        if update.status is not None:
-            kwargs["status"] = update.status
-            if update.status == JobStatus.RUNNING:
-                kwargs["started_at"] = datetime.utcnow()
-            elif update.status in (JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED):
-                kwargs["completed_at"] = datetime.utcnow()
-        if update.result is not None:
-            kwargs["result"] = update.result
-        if update.logs is not None:
-            kwargs["logs"] = update.logs
-
-        job = self.store.update_job(job_id, **kwargs)
-        if job:
-            logger.info(f"Job {job_id} updated: {kwargs}")
+        """Apply an update to a job.
+
+        Worker updates are idempotent: one whose ``seq`` is not above the last
+        applied, or that comes from a worker the job is no longer assigned to,
+        changes nothing and returns the job as it is. A worker reporting
+        QUEUED has stopped the job gracefully: it is requeued. A job in a
+        terminal status keeps it: a late update (e.g. COMPLETED after a
+        cancel) changes only its logs. The update is written only if the job
+        is still in the status it was read in; if another process changed it
+        meanwhile, the update is checked again against the new state.
+        """
+        for _ in range(CONFLICT_ATTEMPTS):
+            current = self.store.get_job(job_id)
+            if current is None:
+                return None
+            if update.seq is not None and current.update_seq is not None and update.seq <= current.update_seq:
+                logger.info(f"Job {job_id}: ignoring replayed update {update.seq} (last applied {current.update_seq})")
+                return current
+            if update.worker_id is not None and current.worker_id != update.worker_id:
+                logger.warning(f"Job {job_id}: ignoring update from {update.worker_id}, job belongs to {current.worker_id}")
+                return current
+            if current.status in TERMINAL_STATUSES:
+                if update.status is not None and update.status != current.status:
+                    logger.info(f"Job {job_id}: ignoring {update.status.value} update, job is already {current.status.value}")
+                if update.logs is not None:
+                    return self.store.update_job(job_id, logs=update.logs)
+                return current
+            if update.status == JobStatus.QUEUED and current.status in PLACED_STATUSES:
+                return self.requeue(job_id, reason="stopped", result=update.result)
+
+            kwargs: Dict = {}
+            phase: Optional[JobPhase] = None
+            if update.status is not None:
+                kwargs["status"] = update.status
+                if update.status != current.status:
+                    if update.status == JobStatus.RUNNING:
+                        kwargs["started_at"] = datetime.utcnow()
+                        phase = JobPhase.STARTED
+                    elif update.status in TERMINAL_STATUSES:
+                        kwargs["completed_at"] = datetime.utcnow()
+                        phase = JobPhase.FINISHED
+            if update.result is not None:
+                kwargs["result"] = update.result
+            if update.logs is not None:
+                kwargs["logs"] = update.logs
+            if update.seq is not None:
+                kwargs["update_seq"] = update.seq
+
+            expect_status = (current.status,)
+            if phase is not None:
+                job = self._transition(job_id, phase, detail=update.status.value, expect_status=expect_status, **kwargs)
+            else:
+                job = self.store.update_job(job_id, expect_status=expect_status, **kwargs)
+            if job is not None:
+                break
+            # Its status changed since it was read, e.g. it was cancelled through another process
+        else:
+            raise RuntimeError(f"Job {job_id}: update not applied, its status kept changing")
+        logger.info(f"Job {job_id} updated: {kwargs}")
+        if job.rendezvous is not None and job.status in TERMINAL_STATUSES:
+            self._rank_finished(job)
         return job
 
     def cancel(self, job_id: str) -> Optional[Job]:
@@ -68,38 +260,346 @@ class JobManager:
         job = self.store.get_job(job_id)
         if not job:
             return None
-        if job.status in (JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED):
+        if job.status in TERMINAL_STATUSES:
             logger.warning(f"Cannot cancel job {job_id} in terminal state {job.status}")
             return job  # Already terminal
 
-        return self.store.update_job(
+        cancelled = self._transition(
             job_id,
+            JobPhase.FINISHED,
+            detail=JobStatus.CANCELLED.value,
+            expect_status=ACTIVE_STATUSES,
             status=JobStatus.CANCELLED,
             completed_at=datetime.utcnow(),
         )
+        if cancelled is None:
+            # It ended since it was read, e.g. its worker reported it completed
+            return self.store.get_job(job_id)
+        job = cancelled
+        # A distributed job takes its ranks with it, and a rank its job
+        for rank_id in job.ranks:
+            self.cancel(rank_id)
+        if job.rendezvous is not None:
+            self._rank_finished(job)
+        return job
+
+    def requeue(self, job_id: str, reason: str, result: Optional[Dict[str, Any]] = None) -> Optional[Job]:
+        """Put a job placed on a worker back in the queue, keeping its checkpoint.
+
+        ``reason`` is ``node_timeout``, ``worker_lost`` (its worker restarted
+        without it) or ``stopped`` (a graceful stop by the worker). The worker is forgotten, so late updates from it are ignored
+        and a heartbeat still listing the job is told to cancel it.
+        """
+        for _ in range(CONFLICT_ATTEMPTS):
+            job = self.store.get_job(job_id)
+            if job is None or job.status not in PLACED_STATUSES:
+                return job
+            if job.rendezvous is not None:
+                # A rank cannot rejoin a group that has started without it
+                failed = self.mark_failed(job_id, error=f"Rank {job.rendezvous.rank} lost ({reason})", expect_status=PLACED_STATUSES)
+                if failed is None:
+                    continue  # e.g. it was cancelled meanwhile
+                self._rank_finished(failed)
+                return failed
+            fields: Dict[str, Any] = {}
+            if result is not None:
+                fields["result"] = result
+            requeued = self._transition(
+                job_id,
+                JobPhase.QUEUED,
+                detail=reason,
+                expect_status=(job.status,),
+                status=JobStatus.QUEUED,
+                worker_id=None,
+                update_seq=None,
+                stop_requested=False,
+                restarts=job.restarts + 1,
+                **fields,
+            )
+            if requeued is not None:
+                break
+            # Its status changed since it was read, e.g. it was cancelled
+        else:
+            raise RuntimeError(f"Job {job_id}: not requeued, its status kept changing")
+        job = requeued
+        JOB_REQUEUES.labels(reason).inc()
+        if self.log_store is not None:
+            self.log_store.restart(job_id, f"requeued ({reason}), attempt {job.restarts + 1}")
+        generation = job.checkpoint.generation if job.checkpoint else None
+        logger.info(f"Job {job_id} ({job.name}) → QUEUED ({reason}), checkpoint generation {generation}")
+        return job
+
+    def preempt(self, job_id: str) -> Optional[Job]:
+        """Take a job off its worker: a running job is stopped gracefully and requeued."""
+        job = self.store.get_job(job_id)
+        if job is None or job.status not in PLACED_STATUSES:
+            return job
+        if job.ranks or job.rendezvous is not None:
+            raise ValueError(f"Job {job_id} is distributed: its ranks cannot resume separately")
+        if job.status == JobStatus.SCHEDULED:
+            # Not started yet, nothing to save: the worker is told to drop it
+            return self.requeue(job_id, reason="stopped")
+        logger.info(f"Job {job_id} ({job.name}): preempting")
+        return self.store.update_job(job_id, stop_requested=True)
+
+    def save_checkpoint(self, job_id: str, checkpoint: Checkpoint) -> Job:
+        """Record a newer checkpoint of a placed job; raises ``ValueError`` when it is refused."""
+        job = self.store.get_job(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        if job.status not in PLACED_STATUSES:
+            raise ValueError(f"Job {job_id} is {job.status.value}, not running")
+        if checkpoint.worker_id is not None and checkpoint.worker_id != job.worker_id:
+            raise ValueError(f"Job {job_id} belongs to {job.worker_id}, not {checkpoint.worker_id}")
+        if job.checkpoint is not None and checkpoint.generation <= job.checkpoint.generation:
+            raise ValueError(f"Job {job_id} already has checkpoint generation {job.checkpoint.generation}")
+        return self.store.update_job(job_id, checkpoint=checkpoint)
+
+    def report_metrics(self, job_id: str, report: MetricsReport) -> Job:
+        """Record intermediate metrics of a placed job; raises ``ValueError`` when they are refused.
+
+        Records at steps not past the job's latest are ignored, so a worker
+        retrying a report, or a requeued job reporting again from its
+        checkpoint, changes nothing.
+        """
+        job = self.store.get_job(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        if job.status not in PLACED_STATUSES:
+            raise ValueError(f"Job {job_id} is {job.status.value}, not running")
+        if report.worker_id is not None and report.worker_id != job.worker_id:
+            raise ValueError(f"Job {job_id} belongs to {job.worker_id}, not {report.worker_id}")
+        last = job.metrics_step
+        records = []
+        for record in sorted(report.records, key=lambda r: r.step):
+            if last is None or record.step > last:
+                records.append(record)
+                last = record.step
+        if not records:
+            return job
+        metrics = dict(job.metrics)
+        for record in records:
+            metrics.update(record.values)
+        job = self.store.update_job(job_id, metrics=metrics, metrics_step=last)
+        for callback in self._metrics_callbacks:
+            callback(job, records)
+        return job
+
+    def mark_scheduled(self, job_id: str, worker_id: str) -> Optional[Job]:
+        """Assign a job to a worker. It runs once the worker picks it up and reports RUNNING.
+
+        Returns None if the job has left the queue since the scheduler read
+        it, e.g. it was cancelled through another API process.
+        """
+        return self._transition(
+            job_id,
+            JobPhase.SCHEDULED,
+            detail=worker_id,
+            expect_status=QUEUED_STATUSES,
+            status=JobStatus.SCHEDULED,
+            worker_id=worker_id,
+        )
+
+    def place_ranks(self, job_id: str, nodes: Sequence[Node]) -> List[Job]:
+        """Schedule one rank of a distributed job on each of ``nodes`` (in rank order), all at once.
+
+        Returns no ranks if the job has left the queue since the scheduler read it.
+        """
+        job = self.store.get_job(job_id)
+        if job is None or job.status not in QUEUED_STATUSES:
+            return []
+        per_node = Counter(node.id for node in nodes)
+        placed: Counter = Counter()
+        ranks = []
+        for rank, node in enumerate(nodes):
+            rendezvous = Rendezvous(
+                gang_id=job.id,
+                rank=rank,
+                world_size=len(nodes),
+                local_rank=placed[node.id],
+                local_world_size=per_node[node.id],
+                master_addr=nodes[0].ip_address,
+            )
+            placed[node.id] += 1
+            rank_job = self.store.create_job(JobCreate(name=f"{job.name}-rank-{rank}", labels=job.labels, spec=job.spec))
+            self.store.update_job(
+                rank_job.id,
+                rendezvous=rendezvous,
+                events=[JobEvent(phase=JobPhase.SUBMITTED, timestamp=rank_job.created_at)],
+            )
+            ranks.append(self.mark_scheduled(rank_job.id, node.id))
+        placed_job = self._transition(
+            job_id,
+            JobPhase.SCHEDULED,
+            detail=f"{len(nodes)} ranks on {len(per_node)} nodes",
+            expect_status=QUEUED_STATUSES,
+            status=JobStatus.SCHEDULED,
+            ranks=[rank.id for rank in ranks],
+        )
+        if placed_job is None:
+            # Cancelled while its ranks were being created: they never run
+            for rank in ranks:
+                self.cancel(rank.id)
+            return []
+        return ranks
+
+    def join_rendezvous(self, job_id: str, join: RendezvousJoin) -> Rendezvous:
+        """Record that a rank's worker reached the barrier, then answer like ``rendezvous``.
+
+        The last rank to join starts the distributed job.
+        """
+        job = self.store.get_job(job_id)
+        if job is None or job.rendezvous is None:
+            raise KeyError(job_id)
+        if join.worker_id is not None and join.worker_id != job.worker_id:
+            raise ValueError(f"Job {job_id} belongs to {job.worker_id}, not {join.worker_id}")
+        fields: Dict[str, Any] = {"joined": True}
+        if job.rendezvous.rank == 0:
+            if join.master_port is None:
+                raise ValueError("Rank 0 must send the port it listens on")
+            fields["master_port"] = join.master_port
+        self.store.update_job(job_id, rendezvous=job.rendezvous.model_copy(update=fields))
+        gang = self.store.get_job(job.rendezvous.gang_id)
+        if gang is not None and gang.status == JobStatus.SCHEDULED and not self._missing_ranks(gang):
+            started = self._transition(
+                gang.id, JobPhase.STARTED, detail=JobStatus.RUNNING.value,
+                expect_status=(JobStatus.SCHEDULED,),
+                status=JobStatus.RUNNING, started_at=datetime.utcnow(),
+            )
+            if started is not None:
+                logger.info(f"Job {gang.id} ({gang.name}): all {len(gang.ranks)} ranks joined, starting")
+        return self.rendezvous(job_id)
+
+    def rendezvous(self, job_id: str) -> Rendezvous:
+        """A rank's view of the barrier: ready once every rank joined, aborted with the job.
+
+        Read-only: a barrier still incomplete ``rendezvous_timeout`` after
+        the ranks were placed reads as aborted, and the job itself is
+        aborted by ``check_rendezvous_timeouts``.
+        """
+        job = self.store.get_job(job_id)
+        if job is None or job.rendezvous is None:
+            raise KeyError(job_id)
+        gang = self.store.get_job(job.rendezvous.gang_id)
+        if gang is None or gang.status in (JobStatus.FAILED, JobStatus.CANCELLED):
+            return job.rendezvous.model_copy(update={"state": RendezvousState.ABORTED})
+        missing = self._missing_ranks(gang)
+        if missing and self._rendezvous_expired(gang):
+            return job.rendezvous.model_copy(update={"state": RendezvousState.ABORTED})
+        if missing:
+            return job.rendezvous
+        rank_0 = self.store.get_job(gang.ranks[0])
+        return job.rendezvous.model_copy(
+            update={"master_port": rank_0.rendezvous.master_port, "state": RendezvousState.READY}
+        )
+
+    def check_rendezvous_timeouts(self) -> List[str]:
+        """Abort distributed jobs whose barrier is still incomplete after ``rendezvous_timeout``.
+
+        Called by the scheduler every tick. Returns the ids of the aborted jobs.
+        """
+        aborted = []
+        for gang in self.store.list_jobs(status=JobStatus.SCHEDULED, limit=_ALL):
+            if not gang.ranks or not self._rendezvous_expired(gang):
+                continue
+            missing = self._missing_ranks(gang)
+            if missing:
+                seconds = self.rendezvous_timeout.total_seconds()
+                self.abort(gang.id, f"Ranks {missing} did not reach the rendezvous within {seconds:g}s")
+                aborted.append(gang.id)
+        return aborted
+
+    def _missing_ranks(self, gang: Job) -> List[int]:
+        """Ranks of a distributed job that have not joined its barrier."""
+        ranks = [self.store.get_job(rank_id) for rank_id in gang.ranks]
+        return [i for i, rank in enumerate(ranks) if rank is None or not rank.rendezvous.joined]
+
+    def _rendezvous_expired(self, gang: Job) -> bool:
+        """Whether a placed distributed job has waited ``rendezvous_timeout`` for its ranks."""
+        if gang.status != JobStatus.SCHEDULED:
+            return False
+        return datetime.utcnow() - gang.events[-1].timestamp > self.rendezvous_timeout
+
+    def abort(self, job_id: str, reason: str) -> Optional[Job]:
+        """Fail a distributed job and cancel its ranks still placed."""
+        job = self.store.get_job(job_id)
+        if job is None or job.status in TERMINAL_STATUSES:
+            return job
+        failed = self.mark_failed(job_id, error=reason)
+        if failed is None:
+            # It ended since it was read, e.g. it was cancelled
+            return self.store.get_job(job_id)
+        job = failed
+        logger.warning(f"Job {job_id} ({job.name}) aborted: {reason}")
+        for rank_id in job.ranks:
+            self.cancel(rank_id)
+        return job
+
+    def _rank_finished(self, rank: Job) -> None:
+        """Complete the distributed job once every rank has, abort it if one did not complete."""
+        gang = self.store.get_job(rank.rendezvous.gang_id)
+        if gang is None or gang.status in TERMINAL_STATUSES:
+            return
+        if rank.status != JobStatus.COMPLETED:
+            reason = f"Rank {rank.rendezvous.rank} {rank.status.value}"
+            exit_code = (rank.result or {}).get("exit_code")
+            if exit_code is not None:
+                reason += f" (exit code {exit_code})"
+            elif rank.error:
+                reason += f": {rank.error}"
+            self.abort(gang.id, reason)
+            return
+        ranks = [self.store.get_job(rank_id) for rank_id in gang.ranks]
+        if all(r is not None and r.status == JobStatus.COMPLETED for r in ranks):
+            self.mark_completed(gang.id, result={"ranks": [r.result for r in ranks]})
+
+    def mark_dispatched(self, job_id: str) -> Optional[Job]:
+        """Record that the job's assignment was handed to its worker.
+
+        Assignments are re-sent until the worker reports the job, so only the
+        first delivery after scheduling is recorded.
+        """
+        job = self.store.get_job(job_id)
+        if job is None or job.status != JobStatus.SCHEDULED:
+            return job
+        if job.events and job.events[-1].phase != JobPhase.SCHEDULED:
+            return job
+        return self._transition(job_id, JobPhase.DISPATCHED, detail=job.worker_id)
 
     def mark_running(self, job_id: str, worker_id: str) -> Optional[Job]:
         """Transition a job to RUNNING on a specific worker."""
-        return self.store.update_job(
+        return self._transition(
             job_id,
+            JobPhase.STARTED,
+            detail=JobStatus.RUNNING.value,
             status=JobStatus.RUNNING,
             worker_id=worker_id,
             started_at=datetime.utcnow(),
         )
 
-    def mark_completed(self, job_id: str, result: Optional[Dict] = None) -> Optional[Job]:
-        """Transition a job to COMPLETED."""
-        return self.store.update_job(
+    def mark_completed(
+        self, job_id: str, result: Optional[Dict] = None, expect_status: Sequence[JobStatus] = ACTIVE_STATUSES,
+    ) -> Optional[Job]:
+        """Transition a job to COMPLETED; None if it is no longer in one of ``expect_status``."""
+        return self._transition(
             job_id,
+            JobPhase.FINISHED,
+            detail=JobStatus.COMPLETED.value,
+            expect_status=expect_status,
             status=JobStatus.COMPLETED,
             completed_at=datetime.utcnow(),
             result=result or {},
         )
 
-    def mark_failed(self, job_id: str, error: str) -> Optional[Job]:
-        """Transition a job to FAILED."""
-        return self.store.update_job(
+    def mark_failed(
+        self, job_id: str, error: str, expect_status: Sequence[JobStatus] = ACTIVE_STATUSES,
+    ) -> Optional[Job]:
+        """Transition a job to FAILED; None if it is no longer in one of ``expect_status``."""
+        return self._transition(
             job_id,
+            JobPhase.FINISHED,
+            detail=JobStatus.FAILED.value,
+            expect_status=expect_status,
             status=JobStatus.FAILED,
             completed_at=datetime.utcnow(),
             error=error,
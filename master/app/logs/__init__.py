@@ -0,0 +1,134 @@
+"""Log Store - bounded, in-memory job output shipped by workers.
+
+Workers send output in batches (see ``LogBatch``), so ingest costs one
+decompress, one parse and one append per job per batch, never per line.
+Each job keeps at most ``max_bytes_per_job`` characters (the tail; the
+truncated head is reported when reading) and at most ``max_jobs`` jobs are
+kept, least recently written first out.
+
+Chunks carry their offset in the job's output stream, which makes ingest
+idempotent: a retried batch is recognised and only what is new is kept.
+A chunk starting past the end means the worker dropped output while the
+master was slow; a marker line records how much is missing.
+
+A requeued job starts a new output stream, at offset 0 again: ``restart``
+marks where it begins, and its offsets count from there.
+
+One master process only: see "Multiple API Processes" in
+docs/setup/master_setup.md.
+"""
+
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import Deque, Optional
+
+from core.protocols.models import LogBatch
+
+logger = logging.getLogger(__name__)
+
+
+class _JobLog:
+    __slots__ = ("chunks", "size", "end", "base", "truncated")
+
+    def __init__(self) -> None:
+        self.chunks: Deque[str] = deque()
+        self.size = 0  # characters held (markers included)
+        self.end = 0  # stream offset of the next expected character
+        self.base = 0  # where the current attempt's stream starts
+        self.truncated = 0  # characters trimmed from the head
+
+
+class LogStore:
+    """Per-job output with a size cap per job and a cap on the number of jobs."""
+
+    def __init__(self, max_bytes_per_job: int = 8 * 1024 * 1024, max_jobs: int = 10000):
+        self.max_bytes_per_job = max_bytes_per_job
+        self.max_jobs = max_jobs
+        self._logs: "OrderedDict[str, _JobLog]" = OrderedDict()
+        # Ingest and requeues come from threadpool threads
+        self._lock = threading.Lock()
+
+    def __contains__(self, job_id: str) -> bool:
+        return job_id in self._logs
+
+    def append(self, job_id: str, offset: int, data: str) -> int:
+        """Add output starting at ``offset``; returns the characters that were new."""
+        with self._lock:
+            return self._append(job_id, offset, data)
+
+    def _append(self, job_id: str, offset: int, data: str) -> int:
+        log = self._logs.get(job_id)
+        if log is None:
+            log = self._logs[job_id] = _JobLog()
+            if len(self._logs) > self.max_jobs:
+                self._logs.popitem(last=False)
+        else:
+            self._logs.move_to_end(job_id)
+
+        offset += log.base
+        if offset + len(data) <= log.end:
+            return 0  # already have all of it
+        if offset < log.end:
+            data = data[log.end - offset :]
+            offset = log.end
+        if offset > log.end:
+            missing = offset - log.end
+            newline = "" if not log.chunks or log.chunks[-1].endswith("\n") else "\n"
+            self._push(log, f"{newline}[clusterml: {missing} characters of output dropped]\n")
+        self._push(log, data)
+        log.end = offset + len(data)
+        return len(data)
+
+    def restart(self, job_id: str, note: str) -> None:
+        """Start a new output stream for the job's next attempt, after a marker line."""
+        with self._lock:
+            log = self._logs.get(job_id)
+            if log is None:
+                return
+            newline = "" if not log.chunks or log.chunks[-1].endswith("\n") else "\n"
+            self._push(log, f"{newline}[clusterml: {note}]\n")
+            log.base = log.end
+
+    def _push(self, log: _JobLog, text: str) -> None:
+        log.chunks.append(text)
+        log.size += len(text)
+        while log.size > self.max_bytes_per_job:
+            head = log.chunks[0]
+            excess = log.size - self.max_bytes_per_job
+            if len(head) <= excess:
+                log.chunks.popleft()
+                trimmed = len(head)
+            else:
+                log.chunks[0] = head[excess:]
+                trimmed = excess
+            log.size -= trimmed
+            log.truncated += trimmed
+
+    def ingest(self, batch: LogBatch, known=None) -> int:
+        """Append every chunk of a batch; returns the new characters stored.
+
+        ``known(job_id)`` is consulted the first time a job is seen, so output
+        for jobs the master does not know is discarded.
+        """
+        accepted = 0
+        for chunk in batch.chunks:
+            if chunk.job_id not in self._logs and known is not None and not known(chunk.job_id):
+                logger.debug(f"Dropping output for unknown job {chunk.job_id}")
+                continue
+            accepted += self.append(chunk.job_id, chunk.offset, chunk.data)
+        return accepted
+
+    def read(self, job_id: str) -> Optional[str]:
+        """The job's stored output, or None if nothing was shipped for it."""
+        with self._lock:
+            log = self._logs.get(job_id)
+            if log is None:
+                return None
+            text = "".join(log.chunks)
+            if len(log.chunks) > 1:
+                log.chunks = deque([text])  # later reads are a single lookup
+            truncated = log.truncated
+        if truncated:
+            text = f"[clusterml: {truncated} earlier characters truncated]\n{text}"
+        return text
@@ -0,0 +1,422 @@
+"""Metrics - Prometheus-style counters, gauges and histograms for the master.
+
+A deliberately small, dependency-free implementation of the Prometheus text
+exposition format (version 0.0.4), served at ``GET /metrics``.
+
+Hot-path cost is one cached dict lookup for the label set, a ``bisect`` into
+the bucket bounds and a short critical section; nothing is formatted until
+a scrape. Gauges describing cluster state (queue depth, nodes, resources)
+are computed from the store at scrape time, so they cost nothing between
+scrapes.
+
+Everything else is counted by the process that did the work. When the
+master runs several processes, ``REGISTRY.label_process`` adds a
+``process`` label to those series, so each process's counters stay
+monotonic and a query sums them over ``process``.
+"""
+
+import bisect
+import math
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.protocols.models import NodeStatus
+from core.utils.resources import parse_cpu, parse_memory
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+# ─── Metric Types ───────────────────────────────────────────────────────────
+
+
+class _Metric:
+    """Base class: a named family of children keyed by label values."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str):
+        """Return the child for the given label values (created on first use)."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _samples(self, extra: str = "") -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self, extra: str = "") -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples(extra))
+        return lines
+
+
+class _Value:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self) -> None:
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter."""
+
+    kind = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def _samples(self, extra: str = "") -> Iterable[str]:
+        for values, child in list(self._children.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, values, extra)} {_format_value(child.value)}"
+
+
+class Gauge(Counter):
+    """Value that can go up and down."""
+
+    kind = "gauge"
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+    def clear(self) -> None:
+        """Drop all children (e.g. before re-populating a label set at scrape time)."""
+        with self._lock:
+            self._children = {}
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...]) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        idx = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[idx] += 1
+            self.sum += value
+
+    def time(self) -> "_Timer":
+        """Context manager that observes the elapsed wall time of its block."""
+        return _Timer(self)
+
+
+class _Timer:
+    __slots__ = ("child", "start")
+
+    def __init__(self, child: _HistogramChild) -> None:
+        self.child = child
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.child.observe(time.perf_counter() - self.start)
+
+
+class Histogram(_Metric):
+    """Distribution of observations in fixed buckets."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.bounds = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.bounds)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def time(self) -> _Timer:
+        return self.labels().time()
+
+    def _samples(self, extra: str = "") -> Iterable[str]:
+        for values, child in list(self._children.items()):
+            with child._lock:
+                counts = list(child.counts)
+                total = child.sum
+            cumulative = 0
+            for bound, count in zip(self.bounds + (math.inf,), counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                if extra:
+                    le = f"{extra},{le}"
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, values, le)} {cumulative}"
+            labels = _format_labels(self.labelnames, values, extra)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class Registry:
+    """Holds metrics and renders them in the Prometheus text format."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._cluster_wide: Set[str] = set()
+        self._process_label = ""
+
+    def _add(self, metric: _Metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def label_process(self, process: Optional[str]) -> None:
+        """Label this process's series with ``process`` (None: no label).
+
+        For a master running several processes. Gauges registered with
+        ``cluster_wide`` are left alone: every process reports the same
+        values for them.
+        """
+        self._process_label = "" if process is None else f'process="{_escape(process)}"'
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, documentation, labelnames))
+
+    def gauge(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        cluster_wide: bool = False,
+    ) -> Gauge:
+        if cluster_wide:
+            self._cluster_wide.add(name)
+        return self._add(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._add(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for name, metric in self._metrics.items():
+            lines.extend(metric.render("" if name in self._cluster_wide else self._process_label))
+        return "\n".join(lines) + "\n"
+
+
+# ─── Master Metrics ─────────────────────────────────────────────────────────
+
+REGISTRY = Registry()
+
+SCHEDULER_TICK_SECONDS = REGISTRY.histogram(
+    "clusterml_scheduler_tick_seconds", "Duration of a scheduling pass."
+)
+SCHEDULER_DECISIONS = REGISTRY.counter(
+    "clusterml_scheduler_decisions_total",
+    "Scheduling decisions per job considered, by outcome.",
+    ["outcome"],
+)
+SCHEDULER_FAILURES = REGISTRY.counter(
+    "clusterml_scheduler_tick_failures_total", "Scheduling passes that raised an exception."
+)
+HEARTBEAT_SECONDS = REGISTRY.histogram(
+    "clusterml_heartbeat_processing_seconds", "Time to process one worker heartbeat."
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    "clusterml_http_request_duration_seconds",
+    "HTTP request latency by method, route template and status code.",
+    ["method", "route", "status"],
+)
+LOG_BATCHES = REGISTRY.counter("clusterml_log_batches_total", "Log batches received from workers.")
+LOG_BYTES = REGISTRY.counter(
+    "clusterml_log_bytes_total",
+    "Log bytes received from workers, compressed on the wire and after decompression.",
+    ["form"],
+)
+ARTIFACT_CHUNKS = REGISTRY.counter(
+    "clusterml_artifact_chunks_total",
+    "Artifact chunks uploaded by workers: stored, or already present and skipped.",
+    ["result"],
+)
+ARTIFACT_BYTES = REGISTRY.counter("clusterml_artifact_bytes_total", "Artifact chunk bytes stored.")
+DATASET_BYTES_SERVED = REGISTRY.counter(
+    "clusterml_dataset_bytes_served_total",
+    "Dataset bytes sent, by how: the server's zero-copy file transfer or views of memory-mapped chunks.",
+    ["mode"],
+)
+SWARM_SOURCES = REGISTRY.counter(
+    "clusterml_swarm_sources_total",
+    "Chunk sources handed out by the swarm tracker: peers, the master, or wait and ask again.",
+    ["source"],
+)
+JOB_REQUEUES = REGISTRY.counter(
+    "clusterml_job_requeues_total",
+    "Jobs put back in the queue after being placed on a worker.",
+    ["reason"],
+)
+SWEEP_TRIALS = REGISTRY.counter(
+    "clusterml_sweep_trials_total",
+    "Sweep trials finished, by outcome (pruned: stopped early as unpromising).",
+    ["outcome"],
+)
+TASKS = REGISTRY.counter(
+    "clusterml_tasks_total",
+    "Python tasks that ended, by outcome, and requeues of tasks lost with a worker.",
+    ["outcome"],
+)
+RESULT_CACHE = REGISTRY.counter(
+    "clusterml_result_cache_total",
+    "Result cache lookups of jobs submitted with cache (hit, miss, expired, bypass, uncacheable), stores and evictions.",
+    ["outcome"],
+)
+JOBS = REGISTRY.gauge("clusterml_jobs", "Jobs in the store by status.", ["status"], cluster_wide=True)
+NODES = REGISTRY.gauge(
+    "clusterml_nodes", "Registered worker nodes by status.", ["status"], cluster_wide=True
+)
+RESOURCES = REGISTRY.gauge(
+    "clusterml_resources",
+    "Capacity of online nodes, split into allocated and free.",
+    ["resource", "state"],
+    cluster_wide=True,
+)
+
+
+def update_cluster_gauges(store) -> None:
+    """Refresh the queue-depth, node and resource gauges from the store."""
+    JOBS.clear()
+    for status, count in store.count_jobs_by_status().items():
+        JOBS.labels(status).set(count)
+
+    NODES.clear()
+    node_counts: Dict[str, int] = {s.value: 0 for s in NodeStatus}
+    totals = {"cpu_cores": 0.0, "memory_mb": 0.0, "gpus": 0.0}
+    allocated = {"cpu_cores": 0.0, "memory_mb": 0.0, "gpus": 0.0}
+    for node in store.list_nodes():
+        node_counts[node.status.value] += 1
+        if node.status != NodeStatus.ONLINE:
+            continue
+        totals["cpu_cores"] += node.resources.cpu_cores
+        totals["memory_mb"] += node.resources.memory_total_mb
+        totals["gpus"] += node.resources.gpu_count
+        for job_id in node.current_jobs:
+            job = store.get_job(job_id)
+            if job is None:
+                continue
+            allocated["cpu_cores"] += parse_cpu(job.spec.resources.cpu)
+            allocated["memory_mb"] += parse_memory(job.spec.resources.memory)
+            allocated["gpus"] += job.spec.resources.gpu
+    for status, count in node_counts.items():
+        NODES.labels(status).set(count)
+    for resource, total in totals.items():
+        RESOURCES.labels(resource, "allocated").set(allocated[resource])
+        RESOURCES.labels(resource, "free").set(max(0.0, total - allocated[resource]))
+
+
+def render_metrics(store) -> str:
+    """Render all master metrics, refreshing scrape-time gauges first."""
+    update_cluster_gauges(store)
+    return REGISTRY.render()
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route request latency.
+
+    Requests are labelled with the route *template* (``/api/v1/jobs/{job_id}``)
+    so label cardinality stays bounded; unmatched paths share one label.
+    """
+
+    def __init__(self, app: ASGIApp, histogram: Histogram = REQUEST_SECONDS):
+        self.app = app
+        self.histogram = histogram
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.histogram.labels(scope["method"], _route_template(scope), str(status_code)).observe(
+                time.perf_counter() - start
+            )
+
+
+def _route_template(scope: Scope) -> str:
+    """The matched route's template, e.g. ``/api/v1/jobs/{job_id}``.
+
+    Taken from the route the router matched (its ``path_format``), so
+    ``{name:path}`` parameters spanning several segments map to one label
+    too. Recent FastAPI versions match included routes without their
+    prefix and record the prefixed route as the effective one.
+    """
+    route = scope.get("route")
+    if route is None:
+        return "<unmatched>"
+    effective = (scope.get("fastapi") or {}).get("effective_route_context")
+    return getattr(effective, "path_format", None) or route.path_format
@@ -7,10 +7,14 @@ from typing import List, Optional
 from core.protocols.models import (
     HeartbeatRequest,
     HeartbeatResponse,
+    JobAssignment,
+    JobStatus,
     Node,
     NodeRegister,
     NodeStatus,
 )
+from master.app.jobs import JobManager
+from master.app.metrics import HEARTBEAT_SECONDS
 from master.app.storage import InMemoryStore
 
 logger = logging.getLogger(__name__)
@@ -19,9 +23,15 @@ logger = logging.getLogger(__name__)
 class NodeManager:
     """Manages worker node lifecycle: register, heartbeat, timeout."""
 
-    def __init__(self, store: InMemoryStore, node_timeout_seconds: float = 90.0):
+    def __init__(
+        self,
+        store: InMemoryStore,
+        node_timeout_seconds: float = 90.0,
+        job_manager: Optional[JobManager] = None,
+    ):
         self.store = store
         self.node_timeout = timedelta(seconds=node_timeout_seconds)
+        self.job_manager = job_manager or JobManager(store)
 
     def register(self, registration: NodeRegister) -> Node:
         """Register a worker node and return its full representation."""
@@ -30,27 +40,81 @@ class NodeManager:
     def heartbeat(self, request: HeartbeatRequest) -> HeartbeatResponse:
         """Process a heartbeat from a worker.
 
-        Updates the node's last-seen timestamp and resource snapshot.
-        Returns any pending job assignments.
+        Updates the node's last-seen timestamp, resource snapshot, per-job
+        usage and, when sent, its summary of cached inputs.
+        Returns any pending job assignments: jobs the scheduler placed on this
+        node that the worker does not report as active yet. Assignments are
+        repeated on every heartbeat until the worker reports the job, so a
+        lost response only delays the start. Jobs the worker still runs but
+        that were cancelled, deleted or taken off it (requeued after a
+        timeout) come back as ``cancel:<job-id>`` commands, preempted ones as
+        ``stop:<job-id>``: stop gracefully, save a checkpoint, report QUEUED.
+        A running job the worker no longer reports was lost with it (the
+        worker restarted and registered again before timing out): it is
+        requeued. Finished jobs the worker has not reported yet stay listed
+        until their update is delivered.
         """
-        node = self.store.get_node(request.worker_id)
-        if node is None:
-            logger.warning(f"Heartbeat from unknown worker {request.worker_id}")
-            return HeartbeatResponse(acknowledged=False)
-
-        self.store.update_node(
-            request.worker_id,
+        with HEARTBEAT_SECONDS.time():
+            return self._heartbeat(request)
+
+    def _heartbeat(self, request: HeartbeatRequest) -> HeartbeatResponse:
+        while True:
+            node = self.store.get_node(request.worker_id)
+            if node is None:
+                logger.warning(f"Heartbeat from unknown worker {request.worker_id}")
+                return HeartbeatResponse(acknowledged=False)
+            response = self._apply_heartbeat(node, request)
+            if response is not None:
+                return response
+            # The scheduler placed a job on the node since it was read: start over
+
+    def _apply_heartbeat(self, node: Node, request: HeartbeatRequest) -> Optional[HeartbeatResponse]:
+        """Answer a heartbeat from ``node`` as read; None if its ``current_jobs`` changed meanwhile."""
+        active = set(request.active_jobs)
+        commands: List[str] = []
+        for job_id in request.active_jobs:
+            job = self.store.get_job(job_id)
+            if job is None or job.status == JobStatus.CANCELLED or job.worker_id != node.id:
+                commands.append(f"cancel:{job_id}")
+            elif job.stop_requested:
+                commands.append(f"stop:{job_id}")
+        assignments: List[JobAssignment] = []
+        for job_id in node.current_jobs:
+            if job_id in active:
+                continue
+            job = self.store.get_job(job_id)
+            if job is None or job.worker_id != node.id:
+                continue
+            if job.status == JobStatus.SCHEDULED:
+                assignments.append(
+                    JobAssignment(job_id=job.id, spec=job.spec, checkpoint=job.checkpoint, rendezvous=job.rendezvous)
+                )
+            elif job.status == JobStatus.RUNNING:
+                logger.warning(f"Job {job_id} is no longer reported by {node.hostname} ({node.id}), requeueing")
+                self.job_manager.requeue(job_id, reason="worker_lost")
+
+        updates = {} if request.cached is None else {"cached": request.cached}
+        # Scheduled-but-not-started jobs keep holding their resources
+        updated = self.store.update_node(
+            node.id,
+            expect_current_jobs=node.current_jobs,
             last_heartbeat=datetime.utcnow(),
             resources=request.resources,
-            current_jobs=request.active_jobs,
+            current_jobs=request.active_jobs + [a.job_id for a in assignments],
+            job_usage=request.job_usage,
             status=NodeStatus.ONLINE,
+            **updates,
         )
+        if updated is None:
+            return None
+        for assignment in assignments:
+            self.job_manager.mark_dispatched(assignment.job_id)
         logger.debug(f"Heartbeat from {node.hostname} ({request.worker_id})")
 
-        return HeartbeatResponse(acknowledged=True)
+        return HeartbeatResponse(acknowledged=True, assigned_jobs=assignments, commands=commands)
 
     def check_timeouts(self) -> List[str]:
-        """Mark nodes as offline if heartbeat has timed out.
+        """Mark nodes as offline if heartbeat has timed out, requeueing their jobs.
 
         Returns list of node IDs that were marked offline.
         """
@@ -58,9 +122,17 @@ class NodeManager:
         now = datetime.utcnow()
         for node in self.store.list_nodes(status=NodeStatus.ONLINE):
             if node.last_heartbeat and (now - node.last_heartbeat) > self.node_timeout:
-                self.store.update_node(node.id, status=NodeStatus.OFFLINE)
+                offline = self.store.update_node(
+                    node.id, expect_current_jobs=node.current_jobs, status=NodeStatus.OFFLINE, current_jobs=[]
+                )
+                if offline is None:
+                    continue  # changed since it was read; checked again next tick
                 logger.warning(f"Node {node.id} ({node.hostname}) timed out")
                 timed_out.append(node.id)
+                for job_id in node.current_jobs:
+                    job = self.store.get_job(job_id)
+                    if job is not None and job.worker_id == node.id:
+                        self.job_manager.requeue(job_id, reason="node_timeout")
         return timed_out
 
     def get_node(self, node_id: str) -> Optional[Node]:
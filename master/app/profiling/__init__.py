@@ -0,0 +1,261 @@
+"""Profiling - in-process sampling profiler for the master.
+
+``SamplingProfiler`` runs a background thread that snapshots every thread's
+Python stack with ``sys._current_frames()`` at a fixed rate. Stacks are
+counted as tuples of code objects and only turned into text when the
+profile is rendered, so a sample costs one frame walk per thread.
+
+Output is in the collapsed-stack format (``frame;frame;frame count``) read by
+``flamegraph.pl``, speedscope and most flame graph viewers. The root frame
+names the thread; on the event loop thread the second frame names the
+asyncio task that was running (``task:scheduler``, ``task:RequestResponseCycle.run_asgi``).
+
+``SlowTickWatchdog`` wraps a scheduler tick: if the tick is still running
+after a threshold it profiles the ticking thread until the tick returns and
+keeps the capture for later inspection.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from types import CodeType
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger(__name__)
+
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+_StackKey = Tuple[int, Optional[str], Tuple[CodeType, ...]]
+
+
+class SlowTickProfile(BaseModel):
+    """Profile captured automatically during a slow scheduler tick."""
+    captured_at: datetime = Field(default_factory=datetime.utcnow)
+    tick_seconds: float
+    threshold_seconds: float
+    samples: int
+    collapsed: str = Field(description="Collapsed stacks of the ticking thread after the threshold")
+
+
+def _short_path(filename: str) -> str:
+    if filename.startswith(_project_root):
+        return os.path.relpath(filename, _project_root)
+    marker = "site-packages" + os.sep
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    return os.path.basename(filename)
+
+
+def _frame_label(code: CodeType) -> str:
+    # ';' separates frames in the collapsed format
+    return f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+def _task_label(loop: asyncio.AbstractEventLoop) -> Optional[str]:
+    """Name of the task currently running on ``loop`` (read from another thread)."""
+    try:
+        task = asyncio.current_task(loop)
+    except RuntimeError:
+        return None
+    if task is None:
+        return None
+    name = task.get_name()
+    if name.startswith("Task-"):
+        # Unnamed tasks (e.g. one per request): group by coroutine instead
+        name = getattr(task.get_coro(), "__qualname__", name)
+    return f"task:{name}"
+
+
+class Profile:
+    """Sample counts of one profiling run."""
+
+    def __init__(
+        self,
+        counts: Dict[_StackKey, int],
+        samples: int,
+        duration_seconds: float,
+        thread_names: Dict[int, str],
+    ):
+        self.counts = counts
+        self.samples = samples
+        self.duration_seconds = duration_seconds
+        self.thread_names = thread_names
+
+    def collapsed(self) -> str:
+        """Render as collapsed stacks, heaviest first."""
+        labels: Dict[CodeType, str] = {}
+        lines: Counter = Counter()
+        for (thread_id, task, codes), count in self.counts.items():
+            frames = [self.thread_names.get(thread_id, f"thread-{thread_id}")]
+            if task is not None:
+                frames.append(task)
+            for code in codes:
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = _frame_label(code)
+                frames.append(label)
+            lines[";".join(frames)] += count
+        return "".join(f"{stack} {count}\n" for stack, count in lines.most_common())
+
+
+class SamplingProfiler:
+    """Samples Python stacks of (some) threads of this process from a background thread."""
+
+    def __init__(
+        self,
+        interval_seconds: float = 0.01,
+        thread_ids: Optional[Set[int]] = None,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+    ):
+        self.interval = interval_seconds
+        self.thread_ids = thread_ids
+        self.loop = loop
+        # ``loop`` must be the loop of the constructing thread
+        self._loop_thread_id = threading.get_ident() if loop is not None else None
+        self._counts: Dict[_StackKey, int] = {}
+        self._names: Dict[int, str] = {}
+        self._samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started = 0.0
+
+    def start(self) -> None:
+        self._started = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="clusterml-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Profile:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return Profile(self._counts, self._samples, time.monotonic() - self._started, self._names)
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self._sample(own_id)
+
+    def _sample(self, own_id: int) -> None:
+        counts = self._counts
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id or (self.thread_ids is not None and thread_id not in self.thread_ids):
+                continue
+            if thread_id not in self._names:
+                # Resolve names while the thread is alive; it may be gone by render time
+                self._names.update((t.ident, t.name) for t in threading.enumerate())
+            codes = []
+            while frame is not None:
+                codes.append(frame.f_code)
+                frame = frame.f_back
+            codes.reverse()
+            task = _task_label(self.loop) if thread_id == self._loop_thread_id else None
+            key = (thread_id, task, tuple(codes))
+            counts[key] = counts.get(key, 0) + 1
+        self._samples += 1
+
+
+# Only one on-demand profile at a time: overlapping samplers skew each other
+_on_demand = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    """Raised when an on-demand profile is already running."""
+
+
+async def profile_for(seconds: float, interval_seconds: float = 0.01) -> Profile:
+    """Profile every thread of this process for ``seconds`` without blocking the event loop."""
+    if not _on_demand.acquire(blocking=False):
+        raise ProfilerBusy()
+    try:
+        profiler = SamplingProfiler(interval_seconds, loop=asyncio.get_running_loop())
+        profiler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profile = profiler.stop()
+        return profile
+    finally:
+        _on_demand.release()
+
+
+class SlowTickWatchdog:
+    """Context manager that profiles a block once it runs longer than a threshold.
+
+    A single daemon thread watches the current block; nothing is sampled for
+    ticks that finish in time. Only the part of the tick after the threshold
+    is captured, which is where a slow tick spends most of its time.
+    """
+
+    def __init__(self, threshold_seconds: float, interval_seconds: float = 0.005, keep: int = 10):
+        self.threshold = threshold_seconds
+        self.interval = interval_seconds
+        self.captures: Deque[SlowTickProfile] = deque(maxlen=keep)
+        self._cond = threading.Condition()
+        self._generation = 0
+        self._tick_thread: Optional[int] = None
+        self._tick_started = 0.0
+        self._profiler: Optional[SamplingProfiler] = None
+        self._watcher: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "SlowTickWatchdog":
+        with self._cond:
+            if self._watcher is None:
+                self._watcher = threading.Thread(target=self._watch, name="clusterml-slow-tick", daemon=True)
+                self._watcher.start()
+            self._generation += 1
+            self._tick_thread = threading.get_ident()
+            self._tick_started = time.monotonic()
+            self._cond.notify()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        with self._cond:
+            elapsed = time.monotonic() - self._tick_started
+            self._tick_thread = None
+            profiler, self._profiler = self._profiler, None
+            self._cond.notify()
+        if profiler is None:
+            return
+        profile = profiler.stop()
+        self.captures.append(
+            SlowTickProfile(
+                tick_seconds=round(elapsed, 6),
+                threshold_seconds=self.threshold,
+                samples=profile.samples,
+                collapsed=profile.collapsed(),
+            )
+        )
+        logger.warning(
+            f"Slow scheduler tick: {elapsed:.3f}s (threshold {self.threshold}s), "
+            f"captured {profile.samples} samples"
+        )
+
+    def _watch(self) -> None:
+        with self._cond:
+            while True:
+                while self._tick_thread is None:
+                    self._cond.wait()
+                generation = self._generation
+                deadline = self._tick_started + self.threshold
+                while self._tick_thread is not None and self._generation == generation:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if self._tick_thread is None or self._generation != generation:
+                    continue
+                self._profiler = SamplingProfiler(self.interval, thread_ids={self._tick_thread})
+                self._profiler.start()
+                while self._tick_thread is not None and self._generation == generation:
+                    self._cond.wait()
+
+    def recent(self) -> List[SlowTickProfile]:
+        """Captured slow ticks, newest first."""
+        return list(reversed(self.captures))
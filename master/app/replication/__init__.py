@@ -0,0 +1,324 @@
+"""Read Replication - stream the primary's change log to read-only masters.
+
+A primary master publishes its store's mutation log over HTTP
+(``GET /api/v1/replication/changes``). A replica master, started with
+``REPLICA_OF=<primary url>``, long-polls that endpoint and applies every
+change to its own in-memory store, so it can serve GET requests locally.
+
+* Only jobs and nodes are replicated. Replicas answer reads of those
+  (``/api/v1/jobs``, ``/api/v1/nodes`` and their records, stats and
+  traces) and redirect every other request under ``/api/``, writes
+  included, to the primary with ``307 Temporary Redirect``. Logs,
+  artifacts, datasets, sweeps, tasks, swarm and job latency live only in
+  the primary's process.
+* Each batch carries the primary store's ``instance_id``, which the
+  replica sends back with its next request. A primary that restarted has
+  a new one and answers with a full snapshot, whatever its revision.
+* Every response carries ``X-Store-Revision``. A client that needs to read
+  its own writes sends that value back as ``X-Min-Revision``; the replica
+  waits briefly for it to catch up and answers 503 if it cannot.
+* ``ReplicaFollower.status()`` reports the replication lag.
+"""
+
+import asyncio
+import logging
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+from pydantic import BaseModel, Field
+from starlette.datastructures import MutableHeaders
+from starlette.responses import JSONResponse, RedirectResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.protocols.models import Job, Node
+from master.app.storage import Change, InMemoryStore, get_store
+
+logger = logging.getLogger(__name__)
+
+REVISION_HEADER = "X-Store-Revision"
+MIN_REVISION_HEADER = "X-Min-Revision"
+
+_READ_METHODS = ("GET", "HEAD", "OPTIONS")
+_MODELS = {"job": Job, "node": Node}
+
+# Reads a replica answers from its replicated job and node tables
+_REPLICATED_READS = re.compile(
+    r"/api/v1/(?:jobs(?:/(?!latency/?$)[^/]+(?:/trace)?)?|nodes(?:/[^/]+)?|replication/[^/]+)/?"
+)
+
+
+# ─── Wire Models ────────────────────────────────────────────────────────────
+
+
+class ChangeRecord(BaseModel):
+    """A single store mutation as sent to replicas."""
+    revision: int
+    kind: str
+    id: str
+    data: Optional[Dict[str, Any]] = None
+
+
+class ChangeBatch(BaseModel):
+    """Response of the change feed endpoint."""
+    revision: int = Field(description="Primary revision when the batch was cut")
+    instance_id: str = Field(description="Primary store instance the revisions belong to")
+    reset: bool = Field(default=False, description="Replica must drop its state and load `changes` as a snapshot")
+    changes: List[ChangeRecord] = Field(default_factory=list)
+
+
+class ReplicationStatus(BaseModel):
+    """Replication role and lag of this master."""
+    role: str
+    revision: int
+    primary_url: Optional[str] = None
+    primary_revision: Optional[int] = None
+    lag_revisions: int = 0
+    lag_seconds: float = 0.0
+    connected: bool = True
+
+
+def _to_record(change: Change) -> ChangeRecord:
+    data = change.record.model_dump(mode="json") if change.record is not None else None
+    return ChangeRecord(revision=change.revision, kind=change.kind, id=change.id, data=data)
+
+
+def _from_record(record: ChangeRecord) -> Change:
+    model = _MODELS[record.kind].model_validate(record.data) if record.data is not None else None
+    return Change(record.revision, record.kind, record.id, model)
+
+
+# ─── Primary Side ───────────────────────────────────────────────────────────
+
+
+async def wait_for_revision(
+    store: InMemoryStore,
+    revision: int,
+    timeout: float,
+    abandoned: Optional[Callable[[], Awaitable[bool]]] = None,
+) -> bool:
+    """Wait until ``store.revision >= revision``. Returns False on timeout.
+
+    Sleeps on the store's ``revision_event()``, so it wakes on the next
+    mutation instead of polling. ``abandoned`` is checked every half second;
+    when it returns True (e.g. the client disconnected) the wait ends early.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        changed = store.revision_event()
+        if store.revision >= revision:
+            return True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        try:
+            await asyncio.wait_for(changed.wait(), remaining if abandoned is None else min(remaining, 0.5))
+        except asyncio.TimeoutError:
+            if abandoned is not None and await abandoned():
+                return False
+
+
+async def read_changes(
+    store: InMemoryStore,
+    since: int,
+    wait: float,
+    limit: int,
+    abandoned: Optional[Callable[[], Awaitable[bool]]] = None,
+    instance_id: Optional[str] = None,
+) -> ChangeBatch:
+    """Build the next change batch for a replica at revision ``since``.
+
+    Long-polls up to ``wait`` seconds when there is nothing new, so an idle
+    replica costs one request per ``wait`` interval while a busy one sees
+    changes within one poll step. A replica whose revisions came from
+    another ``instance_id`` (the primary restarted) gets a snapshot.
+    The batch is built in a thread: a snapshot serializes every job and node.
+    """
+    same_instance = since == 0 or instance_id == store.instance_id
+    if same_instance and store.revision == since and wait > 0:
+        await wait_for_revision(store, since + 1, wait, abandoned=abandoned)
+    return await asyncio.to_thread(_change_batch, store, since, limit, same_instance)
+
+
+def _change_batch(store: InMemoryStore, since: int, limit: int, same_instance: bool) -> ChangeBatch:
+    changes = store.changes_since(since, limit=limit) if same_instance else None
+    if changes is None:
+        revision, jobs, nodes = store.snapshot()
+        snapshot = [Change(revision, "job", j.id, j) for j in jobs]
+        snapshot += [Change(revision, "node", n.id, n) for n in nodes]
+        logger.info(f"Replica at revision {since} needs resync; sending snapshot at {revision}")
+        return ChangeBatch(
+            revision=revision, instance_id=store.instance_id, reset=True, changes=[_to_record(c) for c in snapshot]
+        )
+
+    revision = changes[-1].revision if changes else since
+    return ChangeBatch(revision=revision, instance_id=store.instance_id, changes=[_to_record(c) for c in changes])
+
+
+# ─── Replica Side ───────────────────────────────────────────────────────────
+
+
+class ReplicaFollower:
+    """Tails a primary's change feed and applies it to the local store."""
+
+    def __init__(
+        self,
+        store: InMemoryStore,
+        primary_url: str,
+        poll_wait_seconds: float = 10.0,
+        retry_seconds: float = 1.0,
+        batch_limit: int = 1000,
+    ):
+        self.store = store
+        self.primary_url = primary_url.rstrip("/")
+        self.poll_wait = poll_wait_seconds
+        self.retry_seconds = retry_seconds
+        self.batch_limit = batch_limit
+        self.primary_revision: Optional[int] = None
+        self.primary_instance_id: Optional[str] = None
+        self.connected = False
+        self._caught_up_at = time.monotonic()
+        self._running = False
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Start following the primary."""
+        self._running = True
+        self._task = asyncio.create_task(self._loop(), name="replica-follower")
+        logger.info(f"Replica following {self.primary_url}")
+
+    async def stop(self):
+        """Stop following the primary."""
+        self._running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        logger.info("Replica follower stopped")
+
+    async def _loop(self):
+        """Main replication loop."""
+        timeout = httpx.Timeout(self.poll_wait + 10.0, connect=5.0)
+        async with httpx.AsyncClient(base_url=self.primary_url, timeout=timeout) as client:
+            while self._running:
+                try:
+                    await self.sync_once(client)
+                except Exception as e:
+                    if self.connected:
+                        logger.warning(f"Lost connection to primary {self.primary_url}: {e}")
+                    self.connected = False
+                    await asyncio.sleep(self.retry_seconds)
+
+    async def sync_once(self, client: httpx.AsyncClient, wait: Optional[float] = None) -> ChangeBatch:
+        """Fetch and apply one batch of changes from the primary."""
+        params = {
+            "since": self.store.revision,
+            "wait": self.poll_wait if wait is None else wait,
+            "limit": self.batch_limit,
+        }
+        if self.primary_instance_id is not None:
+            params["instance_id"] = self.primary_instance_id
+        response = await client.get("/api/v1/replication/changes", params=params)
+        response.raise_for_status()
+        batch = ChangeBatch.model_validate_json(response.content)
+        if self.primary_instance_id not in (None, batch.instance_id):
+            logger.warning(f"Primary {self.primary_url} restarted; reloading its state")
+        self.store.apply_changes(
+            [_from_record(r) for r in batch.changes], batch.revision, reset=batch.reset
+        )
+        self.primary_instance_id = batch.instance_id
+
+        self.connected = True
+        primary = response.headers.get(REVISION_HEADER)
+        self.primary_revision = int(primary) if primary is not None else batch.revision
+        if self.store.revision >= self.primary_revision:
+            self._caught_up_at = time.monotonic()
+        return batch
+
+    def status(self) -> ReplicationStatus:
+        """Current replication lag as seen by this replica."""
+        primary = self.primary_revision if self.primary_revision is not None else self.store.revision
+        caught_up = self.connected and self.store.revision >= primary
+        return ReplicationStatus(
+            role="replica",
+            revision=self.store.revision,
+            primary_url=self.primary_url,
+            primary_revision=self.primary_revision,
+            lag_revisions=max(0, primary - self.store.revision),
+            lag_seconds=0.0 if caught_up else round(time.monotonic() - self._caught_up_at, 3),
+            connected=self.connected,
+        )
+
+
+# ─── HTTP Middleware ────────────────────────────────────────────────────────
+
+
+class ReplicationMiddleware:
+    """ASGI middleware for revision headers, min-revision reads and redirects to the primary."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        primary_url: Optional[str] = None,
+        min_revision_wait_seconds: float = 2.0,
+    ):
+        self.app = app
+        self.primary_url = primary_url.rstrip("/") if primary_url else None
+        self.min_revision_wait = min_revision_wait_seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        store = get_store()
+        method = scope["method"]
+        if not hasattr(store, "revision"):
+            # Backend without a change log (e.g. SQLite): nothing to track
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        if (
+            self.primary_url
+            and path.startswith("/api/")
+            and (method not in _READ_METHODS or not _REPLICATED_READS.fullmatch(path))
+        ):
+            url = self.primary_url + path
+            if scope.get("query_string"):
+                url += "?" + scope["query_string"].decode("latin-1")
+            await RedirectResponse(url, status_code=307)(scope, receive, send)
+            return
+
+        min_revision = _header(scope, MIN_REVISION_HEADER.lower())
+        if min_revision is not None and method in _READ_METHODS:
+            try:
+                wanted = int(min_revision)
+            except ValueError:
+                await JSONResponse({"detail": f"Invalid {MIN_REVISION_HEADER}"}, status_code=400)(scope, receive, send)
+                return
+            if not await wait_for_revision(store, wanted, self.min_revision_wait):
+                await JSONResponse(
+                    {"detail": f"Replica at revision {store.revision}, {wanted} requested"},
+                    status_code=503,
+                    headers={"Retry-After": "1", REVISION_HEADER: str(store.revision)},
+                )(scope, receive, send)
+                return
+
+        async def send_with_revision(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append(REVISION_HEADER, str(store.revision))
+            await send(message)
+
+        await self.app(scope, receive, send_with_revision)
+
+
+def _header(scope: Scope, name: str) -> Optional[str]:
+    key = name.encode("latin-1")
+    for k, v in scope.get("headers", ()):
+        if k == key:
+            return v.decode("latin-1")
+    return None
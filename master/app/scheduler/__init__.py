@@ -1,24 +1,72 @@
 """Job Scheduler - FIFO scheduling with resource matching.
 
 The scheduler runs on a periodic loop. Each tick it:
-1. Checks for timed-out nodes
+1. Checks for timed-out nodes and distributed jobs whose ranks never all
+   reached their rendezvous
 2. Takes pending/queued jobs in FIFO order
-3. Finds a worker node whose resources satisfy the job requirements
-4. Assigns the job to that node (marks job SCHEDULED → RUNNING)
+3. Finds a worker node whose resources satisfy the job requirements,
+   preferring the one with most of the job's inputs already cached
+4. Assigns the job to that node (marks job SCHEDULED)
+
+Data locality: workers report the bytes of job inputs (``JobSpec.volumes``
+sources) they have cached. When a busy node holds more of a job's inputs
+than any free one, the job waits for it, but never longer than fetching
+the difference would take at ``fetch_rate_mb`` MB/s, nor longer than
+``locality_wait_seconds`` after it was queued. Jobs without inputs are
+placed first-fit as before.
+
+The node receives the assignment in its next heartbeat response, and the job
+becomes RUNNING once the worker reports it started.
+
+Distributed PyTorch jobs are gang-scheduled: all ``distributed.workers``
+ranks are placed in the same tick, as many per node as it has free slots,
+or none are and the job stays queued (jobs behind it may still be placed).
+
+When several master processes share one store, only the process holding the
+``scheduler`` lease runs ticks; the others stay on standby and take over once
+the leader stops renewing it.
+
+Ticks run in a thread, off the event loop, since store calls may block
+(e.g. on another process's SQLite write); a lock keeps one tick at a time,
+whether from the loop or from ``trigger``.
+
+With ``slow_tick_seconds`` set, a tick that overruns it is profiled and the
+capture kept for ``GET /api/v1/admin/profile/slow-ticks``.
 """
 
 import asyncio
 import logging
-from typing import Optional
+import os
+import socket
+import threading
+from contextlib import nullcontext
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from uuid import uuid4
 
-from core.protocols.models import JobStatus, NodeStatus
+from core.protocols.models import Job, JobPhase, Node, NodeStatus
+from core.utils.locality import cached_bytes
 from core.utils.resources import check_resources_fit
-from master.app.jobs import JobManager
+from master.app.jobs import JobManager, is_distributed
+from master.app.metrics import (
+    SCHEDULER_DECISIONS,
+    SCHEDULER_FAILURES,
+    SCHEDULER_TICK_SECONDS,
+)
 from master.app.nodes import NodeManager
+from master.app.profiling import SlowTickWatchdog
 from master.app.storage import InMemoryStore
 
 logger = logging.getLogger(__name__)
 
+LEADER_LEASE = "scheduler"
+
+# Resolve metric children once; the tick loop only increments them
+_SCHEDULED = SCHEDULER_DECISIONS.labels("scheduled")
+_UNSCHEDULABLE = SCHEDULER_DECISIONS.labels("unschedulable")
+_NO_NODES = SCHEDULER_DECISIONS.labels("no_nodes")
+_DELAYED = SCHEDULER_DECISIONS.labels("delayed_for_locality")
+
 
 class Scheduler:
     """FIFO scheduler with resource-aware node matching."""
@@ -29,19 +77,32 @@ class Scheduler:
         job_manager: JobManager,
         node_manager: NodeManager,
         interval_seconds: float = 5.0,
+        lease_seconds: Optional[float] = None,
+        slow_tick_seconds: Optional[float] = None,
+        locality_wait_seconds: float = 30.0,
+        fetch_rate_mb: float = 100.0,
     ):
         self.store = store
         self.job_manager = job_manager
         self.node_manager = node_manager
         self.interval = interval_seconds
+        # The lease must outlive at least a couple of ticks or leadership flaps
+        self.lease_ttl = max(lease_seconds or 0.0, 3 * interval_seconds)
+        self.owner_id = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+        self.is_leader = False
+        self.watchdog = SlowTickWatchdog(slow_tick_seconds) if slow_tick_seconds else None
+        self.locality_wait = locality_wait_seconds
+        self.fetch_rate = fetch_rate_mb * 1024 * 1024
         self._running = False
         self._task: Optional[asyncio.Task] = None
+        self._tick_lock = threading.Lock()
 
     async def start(self):
         """Start the scheduler loop."""
         self._running = True
-        self._task = asyncio.create_task(self._loop())
-        logger.info(f"Scheduler started (interval={self.interval}s)")
+        await asyncio.to_thread(self._renew_leadership)
+        self._task = asyncio.create_task(self._loop(), name="scheduler")
+        logger.info(f"Scheduler started (interval={self.interval}s, leader={self.is_leader})")
 
     async def stop(self):
         """Stop the scheduler loop."""
@@ -52,87 +113,218 @@ class Scheduler:
                 await self._task
             except asyncio.CancelledError:
                 pass
+        if self.is_leader:
+            await asyncio.to_thread(self.store.release_lease, LEADER_LEASE, self.owner_id)
+            self.is_leader = False
         logger.info("Scheduler stopped")
 
+    def _renew_leadership(self) -> bool:
+        """Acquire or renew the scheduler lease. Returns True while leader."""
+        leader = self.store.try_acquire_lease(LEADER_LEASE, self.owner_id, self.lease_ttl)
+        if leader != self.is_leader:
+            logger.info(f"Scheduler {self.owner_id} {'is now' if leader else 'is no longer'} leader")
+        self.is_leader = leader
+        return leader
+
     async def _loop(self):
         """Main scheduling loop."""
         while self._running:
             try:
-                self._tick()
+                if await asyncio.to_thread(self._renew_leadership):
+                    await asyncio.to_thread(self._tick)
             except Exception as e:
+                SCHEDULER_FAILURES.inc()
                 logger.error(f"Scheduler tick error: {e}", exc_info=True)
             await asyncio.sleep(self.interval)
 
     def _tick(self):
-        """Single scheduling pass."""
+        """Single scheduling pass, timed for /metrics."""
+        with self._tick_lock, SCHEDULER_TICK_SECONDS.time(), self.watchdog or nullcontext():
+            self._schedule()
+
+    def _schedule(self):
+        """Match queued jobs to nodes."""
         # 1. Health-check nodes
         timed_out = self.node_manager.check_timeouts()
         if timed_out:
             logger.info(f"Timed out {len(timed_out)} nodes")
+        aborted = self.job_manager.check_rendezvous_timeouts()
+        if aborted:
+            logger.info(f"Aborted {len(aborted)} distributed jobs at their rendezvous")
 
         # 2. Get queued jobs (FIFO order)
-        pending = [
-            j
-            for j in self.store.list_jobs()
-            if j.status in (JobStatus.PENDING, JobStatus.QUEUED)
-        ]
-        pending.sort(key=lambda j: j.created_at)
+        pending = self.store.get_pending_jobs()
 
         if not pending:
             return
 
-        # 3. Get available nodes
-        available_nodes = self.store.get_available_nodes()
-        if not available_nodes:
+        # 3. Get available nodes (dicts keep their order: first fit is unchanged)
+        available = {node.id: node for node in self.store.get_available_nodes()}
+        if not available:
             logger.debug(f"{len(pending)} jobs queued but no nodes available")
+            _NO_NODES.inc(len(pending))
             return
 
         # 4. Try to match each pending job to a node
+        online: Optional[Dict[str, Node]] = None
+        locality: Dict[Tuple[str, ...], Tuple[List[Tuple[int, str]], Dict[str, int]]] = {}
+        now = datetime.utcnow()
         for job in pending:
-            assigned = False
-            for node in available_nodes:
-                # Check resource fit
-                avail_cpu = node.resources.cpu_cores
-                avail_mem = node.resources.memory_total_mb - node.resources.memory_used_mb
-                avail_gpu = node.resources.gpu_count - len(
-                    [
-                        j_id
-                        for j_id in node.current_jobs
-                        if self.store.get_job(j_id)
-                        and self.store.get_job(j_id).spec.resources.gpu > 0
-                    ]
-                )
+            if is_distributed(job):
+                self._schedule_ranks(job, available)
+                continue
+            sources = tuple(sorted(v.source for v in job.spec.volumes))
+            ranked: List[Tuple[int, str]] = []
+            local: Dict[str, int] = {}
+            if sources:
+                if online is None:
+                    online = {n.id: n for n in self.store.list_nodes(status=NodeStatus.ONLINE) if n.cached}
+                if sources not in locality:
+                    # Sweeps queue many jobs with the same inputs: rank the nodes once
+                    local = {}
+                    for node_id, node in online.items():
+                        size = cached_bytes(sources, node.cached)
+                        if size:
+                            local[node_id] = size
+                    locality[sources] = sorted(((size, node_id) for node_id, size in local.items()), reverse=True), local
+                ranked, local = locality[sources]
+
+            # The fitting node with most of the inputs cached, else the first fit
+            node = next(
+                (available[node_id] for _, node_id in ranked
+                 if node_id in available and self._fits(job, available[node_id])),
+                None,
+            ) or next((n for n in available.values() if self._fits(job, n)), None)
 
-                fits, reason = check_resources_fit(
-                    required_cpu=job.spec.resources.cpu,
-                    required_memory=job.spec.resources.memory,
-                    required_gpu=job.spec.resources.gpu,
-                    available_cpu_cores=avail_cpu,
-                    available_memory_mb=avail_mem,
-                    available_gpu=avail_gpu,
+            if node is None:
+                _UNSCHEDULABLE.inc()
+                logger.debug(
+                    f"No suitable node for job {job.id} ({job.name}), staying queued"
                 )
+                continue
 
-                if fits:
-                    # Assign job to this node
-                    self.job_manager.mark_running(job.id, node.id)
-                    node.current_jobs.append(job.id)
-                    self.store.update_node(node.id, current_jobs=node.current_jobs)
+            if ranked:
+                best = next((size for size, node_id in ranked if self._could_run(job, online[node_id])), 0)
+                gain = best - local.get(node.id, 0)
+                waited = (now - _queued_at(job)).total_seconds()
+                if gain > 0 and waited < min(self.locality_wait, gain / self.fetch_rate):
+                    _DELAYED.inc()
+                    logger.debug(f"Job {job.id} ({job.name}) waits for a node with {gain} more bytes of its inputs")
+                    continue
 
-                    # Remove node from available if at capacity
-                    if len(node.current_jobs) >= node.max_concurrent_jobs:
-                        available_nodes.remove(node)
+            # Assign job to this node, unless it left the queue since it was read
+            if self.job_manager.mark_scheduled(job.id, node.id) is None:
+                logger.debug(f"Job {job.id} ({job.name}) is no longer queued")
+                continue
+            self._take_slot(node.id, job.id, available)
+            logger.info(
+                f"Scheduled job {job.id} ({job.name}) → node {node.id} ({node.hostname})"
+                + (f", {local.get(node.id, 0)} input bytes cached" if ranked else "")
+            )
+            _SCHEDULED.inc()
 
-                    logger.info(
-                        f"Scheduled job {job.id} ({job.name}) → node {node.id} ({node.hostname})"
-                    )
-                    assigned = True
-                    break
+    def _take_slot(self, node_id: str, job_id: str, available: Dict[str, Node]) -> None:
+        """Record the job on its node, dropping the node from ``available`` once it is full."""
+        # Appended in the store, so jobs recorded meanwhile by other processes are kept
+        updated = self.store.add_node_job(node_id, job_id)
 
-            if not assigned:
-                logger.debug(
-                    f"No suitable node for job {job.id} ({job.name}), staying queued"
-                )
+        # Remove node from available if at capacity (or gone)
+        if updated is None or len(updated.current_jobs) >= updated.max_concurrent_jobs:
+            del available[node_id]
+        else:
+            available[node_id] = updated
+
+    def _schedule_ranks(self, job: Job, available: Dict[str, Node]) -> None:
+        """Place every rank of a distributed job now, or none of them."""
+        world_size = job.spec.distributed.workers
+        nodes: List[Node] = []
+        for node in available.values():
+            if not self._fits(job, node):
+                continue
+            slots = node.max_concurrent_jobs - len(node.current_jobs)
+            if job.spec.resources.gpu > 0:
+                slots = min(slots, self._free_gpus(node) // job.spec.resources.gpu)
+            nodes.extend([node] * min(slots, world_size - len(nodes)))
+            if len(nodes) == world_size:
+                break
+        if len(nodes) < world_size:
+            _UNSCHEDULABLE.inc()
+            logger.debug(f"Room for {len(nodes)} of the {world_size} ranks of job {job.id} ({job.name}), staying queued")
+            return
+
+        ranks = self.job_manager.place_ranks(job.id, nodes)
+        if not ranks:
+            logger.debug(f"Job {job.id} ({job.name}) is no longer queued")
+            return
+        for rank, node in zip(ranks, nodes):
+            self._take_slot(node.id, rank.id, available)
+        logger.info(
+            f"Scheduled job {job.id} ({job.name}): {world_size} ranks → "
+            + ", ".join(f"{node.hostname}×{count}" for node, count in _counted(nodes))
+        )
+        _SCHEDULED.inc()
+
+    def _free_gpus(self, node: Node) -> int:
+        return node.resources.gpu_count - len(
+            [
+                j_id
+                for j_id in node.current_jobs
+                if self.store.get_job(j_id)
+                and self.store.get_job(j_id).spec.resources.gpu > 0
+            ]
+        )
+
+    def _fits(self, job: Job, node: Node) -> bool:
+        """Whether the node's free resources satisfy the job."""
+        avail_cpu = node.resources.cpu_cores
+        avail_mem = node.resources.memory_total_mb - node.resources.memory_used_mb
+        avail_gpu = self._free_gpus(node)
+
+        fits, _ = check_resources_fit(
+            required_cpu=job.spec.resources.cpu,
+            required_memory=job.spec.resources.memory,
+            required_gpu=job.spec.resources.gpu,
+            available_cpu_cores=avail_cpu,
+            available_memory_mb=avail_mem,
+            available_gpu=avail_gpu,
+        )
+        return fits
+
+    @staticmethod
+    def _could_run(job: Job, node: Node) -> bool:
+        """Whether the job fits the node once it is idle; only such nodes are worth waiting for."""
+        fits, _ = check_resources_fit(
+            required_cpu=job.spec.resources.cpu,
+            required_memory=job.spec.resources.memory,
+            required_gpu=job.spec.resources.gpu,
+            available_cpu_cores=node.resources.cpu_cores,
+            available_memory_mb=node.resources.memory_total_mb,
+            available_gpu=node.resources.gpu_count,
+        )
+        return fits
 
     def trigger(self):
-        """Manually trigger a scheduling pass (useful after job submission)."""
-        self._tick()
+        """Manually trigger a scheduling pass (useful after job submission).
+
+        Standby schedulers do nothing; the leader picks the job up on its
+        next tick. Runs the tick in the calling thread: call it from an API
+        handler in the threadpool, not from the event loop.
+        """
+        if self.is_leader:
+            self._tick()
+
+
+def _counted(nodes: List[Node]) -> List[Tuple[Node, int]]:
+    """Distinct nodes in order of first appearance, with how often each appears."""
+    counts: Dict[str, List] = {}
+    for node in nodes:
+        counts.setdefault(node.id, [node, 0])[1] += 1
+    return [(node, count) for node, count in counts.values()]
+
+
+def _queued_at(job: Job) -> datetime:
+    """When the job last entered the queue."""
+    for event in reversed(job.events):
+        if event.phase == JobPhase.QUEUED:
+            return event.timestamp
+    return job.created_at
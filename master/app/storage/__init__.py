@@ -1,19 +1,62 @@
 """In-Memory Storage Layer.
 
-Thread-safe in-memory storage for jobs and nodes.
+Lock-free-read in-memory storage for jobs and nodes.
 This is the default backend for development / single-instance deployments.
 For production, swap with a database-backed implementation that exposes
 the same interface.
+
+Concurrency model
+-----------------
+* Stored ``Job`` / ``Node`` records are immutable snapshots. Writers never
+  mutate a stored record in place; they build an updated copy and swap it
+  into the table in a single dict assignment.
+* Each table has its own write lock, so a burst of node heartbeats never
+  queues behind job updates made by the scheduler (and vice versa).
+* Readers take no lock at all. A dict lookup or ``list(d.values())`` is
+  atomic under the GIL, and since records are replaced rather than mutated,
+  a reader always sees either the old or the new version of a record, never
+  a half-applied update.
+
+Objects returned by the store must be treated as read-only: change them via
+``update_job`` / ``update_node``.
+
+Change log
+----------
+Every mutation bumps a global ``revision`` and appends a ``Change`` to a
+bounded in-memory log. Because records are immutable, the log holds
+references to the snapshots themselves, so recording a change costs no
+serialisation. Read replicas (``master.app.replication``) tail this log,
+and wait for new entries on ``revision_event()`` rather than polling.
+Revisions restart from 0 with the process; ``instance_id`` tells one
+store's history from another's.
 """
 
+import asyncio
 import logging
 import threading
+import time
+from collections import deque
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import (
+    Any,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+)
+from uuid import uuid4
+
+from pydantic import BaseModel
 
 from core.protocols.models import (
     Job,
     JobCreate,
+    JobEvent,
     JobStatus,
     Node,
     NodeRegister,
@@ -22,14 +65,135 @@ from core.protocols.models import (
 
 logger = logging.getLogger(__name__)
 
+_Record = TypeVar("_Record", bound=BaseModel)
+
+
+def _with_updates(record: _Record, updates: Dict[str, Any]) -> _Record:
+    """Return a copy of ``record`` with known fields replaced (unknown keys are ignored)."""
+    fields = type(record).model_fields
+    return record.model_copy(update={k: v for k, v in updates.items() if k in fields})
+
+
+class Change(NamedTuple):
+    """One entry of the store's mutation log.
+
+    ``record`` is the new snapshot, or None when the entity was deleted.
+    """
+    revision: int
+    kind: str  # "job" | "node"
+    id: str
+    record: Optional[Union[Job, Node]]
+
 
 class InMemoryStore:
-    """Thread-safe in-memory store for jobs and nodes."""
+    """In-memory store for jobs and nodes with copy-on-write records."""
 
-    def __init__(self) -> None:
+    def __init__(self, change_log_size: int = 10000) -> None:
         self._jobs: Dict[str, Job] = {}
         self._nodes: Dict[str, Node] = {}
-        self._lock = threading.Lock()
+        # (hostname, ip_address) -> node id, for O(1) re-registration lookups
+        self._node_index: Dict[Tuple[str, str], str] = {}
+        self._jobs_lock = threading.Lock()
+        self._nodes_lock = threading.Lock()
+        self._leases: Dict[str, Tuple[str, float]] = {}
+        self._leases_lock = threading.Lock()
+        # Taken *inside* a table lock, never the other way round
+        self._log_lock = threading.Lock()
+        self._revision = 0
+        self._changes: Deque[Change] = deque(maxlen=change_log_size)
+        # Random per store, so a restarted primary is told apart by its replicas
+        self.instance_id = uuid4().hex
+        # One event per event loop waiting for the next mutation
+        self._revision_events: Dict[asyncio.AbstractEventLoop, asyncio.Event] = {}
+
+    # ── Change Log ──────────────────────────────────────────────────────
+
+    @property
+    def revision(self) -> int:
+        """Revision of the most recent mutation (0 for an empty store)."""
+        return self._revision
+
+    def revision_event(self) -> asyncio.Event:
+        """An event set by the next mutation, for the running event loop.
+
+        Callers get it, check ``revision``, then wait on it, so a mutation
+        in between is never missed. Mutations may come from any thread.
+        """
+        loop = asyncio.get_running_loop()
+        with self._log_lock:
+            event = self._revision_events.get(loop)
+            if event is None:
+                event = self._revision_events[loop] = asyncio.Event()
+            return event
+
+    def _notify(self) -> None:
+        """Wake everything waiting on ``revision_event()``. Must hold ``_log_lock``."""
+        if self._revision_events:
+            for loop, event in self._revision_events.items():
+                try:
+                    loop.call_soon_threadsafe(event.set)
+                except RuntimeError:
+                    pass  # that loop is closed
+            self._revision_events = {}
+
+    def _log(self, kind: str, entity_id: str, record: Optional[Union[Job, Node]]) -> None:
+        """Record a mutation. Must be called while holding the table's lock."""
+        with self._log_lock:
+            self._revision += 1
+            self._changes.append(Change(self._revision, kind, entity_id, record))
+            self._notify()
+
+    def changes_since(self, revision: int, limit: int = 1000) -> Optional[List[Change]]:
+        """Return up to ``limit`` changes newer than ``revision``, oldest first.
+
+        Returns None when the log no longer covers ``revision`` (it was
+        trimmed, or ``revision`` is from before a restart); the caller must
+        then resync from ``snapshot()``.
+        """
+        with self._log_lock:
+            if revision > self._revision:
+                return None
+            if revision == self._revision:
+                return []
+            if not self._changes or self._changes[0].revision > revision + 1:
+                return None
+            # Revisions in the log are contiguous, so index arithmetic is exact
+            start = revision + 1 - self._changes[0].revision
+            end = min(start + limit, len(self._changes))
+            return [self._changes[i] for i in range(start, end)]
+
+    def snapshot(self) -> Tuple[int, List[Job], List[Node]]:
+        """Return (revision, jobs, nodes) as one consistent point-in-time view."""
+        with self._jobs_lock, self._nodes_lock, self._log_lock:
+            return self._revision, list(self._jobs.values()), list(self._nodes.values())
+
+    def apply_changes(self, changes: Iterable[Change], revision: int, reset: bool = False) -> None:
+        """Apply changes received from a primary (used by read replicas).
+
+        With ``reset`` the store is cleared first and ``changes`` must hold a
+        full snapshot. Afterwards ``self.revision`` equals ``revision``.
+        """
+        with self._jobs_lock, self._nodes_lock, self._log_lock:
+            if reset:
+                self._jobs = {}
+                self._nodes = {}
+                self._node_index = {}
+                self._changes.clear()
+            for change in changes:
+                table = self._jobs if change.kind == "job" else self._nodes
+                if change.record is None:
+                    removed = table.pop(change.id, None)
+                    if isinstance(removed, Node):
+                        self._node_index.pop((removed.hostname, removed.ip_address), None)
+                else:
+                    table[change.id] = change.record
+                    if isinstance(change.record, Node):
+                        self._node_index[(change.record.hostname, change.record.ip_address)] = change.id
+                if not reset:
+                    # Snapshot entries share one revision; keep the log contiguous
+                    self._changes.append(change)
+            self._revision = revision
+            self._notify()
 
     # ── Job Operations ──────────────────────────────────────────────────
 
@@ -41,8 +205,9 @@ class InMemoryStore:
             spec=job_create.spec,
             status=JobStatus.PENDING,
         )
-        with self._lock:
+        with self._jobs_lock:
             self._jobs[job.id] = job
+            self._log("job", job.id, job)
         logger.info(f"Created job {job.id} ({job.name})")
         return job
 
@@ -74,33 +239,48 @@ class InMemoryStore:
         jobs.sort(key=lambda j: j.created_at, reverse=True)
         return jobs[offset : offset + limit]
 
-    def update_job(self, job_id: str, **kwargs) -> Optional[Job]:
-        """Update job fields."""
-        with self._lock:
+    def update_job(
+        self,
+        job_id: str,
+        expect_status: Optional[Iterable[JobStatus]] = None,
+        append_events: Optional[List[JobEvent]] = None,
+        **kwargs,
+    ) -> Optional[Job]:
+        """Update job fields, returning the new snapshot.
+
+        With ``expect_status`` the update is only applied if the job is in one
+        of those statuses when it is written; otherwise nothing changes and
+        None is returned. ``append_events`` are added to the job's events as
+        they are when it is written.
+        """
+        with self._jobs_lock:
             job = self._jobs.get(job_id)
             if not job:
                 return None
-            for key, value in kwargs.items():
-                if hasattr(job, key):
-                    setattr(job, key, value)
+            if expect_status is not None and job.status not in expect_status:
+                return None
+            if append_events:
+                kwargs["events"] = job.events + append_events
+            job = _with_updates(job, kwargs)
             self._jobs[job_id] = job
+            self._log("job", job_id, job)
         return job
 
     def get_pending_jobs(self) -> List[Job]:
-        """Get all jobs in PENDING status, ordered by creation time."""
+        """Get every PENDING or QUEUED job (the scheduler's queue), ordered by creation time."""
         return sorted(
-            [j for j in self._jobs.values() if j.status == JobStatus.PENDING],
+            [j for j in list(self._jobs.values()) if j.status in (JobStatus.PENDING, JobStatus.QUEUED)],
             key=lambda j: j.created_at,
         )
 
     def get_running_jobs(self) -> List[Job]:
         """Get all currently running jobs."""
-        return [j for j in self._jobs.values() if j.status == JobStatus.RUNNING]
+        return [j for j in list(self._jobs.values()) if j.status == JobStatus.RUNNING]
 
     def count_jobs_by_status(self) -> Dict[str, int]:
         """Return a count of jobs grouped by status."""
         counts: Dict[str, int] = {}
-        for job in self._jobs.values():
+        for job in list(self._jobs.values()):
             counts[job.status.value] = counts.get(job.status.value, 0) + 1
         return counts
 
@@ -108,21 +288,26 @@ class InMemoryStore:
 
     def register_node(self, registration: NodeRegister) -> Node:
         """Register a new worker node."""
-        # Check if node with same hostname+ip already exists
-        with self._lock:
-            for existing in self._nodes.values():
-                if (
-                    existing.hostname == registration.hostname
-                    and existing.ip_address == registration.ip_address
-                ):
-                    # Re-registration: update existing node
-                    existing.status = NodeStatus.ONLINE
-                    existing.resources = registration.resources
-                    existing.labels = registration.labels
-                    existing.last_heartbeat = datetime.utcnow()
-                    existing.version = registration.version
-                    logger.info(f"Re-registered node {existing.id} ({existing.hostname})")
-                    return existing
+        key = (registration.hostname, registration.ip_address)
+        with self._nodes_lock:
+            existing = self._nodes.get(self._node_index.get(key, ""))
+            if existing is not None:
+                # Re-registration: update existing node
+                node = _with_updates(
+                    existing,
+                    {
+                        "status": NodeStatus.ONLINE,
+                        "resources": registration.resources,
+                        "labels": registration.labels,
+                        "max_concurrent_jobs": registration.max_concurrent_jobs,
+                        "last_heartbeat": datetime.utcnow(),
+                        "version": registration.version,
+                    },
+                )
+                self._nodes[node.id] = node
+                self._log("node", node.id, node)
+                logger.info(f"Re-registered node {node.id} ({node.hostname})")
+                return node
 
             node = Node(
                 hostname=registration.hostname,
@@ -130,10 +315,13 @@ class InMemoryStore:
                 port=registration.port,
                 resources=registration.resources,
                 labels=registration.labels,
+                max_concurrent_jobs=registration.max_concurrent_jobs,
                 last_heartbeat=datetime.utcnow(),
                 version=registration.version,
             )
             self._nodes[node.id] = node
+            self._node_index[key] = node.id
+            self._log("node", node.id, node)
 
         logger.info(f"Registered new node {node.id} ({node.hostname})")
         return node
@@ -149,43 +337,99 @@ class InMemoryStore:
             nodes = [n for n in nodes if n.status == status]
         return sorted(nodes, key=lambda n: n.registered_at, reverse=True)
 
-    def update_node(self, node_id: str, **kwargs) -> Optional[Node]:
-        """Update node fields."""
-        with self._lock:
+    def update_node(
+        self, node_id: str, expect_current_jobs: Optional[List[str]] = None, **kwargs
+    ) -> Optional[Node]:
+        """Update node fields, returning the new snapshot.
+
+        With ``expect_current_jobs`` the update is only applied if the node's
+        ``current_jobs`` are still exactly those; otherwise nothing changes
+        and None is returned.
+        """
+        with self._nodes_lock:
+            node = self._nodes.get(node_id)
+            if not node:
+                return None
+            if expect_current_jobs is not None and node.current_jobs != expect_current_jobs:
+                return None
+            node = _with_updates(node, kwargs)
+            self._nodes[node_id] = node
+            self._log("node", node_id, node)
+        return node
+
+    def add_node_job(self, node_id: str, job_id: str) -> Optional[Node]:
+        """Append ``job_id`` to the node's ``current_jobs`` in one write, returning the new snapshot."""
+        with self._nodes_lock:
             node = self._nodes.get(node_id)
             if not node:
                 return None
-            for key, value in kwargs.items():
-                if hasattr(node, key):
-                    setattr(node, key, value)
+            node = _with_updates(node, {"current_jobs": node.current_jobs + [job_id]})
             self._nodes[node_id] = node
+            self._log("node", node_id, node)
         return node
 
     def remove_node(self, node_id: str) -> bool:
         """Remove a node from the registry."""
-        with self._lock:
-            if node_id in self._nodes:
-                del self._nodes[node_id]
-                return True
-        return False
+        with self._nodes_lock:
+            node = self._nodes.pop(node_id, None)
+            if node is None:
+                return False
+            self._node_index.pop((node.hostname, node.ip_address), None)
+            self._log("node", node_id, None)
+        return True
 
     def get_available_nodes(self) -> List[Node]:
         """Return nodes that are online and have capacity for more jobs."""
         return [
             n
-            for n in self._nodes.values()
+            for n in list(self._nodes.values())
             if n.status == NodeStatus.ONLINE
             and len(n.current_jobs) < n.max_concurrent_jobs
         ]
 
+    # ── Leader Election ─────────────────────────────────────────────────
+
+    def try_acquire_lease(self, name: str, owner: str, ttl_seconds: float) -> bool:
+        """Acquire or renew the named lease for ``owner``.
+
+        The in-memory store lives in a single process, so this only arbitrates
+        between owners inside that process; it mirrors the SQLite backend.
+        """
+        now = time.time()
+        with self._leases_lock:
+            holder = self._leases.get(name)
+            if holder is None or holder[0] == owner or holder[1] < now:
+                self._leases[name] = (owner, now + ttl_seconds)
+                return True
+        return False
+
+    def release_lease(self, name: str, owner: str) -> None:
+        """Give up the named lease if ``owner`` holds it."""
+        with self._leases_lock:
+            if self._leases.get(name, ("", 0.0))[0] == owner:
+                del self._leases[name]
+
 
 # Module-level singleton
 _store: Optional[InMemoryStore] = None
 
 
 def get_store() -> InMemoryStore:
-    """Return the global store singleton."""
+    """Return the global store singleton for the configured backend.
+
+    ``STORAGE_BACKEND=sqlite`` selects the shared SQLite store (see
+    ``master.app.storage.sqlite``) so several master processes can serve
+    the same cluster; anything else uses the in-memory store.
+    """
     global _store
     if _store is None:
-        _store = InMemoryStore()
+        from core.config.settings import get_settings
+
+        settings = get_settings()
+        if settings.storage_backend == "sqlite":
+            from master.app.storage.sqlite import SQLiteStore, sqlite_path_from_url
+
+            _store = SQLiteStore(sqlite_path_from_url(settings.database_url))
+        else:
+            _store = InMemoryStore(change_log_size=settings.change_log_size)
     return _store
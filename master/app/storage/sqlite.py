@@ -0,0 +1,371 @@
+"""SQLite Storage Backend.
+
+A store with the same interface as ``InMemoryStore`` that keeps its state in
+a single SQLite file. Several master processes (e.g. ``uvicorn --workers N``)
+can open the same file and see one consistent view of the cluster.
+
+* The database runs in WAL mode, so readers never block writers and each
+  API process can serve reads in parallel on its own core.
+* Every write is a short ``BEGIN IMMEDIATE`` transaction; SQLite serialises
+  writers across processes.
+* Records are stored as JSON documents next to a few indexed columns used
+  for filtering and ordering.
+* A ``leases`` table provides leader election so exactly one process runs
+  the scheduler loop (see ``try_acquire_lease``).
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from core.protocols.models import (
+    Job,
+    JobCreate,
+    JobEvent,
+    JobStatus,
+    Node,
+    NodeRegister,
+    NodeStatus,
+)
+from master.app.storage import _with_updates
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_created ON jobs (created_at);
+
+CREATE TABLE IF NOT EXISTS nodes (
+    id TEXT PRIMARY KEY,
+    hostname TEXT NOT NULL,
+    ip_address TEXT NOT NULL,
+    status TEXT NOT NULL,
+    registered_at REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_nodes_addr ON nodes (hostname, ip_address);
+
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+def sqlite_path_from_url(database_url: Optional[str]) -> str:
+    """Turn ``sqlite:///path/to/db`` (or a bare path) into a filesystem path."""
+    if not database_url:
+        return "clusterml.db"
+    if database_url.startswith("sqlite:///"):
+        return database_url[len("sqlite:///"):]
+    return database_url
+
+
+class SQLiteStore:
+    """Store backed by a SQLite file, safe to share between processes."""
+
+    def __init__(self, path: str, busy_timeout_seconds: float = 10.0) -> None:
+        self.path = path
+        self.busy_timeout = busy_timeout_seconds
+        # sqlite3 connections must not be shared between threads
+        self._local = threading.local()
+        self._conn().executescript(_SCHEMA)
+        logger.info(f"SQLite store at {os.path.abspath(path)}")
+
+    # ── Connection Handling ─────────────────────────────────────────────
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.path,
+                timeout=self.busy_timeout,
+                isolation_level=None,  # explicit transactions only
+                check_same_thread=False,
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _write(self) -> Iterator[sqlite3.Connection]:
+        """Run a block inside a write transaction (takes the DB write lock up front)."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def close(self) -> None:
+        """Close this thread's connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # ── Job Operations ──────────────────────────────────────────────────
+
+    @staticmethod
+    def _put_job(conn: sqlite3.Connection, job: Job) -> None:
+        conn.execute(
+            "INSERT OR REPLACE INTO jobs (id, status, created_at, data) VALUES (?, ?, ?, ?)",
+            (job.id, job.status.value, job.created_at.timestamp(), job.model_dump_json()),
+        )
+
+    def create_job(self, job_create: JobCreate) -> Job:
+        """Create a new job and add to store."""
+        job = Job(
+            name=job_create.name,
+            labels=job_create.labels,
+            spec=job_create.spec,
+            status=JobStatus.PENDING,
+        )
+        with self._write() as conn:
+            self._put_job(conn, job)
+        logger.info(f"Created job {job.id} ({job.name})")
+        return job
+
+    def get_job(self, job_id: str) -> Optional[Job]:
+        """Get job by ID."""
+        row = self._conn().execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job.model_validate_json(row[0]) if row else None
+
+    def list_jobs(
+        self,
+        status: Optional[JobStatus] = None,
+        label: Optional[str] = None,
+        limit: int = 100,
+        offset: int = 0,
+    ) -> List[Job]:
+        """List jobs with optional filtering."""
+        sql = "SELECT data FROM jobs"
+        clauses: List[str] = []
+        params: List = []
+        if status:
+            clauses.append("status = ?")
+            params.append(status.value)
+        if label:
+            key, _, value = label.partition("=")
+            path = "$.labels." + json.dumps(key)
+            if value:
+                clauses.append("json_extract(data, ?) = ?")
+                params.extend([path, value])
+            else:
+                clauses.append("json_type(data, ?) IS NOT NULL")
+                params.append(path)
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY created_at DESC LIMIT ? OFFSET ?"
+        params.extend([limit, offset])
+        rows = self._conn().execute(sql, params).fetchall()
+        return [Job.model_validate_json(r[0]) for r in rows]
+
+    def update_job(
+        self,
+        job_id: str,
+        expect_status: Optional[Iterable[JobStatus]] = None,
+        append_events: Optional[List[JobEvent]] = None,
+        **kwargs,
+    ) -> Optional[Job]:
+        """Update job fields, returning the new snapshot.
+
+        With ``expect_status`` the status is checked in the same transaction
+        as the write, so a change committed by another process in between
+        (e.g. a cancel) is never overwritten; None is returned instead.
+        ``append_events`` are appended in that transaction too, so concurrent
+        transitions keep each other's events.
+        """
+        with self._write() as conn:
+            row = conn.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if not row:
+                return None
+            job = Job.model_validate_json(row[0])
+            if expect_status is not None and job.status not in expect_status:
+                return None
+            if append_events:
+                kwargs["events"] = job.events + append_events
+            job = _with_updates(job, kwargs)
+            self._put_job(conn, job)
+        return job
+
+    def _jobs_with_status(self, status: JobStatus) -> List[Job]:
+        rows = self._conn().execute(
+            "SELECT data FROM jobs WHERE status = ? ORDER BY created_at", (status.value,)
+        ).fetchall()
+        return [Job.model_validate_json(r[0]) for r in rows]
+
+    def get_pending_jobs(self) -> List[Job]:
+        """Get every PENDING or QUEUED job (the scheduler's queue), ordered by creation time."""
+        rows = self._conn().execute(
+            "SELECT data FROM jobs WHERE status IN (?, ?) ORDER BY created_at",
+            (JobStatus.PENDING.value, JobStatus.QUEUED.value),
+        ).fetchall()
+        return [Job.model_validate_json(r[0]) for r in rows]
+
+    def get_running_jobs(self) -> List[Job]:
+        """Get all currently running jobs."""
+        return self._jobs_with_status(JobStatus.RUNNING)
+
+    def count_jobs_by_status(self) -> Dict[str, int]:
+        """Return a count of jobs grouped by status."""
+        rows = self._conn().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    # ── Node Operations ─────────────────────────────────────────────────
+
+    @staticmethod
+    def _put_node(conn: sqlite3.Connection, node: Node) -> None:
+        conn.execute(
+            "INSERT OR REPLACE INTO nodes (id, hostname, ip_address, status, registered_at, data) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                node.id,
+                node.hostname,
+                node.ip_address,
+                node.status.value,
+                node.registered_at.timestamp(),
+                node.model_dump_json(),
+            ),
+        )
+
+    def register_node(self, registration: NodeRegister) -> Node:
+        """Register a new worker node."""
+        with self._write() as conn:
+            row = conn.execute(
+                "SELECT data FROM nodes WHERE hostname = ? AND ip_address = ?",
+                (registration.hostname, registration.ip_address),
+            ).fetchone()
+            if row:
+                # Re-registration: update existing node
+                node = _with_updates(
+                    Node.model_validate_json(row[0]),
+                    {
+                        "status": NodeStatus.ONLINE,
+                        "resources": registration.resources,
+                        "labels": registration.labels,
+                        "max_concurrent_jobs": registration.max_concurrent_jobs,
+                        "last_heartbeat": datetime.utcnow(),
+                        "version": registration.version,
+                    },
+                )
+                self._put_node(conn, node)
+                logger.info(f"Re-registered node {node.id} ({node.hostname})")
+                return node
+
+            node = Node(
+                hostname=registration.hostname,
+                ip_address=registration.ip_address,
+                port=registration.port,
+                resources=registration.resources,
+                labels=registration.labels,
+                max_concurrent_jobs=registration.max_concurrent_jobs,
+                last_heartbeat=datetime.utcnow(),
+                version=registration.version,
+            )
+            self._put_node(conn, node)
+
+        logger.info(f"Registered new node {node.id} ({node.hostname})")
+        return node
+
+    def get_node(self, node_id: str) -> Optional[Node]:
+        """Get node by ID."""
+        row = self._conn().execute("SELECT data FROM nodes WHERE id = ?", (node_id,)).fetchone()
+        return Node.model_validate_json(row[0]) if row else None
+
+    def list_nodes(self, status: Optional[NodeStatus] = None) -> List[Node]:
+        """List all registered nodes."""
+        if status:
+            rows = self._conn().execute(
+                "SELECT data FROM nodes WHERE status = ? ORDER BY registered_at DESC",
+                (status.value,),
+            ).fetchall()
+        else:
+            rows = self._conn().execute(
+                "SELECT data FROM nodes ORDER BY registered_at DESC"
+            ).fetchall()
+        return [Node.model_validate_json(r[0]) for r in rows]
+
+    def update_node(
+        self, node_id: str, expect_current_jobs: Optional[List[str]] = None, **kwargs
+    ) -> Optional[Node]:
+        """Update node fields, returning the new snapshot.
+
+        With ``expect_current_jobs`` the node's ``current_jobs`` are compared
+        in the same transaction as the write, so a job another process added
+        in between (``add_node_job``) is never dropped; None is returned instead.
+        """
+        with self._write() as conn:
+            row = conn.execute("SELECT data FROM nodes WHERE id = ?", (node_id,)).fetchone()
+            if not row:
+                return None
+            node = Node.model_validate_json(row[0])
+            if expect_current_jobs is not None and node.current_jobs != expect_current_jobs:
+                return None
+            node = _with_updates(node, kwargs)
+            self._put_node(conn, node)
+        return node
+
+    def add_node_job(self, node_id: str, job_id: str) -> Optional[Node]:
+        """Append ``job_id`` to the node's ``current_jobs`` in one transaction, returning the new snapshot."""
+        with self._write() as conn:
+            row = conn.execute("SELECT data FROM nodes WHERE id = ?", (node_id,)).fetchone()
+            if not row:
+                return None
+            node = Node.model_validate_json(row[0])
+            node = _with_updates(node, {"current_jobs": node.current_jobs + [job_id]})
+            self._put_node(conn, node)
+        return node
+
+    def remove_node(self, node_id: str) -> bool:
+        """Remove a node from the registry."""
+        with self._write() as conn:
+            return conn.execute("DELETE FROM nodes WHERE id = ?", (node_id,)).rowcount > 0
+
+    def get_available_nodes(self) -> List[Node]:
+        """Return nodes that are online and have capacity for more jobs."""
+        return [
+            n
+            for n in self.list_nodes(status=NodeStatus.ONLINE)
+            if len(n.current_jobs) < n.max_concurrent_jobs
+        ]
+
+    # ── Leader Election ─────────────────────────────────────────────────
+
+    def try_acquire_lease(self, name: str, owner: str, ttl_seconds: float) -> bool:
+        """Acquire or renew the named lease for ``owner``.
+
+        Succeeds if nobody holds the lease, ``owner`` already holds it, or the
+        current holder let it expire. Returns True if ``owner`` holds the lease
+        for the next ``ttl_seconds``.
+        """
+        now = time.time()
+        with self._write() as conn:
+            cur = conn.execute(
+                "INSERT INTO leases (name, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE leases.owner = excluded.owner OR leases.expires_at < ?",
+                (name, owner, now + ttl_seconds, now),
+            )
+            return cur.rowcount > 0
+
+    def release_lease(self, name: str, owner: str) -> None:
+        """Give up the named lease if ``owner`` holds it."""
+        with self._write() as conn:
+            conn.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
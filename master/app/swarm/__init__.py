@@ -0,0 +1,110 @@
+"""Swarm Tracker - which workers hold which dataset chunks.
+
+Workers fetch dataset chunks from each other instead of all from the
+master. The tracker only keeps locations; no chunk data passes through it.
+
+* A worker that stores a chunk announces it and from then on serves it to
+  peers. Announcements expire after ``ttl_seconds``; workers repeat their
+  full list periodically, so evicted chunks and dead workers drop out.
+* Asked for sources, the tracker returns a few random holders, spreading
+  load over the swarm. A chunk nobody holds yet is leased to one asker for
+  ``lease_seconds``: only that worker fetches it from the master, the
+  others are told to wait (and fetch other chunks meanwhile), then get it
+  from the leaseholder. Master egress is thus about one copy of each chunk,
+  however many workers want it.
+
+One master process only: see "Multiple API Processes" in
+docs/setup/master_setup.md.
+"""
+
+import logging
+import random
+import time
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from core.protocols.models import ChunkSources
+
+logger = logging.getLogger(__name__)
+
+
+class Tracker:
+    """In-memory chunk locations with per-chunk master leases."""
+
+    def __init__(self, ttl_seconds: float = 180.0, lease_seconds: float = 30.0, max_peers: int = 4, max_leases: int = 4):
+        self.ttl_seconds = ttl_seconds
+        self.lease_seconds = lease_seconds
+        self.max_peers = max_peers
+        self.max_leases = max_leases
+        # digest -> peer -> expiry (monotonic)
+        self._holders: Dict[str, Dict[str, float]] = {}
+        self._held_by: Dict[str, Set[str]] = {}
+        self._leases: Dict[str, Tuple[str, float]] = {}
+
+    def announce(self, peer: str, digests: Sequence[str], full: bool = False) -> None:
+        """Record that ``peer`` serves ``digests``; with ``full``, only those."""
+        expires = time.monotonic() + self.ttl_seconds
+        held = self._held_by.setdefault(peer, set())
+        if full:
+            for digest in held.difference(digests):
+                self._forget(digest, peer)
+            held.intersection_update(digests)
+        for digest in digests:
+            self._holders.setdefault(digest, {})[peer] = expires
+            held.add(digest)
+            lease = self._leases.get(digest)
+            if lease is not None and lease[0] == peer:
+                del self._leases[digest]
+
+    def _forget(self, digest: str, peer: str) -> None:
+        holders = self._holders.get(digest)
+        if holders is not None:
+            holders.pop(peer, None)
+            if not holders:
+                del self._holders[digest]
+
+    def holders(self, digest: str) -> List[str]:
+        """Peers whose announcement of ``digest`` has not expired."""
+        holders = self._holders.get(digest)
+        if not holders:
+            return []
+        now = time.monotonic()
+        for peer in [p for p, expires in holders.items() if expires <= now]:
+            self._forget(digest, peer)
+            self._held_by.get(peer, set()).discard(digest)
+        return list(self._holders.get(digest, ()))
+
+    def locate(self, digests: Sequence[str], peer: Optional[str] = None) -> Dict[str, ChunkSources]:
+        """Sources for each chunk. An empty answer means: ask again shortly.
+
+        One asker gets at most ``max_leases`` new master leases per call, so
+        the first chunks of a dataset are fetched from the master by several
+        workers in parallel rather than all by the first to ask.
+        """
+        now = time.monotonic()
+        leased = 0
+        answer = {}
+        for digest in digests:
+            holders = [p for p in self.holders(digest) if p != peer]
+            if holders:
+                answer[digest] = ChunkSources(peers=random.sample(holders, min(self.max_peers, len(holders))))
+                continue
+            lease = self._leases.get(digest)
+            if peer is None:
+                # Not serving, so not worth waiting for: straight to the master
+                answer[digest] = ChunkSources(master=True)
+            elif lease is not None and lease[0] == peer and lease[1] > now:
+                answer[digest] = ChunkSources(master=True)
+            elif (lease is None or lease[1] <= now) and leased < self.max_leases:
+                self._leases[digest] = (peer, now + self.lease_seconds)
+                leased += 1
+                answer[digest] = ChunkSources(master=True)
+            else:
+                answer[digest] = ChunkSources()
+        return answer
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "peers": sum(1 for held in self._held_by.values() if held),
+            "chunks": len(self._holders),
+            "leases": len(self._leases),
+        }
@@ -0,0 +1,266 @@
+"""Sweeps - hyperparameter searches run as jobs, with successive-halving early stopping.
+
+A sweep expands its search space into trials (``grid``: every combination
+in order, ``random``: ``max_trials`` samples from a seeded generator) and
+runs each as a job labelled ``sweep=<id>`` and ``trial=<n>``, at most
+``parallelism`` at a time. A trial that ends, however it ends, makes room
+for the next one, so the sweep's share of the cluster never idles.
+
+Trials report their objective as intermediate metrics (see
+``JobManager.report_metrics``). With ``early_stopping`` the sweep applies
+asynchronous successive halving (ASHA): rungs sit at
+``min_step * reduction_factor**k`` steps. The first time a trial reports at
+or past a rung, its objective is recorded there, and unless it is among the
+best ``1/reduction_factor`` of all values recorded at that rung so far the
+trial is pruned: its job is cancelled and the next trial takes its slot.
+Decisions never wait for other trials to reach a rung, which is what makes
+it asynchronous; only the few promising trials run to the end.
+
+The best trial is the best of the completed trials by their last reported
+objective (of all trials while none has completed).
+
+One master process only: see "Multiple API Processes" in
+docs/setup/master_setup.md.
+"""
+
+import itertools
+import json
+import logging
+import math
+import random
+import threading
+from datetime import datetime
+from string import Template
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from core.protocols.models import (
+    EarlyStopping,
+    EnvVar,
+    Job,
+    JobCreate,
+    JobSpec,
+    JobStatus,
+    MetricRecord,
+    ParameterRange,
+    Sweep,
+    SweepCreate,
+    SweepStatus,
+    Trial,
+    TrialStatus,
+)
+from master.app.jobs import JobManager
+from master.app.metrics import SWEEP_TRIALS
+
+logger = logging.getLogger(__name__)
+
+_TRIAL_STATUS = {
+    JobStatus.COMPLETED: TrialStatus.COMPLETED,
+    JobStatus.FAILED: TrialStatus.FAILED,
+    JobStatus.CANCELLED: TrialStatus.CANCELLED,
+}
+
+
+class SweepError(ValueError):
+    """A sweep that cannot run as given."""
+
+
+def sample(rng: random.Random, parameter: ParameterRange) -> Any:
+    """One random value of a parameter."""
+    if parameter.values is not None:
+        return rng.choice(parameter.values)
+    if parameter.scale == "log":
+        value = math.exp(rng.uniform(math.log(parameter.min), math.log(parameter.max)))
+    else:
+        value = rng.uniform(parameter.min, parameter.max)
+    return round(value) if parameter.integer else value
+
+
+def trial_params(sweep: SweepCreate) -> Iterator[Dict[str, Any]]:
+    """The parameters of each trial of a sweep, in order."""
+    names = list(sweep.parameters)
+    if sweep.algorithm == "grid":
+        grid = itertools.product(*(sweep.parameters[name].values for name in names))
+        return (dict(zip(names, values)) for values in itertools.islice(grid, sweep.max_trials))
+    rng = random.Random(sweep.seed)
+    return ({name: sample(rng, sweep.parameters[name]) for name in names} for _ in range(sweep.max_trials))
+
+
+def render(spec: JobSpec, params: Dict[str, Any]) -> JobSpec:
+    """The trial's spec: ``${name}`` replaced in command, args and env, and the params in the env as JSON."""
+    mapping = {name: str(value) for name, value in params.items()}
+
+    def substitute(text: str) -> str:
+        return Template(text).safe_substitute(mapping)
+
+    env = [EnvVar(name=var.name, value=substitute(var.value)) for var in spec.env]
+    env.append(EnvVar(name="CLUSTERML_SWEEP_PARAMS", value=json.dumps(params)))
+    return spec.model_copy(update={
+        "command": [substitute(arg) for arg in spec.command],
+        "args": [substitute(arg) for arg in spec.args],
+        "env": env,
+    })
+
+
+def rungs(config: EarlyStopping, step: int) -> Iterator[int]:
+    """The rungs at or below ``step``; the last step is not one, trials reaching it are done."""
+    rung = config.min_step
+    while rung <= step and (config.max_step is None or rung < config.max_step):
+        yield rung
+        rung *= config.reduction_factor
+
+
+class SweepManager:
+    """Runs sweeps: launches their trials as jobs and prunes the unpromising ones."""
+
+    def __init__(self, job_manager: JobManager):
+        self.job_manager = job_manager
+        self._sweeps: Dict[str, Sweep] = {}
+        self._params: Dict[str, Iterator[Dict[str, Any]]] = {}  # trials not launched yet
+        self._trials: Dict[str, Tuple[str, int]] = {}  # job id -> (sweep id, trial number)
+        # Re-entrant: cancelling a trial's job calls back into ``_job_finished``
+        self._lock = threading.RLock()
+        job_manager.on_metrics(self._metrics_reported)
+        job_manager.on_finished(self._job_finished)
+
+    def create(self, sweep_create: SweepCreate) -> Sweep:
+        """Start a sweep: its first ``parallelism`` trials are queued at once."""
+        if sweep_create.algorithm == "grid":
+            ranges = [name for name, p in sweep_create.parameters.items() if p.values is None]
+            if ranges:
+                raise SweepError(f"A grid needs values for every parameter, not ranges: {', '.join(ranges)}")
+        sweep = Sweep(**sweep_create.model_dump())
+        with self._lock:
+            self._sweeps[sweep.id] = sweep
+            self._params[sweep.id] = trial_params(sweep)
+            self._fill(sweep)
+        logger.info(f"Sweep {sweep.id} ({sweep.name}) started: {sweep.algorithm}, up to {sweep.max_trials} trials")
+        return self.get(sweep.id)
+
+    def get(self, sweep_id: str) -> Optional[Sweep]:
+        with self._lock:
+            sweep = self._sweeps.get(sweep_id)
+            return sweep.model_copy(deep=True) if sweep is not None else None
+
+    def list(self) -> List[Sweep]:
+        """All sweeps, newest first."""
+        with self._lock:
+            sweeps = [sweep.model_copy(deep=True) for sweep in self._sweeps.values()]
+        sweeps.sort(key=lambda s: s.created_at, reverse=True)
+        return sweeps
+
+    def cancel(self, sweep_id: str) -> Optional[Sweep]:
+        """Stop a sweep: no more trials start, and the running ones are cancelled."""
+        with self._lock:
+            sweep = self._sweeps.get(sweep_id)
+            if sweep is None:
+                return None
+            if sweep.status == SweepStatus.RUNNING:
+                sweep.status = SweepStatus.CANCELLED
+                sweep.completed_at = datetime.utcnow()
+                self._params.pop(sweep_id, None)
+                for trial in sweep.trials:
+                    if trial.status == TrialStatus.RUNNING:
+                        self.job_manager.cancel(trial.job_id)
+                logger.info(f"Sweep {sweep_id} ({sweep.name}) cancelled")
+        return self.get(sweep_id)
+
+    def _trial(self, job: Job) -> Optional[Tuple[Sweep, Trial]]:
+        found = self._trials.get(job.id)
+        if found is None:
+            return None
+        sweep = self._sweeps[found[0]]
+        return sweep, sweep.trials[found[1]]
+
+    def _fill(self, sweep: Sweep) -> None:
+        """Launch trials until ``parallelism`` run; complete the sweep once none is left."""
+        if sweep.status != SweepStatus.RUNNING:
+            return
+        running = sum(1 for trial in sweep.trials if trial.status == TrialStatus.RUNNING)
+        params = self._params.get(sweep.id)
+        while running < sweep.parallelism and params is not None:
+            values = next(params, None)
+            if values is None:
+                self._params.pop(sweep.id, None)
+                break
+            number = len(sweep.trials)
+            job = self.job_manager.create(JobCreate(
+                name=f"{sweep.name}-trial-{number}",
+                labels={**sweep.labels, "sweep": sweep.id, "trial": str(number)},
+                spec=render(sweep.spec, values),
+            ))
+            sweep.trials.append(Trial(number=number, job_id=job.id, params=values))
+            self._trials[job.id] = (sweep.id, number)
+            running += 1
+        if running == 0 and sweep.id not in self._params:
+            sweep.status = SweepStatus.COMPLETED
+            sweep.completed_at = datetime.utcnow()
+            best = sweep.trials[sweep.best_trial] if sweep.best_trial is not None else None
+            logger.info(
+                f"Sweep {sweep.id} ({sweep.name}) completed: {len(sweep.trials)} trials"
+                + (f", best {best.number} ({sweep.objective.metric}={best.value:g})" if best else "")
+            )
+
+    def _metrics_reported(self, job: Job, records: List[MetricRecord]) -> None:
+        with self._lock:
+            found = self._trial(job)
+            if found is None:
+                return
+            sweep, trial = found
+            if sweep.status != SweepStatus.RUNNING or trial.status != TrialStatus.RUNNING:
+                return
+            metric = sweep.objective.metric
+            pruned_at = None
+            for record in records:
+                if metric not in record.values:
+                    continue
+                trial.step, trial.value = record.step, record.values[metric]
+                if sweep.early_stopping is None:
+                    continue
+                for rung in rungs(sweep.early_stopping, record.step):
+                    if rung in trial.rungs:
+                        continue
+                    trial.rungs[rung] = trial.value
+                    if not self._promising(sweep, rung, trial.value):
+                        pruned_at = rung
+                        break
+                if pruned_at is not None:
+                    break
+            self._update_best(sweep)
+            if pruned_at is not None:
+                trial.status = TrialStatus.PRUNED
+                logger.info(
+                    f"Sweep {sweep.id}: pruning trial {trial.number} at step {pruned_at} "
+                    f"({metric}={trial.value:g})"
+                )
+                self.job_manager.cancel(job.id)
+
+    def _promising(self, sweep: Sweep, rung: int, value: float) -> bool:
+        """Whether ``value`` is among the best ``1/reduction_factor`` recorded at ``rung``."""
+        recorded = [trial.rungs[rung] for trial in sweep.trials if rung in trial.rungs]
+        keep = max(1, len(recorded) // sweep.early_stopping.reduction_factor)
+        if sweep.objective.goal == "maximize":
+            better = sum(1 for other in recorded if other > value)
+        else:
+            better = sum(1 for other in recorded if other < value)
+        return better < keep
+
+    def _update_best(self, sweep: Sweep) -> None:
+        scored = [t for t in sweep.trials if t.value is not None]
+        completed = [t for t in scored if t.status == TrialStatus.COMPLETED]
+        candidates = completed or scored
+        if not candidates:
+            return
+        pick = max if sweep.objective.goal == "maximize" else min
+        sweep.best_trial = pick(candidates, key=lambda t: t.value).number
+
+    def _job_finished(self, job: Job) -> None:
+        with self._lock:
+            found = self._trial(job)
+            if found is None:
+                return
+            sweep, trial = found
+            if trial.status == TrialStatus.RUNNING:
+                trial.status = _TRIAL_STATUS[job.status]
+            SWEEP_TRIALS.labels(trial.status.value).inc()
+            self._update_best(sweep)
+            self._fill(sweep)
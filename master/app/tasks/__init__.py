@@ -0,0 +1,320 @@
+"""Tasks - Python functions run by warm worker processes, without a job.
+
+A job costs a scheduling pass, a heartbeat round and a process start:
+seconds of overhead. A task skips all of it. It is a pickled
+``(function, args, kwargs)`` that waits in a FIFO queue here until a worker
+takes it with a long-polling lease request. It runs in one of the worker's
+already started task processes, and its outcome waits in the client's
+session, which long-polls for outcomes too. Each hop is one request on a
+kept-alive connection, so a task costs a few milliseconds on top of its
+own run time, and a batch of tasks shares every request.
+
+* Payloads and results are opaque here (base64 pickles); the master never
+  unpickles them.
+* A worker's lease requests list the tasks it holds, which renews their
+  leases. The tasks of a worker silent for ``lease_seconds``, and tasks a
+  worker no longer lists (the response leasing them was lost), go back to
+  the front of the queue. A task lost with ``max_attempts`` workers fails.
+* A session's outcomes are kept in the order its tasks end. A wait request
+  acknowledges every outcome before its ``cursor``, and those tasks are
+  forgotten. A session without requests for ``session_ttl_seconds`` is
+  dropped with its tasks.
+* Cancelling ends pending tasks at once; a worker running one is told to
+  kill it with the answer to its next lease request.
+
+One master process only: see "Multiple API Processes" in
+docs/setup/master_setup.md.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Set
+from uuid import uuid4
+
+from core.protocols.models import (
+    TaskAssignment,
+    TaskCancel,
+    TaskLease,
+    TaskLeaseResponse,
+    TaskOutcome,
+    TaskResults,
+    TaskStatus,
+    TaskSubmit,
+    TaskWait,
+    TaskWaitResponse,
+)
+from master.app.metrics import TASKS
+
+logger = logging.getLogger(__name__)
+
+# Most outcomes returned by one wait request
+MAX_RESULTS_PER_WAIT = 1000
+
+# Seconds between checks for silent workers and idle sessions
+_EXPIRY_INTERVAL = 1.0
+
+
+class _Task:
+    __slots__ = ("id", "session", "payload", "status", "worker_id", "attempts")
+
+    def __init__(self, session: str, payload: str):
+        self.id = str(uuid4())
+        self.session = session
+        self.payload = payload
+        self.status = TaskStatus.PENDING
+        self.worker_id: Optional[str] = None
+        self.attempts = 0  # times leased
+
+
+class _Session:
+    __slots__ = ("tasks", "results", "base", "waiter", "last_seen")
+
+    def __init__(self, now: float):
+        self.tasks: Set[str] = set()  # not yet acknowledged
+        self.results: List[TaskOutcome] = []  # ended, not yet acknowledged
+        self.base = 0  # cursor of results[0]
+        self.waiter: Optional[asyncio.Future] = None
+        self.last_seen = now
+
+
+class TaskQueue:
+    """Queued, leased and ended tasks of every client session."""
+
+    def __init__(
+        self,
+        lease_seconds: float = 30.0,
+        session_ttl_seconds: float = 600.0,
+        max_attempts: int = 3,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.lease_seconds = lease_seconds
+        self.session_ttl_seconds = session_ttl_seconds
+        self.max_attempts = max_attempts
+        self._clock = clock
+        self._tasks: Dict[str, _Task] = {}
+        self._queue: Deque[str] = deque()  # may hold ids of tasks no longer pending; skipped
+        self._sessions: Dict[str, _Session] = {}
+        self._workers: Dict[str, float] = {}  # worker id -> time of its last request
+        self._polling: Dict[str, int] = {}  # worker id -> lease requests it has waiting
+        self._leased: Dict[str, Set[str]] = {}  # worker id -> tasks it holds
+        self._kill: Dict[str, Set[str]] = {}  # worker id -> cancelled tasks it still runs
+        self._idle: Deque[asyncio.Future] = deque()  # lease requests waiting for tasks
+        self._next_expiry = 0.0
+
+    # ─── Clients ───────────────────────────────────────────────────────────
+
+    def submit(self, submit: TaskSubmit) -> List[str]:
+        """Queue a batch of tasks; returns their ids."""
+        session = self._session(submit.session)
+        ids = []
+        for payload in submit.payloads:
+            task = _Task(submit.session, payload)
+            self._tasks[task.id] = task
+            session.tasks.add(task.id)
+            self._queue.append(task.id)
+            ids.append(task.id)
+        self._wake_workers()
+        return ids
+
+    async def wait(self, request: TaskWait) -> TaskWaitResponse:
+        """Outcomes after ``cursor``, waiting up to ``wait_seconds`` for one."""
+        session = self._session(request.session)
+        self.expire()
+        cursor = min(max(request.cursor, session.base), session.base + len(session.results))
+        for outcome in session.results[: cursor - session.base]:
+            session.tasks.discard(outcome.id)
+            self._tasks.pop(outcome.id, None)
+        del session.results[: cursor - session.base]
+        session.base = cursor
+
+        if not session.results and request.wait_seconds > 0:
+            if session.waiter is not None and not session.waiter.done():
+                session.waiter.set_result(None)  # only the newest request of a session waits
+            waiter = session.waiter = asyncio.get_running_loop().create_future()
+            try:
+                await asyncio.wait_for(waiter, request.wait_seconds)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                if session.waiter is waiter:
+                    session.waiter = None
+                session.last_seen = self._clock()
+        results = session.results[:MAX_RESULTS_PER_WAIT]
+        return TaskWaitResponse(cursor=session.base + len(results), results=results)
+
+    def cancel(self, request: TaskCancel) -> int:
+        """Cancel pending and running tasks of a session; returns how many were."""
+        self._session(request.session)
+        cancelled = 0
+        for task_id in request.ids:
+            task = self._tasks.get(task_id)
+            if task is None or task.session != request.session:
+                continue
+            if task.status == TaskStatus.RUNNING:
+                self._leased.get(task.worker_id, set()).discard(task_id)
+                self._kill.setdefault(task.worker_id, set()).add(task_id)
+            elif task.status != TaskStatus.PENDING:
+                continue
+            self._end(task, TaskOutcome(id=task_id, status=TaskStatus.CANCELLED))
+            cancelled += 1
+        return cancelled
+
+    # ─── Workers ───────────────────────────────────────────────────────────
+
+    async def lease(self, request: TaskLease) -> TaskLeaseResponse:
+        """Renew the leases of the tasks a worker holds and hand it up to ``capacity`` more.
+
+        With nothing queued, waits up to ``wait_seconds`` for tasks.
+        """
+        worker_id = request.worker_id
+        self._workers[worker_id] = self._clock()
+        self.expire()
+        held = self._leased.setdefault(worker_id, set())
+        listed = set(request.running)
+        for task_id in held - listed:
+            logger.warning(f"Worker {worker_id} does not hold task {task_id} leased to it, requeueing it")
+            held.discard(task_id)
+            self._requeue(task_id)
+        kill = self._kill.pop(worker_id, set()) & listed
+
+        tasks = self._take(worker_id, request.capacity)
+        if not tasks and request.capacity and request.wait_seconds > 0:
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + request.wait_seconds
+            self._polling[worker_id] = self._polling.get(worker_id, 0) + 1
+            try:
+                while not tasks and loop.time() < deadline:
+                    waiter = loop.create_future()
+                    self._idle.append(waiter)
+                    try:
+                        await asyncio.wait_for(waiter, deadline - loop.time())
+                    except asyncio.TimeoutError:
+                        pass
+                    finally:
+                        if not waiter.done():
+                            waiter.cancel()
+                        if waiter in self._idle:
+                            self._idle.remove(waiter)
+                    tasks = self._take(worker_id, request.capacity)
+            finally:
+                self._polling[worker_id] -= 1
+                if not self._polling[worker_id]:
+                    del self._polling[worker_id]
+                self._workers[worker_id] = self._clock()
+        return TaskLeaseResponse(tasks=tasks, cancel=sorted(kill))
+
+    def finish(self, results: TaskResults) -> int:
+        """Record the outcomes of tasks a worker ran; returns how many were still expected."""
+        self._workers[results.worker_id] = self._clock()
+        held = self._leased.get(results.worker_id, set())
+        accepted = 0
+        for outcome in results.results:
+            held.discard(outcome.id)
+            task = self._tasks.get(outcome.id)
+            if task is None or task.status != TaskStatus.RUNNING or task.worker_id != results.worker_id:
+                continue  # cancelled, requeued, or its session is gone
+            self._end(task, outcome)
+            accepted += 1
+        return accepted
+
+    # ─── Housekeeping ──────────────────────────────────────────────────────
+
+    def expire(self) -> None:
+        """Requeue the tasks of silent workers and drop idle sessions (at most once a second)."""
+        now = self._clock()
+        if now < self._next_expiry:
+            return
+        self._next_expiry = now + _EXPIRY_INTERVAL
+        for worker_id, seen in list(self._workers.items()):
+            if worker_id in self._polling or now - seen <= self.lease_seconds:
+                continue
+            del self._workers[worker_id]
+            self._kill.pop(worker_id, None)
+            lost = self._leased.pop(worker_id, set())
+            if lost:
+                logger.warning(f"Worker {worker_id} went silent holding {len(lost)} tasks, requeueing them")
+            for task_id in lost:
+                self._requeue(task_id)
+        for session_id, session in list(self._sessions.items()):
+            if session.waiter is None and now - session.last_seen > self.session_ttl_seconds:
+                self._drop(session_id)
+
+    def stats(self) -> Dict[str, int]:
+        """Tasks by status, and the sessions and workers known."""
+        counts = {status.value: 0 for status in TaskStatus}
+        for task in self._tasks.values():
+            counts[task.status.value] += 1
+        counts["sessions"] = len(self._sessions)
+        counts["workers"] = len(self._workers)
+        return counts
+
+    # ─── Internals ─────────────────────────────────────────────────────────
+
+    def _session(self, session_id: str) -> _Session:
+        session = self._sessions.get(session_id)
+        now = self._clock()
+        if session is None:
+            session = self._sessions[session_id] = _Session(now)
+        session.last_seen = now
+        return session
+
+    def _take(self, worker_id: str, capacity: int) -> List[TaskAssignment]:
+        tasks: List[TaskAssignment] = []
+        held = self._leased.setdefault(worker_id, set())
+        while self._queue and len(tasks) < capacity:
+            task = self._tasks.get(self._queue.popleft())
+            if task is None or task.status != TaskStatus.PENDING:
+                continue
+            task.status = TaskStatus.RUNNING
+            task.worker_id = worker_id
+            task.attempts += 1
+            held.add(task.id)
+            tasks.append(TaskAssignment(id=task.id, payload=task.payload))
+        return tasks
+
+    def _wake_workers(self) -> None:
+        # One waiting lease request per queued task at most; each may take several
+        for _ in range(min(len(self._idle), len(self._queue))):
+            waiter = self._idle.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def _requeue(self, task_id: str) -> None:
+        task = self._tasks.get(task_id)
+        if task is None or task.status != TaskStatus.RUNNING:
+            return
+        task.worker_id = None
+        if task.attempts >= self.max_attempts:
+            self._end(task, TaskOutcome(
+                id=task_id, status=TaskStatus.FAILED, error=f"Lost with {task.attempts} workers",
+            ))
+            return
+        task.status = TaskStatus.PENDING
+        self._queue.appendleft(task_id)
+        TASKS.labels("requeued").inc()
+        self._wake_workers()
+
+    def _end(self, task: _Task, outcome: TaskOutcome) -> None:
+        task.status = outcome.status
+        task.payload = ""
+        TASKS.labels(outcome.status.value).inc()
+        session = self._sessions.get(task.session)
+        if session is None:
+            self._tasks.pop(task.id, None)
+            return
+        session.results.append(outcome)
+        if session.waiter is not None and not session.waiter.done():
+            session.waiter.set_result(None)
+
+    def _drop(self, session_id: str) -> None:
+        session = self._sessions.pop(session_id)
+        running = 0
+        for task_id in session.tasks:
+            task = self._tasks.pop(task_id, None)
+            if task is not None and task.status == TaskStatus.RUNNING:
+                self._leased.get(task.worker_id, set()).discard(task_id)
+                self._kill.setdefault(task.worker_id, set()).add(task_id)
+                running += 1
+        logger.info(f"Dropped idle task session {session_id} ({len(session.tasks)} tasks, {running} running)")
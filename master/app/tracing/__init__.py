@@ -0,0 +1,167 @@
+"""Job Lifecycle Tracing - phase durations and rolling latency percentiles.
+
+Every job carries a list of ``JobEvent`` milestones (submitted, queued,
+scheduled, dispatched, started, finished). This module turns them into
+phase durations and keeps a rolling window of recent durations per phase,
+overall and per job label, so you can see where time-to-first-step goes:
+
+    queue_wait     queued     → scheduled   (waiting for a node)
+    dispatch       scheduled  → dispatched  (waiting for the node's heartbeat)
+    startup        dispatched → started     (worker setup / container start)
+    time_to_start  submitted  → started
+    run            started    → finished
+    total          submitted  → finished
+
+``LifecycleTracker`` sees only the transitions its own process handles. A
+master running several processes computes reports from the events stored
+with the latest jobs instead (``report_from_jobs``).
+"""
+
+import math
+import threading
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+from core.protocols.models import (
+    Job,
+    JobEvent,
+    JobPhase,
+    JobTrace,
+    LatencyReport,
+    PhaseLatency,
+)
+
+# name -> (from phase, to phase)
+PHASES: Dict[str, Tuple[JobPhase, JobPhase]] = {
+    "queue_wait": (JobPhase.QUEUED, JobPhase.SCHEDULED),
+    "dispatch": (JobPhase.SCHEDULED, JobPhase.DISPATCHED),
+    "startup": (JobPhase.DISPATCHED, JobPhase.STARTED),
+    "time_to_start": (JobPhase.SUBMITTED, JobPhase.STARTED),
+    "run": (JobPhase.STARTED, JobPhase.FINISHED),
+    "total": (JobPhase.SUBMITTED, JobPhase.FINISHED),
+}
+
+# Phases that end at a given milestone, so recording only touches those
+_ENDING_AT: Dict[JobPhase, List[str]] = {}
+for _name, (_, _end) in PHASES.items():
+    _ENDING_AT.setdefault(_end, []).append(_name)
+
+
+def _first_times(events: List[JobEvent]) -> Dict[JobPhase, JobEvent]:
+    """First occurrence of each milestone (a requeued job keeps its original submit time)."""
+    first: Dict[JobPhase, JobEvent] = {}
+    for event in events:
+        first.setdefault(event.phase, event)
+    return first
+
+
+def _last_times(events: List[JobEvent]) -> Dict[JobPhase, JobEvent]:
+    last: Dict[JobPhase, JobEvent] = {}
+    for event in events:
+        last[event.phase] = event
+    return last
+
+
+def phase_durations(events: List[JobEvent]) -> Dict[str, float]:
+    """Seconds spent in each phase whose start and end milestones are both present.
+
+    Each phase ends at the latest occurrence of its end milestone and starts
+    at the latest occurrence of its start milestone before that, so retries
+    report the final attempt; ``submitted`` always uses the original submit.
+    """
+    last = _last_times(events)
+    first = _first_times(events)
+    durations: Dict[str, float] = {}
+    for name, (start, end) in PHASES.items():
+        end_event = last.get(end)
+        if end_event is None:
+            continue
+        start_event = first.get(start) if start == JobPhase.SUBMITTED else None
+        if start_event is None:
+            for event in events:
+                if event.phase == start and event.timestamp <= end_event.timestamp:
+                    start_event = event
+        if start_event is not None:
+            durations[name] = (end_event.timestamp - start_event.timestamp).total_seconds()
+    return durations
+
+
+def build_trace(job: Job) -> JobTrace:
+    """Return the lifecycle trace of a job."""
+    return JobTrace(
+        job_id=job.id,
+        status=job.status,
+        events=job.events,
+        durations=phase_durations(job.events),
+    )
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    rank = math.ceil(q * len(sorted_values))
+    return sorted_values[min(len(sorted_values), max(rank, 1)) - 1]
+
+
+class LifecycleTracker:
+    """Rolling windows of phase durations, overall and per label.
+
+    Recording is O(labels on the job) deque appends; percentiles are only
+    computed when a report is requested.
+    """
+
+    def __init__(self, window: int = 1000, max_label_series: int = 500):
+        self.window = window
+        self.max_label_series = max_label_series
+        # (phase name, "key=value" or None) -> recent durations
+        self._series: Dict[Tuple[str, Optional[str]], Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, job: Job, phase: JobPhase) -> None:
+        """Record the durations of every phase that ends at ``phase`` for this job."""
+        names = _ENDING_AT.get(phase)
+        if not names:
+            return
+        durations = phase_durations(job.events)
+        labels = [f"{k}={v}" for k, v in job.labels.items()]
+        with self._lock:
+            for name in names:
+                if name not in durations:
+                    continue
+                for label in [None] + labels:
+                    series = self._series.get((name, label))
+                    if series is None:
+                        if label is not None and len(self._series) >= self.max_label_series:
+                            continue  # bound memory under label churn
+                        series = self._series[(name, label)] = deque(maxlen=self.window)
+                    series.append(durations[name])
+
+    def report(self, label: Optional[str] = None) -> LatencyReport:
+        """p50/p95/p99 per phase, for all jobs or for jobs carrying ``label`` (``key=value``)."""
+        with self._lock:
+            snapshot = {name: list(self._series.get((name, label), ())) for name in PHASES}
+        return _report(snapshot, label, self.window)
+
+
+def report_from_jobs(jobs: Iterable[Job], window: int, label: Optional[str] = None) -> LatencyReport:
+    """p50/p95/p99 per phase over the stored events of ``jobs``, e.g. the latest ``window`` jobs."""
+    values: Dict[str, List[float]] = {name: [] for name in PHASES}
+    for job in jobs:
+        for name, seconds in phase_durations(job.events).items():
+            values[name].append(seconds)
+    return _report(values, label, window)
+
+
+def _report(values_by_phase: Dict[str, List[float]], label: Optional[str], window: int) -> LatencyReport:
+    phases: Dict[str, PhaseLatency] = {}
+    for name, values in values_by_phase.items():
+        if not values:
+            phases[name] = PhaseLatency()
+            continue
+        values.sort()
+        phases[name] = PhaseLatency(
+            count=len(values),
+            p50=_percentile(values, 0.50),
+            p95=_percentile(values, 0.95),
+            p99=_percentile(values, 0.99),
+        )
+    return LatencyReport(label=label, window=window, phases=phases)
@@ -6,11 +6,13 @@ job management, scheduling, and REST API routes.
 
 import logging
 import os
+import shlex
 import sys
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 # Ensure project root is on sys.path so `core.*` and `master.*` imports work
 # when running with `python main.py` from the master/ directory.
@@ -18,12 +20,31 @@ _project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if _project_root not in sys.path:
     sys.path.insert(0, _project_root)
 
-from core.config.settings import get_settings  # noqa: E402
-from master.app.storage import get_store  # noqa: E402
-from master.app.nodes import NodeManager  # noqa: E402
-from master.app.jobs import JobManager  # noqa: E402
-from master.app.scheduler import Scheduler  # noqa: E402
-from master.app.api import jobs as jobs_api, nodes as nodes_api  # noqa: E402
+from core.config.settings import get_settings
+from master.app.api import admin as admin_api
+from master.app.api import artifacts as artifacts_api
+from master.app.api import datasets as datasets_api
+from master.app.api import disabled_detail
+from master.app.api import jobs as jobs_api
+from master.app.api import nodes as nodes_api
+from master.app.api import replication as replication_api
+from master.app.api import swarm as swarm_api
+from master.app.api import sweeps as sweeps_api
+from master.app.api import tasks as tasks_api
+from master.app.artifacts import ArtifactStore
+from master.app.cache import ResultCache
+from master.app.datasets import DatasetStore
+from master.app.jobs import JobManager
+from master.app.logs import LogStore
+from master.app.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from master.app.metrics import REGISTRY, MetricsMiddleware, render_metrics
+from master.app.nodes import NodeManager
+from master.app.replication import ReplicaFollower, ReplicationMiddleware
+from master.app.scheduler import Scheduler
+from master.app.storage import InMemoryStore, get_store
+from master.app.swarm import Tracker
+from master.app.sweeps import SweepManager
+from master.app.tasks import TaskQueue
 
 # ── Settings & Logging ──────────────────────────────────────────────────────
 settings = get_settings()
@@ -36,12 +57,36 @@ logger = logging.getLogger(__name__)
 
 # ── Globals initialised in lifespan ─────────────────────────────────────────
 scheduler: Scheduler | None = None
+follower: ReplicaFollower | None = None
+
+
+def _server_processes() -> int:
+    """How many processes serve the API: MASTER_WORKERS, or the server's own worker count.
+
+    ``uvicorn main:app --workers N`` and gunicorn's ``-w N`` start several
+    processes without going through ``__main__``; their workers see the same
+    command line (and GUNICORN_CMD_ARGS).
+    """
+    args = sys.argv[1:] + shlex.split(os.getenv("GUNICORN_CMD_ARGS", ""))
+    processes = settings.master_workers
+    for i, arg in enumerate(args):
+        if arg in ("--workers", "-w"):
+            value = args[i + 1] if i + 1 < len(args) else ""
+        elif arg.startswith("--workers="):
+            value = arg.partition("=")[2]
+        elif arg.startswith("-w"):
+            value = arg[2:]
+        else:
+            continue
+        if value.isdigit():
+            processes = max(processes, int(value))
+    return processes
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan handler – boot and teardown."""
-    global scheduler
+    global scheduler, follower
 
     logger.info("Starting ClusterML Master...")
 
@@ -49,22 +94,92 @@ async def lifespan(app: FastAPI):
     store = get_store()
     logger.info(f"Storage backend: {settings.storage_backend}")
 
+    several = _server_processes() > 1
+    if several and isinstance(store, InMemoryStore):
+        # Each process would get its own private copy of the cluster state
+        raise RuntimeError("Several master processes require a shared backend, e.g. STORAGE_BACKEND=sqlite")
+
+    # Counters and histograms count what this process did; a scrape reaches
+    # one process at a time, so each reports its own series
+    REGISTRY.label_process(str(os.getpid()) if several else None)
+    if several:
+        logger.warning(
+            f"Metrics are per process (process=\"{os.getpid()}\"): a scrape reaches one process,"
+            " so sum counters over the process label"
+        )
+
+    def single_process_only(name, factory):
+        """``factory()``, or None when several processes serve the API.
+
+        The component keeps its state in this process's memory; see
+        "Multiple API Processes" in docs/setup/master_setup.md.
+        """
+        if several:
+            logger.warning(disabled_detail(name))
+            return None
+        return factory()
+
     # 2. Managers
-    node_manager = NodeManager(store, node_timeout_seconds=settings.node_timeout_seconds)
-    job_manager = JobManager(store)
-
-    # 3. Scheduler
-    scheduler = Scheduler(
-        store=store,
-        job_manager=job_manager,
-        node_manager=node_manager,
-        interval_seconds=settings.scheduler_interval_seconds,
+    log_store = single_process_only(
+        "Log shipping", lambda: LogStore(settings.log_max_bytes_per_job, settings.log_max_jobs)
+    )
+    artifact_store = ArtifactStore(settings.artifact_dir)
+    result_cache = None
+    if settings.result_cache_entries > 0:
+        result_cache = single_process_only("The result cache", lambda: ResultCache(
+            artifact_store,
+            max_entries=settings.result_cache_entries,
+            ttl_seconds=settings.result_cache_ttl_seconds,
+            max_bytes=settings.result_cache_max_bytes,
+        ))
+    job_manager = JobManager(
+        store,
+        log_store=log_store,
+        rendezvous_timeout_seconds=settings.rendezvous_timeout_seconds,
+        result_cache=result_cache,
+        latency_from_store=several,
+    )
+    node_manager = NodeManager(
+        store, node_timeout_seconds=settings.node_timeout_seconds, job_manager=job_manager
+    )
+    sweep_manager = single_process_only("The sweep manager", lambda: SweepManager(job_manager))
+    task_queue = single_process_only("The task queue", lambda: TaskQueue(
+        lease_seconds=settings.task_lease_seconds,
+        session_ttl_seconds=settings.task_session_ttl_seconds,
+        max_attempts=settings.task_max_attempts,
+    ))
+    tracker = single_process_only(
+        "The swarm tracker",
+        lambda: Tracker(ttl_seconds=settings.swarm_ttl_seconds, lease_seconds=settings.swarm_lease_seconds),
     )
-    await scheduler.start()
+
+    # 3. Scheduler (primary) or change-log follower (read replica)
+    if settings.replica_of:
+        follower = ReplicaFollower(store, settings.replica_of)
+        await follower.start()
+    else:
+        scheduler = Scheduler(
+            store=store,
+            job_manager=job_manager,
+            node_manager=node_manager,
+            interval_seconds=settings.scheduler_interval_seconds,
+            lease_seconds=settings.scheduler_lease_seconds,
+            slow_tick_seconds=settings.slow_tick_seconds,
+            locality_wait_seconds=settings.locality_wait_seconds,
+            fetch_rate_mb=settings.fetch_rate_mb,
+        )
+        await scheduler.start()
 
     # 4. Inject into API routers
-    jobs_api.init(job_manager, scheduler)
+    jobs_api.init(job_manager, scheduler, log_store, single_process=not several)
+    sweeps_api.init(sweep_manager, scheduler)
+    tasks_api.init(task_queue)
+    artifacts_api.init(artifact_store, job_manager)
+    datasets_api.init(DatasetStore(settings.dataset_dir))
+    swarm_api.init(tracker)
     nodes_api.init(node_manager, store)
+    replication_api.init(store, follower)
+    admin_api.init(scheduler, settings.admin_api_key, allow_open=settings.dev_mode)
 
     logger.info("ClusterML Master is ready ✓")
     yield
@@ -73,6 +188,10 @@ async def lifespan(app: FastAPI):
     logger.info("Shutting down ClusterML Master...")
     if scheduler:
         await scheduler.stop()
+        scheduler = None
+    if follower:
+        await follower.stop()
+        follower = None
     logger.info("Shutdown complete")
 
 
@@ -92,11 +211,29 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Store-Revision"],
 )
 
+# Revision headers, min-revision reads, and write redirects on replicas
+app.add_middleware(
+    ReplicationMiddleware,
+    primary_url=settings.replica_of,
+    min_revision_wait_seconds=settings.min_revision_wait_seconds,
+)
+
+# Per-route latency histograms (outermost, so it times the whole stack)
+app.add_middleware(MetricsMiddleware)
+
 # ── API Routers ─────────────────────────────────────────────────────────────
 app.include_router(jobs_api.router, prefix="/api/v1/jobs", tags=["jobs"])
+app.include_router(sweeps_api.router, prefix="/api/v1/sweeps", tags=["sweeps"])
+app.include_router(tasks_api.router, prefix="/api/v1/tasks", tags=["tasks"])
+app.include_router(artifacts_api.router, prefix="/api/v1", tags=["artifacts"])
+app.include_router(datasets_api.router, prefix="/api/v1/datasets", tags=["datasets"])
+app.include_router(swarm_api.router, prefix="/api/v1/swarm", tags=["swarm"])
 app.include_router(nodes_api.router, prefix="/api/v1/nodes", tags=["nodes"])
+app.include_router(replication_api.router, prefix="/api/v1/replication", tags=["replication"])
+app.include_router(admin_api.router, prefix="/api/v1/admin", tags=["admin"])
 
 
 # ── Root Endpoints ──────────────────────────────────────────────────────────
@@ -104,7 +241,17 @@ app.include_router(nodes_api.router, prefix="/api/v1/nodes", tags=["nodes"])
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
-    return {"status": "healthy", "scheduler": scheduler is not None}
+    return {
+        "status": "healthy",
+        "scheduler": scheduler is not None,
+        "role": "replica" if settings.replica_of else "primary",
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics():
+    """Prometheus metrics endpoint."""
+    return PlainTextResponse(render_metrics(get_store()), media_type=METRICS_CONTENT_TYPE)
 
 
 @app.get("/")
@@ -116,9 +263,14 @@ async def root():
         "docs": "/docs",
         "endpoints": {
             "jobs": "/api/v1/jobs",
+            "sweeps": "/api/v1/sweeps",
+            "tasks": "/api/v1/tasks",
             "nodes": "/api/v1/nodes",
+            "datasets": "/api/v1/datasets",
             "cluster_status": "/api/v1/nodes/status",
+            "replication": "/api/v1/replication/status",
             "health": "/health",
+            "metrics": "/metrics",
         },
     }
 
@@ -131,4 +283,7 @@ if __name__ == "__main__":
         host=settings.master_host,
         port=settings.master_port,
         reload=settings.dev_mode,
+        workers=None if settings.dev_mode else settings.master_workers,
+        # Workers keep one connection open across heartbeats
+        timeout_keep_alive=settings.keep_alive_seconds,
     )
@@ -0,0 +1,23 @@
+"""Fixtures shared by the master tests."""
+
+import os
+import sys
+
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+import pytest
+
+
+@pytest.fixture
+def several_master_processes(monkeypatch, tmp_path):
+    """Start the app as one of several master processes, sharing a SQLite store."""
+    import master.app.storage as storage_mod
+    import master.main
+    from master.app.storage.sqlite import SQLiteStore
+
+    monkeypatch.setattr(master.main.settings, "master_workers", 2)
+    storage_mod._store = SQLiteStore(str(tmp_path / "cluster.db"))
+    yield
+    storage_mod._store = None
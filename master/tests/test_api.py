@@ -3,6 +3,7 @@
 Run with: pytest master/tests/test_api.py -v
 """
 
+import asyncio
 import os
 import sys
 
@@ -46,6 +47,38 @@ class TestRootEndpoints:
         assert r.status_code == 200
 
 
+def _loop_running() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+class TestThreadpool:
+    def test_store_calls_run_off_the_event_loop(self, client, monkeypatch):
+        from master.app.storage import get_store
+
+        store = get_store()
+        on_loop = []
+
+        def recorded(method):
+            def call(*args, **kwargs):
+                on_loop.append(_loop_running())
+                return method(*args, **kwargs)
+            return call
+
+        for name in ("register_node", "update_node", "create_job", "get_job"):
+            monkeypatch.setattr(store, name, recorded(getattr(store, name)))
+        node = client.post("/api/v1/nodes", json={
+            "hostname": "w", "ip_address": "10.0.0.9", "resources": {"cpu_cores": 4, "memory_total_mb": 8192},
+        }).json()
+        client.post("/api/v1/nodes/heartbeat", json={"worker_id": node["id"], "resources": node["resources"]})
+        job = client.post("/api/v1/jobs", json={"name": "j", "spec": {"image": "python:3.11-slim"}}).json()
+        client.get(f"/api/v1/jobs/{job['id']}")
+        assert len(on_loop) >= 4 and not any(on_loop)
+
+
 class TestNodesAPI:
     def test_register_node(self, client):
         payload = {
@@ -188,8 +221,8 @@ class TestJobsAPI:
         # After submission with a node available, scheduler should assign it
         r = client.get(f"/api/v1/jobs/{job_id}")
         body = r.json()
-        # Status should be "running" (scheduler triggered on submit)
-        assert body["status"] == "running"
+        # Status should be "scheduled" (scheduler triggered on submit)
+        assert body["status"] == "scheduled"
         assert body["worker_id"] is not None
 
     def test_job_not_found(self, client):
@@ -0,0 +1,178 @@
+"""Tests for job artifacts: the chunk store, resumable uploads and ranged downloads.
+
+Run with: pytest master/tests/test_artifacts.py -v
+"""
+
+import asyncio
+import hashlib
+import os
+import sys
+import time
+
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+import pytest
+from fastapi.testclient import TestClient
+
+from core.protocols.models import ArtifactManifest
+from master.app.api import artifacts as artifacts_api
+from master.app.artifacts import STALE_UPLOAD_SECONDS, ArtifactError, ArtifactStore
+from master.main import app
+
+CHUNK = 1024
+
+
+def _sha(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _manifest(name: str, data: bytes, chunk_size: int = CHUNK) -> ArtifactManifest:
+    pieces = [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
+    return ArtifactManifest(name=name, size=len(data), chunk_size=chunk_size, chunks=[_sha(p) for p in pieces])
+
+
+async def _stream(data: bytes, piece: int = 100):
+    for i in range(0, len(data), piece):
+        yield data[i:i + piece]
+
+
+@pytest.fixture(autouse=True)
+def reset_store():
+    import master.app.storage as storage_mod
+    storage_mod._store = None
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ArtifactStore(str(tmp_path / "artifacts"))
+
+
+@pytest.fixture
+def client(store):
+    with TestClient(app) as c:
+        artifacts_api.init(store, artifacts_api._job_manager)
+        yield c
+
+
+class TestArtifactStore:
+    def test_chunk_must_match_its_hash(self, store):
+        data = b"x" * 300
+        with pytest.raises(ArtifactError):
+            asyncio.run(store.chunks.put(_sha(b"other"), _stream(data)))
+        assert asyncio.run(store.chunks.put(_sha(data), _stream(data)))
+        assert not asyncio.run(store.chunks.put(_sha(data), _stream(data)))
+        assert os.listdir(os.path.join(store.root, "tmp")) == []
+
+    def test_startup_removes_only_stale_uploads(self, store):
+        tmp = os.path.join(store.root, "tmp")
+        for name in ("stale", "in-progress"):
+            with open(os.path.join(tmp, name), "wb") as f:
+                f.write(b"partial")
+        old = time.time() - 2 * STALE_UPLOAD_SECONDS
+        os.utime(os.path.join(tmp, "stale"), (old, old))
+        # Another API process starts on the same directory
+        ArtifactStore(store.root)
+        assert os.listdir(tmp) == ["in-progress"]
+
+    def test_complete_requires_every_chunk(self, store):
+        data = os.urandom(CHUNK * 2 + 10)
+        upload = store.begin("job-1", _manifest("model.pt", data))
+        assert len(upload.missing) == 3
+        asyncio.run(store.chunks.put(upload.missing[0], _stream(data[:CHUNK])))
+        with pytest.raises(ArtifactError):
+            store.complete("job-1", "model.pt")
+        # Resuming asks only for what is still missing
+        assert store.begin("job-1", _manifest("model.pt", data)).missing == upload.missing[1:]
+
+    def test_reads_any_range_across_chunks(self, store):
+        data = os.urandom(CHUNK * 3 + 5)
+        for piece in (data[i:i + CHUNK] for i in range(0, len(data), CHUNK)):
+            asyncio.run(store.chunks.put(_sha(piece), _stream(piece)))
+        store.begin("job-1", _manifest("model.pt", data))
+        artifact = store.complete("job-1", "model.pt")
+        for start, end in ((0, len(data)), (10, 20), (CHUNK - 1, 2 * CHUNK + 1), (3 * CHUNK, len(data))):
+            assert b"".join(store.read(artifact, start, end)) == data[start:end]
+
+    def test_rejects_bad_manifests(self, store):
+        with pytest.raises(ArtifactError):
+            store.begin("job-1", ArtifactManifest(name="x", size=CHUNK + 1, chunk_size=CHUNK, chunks=[_sha(b"")]))
+        with pytest.raises(ArtifactError):
+            store.begin("job-1", ArtifactManifest(name="../escape", size=0, chunk_size=CHUNK, chunks=[]))
+
+
+class TestArtifactAPI:
+    def _job(self, client) -> str:
+        r = client.post("/api/v1/jobs", json={"name": "train", "spec": {"image": "python:3.11-slim"}})
+        return r.json()["id"]
+
+    def _upload(self, client, job_id: str, name: str, data: bytes):
+        manifest = _manifest(name, data)
+        r = client.post(f"/api/v1/jobs/{job_id}/artifacts", json=manifest.model_dump())
+        assert r.status_code == 200
+        missing = r.json()["missing"]
+        for i, digest in enumerate(manifest.chunks):
+            if digest in missing:
+                missing.remove(digest)
+                r = client.put(f"/api/v1/artifacts/chunks/{digest}", content=data[i * CHUNK:(i + 1) * CHUNK])
+                assert r.status_code == 201
+        return client.post(f"/api/v1/jobs/{job_id}/artifacts/{name}/complete")
+
+    def test_upload_and_download(self, client):
+        job_id = self._job(client)
+        data = os.urandom(CHUNK * 4 + 100)
+        assert self._upload(client, job_id, "ckpt/model.pt", data).json()["complete"]
+        assert [a["name"] for a in client.get(f"/api/v1/jobs/{job_id}/artifacts").json()] == ["ckpt/model.pt"]
+        r = client.get(f"/api/v1/jobs/{job_id}/artifacts/ckpt/model.pt")
+        assert r.status_code == 200 and r.content == data
+        assert r.headers["accept-ranges"] == "bytes"
+
+    def test_identical_chunks_are_sent_once(self, client):
+        data = os.urandom(CHUNK * 3)
+        self._upload(client, self._job(client), "model.pt", data)
+        other = self._job(client)
+        manifest = _manifest("model.pt", data + b"tail")
+        r = client.post(f"/api/v1/jobs/{other}/artifacts", json=manifest.model_dump())
+        assert r.json()["missing"] == [manifest.chunks[-1]]
+
+    def test_range_requests(self, client):
+        job_id = self._job(client)
+        data = os.urandom(CHUNK * 2 + 7)
+        self._upload(client, job_id, "model.pt", data)
+        url = f"/api/v1/jobs/{job_id}/artifacts/model.pt"
+        r = client.get(url, headers={"Range": f"bytes={CHUNK - 2}-{CHUNK + 2}"})
+        assert r.status_code == 206 and r.content == data[CHUNK - 2:CHUNK + 3]
+        assert r.headers["content-range"] == f"bytes {CHUNK - 2}-{CHUNK + 2}/{len(data)}"
+        assert client.get(url, headers={"Range": "bytes=-7"}).content == data[-7:]
+        assert client.get(url, headers={"Range": f"bytes={len(data)}-"}).status_code == 416
+        stale = client.get(url, headers={"Range": "bytes=0-0", "If-Range": '"other"'})
+        assert stale.status_code == 200 and stale.content == data
+        head = client.head(url)
+        assert head.headers["content-length"] == str(len(data)) and head.content == b""
+
+    def test_errors(self, client):
+        job_id = self._job(client)
+        assert client.put(f"/api/v1/artifacts/chunks/{_sha(b'a')}", content=b"b").status_code == 400
+        manifest = _manifest("model.pt", b"abc")
+        assert client.post("/api/v1/jobs/missing/artifacts", json=manifest.model_dump()).status_code == 404
+        client.post(f"/api/v1/jobs/{job_id}/artifacts", json=manifest.model_dump())
+        assert client.post(f"/api/v1/jobs/{job_id}/artifacts/model.pt/complete").status_code == 409
+        assert client.get(f"/api/v1/jobs/{job_id}/artifacts/model.pt").status_code == 404
+
+    def test_checkpoint_commit(self, client):
+        job_id = self._job(client)
+        data = os.urandom(CHUNK * 2)
+        self._upload(client, job_id, "checkpoint/state.pt", data)
+        checkpoint = {"generation": 1, "files": [_manifest("state.pt", data).model_dump()], "worker_id": "w1"}
+        url = f"/api/v1/jobs/{job_id}/checkpoint"
+        assert client.put(url, json=checkpoint).status_code == 409  # not placed on a worker
+        assert client.get(url).status_code == 404
+
+        artifacts_api._job_manager.mark_scheduled(job_id, "w1")
+        unstored = {**checkpoint, "files": [_manifest("state.pt", data + b"x").model_dump()]}
+        assert client.put(url, json=unstored).status_code == 409
+        assert client.put(url, json=checkpoint).status_code == 200
+        assert client.get(url).json()["files"][0]["chunks"] == _manifest("state.pt", data).chunks
+        digest = _sha(data[:CHUNK])
+        assert client.get(f"/api/v1/artifacts/chunks/{digest}").content == data[:CHUNK]
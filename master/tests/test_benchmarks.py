@@ -0,0 +1,74 @@
+"""Tests for the micro-benchmark runner (benchmarks/).
+
+Run with: pytest master/tests/test_benchmarks.py -v
+"""
+
+import json
+import os
+import sys
+
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+from benchmarks import Benchmark, Result, compare, load_all, measure
+from benchmarks.__main__ import main
+
+
+def _result(name, size, median):
+    return Result(name=name, size=size, median=median, min=median, mean=median, stdev=0.0, rounds=1, iterations=1)
+
+
+class TestCompare:
+    def test_threshold_and_overrides(self):
+        baseline = {"results": [{"name": "a", "size": 1, "median": 1.0}, {"name": "b", "size": 10, "median": 1.0}]}
+        results = [_result("a", 1, 1.3), _result("b", 10, 1.3), _result("new", 1, 5.0)]
+
+        by_key = {c.key: c for c in compare(results, baseline, threshold=0.2)}
+        assert set(by_key) == {"a[1]", "b[10]"}  # not in baseline: skipped
+        assert by_key["a[1]"].regressed and round(by_key["a[1]"].change, 3) == 0.3
+
+        overrides = {"a": 0.5, "b[10]": 0.5}
+        assert not any(c.regressed for c in compare(results, baseline, 0.2, overrides))
+
+
+class TestMeasure:
+    def test_reset_runs_before_every_timed_call(self):
+        calls = []
+
+        def setup(size):
+            return (lambda: calls.append("run")), (lambda: calls.append("reset"))
+
+        result = measure(Benchmark("x", (1,), setup), 1, rounds=2, min_round_seconds=0.0)
+        assert calls[:2] == ["reset", "run"]
+        assert calls.count("reset") == calls.count("run")
+        assert result.rounds == 2 and result.median >= 0
+
+    def test_required_hot_paths_are_covered(self):
+        names = set(load_all())
+        for required in (
+            "store.list_jobs",
+            "store.update_job",
+            "store.register_node.new",
+            "scheduler.tick.assign",
+            "resources.check_resources_fit",
+            "models.job.construct",
+        ):
+            assert required in names
+
+
+def test_cli_writes_results_and_compares(tmp_path, capsys):
+    out = tmp_path / "results.json"
+    args = ["-k", "resources.parse", "--rounds", "2", "--min-round-seconds", "0.001"]
+    assert main(args + ["--out", str(out)]) == 0
+    data = json.loads(out.read_text())
+    assert {r["name"] for r in data["results"]} == {"resources.parse_cpu", "resources.parse_memory"}
+    assert data["environment"]["python"]
+
+    # A baseline 1000x faster than reality must be flagged
+    for r in data["results"]:
+        r["median"] /= 1000
+    fast = tmp_path / "fast.json"
+    fast.write_text(json.dumps(data))
+    assert main(args + ["--baseline", str(fast)]) == 1
+    assert "REGRESSION" in capsys.readouterr().out
@@ -0,0 +1,148 @@
+"""Tests for the dataset service: registration, immutability, manifests and mapped reads.
+
+Run with: pytest master/tests/test_datasets.py -v
+"""
+
+import asyncio
+import hashlib
+import os
+import sys
+
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+import pytest
+from fastapi.testclient import TestClient
+
+from core.protocols.models import ArtifactManifest, DatasetCreate
+from master.app.api import datasets as datasets_api
+from master.app.api.datasets import ChunkRangeResponse
+from master.app.artifacts import ChunkStore
+from master.app.datasets import DatasetStore
+from master.main import app
+
+CHUNK = 1024
+
+
+def _sha(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _pieces(data: bytes):
+    return [data[i:i + CHUNK] for i in range(0, len(data), CHUNK)]
+
+
+def _create(name: str, shards: dict) -> DatasetCreate:
+    return DatasetCreate(name=name, shards=[
+        ArtifactManifest(name=shard, size=len(data), chunk_size=CHUNK, chunks=[_sha(p) for p in _pieces(data)])
+        for shard, data in shards.items()
+    ])
+
+
+@pytest.fixture(autouse=True)
+def reset_store():
+    import master.app.storage as storage_mod
+    storage_mod._store = None
+
+
+@pytest.fixture
+def store(tmp_path):
+    return DatasetStore(str(tmp_path / "datasets"))
+
+
+@pytest.fixture
+def client(store):
+    with TestClient(app) as c:
+        datasets_api.init(store)
+        yield c
+
+
+def _publish(client, name: str, shards: dict):
+    r = client.post("/api/v1/datasets", json=_create(name, shards).model_dump())
+    assert r.status_code == 200
+    missing = set(r.json()["missing"])
+    for data in shards.values():
+        for piece in _pieces(data):
+            if _sha(piece) in missing:
+                missing.discard(_sha(piece))
+                assert client.put(f"/api/v1/datasets/chunks/{_sha(piece)}", content=piece).status_code == 201
+    return client.post(f"/api/v1/datasets/{name}/complete")
+
+
+class TestDatasetAPI:
+    def test_publish_and_read_shards(self, client):
+        shards = {f"train-{i:05d}.tar": os.urandom(CHUNK * 2 + i) for i in range(3)}
+        assert client.get("/api/v1/datasets/mnist/shards/train-00000.tar").status_code == 404
+        assert _publish(client, "mnist", shards).json()["complete"]
+        assert [d["name"] for d in client.get("/api/v1/datasets").json()] == ["mnist"]
+        for shard, data in shards.items():
+            assert client.get(f"/api/v1/datasets/mnist/shards/{shard}").content == data
+        url = "/api/v1/datasets/mnist/shards/train-00002.tar"
+        r = client.get(url, headers={"Range": f"bytes={CHUNK - 3}-{2 * CHUNK}"})
+        data = shards["train-00002.tar"]
+        assert r.status_code == 206 and r.content == data[CHUNK - 3:2 * CHUNK + 1]
+        assert client.get(url, headers={"If-None-Match": r.headers["etag"]}).status_code == 304
+        assert client.head(url).headers["content-length"] == str(len(data))
+
+    def test_datasets_are_immutable(self, client):
+        _publish(client, "mnist", {"a": b"one"})
+        again = client.post("/api/v1/datasets", json=_create("mnist", {"a": b"one"}).model_dump())
+        assert again.status_code == 200 and again.json()["missing"] == []
+        assert client.post("/api/v1/datasets", json=_create("mnist", {"a": b"two"}).model_dump()).status_code == 409
+        assert client.get("/api/v1/datasets/mnist/shards/a").content == b"one"
+
+    def test_complete_needs_every_chunk(self, client):
+        client.post("/api/v1/datasets", json=_create("partial", {"a": b"x" * 3000}).model_dump())
+        assert client.post("/api/v1/datasets/partial/complete").status_code == 409
+        assert client.get("/api/v1/datasets/partial/manifest").status_code == 404
+
+    def test_manifest_lists_only_this_readers_shards(self, client):
+        shards = {f"s{i}": bytes([i]) * 10 for i in range(5)}
+        _publish(client, "split", shards)
+        r = client.get("/api/v1/datasets/split/manifest", params={"shard_index": 1, "num_shards": 2})
+        manifest = r.json()
+        assert [s["name"] for s in manifest["shards"]] == ["s1", "s3"] and manifest["total_shards"] == 5
+        assert client.get("/api/v1/datasets/split/manifest", params={"shard_index": 2, "num_shards": 2}).status_code == 400
+
+    def test_chunks_are_readable_by_hash(self, client):
+        data = os.urandom(CHUNK)
+        _publish(client, "one", {"a": data})
+        assert client.get(f"/api/v1/datasets/chunks/{_sha(data)}").content == data
+        assert client.get(f"/api/v1/datasets/chunks/{_sha(b'nope')}").status_code == 404
+
+
+class TestMappedReads:
+    def _chunk(self, tmp_path, data: bytes):
+        chunks = ChunkStore(str(tmp_path), max_maps=2)
+
+        async def stream():
+            yield data
+
+        asyncio.run(chunks.put(_sha(data), stream()))
+        return chunks
+
+    def test_readers_share_one_mapping(self, tmp_path):
+        data = os.urandom(5000)
+        chunks = self._chunk(tmp_path, data)
+        first, second = chunks.view(_sha(data), 10, 20), chunks.view(_sha(data))
+        assert first.obj is second.obj
+        assert bytes(first) == data[10:20] and bytes(second) == data
+
+    def test_zerocopy_extension_is_used_when_offered(self, tmp_path):
+        data = os.urandom(5000)
+        chunks = self._chunk(tmp_path, data)
+        sent = []
+
+        async def send(message):
+            if message["type"] == "http.response.zerocopy":
+                f = message["file"]
+                f.seek(message["offset"])
+                sent.append(f.read(message["count"]))
+            elif message["type"] == "http.response.body":
+                sent.append(bytes(message["body"]))
+
+        response = ChunkRangeResponse(chunks, [(_sha(data), 100, 300)], 206, {"Content-Length": "200"})
+        scope = {"type": "http", "extensions": {"http.response.zerocopy": {}}}
+        asyncio.run(response(scope, None, send))
+        assert b"".join(sent) == data[100:300]
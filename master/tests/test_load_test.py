@@ -0,0 +1,55 @@
+"""Smoke test for the load-test harness (scripts/load_test.py).
+
+Runs a tiny load against a real local master so the harness keeps working
+as the API evolves. Run with: pytest master/tests/test_load_test.py -v
+"""
+
+import importlib.util
+import os
+import sys
+
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+_spec = importlib.util.spec_from_file_location(
+    "load_test", os.path.join(_project_root, "scripts", "load_test.py")
+)
+load_test = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(load_test)
+
+
+def test_split_preserves_totals():
+    cfg = load_test.LoadConfig(workers=1001, pollers=5, submit_rate=90)
+    shares = load_test._split(cfg, 4)
+    assert sum(s.workers for s in shares) == 1001
+    assert sum(s.pollers for s in shares) == 5
+    assert sum(s.submit_rate for s in shares) == 90
+    # Worker indices (hostnames) do not collide across processes
+    assert [s.worker_offset for s in shares] == [0, 251, 501, 751]
+
+
+def test_small_load_run_against_local_master():
+    cfg = load_test.LoadConfig(
+        workers=20,
+        submit_rate=10,
+        pollers=2,
+        duration=3.0,
+        heartbeat_interval=0.5,
+        poll_interval=0.5,
+        job_runtime=0.2,
+        seed=1,
+    )
+    master = load_test.spawn_master(cfg, scheduler_interval=0.2)
+    try:
+        report = load_test.run(cfg)
+    finally:
+        master.terminate()
+        master.wait(timeout=15)
+
+    assert report["workers_registered"] == 20
+    assert report["error_rate"] == 0
+    assert report["operations"]["submit"]["requests"] == 30
+    assert report["jobs_completed"] > 0
+    assert report["master_job_latency"]["phases"]["time_to_start"]["count"] > 0
+    assert load_test.check_targets(report, load_test.Targets(nodes=20, submit_rate=10)) == []
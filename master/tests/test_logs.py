@@ -0,0 +1,104 @@
+"""Tests for shipped job output: the log store and the ingest endpoint.
+
+Run with: pytest master/tests/test_logs.py -v
+"""
+
+import gzip
+import os
+import sys
+
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+import pytest
+from fastapi.testclient import TestClient
+
+from core.protocols.models import LogBatch, LogChunk
+from master.app.logs import LogStore
+from master.main import app
+
+
+@pytest.fixture(autouse=True)
+def reset_store():
+    import master.app.storage as storage_mod
+    storage_mod._store = None
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as c:
+        yield c
+
+
+def _batch(*chunks) -> bytes:
+    batch = LogBatch(worker_id="w-1", chunks=[LogChunk(job_id=j, offset=o, data=d) for j, o, d in chunks])
+    return gzip.compress(batch.model_dump_json().encode())
+
+
+class TestLogStore:
+    def test_retried_chunks_are_not_duplicated(self):
+        store = LogStore()
+        assert store.append("j", 0, "a\nb\n") == 4
+        assert store.append("j", 0, "a\nb\n") == 0
+        assert store.append("j", 2, "b\nc\n") == 2
+        assert store.read("j") == "a\nb\nc\n"
+        assert store.read("other") is None
+
+    def test_gap_is_marked(self):
+        store = LogStore()
+        store.append("j", 0, "start\npart")
+        store.append("j", 100, "end\n")
+        assert store.read("j") == "start\npart\n[clusterml: 90 characters of output dropped]\nend\n"
+
+    def test_keeps_tail_per_job_and_bounded_jobs(self):
+        store = LogStore(max_bytes_per_job=10, max_jobs=2)
+        for i in range(5):
+            store.append("j", i * 4, f"{i:03d}\n")
+        assert store.read("j") == "[clusterml: 10 earlier characters truncated]\n2\n003\n004\n"
+        store.append("k", 0, "k\n")
+        store.append("l", 0, "l\n")
+        assert "j" not in store and "k" in store and "l" in store
+
+    def test_restart_starts_a_new_stream(self):
+        store = LogStore()
+        store.append("j", 0, "epoch 1\nepoch 2")
+        store.restart("j", "requeued (node_timeout), attempt 2")
+        assert store.append("j", 0, "epoch 2\n") == 8
+        assert store.read("j") == "epoch 1\nepoch 2\n[clusterml: requeued (node_timeout), attempt 2]\nepoch 2\n"
+
+
+class TestLogIngestAPI:
+    def _job(self, client) -> str:
+        r = client.post("/api/v1/jobs", json={"name": "logged", "spec": {"image": "python:3.11-slim"}})
+        return r.json()["id"]
+
+    def _ship(self, client, body: bytes):
+        return client.post("/api/v1/jobs/logs", content=body, headers={"Content-Encoding": "gzip"})
+
+    def test_batches_are_ingested_and_served(self, client):
+        job_id = self._job(client)
+        r = self._ship(client, _batch((job_id, 0, "epoch 1\n"), (job_id, 8, "epoch 2\n"), ("ghost", 0, "x\n")))
+        assert r.status_code == 200
+        assert r.json() == {"chunks": 3, "accepted": 16}
+        self._ship(client, _batch((job_id, 8, "epoch 2\nepoch 3\n")))  # a retry overlapping the last batch
+        assert client.get(f"/api/v1/jobs/{job_id}/logs").json()["logs"] == "epoch 1\nepoch 2\nepoch 3\n"
+
+    def test_final_update_logs_are_the_fallback(self, client):
+        job_id = self._job(client)
+        client.put(f"/api/v1/jobs/{job_id}", json={"logs": "tail\n"})
+        assert client.get(f"/api/v1/jobs/{job_id}/logs").json()["logs"] == "tail\n"
+
+    def test_bad_bodies_are_rejected(self, client, monkeypatch):
+        assert self._ship(client, b"not gzip").status_code == 400
+        assert self._ship(client, gzip.compress(b'{"chunks": "nope"}')).status_code == 422
+        monkeypatch.setattr("master.app.api.jobs.MAX_LOG_BATCH_BYTES", 100)
+        assert self._ship(client, gzip.compress(b" " * 1000)).status_code == 413
+
+    def test_disabled_with_several_master_processes(self, several_master_processes):
+        with TestClient(app) as client:
+            job_id = self._job(client)
+            r = self._ship(client, _batch((job_id, 0, "epoch 1\n")))
+            assert r.status_code == 404 and "MASTER_WORKERS=1" in r.json()["detail"]
+            client.put(f"/api/v1/jobs/{job_id}", json={"logs": "tail\n"})
+            assert client.get(f"/api/v1/jobs/{job_id}/logs").json()["logs"] == "tail\n"
@@ -13,17 +13,27 @@ _project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".
 if _project_root not in sys.path:
     sys.path.insert(0, _project_root)
 
+from datetime import datetime, timedelta
+
 from core.protocols.models import (
+    ArtifactManifest,
+    Checkpoint,
+    DistributedConfig,
     JobCreate,
     JobSpec,
     JobStatus,
     NodeRegister,
     NodeStatus,
     ResourceInfo,
+    RendezvousJoin,
+    RendezvousState,
     ResourceRequirements,
     HeartbeatRequest,
+    JobResourceUsage,
     JobUpdate,
+    VolumeMount,
 )
+from core.utils.locality import cached_bytes, input_key
 from core.utils.resources import parse_cpu, parse_memory, check_resources_fit
 from master.app.storage import InMemoryStore
 from master.app.nodes import NodeManager
@@ -39,13 +49,13 @@ def store():
 
 
 @pytest.fixture
-def node_manager(store):
-    return NodeManager(store, node_timeout_seconds=60)
+def job_manager(store):
+    return JobManager(store)
 
 
 @pytest.fixture
-def job_manager(store):
-    return JobManager(store)
+def node_manager(store, job_manager):
+    return NodeManager(store, node_timeout_seconds=60, job_manager=job_manager)
 
 
 @pytest.fixture
@@ -114,6 +124,19 @@ class TestResourceParsing:
         assert "GPU" in reason
 
 
+class TestLocality:
+    def test_input_key(self):
+        assert input_key("dataset://mnist/train-0.tar") == "dataset://mnist"
+        assert input_key("dataset://mnist?shard_index=1&num_shards=4") == "dataset://mnist"
+        assert input_key("file:///data/x.bin#sha256=" + "0" * 64) == "/data/x.bin"
+        assert input_key("https://models.example.com/r50.pt") == "https://models.example.com/r50.pt"
+
+    def test_directory_source_counts_its_files(self):
+        cached = {"/data/mnist/a": 10, "/data/mnist/b": 5, "/data/mnist2/a": 100, "dataset://imagenet": 7}
+        assert cached_bytes(["/data/mnist/"], cached) == 15
+        assert cached_bytes(["dataset://imagenet/s0", "dataset://imagenet/s1"], cached) == 7
+
+
 # ── Storage Tests ───────────────────────────────────────────────────────────
 
 class TestInMemoryStore:
@@ -166,6 +189,61 @@ class TestInMemoryStore:
         assert len(available) == 0
 
 
+    def test_update_returns_new_snapshot(self, store, sample_job_create):
+        job = store.create_job(sample_job_create)
+        updated = store.update_job(job.id, status=JobStatus.RUNNING, worker_id="w1")
+        # Earlier readers keep a consistent, unmodified snapshot
+        assert job.status == JobStatus.PENDING
+        assert job.worker_id is None
+        assert updated.status == JobStatus.RUNNING
+        assert store.get_job(job.id) is updated
+
+    def test_update_ignores_unknown_fields(self, store, sample_job_create):
+        job = store.create_job(sample_job_create)
+        updated = store.update_job(job.id, not_a_field=1)
+        assert not hasattr(updated, "not_a_field")
+
+    def test_remove_node_allows_fresh_registration(self, store, sample_node_registration):
+        n1 = store.register_node(sample_node_registration)
+        assert store.remove_node(n1.id) is True
+        n2 = store.register_node(sample_node_registration)
+        assert n2.id != n1.id
+
+    def test_concurrent_writers_and_readers(self, store, sample_job_create, sample_node_registration):
+        import threading
+
+        node = store.register_node(sample_node_registration)
+        jobs = [store.create_job(sample_job_create) for _ in range(50)]
+        errors = []
+
+        def heartbeat_writer():
+            for i in range(500):
+                store.update_node(node.id, current_jobs=[f"j{i}"], last_heartbeat=None)
+
+        def job_writer():
+            for job in jobs:
+                store.update_job(job.id, status=JobStatus.RUNNING, worker_id=node.id)
+
+        def reader():
+            try:
+                for _ in range(200):
+                    for j in store.list_jobs(limit=1000):
+                        # A record is either fully old or fully new
+                        assert (j.status == JobStatus.RUNNING) == (j.worker_id is not None)
+                    store.list_nodes()
+            except Exception as e:  # pragma: no cover - surfaced below
+                errors.append(e)
+
+        threads = [threading.Thread(target=f) for f in (heartbeat_writer, job_writer, reader, reader)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert errors == []
+        assert store.count_jobs_by_status() == {"running": 50}
+
+
 # ── Node Manager Tests ──────────────────────────────────────────────────────
 
 class TestNodeManager:
@@ -185,6 +263,108 @@ class TestNodeManager:
         )
         assert response.acknowledged is True
 
+    def test_heartbeat_stores_job_usage(self, node_manager, sample_node_registration):
+        node = node_manager.register(sample_node_registration)
+        usage = {"job-1": JobResourceUsage(cpu_percent=180.0, memory_rss_mb=2048, processes=3)}
+        node_manager.heartbeat(
+            HeartbeatRequest(
+                worker_id=node.id,
+                resources=sample_node_registration.resources,
+                active_jobs=["job-1"],
+                job_usage=usage,
+            )
+        )
+        assert node_manager.get_node(node.id).job_usage == usage
+
+    def test_heartbeat_cancels_cancelled_jobs(self, node_manager, job_manager, sample_node_registration, sample_job_create):
+        node = node_manager.register(sample_node_registration)
+        running = job_manager.create(sample_job_create)
+        job_manager.mark_scheduled(running.id, node.id)
+        cancelled = job_manager.create(sample_job_create)
+        job_manager.cancel(cancelled.id)
+        response = node_manager.heartbeat(
+            HeartbeatRequest(
+                worker_id=node.id,
+                resources=sample_node_registration.resources,
+                active_jobs=[running.id, cancelled.id],
+            )
+        )
+        assert response.commands == [f"cancel:{cancelled.id}"]
+
+    def test_timed_out_node_jobs_are_requeued_with_their_checkpoint(
+        self, store, node_manager, job_manager, sample_node_registration, sample_job_create
+    ):
+        node = node_manager.register(sample_node_registration)
+        job = job_manager.create(sample_job_create)
+        job_manager.mark_scheduled(job.id, node.id)
+        job_manager.mark_running(job.id, node.id)
+        checkpoint = Checkpoint(generation=3, files=[ArtifactManifest(name="state.pt", size=0, chunk_size=1024)])
+        job_manager.save_checkpoint(job.id, checkpoint)
+        store.update_node(node.id, current_jobs=[job.id], last_heartbeat=datetime.utcnow() - timedelta(seconds=120))
+
+        assert node_manager.check_timeouts() == [node.id]
+        requeued = job_manager.get(job.id)
+        assert requeued.status == JobStatus.QUEUED and requeued.worker_id is None
+        assert requeued.restarts == 1 and requeued.checkpoint == checkpoint
+        # The node comes back still running it: it is told to drop it
+        response = node_manager.heartbeat(
+            HeartbeatRequest(worker_id=node.id, resources=sample_node_registration.resources, active_jobs=[job.id])
+        )
+        assert response.commands == [f"cancel:{job.id}"]
+
+    def test_jobs_lost_by_a_restarted_worker_are_requeued(
+        self, node_manager, job_manager, sample_node_registration, sample_job_create
+    ):
+        node = node_manager.register(sample_node_registration)
+        lost = job_manager.create(sample_job_create)
+        unreported = job_manager.create(sample_job_create)
+        for job in (lost, unreported):
+            job_manager.mark_scheduled(job.id, node.id)
+        beat = HeartbeatRequest(
+            worker_id=node.id, resources=sample_node_registration.resources, active_jobs=[lost.id, unreported.id]
+        )
+        node_manager.heartbeat(beat)
+        job_manager.mark_running(lost.id, node.id)
+        job_manager.mark_running(unreported.id, node.id)
+
+        # The worker crashes and comes back under the same node id before timing out;
+        # its outbox still lists the job that finished before the crash
+        assert node_manager.register(sample_node_registration).id == node.id
+        node_manager.heartbeat(beat.model_copy(update={"active_jobs": [unreported.id]}))
+
+        requeued = job_manager.get(lost.id)
+        assert requeued.status == JobStatus.QUEUED and requeued.worker_id is None
+        assert requeued.events[-1].detail == "worker_lost"
+        assert job_manager.get(unreported.id).status == JobStatus.RUNNING
+        assert node_manager.get_node(node.id).current_jobs == [unreported.id]
+
+    def test_preempted_job_is_stopped_then_requeued(
+        self, node_manager, job_manager, sample_node_registration, sample_job_create
+    ):
+        node = node_manager.register(sample_node_registration)
+        job = job_manager.create(sample_job_create)
+        job_manager.mark_scheduled(job.id, node.id)
+        job_manager.mark_running(job.id, node.id)
+        job_manager.preempt(job.id)
+        beat = HeartbeatRequest(worker_id=node.id, resources=sample_node_registration.resources, active_jobs=[job.id])
+        assert node_manager.heartbeat(beat).commands == [f"stop:{job.id}"]
+
+        update = JobUpdate(status=JobStatus.QUEUED, seq=3, worker_id=node.id, result={"stopped": True})
+        requeued = job_manager.update(job.id, update)
+        assert requeued.status == JobStatus.QUEUED and not requeued.stop_requested
+        assert requeued.events[-1].detail == "stopped"
+
+    def test_heartbeat_keeps_cache_summary_unless_sent(self, node_manager, sample_node_registration):
+        node = node_manager.register(sample_node_registration)
+        beat = HeartbeatRequest(worker_id=node.id, resources=sample_node_registration.resources)
+        node_manager.heartbeat(beat.model_copy(update={"cached": {"dataset://mnist": 1000}}))
+        node_manager.heartbeat(beat)
+        assert node_manager.get_node(node.id).cached == {"dataset://mnist": 1000}
+
+    def test_registration_sets_concurrency(self, node_manager, sample_node_registration):
+        registration = sample_node_registration.model_copy(update={"max_concurrent_jobs": 6})
+        assert node_manager.register(registration).max_concurrent_jobs == 6
+
     def test_heartbeat_unknown_node(self, node_manager):
         response = node_manager.heartbeat(
             HeartbeatRequest(
@@ -227,6 +407,65 @@ class TestJobManager:
         assert failed.status == JobStatus.FAILED
         assert failed.error == "OOM killed"
 
+    def test_replayed_worker_updates_are_ignored(self, job_manager, sample_job_create):
+        job = job_manager.create(sample_job_create)
+        job_manager.mark_scheduled(job.id, "w1")
+        done = job_manager.update(job.id, JobUpdate(status=JobStatus.COMPLETED, seq=20, worker_id="w1"))
+        assert done.status == JobStatus.COMPLETED and done.update_seq == 20
+        # A RUNNING sent earlier but delivered late, then a retry of the completion
+        assert job_manager.update(job.id, JobUpdate(status=JobStatus.RUNNING, seq=10, worker_id="w1")).status == JobStatus.COMPLETED
+        again = job_manager.update(job.id, JobUpdate(status=JobStatus.COMPLETED, seq=20, worker_id="w1"))
+        assert again.events == done.events
+
+    def test_late_worker_update_after_cancel_is_ignored(self, job_manager, sample_job_create):
+        finished = []
+        job_manager.on_finished(finished.append)
+        job = job_manager.create(sample_job_create)
+        job_manager.mark_running(job.id, "w1")
+        cancelled = job_manager.cancel(job.id)
+        late = job_manager.update(job.id, JobUpdate(status=JobStatus.COMPLETED, result={"exit_code": 0}, seq=5, worker_id="w1"))
+        assert late.status == JobStatus.CANCELLED and late.result is None
+        assert late.events == cancelled.events and len(finished) == 1
+        # Its final output is still kept
+        assert job_manager.update(job.id, JobUpdate(logs="done\n", seq=6, worker_id="w1")).logs == "done\n"
+
+    def test_cancel_racing_completion_keeps_the_completion(self, store, job_manager, sample_job_create, monkeypatch):
+        finished = []
+        job_manager.on_finished(finished.append)
+        job = job_manager.create(sample_job_create)
+        job_manager.mark_running(job.id, "w1")
+        read = store.get_job
+
+        def read_then_complete(job_id):
+            snapshot = read(job_id)
+            monkeypatch.setattr(store, "get_job", read)
+            # Another API process records the worker's completion in between
+            job_manager.update(job_id, JobUpdate(status=JobStatus.COMPLETED, result={"exit_code": 0}, seq=1, worker_id="w1"))
+            return snapshot
+
+        monkeypatch.setattr(store, "get_job", read_then_complete)
+        assert job_manager.cancel(job.id).status == JobStatus.COMPLETED
+        assert read(job.id).status == JobStatus.COMPLETED and [j.status for j in finished] == [JobStatus.COMPLETED]
+
+    def test_update_from_another_worker_is_ignored(self, job_manager, sample_job_create):
+        job = job_manager.create(sample_job_create)
+        job_manager.mark_scheduled(job.id, "w2")
+        stale = job_manager.update(job.id, JobUpdate(status=JobStatus.FAILED, seq=5, worker_id="w1"))
+        assert stale.status == JobStatus.SCHEDULED and stale.update_seq is None
+
+    def test_checkpoints_come_from_the_current_worker_in_order(self, job_manager, sample_job_create):
+        job = job_manager.create(sample_job_create)
+        checkpoint = Checkpoint(generation=1, files=[], worker_id="w1")
+        with pytest.raises(ValueError):
+            job_manager.save_checkpoint(job.id, checkpoint)  # not placed
+        job_manager.mark_scheduled(job.id, "w1")
+        job_manager.save_checkpoint(job.id, checkpoint)
+        with pytest.raises(ValueError):
+            job_manager.save_checkpoint(job.id, checkpoint)  # not newer
+        with pytest.raises(ValueError):
+            job_manager.save_checkpoint(job.id, checkpoint.model_copy(update={"generation": 2, "worker_id": "w2"}))
+        assert job_manager.get(job.id).checkpoint.generation == 1
+
     def test_get_stats(self, job_manager, sample_job_create):
         j1 = job_manager.create(sample_job_create)
         j2 = job_manager.create(sample_job_create)
@@ -254,9 +493,9 @@ class TestScheduler:
         # Run one scheduling tick
         scheduler._tick()
 
-        # Job should now be RUNNING
+        # Job should now be SCHEDULED, waiting for the node to pick it up
         updated_job = job_manager.get(job.id)
-        assert updated_job.status == JobStatus.RUNNING
+        assert updated_job.status == JobStatus.SCHEDULED
         assert updated_job.worker_id is not None
 
     def test_tick_no_nodes_stays_queued(
@@ -290,3 +529,148 @@ class TestScheduler:
 
         # Should remain queued (GPU requirement not met)
         assert job_manager.get(job.id).status == JobStatus.QUEUED
+
+    def test_tick_sees_oldest_job_behind_many_newer_ones(
+        self, store, job_manager, node_manager, sample_node_registration
+    ):
+        scheduler = Scheduler(store, job_manager, node_manager, interval_seconds=1)
+        oldest = job_manager.create(JobCreate(name="oldest", spec=JobSpec(image="i")))
+        for i in range(150):
+            job = job_manager.create(JobCreate(name=f"newer-{i}", spec=JobSpec(image="i")))
+            job_manager.cancel(job.id)
+
+        node_manager.register(sample_node_registration)
+        scheduler._tick()
+        assert job_manager.get(oldest.id).status == JobStatus.SCHEDULED
+
+
+class TestLocalityPlacement:
+    GB = 1024 ** 3
+
+    def _node(self, node_manager, name, cached, max_jobs=2):
+        registration = NodeRegister(
+            hostname=name,
+            ip_address=f"10.0.0.{len(node_manager.list_nodes()) + 1}",
+            resources=ResourceInfo(cpu_cores=8, memory_total_mb=16384),
+            max_concurrent_jobs=max_jobs,
+        )
+        node = node_manager.register(registration)
+        node_manager.heartbeat(HeartbeatRequest(worker_id=node.id, resources=registration.resources, cached=cached))
+        return node
+
+    def _job(self, job_manager, source="dataset://imagenet"):
+        spec = JobSpec(image="i", volumes=[VolumeMount(name="data", mountPath="data", source=source)])
+        return job_manager.create(JobCreate(name="train", spec=spec))
+
+    def test_prefers_node_with_inputs_cached(self, store, job_manager, node_manager):
+        self._node(node_manager, "cold", {})
+        warm = self._node(node_manager, "warm", {"dataset://imagenet": 50 * self.GB})
+        job = self._job(job_manager)
+        Scheduler(store, job_manager, node_manager)._tick()
+        assert job_manager.get(job.id).worker_id == warm.id
+
+    def test_waits_for_busy_warm_node_then_gives_up(self, store, job_manager, node_manager):
+        cold = self._node(node_manager, "cold", {})
+        warm = self._node(node_manager, "warm", {"dataset://imagenet": 50 * self.GB}, max_jobs=1)
+        store.update_node(warm.id, current_jobs=["other"])
+        job = self._job(job_manager)
+        scheduler = Scheduler(store, job_manager, node_manager, locality_wait_seconds=60)
+        scheduler._tick()
+        assert job_manager.get(job.id).status == JobStatus.QUEUED
+        scheduler.locality_wait = 0
+        scheduler._tick()
+        assert job_manager.get(job.id).worker_id == cold.id
+
+    def test_small_inputs_are_not_worth_waiting_for(self, store, job_manager, node_manager):
+        cold = self._node(node_manager, "cold", {})
+        warm = self._node(node_manager, "warm", {"dataset://imagenet": 1024}, max_jobs=1)
+        store.update_node(warm.id, current_jobs=["other"])
+        job = self._job(job_manager)
+        Scheduler(store, job_manager, node_manager, locality_wait_seconds=60)._tick()
+        assert job_manager.get(job.id).worker_id == cold.id
+
+
+class TestDistributedJobs:
+    def _node(self, node_manager, name, max_jobs=2):
+        registration = NodeRegister(
+            hostname=name,
+            ip_address=f"10.0.0.{len(node_manager.list_nodes()) + 1}",
+            resources=ResourceInfo(cpu_cores=8, memory_total_mb=16384),
+            max_concurrent_jobs=max_jobs,
+        )
+        return node_manager.register(registration)
+
+    def _job(self, job_manager, workers):
+        spec = JobSpec(image="i", command=["python", "train.py"], distributed=DistributedConfig(workers=workers, type="pytorch"))
+        return job_manager.create(JobCreate(name="ddp", spec=spec))
+
+    def _placed(self, store, job_manager, node_manager, workers=3):
+        a = self._node(node_manager, "a")
+        b = self._node(node_manager, "b")
+        job = self._job(job_manager, workers)
+        Scheduler(store, job_manager, node_manager)._tick()
+        job = job_manager.get(job.id)
+        return job, [job_manager.get(rank_id) for rank_id in job.ranks], a, b
+
+    def test_all_ranks_are_placed_together_or_none(self, store, job_manager, node_manager):
+        job, ranks, a, b = self._placed(store, job_manager, node_manager)
+        assert job.status == JobStatus.SCHEDULED and job.worker_id is None
+        assert [r.worker_id for r in ranks] == [a.id, a.id, b.id]
+        assert [(r.rendezvous.rank, r.rendezvous.local_rank, r.rendezvous.local_world_size) for r in ranks] == [
+            (0, 0, 2), (1, 1, 2), (2, 0, 1),
+        ]
+        assert {r.rendezvous.master_addr for r in ranks} == {a.ip_address}
+        assert all(r.status == JobStatus.SCHEDULED and r.rendezvous.world_size == 3 for r in ranks)
+
+        # One free slot is left: a 2-rank job waits rather than starting half
+        waiting = self._job(job_manager, 2)
+        Scheduler(store, job_manager, node_manager)._tick()
+        assert job_manager.get(waiting.id).status == JobStatus.QUEUED and not job_manager.get(waiting.id).ranks
+
+    def test_ranks_start_once_all_joined(self, store, job_manager, node_manager):
+        job, ranks, a, b = self._placed(store, job_manager, node_manager)
+        response = node_manager.heartbeat(HeartbeatRequest(worker_id=b.id, resources=ResourceInfo(cpu_cores=8, memory_total_mb=16384)))
+        assert [x.rendezvous.rank for x in response.assigned_jobs] == [2]
+
+        with pytest.raises(ValueError):
+            job_manager.join_rendezvous(ranks[0].id, RendezvousJoin(worker_id=a.id))  # rank 0 needs a port
+        with pytest.raises(ValueError):
+            job_manager.join_rendezvous(ranks[1].id, RendezvousJoin(worker_id=b.id))  # not its worker
+        assert job_manager.join_rendezvous(ranks[0].id, RendezvousJoin(worker_id=a.id, master_port=29400)).state == RendezvousState.WAITING
+        job_manager.join_rendezvous(ranks[1].id, RendezvousJoin(worker_id=a.id))
+        ready = job_manager.join_rendezvous(ranks[2].id, RendezvousJoin(worker_id=b.id))
+        assert ready.state == RendezvousState.READY and ready.master_port == 29400
+        assert job_manager.get(job.id).status == JobStatus.RUNNING
+
+        for rank in ranks:
+            job_manager.update(rank.id, JobUpdate(status=JobStatus.COMPLETED, result={"exit_code": 0}, worker_id=rank.worker_id))
+        done = job_manager.get(job.id)
+        assert done.status == JobStatus.COMPLETED and len(done.result["ranks"]) == 3
+
+    def test_failed_rank_aborts_the_group(self, store, job_manager, node_manager):
+        job, ranks, a, b = self._placed(store, job_manager, node_manager)
+        job_manager.update(ranks[2].id, JobUpdate(status=JobStatus.FAILED, result={"exit_code": 1}, worker_id=b.id))
+        failed = job_manager.get(job.id)
+        assert failed.status == JobStatus.FAILED and failed.error == "Rank 2 failed (exit code 1)"
+        assert [job_manager.get(r.id).status for r in ranks[:2]] == [JobStatus.CANCELLED] * 2
+        assert job_manager.rendezvous(ranks[0].id).state == RendezvousState.ABORTED
+        beat = HeartbeatRequest(worker_id=a.id, resources=ResourceInfo(cpu_cores=8, memory_total_mb=16384), active_jobs=[ranks[0].id])
+        assert node_manager.heartbeat(beat).commands == [f"cancel:{ranks[0].id}"]
+
+    def test_incomplete_rendezvous_times_out(self, store, job_manager, node_manager):
+        job, ranks, a, b = self._placed(store, job_manager, node_manager)
+        job_manager.join_rendezvous(ranks[0].id, RendezvousJoin(worker_id=a.id, master_port=29400))
+        job_manager.rendezvous_timeout = timedelta(0)
+        # Polling the barrier reports the abort but changes nothing
+        assert job_manager.rendezvous(ranks[0].id).state == RendezvousState.ABORTED
+        assert job_manager.get(job.id).status == JobStatus.SCHEDULED
+        Scheduler(store, job_manager, node_manager)._tick()
+        assert job_manager.get(job.id).error == "Ranks [1, 2] did not reach the rendezvous within 0s"
+        assert {job_manager.get(r.id).status for r in ranks} == {JobStatus.CANCELLED}
+
+    def test_cancel_and_preempt(self, store, job_manager, node_manager):
+        job, ranks, a, b = self._placed(store, job_manager, node_manager)
+        with pytest.raises(ValueError):
+            job_manager.preempt(job.id)
+        job_manager.cancel(job.id)
+        assert {job_manager.get(r.id).status for r in ranks} == {JobStatus.CANCELLED}
@@ -0,0 +1,149 @@
+"""Tests for the Prometheus metrics module and /metrics endpoint.
+
+Run with: pytest master/tests/test_metrics.py -v
+"""
+
+import os
+import sys
+
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+import pytest
+from fastapi.testclient import TestClient
+
+from master.app.metrics import Registry
+from master.main import app
+
+
+@pytest.fixture(autouse=True)
+def reset_store():
+    import master.app.storage as storage_mod
+    storage_mod._store = None
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as c:
+        yield c
+
+
+def _sample(text: str, prefix: str) -> float:
+    """Return the value of the first sample line starting with ``prefix``."""
+    for line in text.splitlines():
+        if line.startswith(prefix):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{prefix} not found in:\n{text}")
+
+
+class TestRegistry:
+    def test_counter_and_gauge(self):
+        reg = Registry()
+        c = reg.counter("requests_total", "Requests.", ["code"])
+        c.labels("200").inc()
+        c.labels("200").inc(2)
+        g = reg.gauge("queue_depth", "Depth.")
+        g.set(7)
+        out = reg.render()
+        assert "# TYPE requests_total counter" in out
+        assert 'requests_total{code="200"} 3' in out
+        assert "queue_depth 7" in out
+
+    def test_histogram_buckets_are_cumulative(self):
+        reg = Registry()
+        h = reg.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+        for v in (0.05, 0.1, 0.5, 3.0):
+            h.observe(v)
+        out = reg.render()
+        assert 'latency_seconds_bucket{le="0.1"} 2' in out
+        assert 'latency_seconds_bucket{le="1"} 3' in out
+        assert 'latency_seconds_bucket{le="+Inf"} 4' in out
+        assert "latency_seconds_count 4" in out
+        assert _sample(out, "latency_seconds_sum") == pytest.approx(3.65)
+
+    def test_label_values_are_escaped(self):
+        reg = Registry()
+        reg.counter("c", "C.", ["path"]).labels('a"b\\c').inc()
+        assert 'c{path="a\\"b\\\\c"} 1' in reg.render()
+
+    def test_process_label_spares_cluster_wide_gauges(self):
+        reg = Registry()
+        reg.counter("c", "C.", ["code"]).labels("200").inc()
+        reg.histogram("h", "H.", buckets=(1.0,)).observe(0.5)
+        reg.gauge("jobs", "J.", ["status"], cluster_wide=True).labels("queued").set(3)
+        reg.label_process("4242")
+        out = reg.render()
+        reg.label_process(None)
+        assert 'c{code="200"} 1' in reg.render()
+        assert 'c{code="200",process="4242"} 1' in out
+        assert 'h_bucket{process="4242",le="1"} 1' in out
+        assert 'h_count{process="4242"} 1' in out
+        assert 'jobs{status="queued"} 3' in out
+
+    def test_wrong_label_count_rejected(self):
+        reg = Registry()
+        c = reg.counter("c", "C.", ["a", "b"])
+        with pytest.raises(ValueError):
+            c.labels("only-one")
+        with pytest.raises(ValueError):
+            reg.counter("c", "again")
+
+
+class TestMetricsEndpoint:
+    def _register_node(self, client):
+        return client.post(
+            "/api/v1/nodes",
+            json={
+                "hostname": "metrics-worker",
+                "ip_address": "10.0.0.9",
+                "resources": {"cpu_cores": 8, "memory_total_mb": 16384, "gpu_count": 1},
+            },
+        ).json()["id"]
+
+    def test_metrics_exposes_scheduler_api_and_cluster_state(self, client):
+        node_id = self._register_node(client)
+        client.post(
+            "/api/v1/nodes/heartbeat",
+            json={"worker_id": node_id, "resources": {"cpu_cores": 8, "memory_total_mb": 16384, "gpu_count": 1}},
+        )
+        client.post(
+            "/api/v1/jobs",
+            json={"name": "m", "spec": {"image": "i", "resources": {"cpu": "2", "memory": "4Gi"}}},
+        )
+        client.get("/api/v1/jobs/does-not-exist")
+
+        r = client.get("/metrics")
+        assert r.status_code == 200
+        assert r.headers["content-type"].startswith("text/plain; version=0.0.4")
+        text = r.text
+
+        assert _sample(text, "clusterml_scheduler_tick_seconds_count") >= 1
+        assert _sample(text, 'clusterml_scheduler_decisions_total{outcome="scheduled"}') >= 1
+        assert _sample(text, "clusterml_heartbeat_processing_seconds_count") >= 1
+        # Routes are labelled by template, not by concrete path
+        assert 'route="/api/v1/jobs/{job_id}",status="404"' in text
+        assert "does-not-exist" not in text
+
+        assert _sample(text, 'clusterml_nodes{status="online"}') == 1
+        assert _sample(text, 'clusterml_resources{resource="cpu_cores",state="allocated"}') == 2
+        assert _sample(text, 'clusterml_resources{resource="cpu_cores",state="free"}') == 6
+        assert _sample(text, 'clusterml_jobs{status="scheduled"}') == 1
+
+    def test_series_carry_the_process_with_several_master_processes(self, several_master_processes):
+        with TestClient(app) as client:
+            client.get("/health")
+            text = client.get("/metrics").text
+        assert f'process="{os.getpid()}"' in text
+        assert _sample(text, f'clusterml_http_request_duration_seconds_count{{method="GET",route="/health",status="200",process="{os.getpid()}"}}') >= 1
+        # Computed from the shared store: the same in every process
+        assert 'clusterml_nodes{status="online"} 0' in text
+
+    def test_route_label_is_the_route_template(self, client):
+        client.get("/api/v1/jobs/some-job/artifacts/checkpoint/model.pt")  # {name:path}
+        client.get("/api/v1/jobs/jobs")  # the id repeats a static segment
+        text = client.get("/metrics").text
+        assert 'route="/api/v1/jobs/{job_id}/artifacts/{name}",status="404"' in text
+        assert "checkpoint/model.pt" not in text
+        assert 'route="/api/v1/{job_id}/jobs"' not in text
+        assert _sample(text, 'clusterml_http_request_duration_seconds_count{method="GET",route="/api/v1/jobs/{job_id}",status="404"}') >= 1
@@ -0,0 +1,96 @@
+"""Tests for the sampling profiler, slow-tick capture and admin endpoints.
+
+Run with: pytest master/tests/test_profiling.py -v
+"""
+
+import os
+import sys
+import threading
+import time
+
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+import pytest
+from fastapi.testclient import TestClient
+
+from master.app.api import admin as admin_api
+from master.app.jobs import JobManager
+from master.app.nodes import NodeManager
+from master.app.profiling import SamplingProfiler, SlowTickWatchdog
+from master.app.scheduler import Scheduler
+from master.app.storage import InMemoryStore
+from master.main import app
+
+
+def _spin(seconds: float) -> None:
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        pass
+
+
+class TestSamplingProfiler:
+    def test_collapsed_stacks_name_thread_and_function(self):
+        worker = threading.Thread(target=_spin, args=(0.3,), name="busy-worker")
+        profiler = SamplingProfiler(interval_seconds=0.005)
+        profiler.start()
+        worker.start()
+        worker.join()
+        profile = profiler.stop()
+
+        assert profile.samples > 10
+        lines = profile.collapsed().splitlines()
+        busy = [line for line in lines if line.startswith("busy-worker;")]
+        assert busy and any("_spin (master/tests/test_profiling.py" in line for line in busy)
+        stack, count = busy[0].rsplit(" ", 1)
+        assert int(count) > 0
+
+
+class TestSlowTickWatchdog:
+    def test_only_slow_blocks_are_captured(self):
+        watchdog = SlowTickWatchdog(threshold_seconds=0.05, interval_seconds=0.002)
+        with watchdog:
+            _spin(0.01)
+        time.sleep(0.02)
+        assert watchdog.recent() == []
+
+        with watchdog:
+            _spin(0.3)
+        capture = watchdog.recent()[0]
+        assert capture.tick_seconds >= 0.3
+        assert capture.samples > 0
+        assert "_spin" in capture.collapsed
+
+    def test_scheduler_tick_is_watched(self, monkeypatch):
+        store = InMemoryStore()
+        job_manager = JobManager(store)
+        scheduler = Scheduler(
+            store, job_manager, NodeManager(store, job_manager=job_manager), slow_tick_seconds=0.05
+        )
+        monkeypatch.setattr(scheduler, "_schedule", lambda: _spin(0.2))
+        scheduler._tick()
+        assert len(scheduler.watchdog.recent()) == 1
+
+
+class TestAdminAPI:
+    @pytest.fixture(autouse=True)
+    def reset_store(self):
+        import master.app.storage as storage_mod
+        storage_mod._store = None
+
+    def test_disabled_without_admin_key(self):
+        with TestClient(app) as client:
+            assert client.get("/api/v1/admin/profile", params={"seconds": 0.1}).status_code == 403
+
+    def test_profile_and_slow_ticks(self):
+        with TestClient(app) as client:
+            admin_api.init(None, "s3cret")
+            assert client.get("/api/v1/admin/profile", params={"seconds": 0.1}).status_code == 401
+            headers = {"X-API-Key": "s3cret"}
+            r = client.get("/api/v1/admin/profile", params={"seconds": 0.2, "hz": 200}, headers=headers)
+            assert r.status_code == 200
+            assert int(r.headers["X-Profile-Samples"]) > 0
+            # Every line is "frame;frame;... count"
+            assert all(line.rsplit(" ", 1)[1].isdigit() for line in r.text.splitlines())
+            assert client.get("/api/v1/admin/profile/slow-ticks", headers=headers).json() == []
@@ -0,0 +1,342 @@
+"""Tests for the store change log and read replicas.
+
+Run with: pytest master/tests/test_replication.py -v
+"""
+
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from core.protocols.models import (
+    JobCreate,
+    JobSpec,
+    JobStatus,
+    NodeRegister,
+    ResourceInfo,
+)
+from master.app.replication import (
+    MIN_REVISION_HEADER,
+    REVISION_HEADER,
+    ReplicaFollower,
+    ReplicationMiddleware,
+    read_changes,
+    wait_for_revision,
+)
+from master.app.storage import InMemoryStore
+
+
+def _job():
+    return JobCreate(name="job", spec=JobSpec(image="python:3.11"))
+
+
+def _node(hostname="worker-1"):
+    return NodeRegister(
+        hostname=hostname,
+        ip_address="10.0.0.1",
+        resources=ResourceInfo(cpu_cores=4, memory_total_mb=8192),
+    )
+
+
+def _primary_transport(primary: InMemoryStore) -> httpx.MockTransport:
+    """Serve the change feed of ``primary`` without a real HTTP server."""
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        params = request.url.params
+        batch = await read_changes(
+            primary, int(params["since"]), float(params["wait"]), int(params["limit"]),
+            instance_id=params.get("instance_id"),
+        )
+        return httpx.Response(
+            200,
+            content=batch.model_dump_json(),
+            headers={REVISION_HEADER: str(primary.revision)},
+        )
+
+    return httpx.MockTransport(handler)
+
+
+class TestChangeLog:
+    def test_every_mutation_bumps_revision(self):
+        store = InMemoryStore()
+        job = store.create_job(_job())
+        store.update_job(job.id, status=JobStatus.QUEUED)
+        node = store.register_node(_node())
+        store.remove_node(node.id)
+
+        assert store.revision == 4
+        changes = store.changes_since(0)
+        assert [c.revision for c in changes] == [1, 2, 3, 4]
+        assert changes[1].record.status == JobStatus.QUEUED
+        assert changes[3].kind == "node" and changes[3].record is None
+        assert store.changes_since(2, limit=1)[0].revision == 3
+        assert store.changes_since(4) == []
+
+    def test_trimmed_or_future_revision_needs_resync(self):
+        store = InMemoryStore(change_log_size=2)
+        for _ in range(5):
+            store.create_job(_job())
+        assert store.changes_since(1) is None  # trimmed
+        assert [c.revision for c in store.changes_since(3)] == [4, 5]
+        assert store.changes_since(99) is None  # primary restarted
+
+
+class TestReadChanges:
+    def test_snapshot_is_built_off_the_event_loop(self, monkeypatch):
+        store = InMemoryStore()
+        store.create_job(_job())
+        snapshot = store.snapshot
+        threads = []
+
+        def recorded():
+            threads.append(threading.current_thread())
+            return snapshot()
+
+        monkeypatch.setattr(store, "snapshot", recorded)
+        batch = asyncio.run(read_changes(store, 1, 0, 100, instance_id="another-primary"))
+        assert batch.reset and len(batch.changes) == 1
+        assert threads and threads[0] is not threading.main_thread()
+
+
+class TestWaitForRevision:
+    def test_woken_by_a_mutation_from_another_thread(self):
+        store = InMemoryStore()
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            waiter = asyncio.create_task(wait_for_revision(store, 1, timeout=10))
+            await asyncio.sleep(0.05)
+            assert not waiter.done()
+            start = time.monotonic()
+            await loop.run_in_executor(None, store.create_job, _job())
+            assert await waiter is True
+            return time.monotonic() - start
+
+        assert asyncio.run(run()) < 1.0
+
+    def test_times_out_or_ends_when_abandoned(self):
+        store = InMemoryStore()
+
+        async def gone():
+            return True
+
+        async def run():
+            assert await wait_for_revision(store, 1, timeout=0.05) is False
+            start = time.monotonic()
+            assert await wait_for_revision(store, 1, timeout=10, abandoned=gone) is False
+            assert time.monotonic() - start < 2
+            store.create_job(_job())
+            assert await wait_for_revision(store, 1, timeout=0) is True
+
+        asyncio.run(run())
+
+
+class TestReplicaFollower:
+    def test_follower_applies_changes_and_snapshots(self):
+        primary = InMemoryStore(change_log_size=3)
+        replica = InMemoryStore()
+        follower = ReplicaFollower(replica, "http://primary")
+
+        async def run():
+            async with httpx.AsyncClient(
+                base_url="http://primary", transport=_primary_transport(primary)
+            ) as client:
+                # Log covers everything: incremental changes
+                job = primary.create_job(_job())
+                primary.register_node(_node())
+                batch = await follower.sync_once(client, wait=0)
+                assert not batch.reset
+                assert replica.get_job(job.id) == primary.get_job(job.id)
+
+                # Fall behind further than the log holds: full snapshot
+                for _ in range(5):
+                    primary.update_job(job.id, status=JobStatus.RUNNING)
+                batch = await follower.sync_once(client, wait=0)
+                assert batch.reset
+                assert replica.get_job(job.id).status == JobStatus.RUNNING
+                assert len(replica.list_nodes()) == 1
+
+                # And incremental again afterwards
+                node = primary.list_nodes()[0]
+                primary.remove_node(node.id)
+                batch = await follower.sync_once(client, wait=0)
+                assert not batch.reset
+                assert replica.list_nodes() == []
+
+        asyncio.run(run())
+        assert replica.revision == primary.revision
+        status = follower.status()
+        assert status.lag_revisions == 0
+        assert status.lag_seconds == 0.0
+
+    def test_restarted_primary_is_resynced_from_a_snapshot(self):
+        primary = InMemoryStore()
+        replica = InMemoryStore()
+        follower = ReplicaFollower(replica, "http://primary")
+
+        async def sync(store):
+            async with httpx.AsyncClient(base_url="http://primary", transport=_primary_transport(store)) as client:
+                return await follower.sync_once(client, wait=0)
+
+        old = primary.create_job(_job())
+        asyncio.run(sync(primary))
+        assert replica.get_job(old.id) is not None
+
+        # The primary comes back empty and its revision grows past the replica's
+        restarted = InMemoryStore()
+        new = [restarted.create_job(_job()) for _ in range(3)]
+        batch = asyncio.run(sync(restarted))
+        assert batch.reset and batch.instance_id == restarted.instance_id
+        assert replica.get_job(old.id) is None
+        assert {j.id for j in replica.list_jobs()} == {j.id for j in new}
+        assert replica.revision == restarted.revision
+        assert not asyncio.run(sync(restarted)).reset
+
+    def test_lag_reported_when_disconnected(self):
+        follower = ReplicaFollower(InMemoryStore(), "http://primary")
+        follower.primary_revision = 10
+        status = follower.status()
+        assert status.connected is False
+        assert status.lag_revisions == 10
+
+
+class TestReplicationMiddleware:
+    @pytest.fixture
+    def store(self, monkeypatch):
+        import master.app.storage as storage_mod
+
+        store = InMemoryStore()
+        monkeypatch.setattr(storage_mod, "_store", store)
+        return store
+
+    def _client(self, primary_url=None):
+        app = FastAPI()
+        app.add_middleware(
+            ReplicationMiddleware, primary_url=primary_url, min_revision_wait_seconds=0.05
+        )
+
+        @app.get("/api/v1/jobs")
+        async def jobs():
+            return []
+
+        @app.post("/api/v1/jobs")
+        async def submit():
+            return {}
+
+        return TestClient(app)
+
+    def test_revision_header_and_min_revision(self, store):
+        store.create_job(_job())
+        client = self._client()
+        r = client.get("/api/v1/jobs")
+        assert r.headers[REVISION_HEADER] == "1"
+        assert client.get("/api/v1/jobs", headers={MIN_REVISION_HEADER: "1"}).status_code == 200
+        r = client.get("/api/v1/jobs", headers={MIN_REVISION_HEADER: "5"})
+        assert r.status_code == 503
+        assert client.get("/api/v1/jobs", headers={MIN_REVISION_HEADER: "x"}).status_code == 400
+
+    def test_replica_redirects_writes(self, store):
+        client = self._client(primary_url="http://primary:8080/")
+        r = client.post("/api/v1/jobs?a=1", json={}, follow_redirects=False)
+        assert r.status_code == 307
+        assert r.headers["location"] == "http://primary:8080/api/v1/jobs?a=1"
+        assert client.get("/api/v1/jobs").status_code == 200
+
+    @pytest.mark.parametrize("path", [
+        "/api/v1/jobs", "/api/v1/jobs/stats", "/api/v1/jobs/j1", "/api/v1/jobs/j1/trace",
+        "/api/v1/nodes", "/api/v1/nodes/status", "/api/v1/nodes/n1", "/api/v1/replication/status",
+    ])
+    def test_replica_serves_job_and_node_reads(self, store, path):
+        client = self._client(primary_url="http://primary:8080")
+        assert client.get(path, follow_redirects=False).status_code != 307
+
+    @pytest.mark.parametrize("path", [
+        "/api/v1/jobs/latency", "/api/v1/jobs/j1/logs", "/api/v1/jobs/j1/rendezvous",
+        "/api/v1/jobs/j1/artifacts", "/api/v1/jobs/j1/checkpoint", "/api/v1/artifacts/chunks/ab",
+        "/api/v1/datasets", "/api/v1/sweeps/s1", "/api/v1/tasks", "/api/v1/swarm/peers", "/api/v1/admin/profile",
+    ])
+    def test_replica_redirects_other_reads(self, store, path):
+        client = self._client(primary_url="http://primary:8080")
+        r = client.get(path, follow_redirects=False)
+        assert r.status_code == 307 and r.headers["location"] == "http://primary:8080" + path
+
+
+# ── Multi-process: one primary and two replicas on localhost ──────────────
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_master(port: int, **env) -> subprocess.Popen:
+    proc_env = dict(os.environ, LOG_LEVEL="WARNING", **env)
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "master.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=_project_root,
+        env=proc_env,
+    )
+
+
+def _wait_healthy(url: str, timeout: float = 20.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{url}/health", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise TimeoutError(f"{url} did not become healthy")
+
+
+def test_replicas_serve_reads_across_processes():
+    primary_url = f"http://127.0.0.1:{_free_port()}"
+    replica_urls = [f"http://127.0.0.1:{_free_port()}" for _ in range(2)]
+    procs = [_start_master(int(primary_url.rsplit(":", 1)[1]))]
+    procs += [
+        _start_master(int(url.rsplit(":", 1)[1]), REPLICA_OF=primary_url) for url in replica_urls
+    ]
+    try:
+        for url in [primary_url] + replica_urls:
+            _wait_healthy(url)
+
+        r = httpx.post(
+            f"{primary_url}/api/v1/jobs",
+            json={"name": "replicated", "spec": {"image": "python:3.11"}},
+        )
+        assert r.status_code == 201
+        job_id = r.json()["id"]
+        revision = r.headers[REVISION_HEADER]
+
+        for url in replica_urls:
+            # Read-your-writes: wait for the replica to reach our revision
+            r = httpx.get(f"{url}/api/v1/jobs/{job_id}", headers={MIN_REVISION_HEADER: revision})
+            assert r.status_code == 200
+            assert r.json()["name"] == "replicated"
+
+            r = httpx.post(f"{url}/api/v1/jobs", json={"name": "x", "spec": {"image": "i"}})
+            assert r.status_code == 307
+            assert r.headers["location"].startswith(primary_url)
+
+            status = httpx.get(f"{url}/api/v1/replication/status").json()
+            assert status["role"] == "replica"
+            assert status["revision"] >= int(revision)
+    finally:
+        # Replicas first, so the primary has no open long-polls to drain
+        for p in reversed(procs):
+            p.terminate()
+            p.wait(timeout=15)
@@ -0,0 +1,214 @@
+"""Tests for the result cache of jobs submitted with ``cache``.
+
+Run with: pytest master/tests/test_result_cache.py -v
+"""
+
+import os
+import sys
+
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+import asyncio
+import hashlib
+
+import pytest
+from fastapi.testclient import TestClient
+
+from core.protocols.models import (
+    ArtifactManifest,
+    EnvVar,
+    JobCreate,
+    JobSpec,
+    JobStatus,
+    JobUpdate,
+    ResourceRequirements,
+    VolumeMount,
+)
+from master.app.artifacts import ArtifactStore
+from master.app.cache import ResultCache, cache_key
+from master.app.jobs import JobManager
+from master.app.storage import InMemoryStore
+
+PIN = "#sha256=" + "ab" * 32
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _spec(**overrides) -> JobSpec:
+    fields = dict(image="python:3.11-slim", command=["python", "train.py"], args=["--seed", "1"])
+    fields.update(overrides)
+    return JobSpec(**fields)
+
+
+def _create(spec: JobSpec = None, **overrides) -> JobCreate:
+    return JobCreate(name="train", spec=spec or _spec(), cache=True, **overrides)
+
+
+def _finish(jobs: JobManager, job_id: str, status: JobStatus = JobStatus.COMPLETED, **result):
+    jobs.mark_running(job_id, "w1")
+    return jobs.update(job_id, JobUpdate(status=status, result={"exit_code": 0, **result}))
+
+
+async def _stream(data: bytes):
+    yield data
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def artifacts(tmp_path):
+    return ArtifactStore(str(tmp_path / "artifacts"))
+
+
+@pytest.fixture
+def cache(artifacts, clock):
+    return ResultCache(artifacts, max_entries=2, ttl_seconds=3600, clock=clock)
+
+
+@pytest.fixture
+def jobs(cache):
+    return JobManager(InMemoryStore(), result_cache=cache)
+
+
+class TestCacheKey:
+    def test_canonical_form(self):
+        base = cache_key(_spec(env=[EnvVar(name="A", value="1"), EnvVar(name="B", value="2")], outputs=["*.pt", "*.json"]))
+        same = _spec(
+            env=[EnvVar(name="B", value="2"), EnvVar(name="A", value="1")],
+            outputs=["*.json", "*.pt", "*.pt"],
+            resources=ResourceRequirements(cpu="1000m", memory="1024Mi"),
+        )
+        assert cache_key(same) == base
+        assert cache_key(_spec(args=["--seed", "2"], env=same.env, outputs=same.outputs)) != base
+        # Repeated names keep their order: the last value wins
+        assert cache_key(_spec(env=[EnvVar(name="A", value="1"), EnvVar(name="A", value="2")])) != cache_key(
+            _spec(env=[EnvVar(name="A", value="2"), EnvVar(name="A", value="1")])
+        )
+
+    def test_inputs_must_be_declared_by_content(self):
+        def volume(source):
+            return _spec(volumes=[VolumeMount(name="data", mountPath="data", source=source)])
+
+        assert cache_key(volume("https://example.com/train.csv" + PIN)) is not None
+        assert cache_key(volume("dataset://mnist?shard_index=0&num_shards=2")) is not None
+        assert cache_key(volume("https://example.com/train.csv" + PIN)) != cache_key(volume("https://example.com/train.csv#sha256=" + "cd" * 32))
+        assert cache_key(volume("https://example.com/train.csv")) is None
+        assert cache_key(volume("/data/train.csv")) is None
+        assert cache_key(volume("/data/train.csv#sha256=short")) is None
+
+
+class TestResultCache:
+    def test_identical_job_completes_from_the_cache(self, jobs, artifacts):
+        first = jobs.create(_create())
+        assert first.status == JobStatus.QUEUED and first.cache_key == cache_key(_spec())
+        data = b"weights" * 100
+        digest = hashlib.sha256(data).hexdigest()
+        asyncio.run(artifacts.chunks.put(digest, _stream(data)))
+        artifacts.begin(first.id, ArtifactManifest(name="model.pt", size=len(data), chunk_size=1024, chunks=[digest]))
+        artifacts.complete(first.id, "model.pt")
+        _finish(jobs, first.id, accuracy=0.9)
+
+        hit = jobs.create(JobCreate(name="again", labels={"team": "ml"}, spec=_spec(), cache=True))
+        assert hit.status == JobStatus.COMPLETED and hit.cached_from == first.id
+        assert hit.result == {"exit_code": 0, "accuracy": 0.9}
+        assert [e.phase.value for e in hit.events] == ["submitted", "finished"]
+        (artifact,) = artifacts.list(hit.id)
+        assert artifact.complete and b"".join(artifacts.read(artifact)) == data
+        assert jobs.store.get_pending_jobs() == []
+
+        # Not opted in, or different args: it runs
+        assert jobs.create(JobCreate(name="train", spec=_spec())).status == JobStatus.QUEUED
+        assert jobs.create(_create(_spec(args=["--seed", "2"]))).status == JobStatus.QUEUED
+
+    def test_only_complete_runs_are_stored(self, jobs):
+        _finish(jobs, jobs.create(_create()).id, status=JobStatus.FAILED)
+        jobs.cancel(jobs.create(_create()).id)
+        _finish(jobs, jobs.create(_create()).id, artifact_error="upload failed")
+        assert jobs.create(_create()).status == JobStatus.QUEUED
+
+        undeclared = _spec(volumes=[VolumeMount(name="data", mountPath="data", source="/data/train.csv")])
+        job = jobs.create(_create(undeclared))
+        assert job.cache_key is None
+        _finish(jobs, job.id)
+        assert jobs.create(_create(undeclared)).status == JobStatus.QUEUED
+
+    def test_bypass_runs_and_replaces_the_entry(self, jobs):
+        first = jobs.create(_create())
+        _finish(jobs, first.id, accuracy=0.5)
+        rerun = jobs.create(_create(cache_bypass=True))
+        assert rerun.status == JobStatus.QUEUED
+        _finish(jobs, rerun.id, accuracy=0.6)
+        hit = jobs.create(_create())
+        assert hit.cached_from == rerun.id and hit.result["accuracy"] == 0.6
+
+    def test_entries_expire_and_are_evicted(self, jobs, cache, clock):
+        for seed in ("1", "2"):
+            _finish(jobs, jobs.create(_create(_spec(args=["--seed", seed]))).id)
+        assert jobs.create(_create(_spec(args=["--seed", "1"]))).status == JobStatus.COMPLETED
+
+        # Seed 1 was used last, so seed 2 is evicted to make room for seed 3
+        _finish(jobs, jobs.create(_create(_spec(args=["--seed", "3"]))).id)
+        assert len(cache) == 2
+        assert jobs.create(_create(_spec(args=["--seed", "2"]))).status == JobStatus.QUEUED
+        assert jobs.create(_create(_spec(args=["--seed", "1"]))).status == JobStatus.COMPLETED
+
+        clock.now += 3601
+        assert jobs.create(_create(_spec(args=["--seed", "1"]))).status == JobStatus.QUEUED
+        assert len(cache) == 1
+
+    def test_entries_are_bounded_by_size(self, artifacts, clock):
+        cache = ResultCache(artifacts, ttl_seconds=3600, clock=clock, max_bytes=300)
+        jobs = JobManager(InMemoryStore(), result_cache=cache)
+        _finish(jobs, jobs.create(_create(_spec(args=["--seed", "1"]))).id, notes="x" * 100)
+        _finish(jobs, jobs.create(_create(_spec(args=["--seed", "2"]))).id, notes="y" * 100)
+        assert len(cache) == 2 and cache.size_bytes <= 300
+
+        # A third entry pushes the least recently used one out; one too large is not stored
+        _finish(jobs, jobs.create(_create(_spec(args=["--seed", "3"]))).id, notes="z" * 100)
+        _finish(jobs, jobs.create(_create(_spec(args=["--seed", "4"]))).id, notes="w" * 400)
+        assert len(cache) == 2 and cache.size_bytes <= 300
+        assert jobs.create(_create(_spec(args=["--seed", "1"]))).status == JobStatus.QUEUED
+        assert jobs.create(_create(_spec(args=["--seed", "3"]))).status == JobStatus.COMPLETED
+        assert jobs.create(_create(_spec(args=["--seed", "4"]))).status == JobStatus.QUEUED
+
+
+class TestResultCacheAPI:
+    def test_resubmission_returns_the_cached_result(self):
+        import master.app.storage as storage_mod
+        from master.main import app
+
+        storage_mod._store = None
+        with TestClient(app) as client:
+            body = {"name": "train", "cache": True, "spec": {"image": "python:3.11-slim", "args": ["--api"]}}
+            first = client.post("/api/v1/jobs", json=body).json()
+            assert first["status"] == "queued"
+            client.put(f"/api/v1/jobs/{first['id']}", json={"status": "completed", "result": {"loss": 0.1}})
+
+            hit = client.post("/api/v1/jobs", json=body)
+            assert hit.status_code == 201
+            assert hit.json()["status"] == "completed" and hit.json()["cached_from"] == first["id"]
+            assert hit.json()["result"] == {"loss": 0.1}
+            bypass = client.post("/api/v1/jobs", json={**body, "cache_bypass": True}).json()
+            assert bypass["status"] == "queued"
+        storage_mod._store = None
+
+    def test_disabled_with_several_master_processes(self, several_master_processes):
+        from master.main import app
+
+        with TestClient(app) as client:
+            body = {"name": "train", "cache": True, "spec": {"image": "python:3.11-slim", "args": ["--procs"]}}
+            r = client.post("/api/v1/jobs", json=body)
+            assert r.status_code == 404 and r.json()["detail"].startswith("The result cache is disabled")
+            body["cache"] = False
+            assert client.post("/api/v1/jobs", json=body).json()["status"] == "queued"
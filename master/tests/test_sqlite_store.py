@@ -0,0 +1,329 @@
+"""Tests for the shared SQLite storage backend and scheduler leader election.
+
+Run with: pytest master/tests/test_sqlite_store.py -v
+"""
+
+import asyncio
+import multiprocessing
+import os
+import sys
+
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+import pytest
+
+from core.protocols.models import (
+    HeartbeatRequest,
+    JobCreate,
+    JobPhase,
+    JobSpec,
+    JobStatus,
+    JobUpdate,
+    NodeRegister,
+    NodeStatus,
+    ResourceInfo,
+)
+from master.app.jobs import JobManager
+from master.app.nodes import NodeManager
+from master.app.scheduler import Scheduler
+from master.app.storage.sqlite import SQLiteStore, sqlite_path_from_url
+
+
+def _job(name="job", labels=None):
+    return JobCreate(name=name, labels=labels or {}, spec=JobSpec(image="python:3.11"))
+
+
+def _node(hostname="worker-1"):
+    return NodeRegister(
+        hostname=hostname,
+        ip_address="10.0.0.1",
+        resources=ResourceInfo(cpu_cores=8, memory_total_mb=16384),
+    )
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "cluster.db")
+
+
+@pytest.fixture
+def store(db_path):
+    s = SQLiteStore(db_path)
+    yield s
+    s.close()
+
+
+def _submit_jobs(db_path, count):
+    store = SQLiteStore(db_path)
+    for i in range(count):
+        store.create_job(_job(name=f"child-{i}"))
+    store.close()
+
+
+class TestSQLiteStore:
+    def test_path_from_url(self):
+        assert sqlite_path_from_url("sqlite:////var/lib/clusterml.db") == "/var/lib/clusterml.db"
+        assert sqlite_path_from_url(None) == "clusterml.db"
+
+    def test_job_roundtrip_and_update(self, store):
+        job = store.create_job(_job(labels={"team": "ml"}))
+        updated = store.update_job(job.id, status=JobStatus.RUNNING, worker_id="w1")
+        fetched = store.get_job(job.id)
+        assert fetched == updated
+        assert fetched.worker_id == "w1"
+        assert store.update_job("missing", status=JobStatus.FAILED) is None
+
+    def test_list_jobs_filters(self, store):
+        j1 = store.create_job(_job(labels={"team": "ml"}))
+        store.create_job(_job(labels={"team": "infra"}))
+        store.update_job(j1.id, status=JobStatus.RUNNING)
+
+        assert [j.id for j in store.list_jobs(status=JobStatus.RUNNING)] == [j1.id]
+        assert [j.id for j in store.list_jobs(label="team=ml")] == [j1.id]
+        assert len(store.list_jobs(label="team")) == 2
+        assert store.count_jobs_by_status() == {"running": 1, "pending": 1}
+
+    def test_node_registration(self, store):
+        n1 = store.register_node(_node())
+        n2 = store.register_node(_node())
+        assert n1.id == n2.id
+        assert len(store.list_nodes(status=NodeStatus.ONLINE)) == 1
+
+        store.update_node(n1.id, current_jobs=["a", "b"])
+        assert store.get_available_nodes() == []
+        assert store.remove_node(n1.id) is True
+        assert store.get_node(n1.id) is None
+
+    def test_state_shared_between_processes(self, store, db_path):
+        ctx = multiprocessing.get_context("spawn")
+        procs = [ctx.Process(target=_submit_jobs, args=(db_path, 20)) for _ in range(2)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join(timeout=30)
+            assert p.exitcode == 0
+        assert store.count_jobs_by_status() == {"pending": 40}
+
+    def test_lease_is_exclusive_until_expiry(self, store, db_path):
+        other = SQLiteStore(db_path)
+        assert store.try_acquire_lease("scheduler", "a", ttl_seconds=60) is True
+        assert other.try_acquire_lease("scheduler", "b", ttl_seconds=60) is False
+        # Renewal by the holder succeeds
+        assert store.try_acquire_lease("scheduler", "a", ttl_seconds=60) is True
+        store.release_lease("scheduler", "a")
+        assert other.try_acquire_lease("scheduler", "b", ttl_seconds=-1) is True
+        # b's lease already expired, so a can take over
+        assert store.try_acquire_lease("scheduler", "a", ttl_seconds=60) is True
+        other.close()
+
+
+class TestSchedulerLeadership:
+    def _scheduler(self, store):
+        return Scheduler(store, JobManager(store), NodeManager(store), interval_seconds=1)
+
+    def test_only_leader_schedules(self, store, db_path):
+        follower_store = SQLiteStore(db_path)
+        leader = self._scheduler(store)
+        follower = self._scheduler(follower_store)
+
+        assert leader._renew_leadership() is True
+        assert follower._renew_leadership() is False
+
+        NodeManager(store).register(_node())
+        job = JobManager(store).create(_job())
+
+        follower.trigger()
+        assert store.get_job(job.id).status == JobStatus.QUEUED
+
+        leader.trigger()
+        assert store.get_job(job.id).status == JobStatus.SCHEDULED
+        follower_store.close()
+
+    def test_ticks_run_off_the_event_loop(self, store, monkeypatch):
+        scheduler = Scheduler(store, JobManager(store), NodeManager(store), interval_seconds=0.01)
+        on_loop = []
+
+        def schedule():
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(True)
+            except RuntimeError:
+                on_loop.append(False)
+
+        monkeypatch.setattr(scheduler, "_schedule", schedule)
+
+        async def run():
+            await scheduler.start()
+            await asyncio.sleep(0.1)
+            await scheduler.stop()
+
+        asyncio.run(run())
+        assert on_loop and not any(on_loop)
+
+    def test_cancel_between_read_and_schedule_is_kept(self, store, db_path, monkeypatch):
+        api_store = SQLiteStore(db_path)
+        leader = self._scheduler(store)
+        assert leader._renew_leadership() is True
+        node = NodeManager(store).register(_node())
+        cancelled = JobManager(store).create(_job(name="cancelled"))
+        queued = JobManager(store).create(_job(name="queued"))
+
+        read = store.get_pending_jobs
+
+        def read_then_race():
+            pending = read()
+            # Another API process commits a cancel and records a job on the node
+            JobManager(api_store).cancel(cancelled.id)
+            api_store.add_node_job(node.id, "elsewhere")
+            return pending
+
+        monkeypatch.setattr(store, "get_pending_jobs", read_then_race)
+        leader.trigger()
+
+        assert store.get_job(cancelled.id).status == JobStatus.CANCELLED
+        assert store.get_job(queued.id).status == JobStatus.SCHEDULED
+        assert store.get_node(node.id).current_jobs == ["elsewhere", queued.id]
+        api_store.close()
+
+    def test_job_placed_during_heartbeat_is_kept_and_dispatched(self, store, db_path, monkeypatch):
+        leader_store = SQLiteStore(db_path)
+        nodes = NodeManager(store)
+        node = nodes.register(_node())
+        job = JobManager(leader_store).create(_job())
+
+        read = store.get_node
+        raced = []
+
+        def read_then_place(node_id):
+            snapshot = read(node_id)
+            if not raced:
+                # The scheduler leader, in another process, places a job on the node
+                raced.append(JobManager(leader_store).mark_scheduled(job.id, node.id))
+                leader_store.add_node_job(node.id, job.id)
+            return snapshot
+
+        monkeypatch.setattr(store, "get_node", read_then_place)
+        response = nodes.heartbeat(HeartbeatRequest(worker_id=node.id, resources=_node().resources))
+
+        assert [a.job_id for a in response.assigned_jobs] == [job.id]
+        assert read(node.id).current_jobs == [job.id]
+        leader_store.close()
+
+
+class TestConcurrentJobUpdates:
+    def test_cancel_between_read_and_completion_is_kept(self, store, db_path, monkeypatch):
+        api_store = SQLiteStore(db_path)
+        jobs = JobManager(store)
+        job = jobs.create(_job())
+        jobs.mark_running(job.id, "w1")
+
+        read = store.get_job
+        raced = []
+
+        def read_then_cancel(job_id):
+            snapshot = read(job_id)
+            if not raced:
+                # Another API process commits a cancel before the worker's completion is written
+                raced.append(JobManager(api_store).cancel(job_id))
+            return snapshot
+
+        monkeypatch.setattr(store, "get_job", read_then_cancel)
+        update = JobUpdate(status=JobStatus.COMPLETED, result={"exit_code": 0}, seq=1, worker_id="w1")
+        late = jobs.update(job.id, update)
+
+        assert late.status == JobStatus.CANCELLED and late.result is None
+        assert read(job.id).events == raced[0].events
+        api_store.close()
+
+    def test_cancel_between_read_and_abort_is_kept(self, store, db_path, monkeypatch):
+        api_store = SQLiteStore(db_path)
+        jobs = JobManager(store)
+        job = jobs.create(_job())
+        jobs.mark_running(job.id, "w1")
+
+        read = store.get_job
+        raced = []
+
+        def read_then_cancel(job_id):
+            snapshot = read(job_id)
+            if not raced:
+                raced.append(JobManager(api_store).cancel(job_id))
+            return snapshot
+
+        monkeypatch.setattr(store, "get_job", read_then_cancel)
+        aborted = jobs.abort(job.id, "rank 1 failed")
+
+        assert aborted.status == JobStatus.CANCELLED and aborted.error is None
+        assert read(job.id).events == raced[0].events
+        api_store.close()
+
+    def test_terminal_marks_leave_an_ended_job_alone(self, store):
+        jobs = JobManager(store)
+        job = jobs.create(_job())
+        jobs.cancel(job.id)
+        assert jobs.mark_completed(job.id, result={"ranks": []}) is None
+        assert jobs.mark_failed(job.id, error="late") is None
+        assert store.get_job(job.id).status == JobStatus.CANCELLED
+
+    def test_conflicts_are_retried_a_bounded_number_of_times(self, store, monkeypatch):
+        jobs = JobManager(store)
+        job = jobs.create(_job())
+        jobs.mark_running(job.id, "w1")
+        monkeypatch.setattr(store, "update_job", lambda *args, **kwargs: None)  # always lost
+        with pytest.raises(RuntimeError, match="status kept changing"):
+            jobs.update(job.id, JobUpdate(status=JobStatus.COMPLETED))
+
+    def test_transitions_through_two_stores_keep_all_events(self, store, db_path):
+        other = SQLiteStore(db_path)
+        job = JobManager(store).create(_job())
+        JobManager(other).mark_scheduled(job.id, "w1")
+        JobManager(store).mark_dispatched(job.id)
+        phases = [e.phase for e in other.get_job(job.id).events]
+        assert phases == [JobPhase.SUBMITTED, JobPhase.QUEUED, JobPhase.SCHEDULED, JobPhase.DISPATCHED]
+        other.close()
+
+
+class TestSeveralMasterProcesses:
+    def test_server_worker_flags_count_as_processes(self, monkeypatch):
+        import master.main
+
+        monkeypatch.setattr(master.main.settings, "master_workers", 1)
+        monkeypatch.delenv("GUNICORN_CMD_ARGS", raising=False)
+        for argv, processes in [
+            (["uvicorn", "main:app"], 1),
+            (["uvicorn", "main:app", "--workers", "4"], 4),
+            (["uvicorn", "main:app", "--workers=3"], 3),
+            (["gunicorn", "master.main:app", "-w", "2"], 2),
+            (["gunicorn", "master.main:app", "-w5"], 5),
+        ]:
+            monkeypatch.setattr(sys, "argv", argv)
+            assert master.main._server_processes() == processes
+        monkeypatch.setattr(sys, "argv", ["gunicorn", "master.main:app"])
+        monkeypatch.setenv("GUNICORN_CMD_ARGS", "--bind 0.0.0.0:8080 --workers 6")
+        assert master.main._server_processes() == 6
+
+    def test_memory_backend_is_refused_however_the_app_is_started(self, monkeypatch):
+        from fastapi.testclient import TestClient
+
+        import master.app.storage as storage_mod
+        from master.main import app
+
+        monkeypatch.setattr(sys, "argv", ["uvicorn", "main:app", "--workers", "2"])
+        storage_mod._store = None
+        with pytest.raises(RuntimeError, match="shared backend"), TestClient(app):
+            pass
+        storage_mod._store = None
+
+    def test_server_workers_disable_per_process_features(self, monkeypatch, db_path):
+        from fastapi.testclient import TestClient
+
+        import master.app.storage as storage_mod
+        from master.main import app
+
+        monkeypatch.setattr(sys, "argv", ["uvicorn", "main:app", "--workers", "2"])
+        storage_mod._store = SQLiteStore(db_path)
+        with TestClient(app) as client:
+            assert "MASTER_WORKERS=1" in client.get("/api/v1/sweeps").json()["detail"]
+        storage_mod._store = None
@@ -0,0 +1,79 @@
+"""Tests for the swarm tracker that tells workers where dataset chunks are.
+
+Run with: pytest master/tests/test_swarm_tracker.py -v
+"""
+
+import os
+import sys
+
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+import pytest
+from fastapi.testclient import TestClient
+
+from master.app.swarm import Tracker
+from master.main import app
+
+
+@pytest.fixture(autouse=True)
+def reset_store():
+    import master.app.storage as storage_mod
+    storage_mod._store = None
+
+
+class TestTracker:
+    def test_unheld_chunk_goes_to_the_master_once(self):
+        tracker = Tracker()
+        assert tracker.locate(["c1"], peer="a:1")["c1"].master
+        waiting = tracker.locate(["c1"], peer="b:1")["c1"]
+        assert not waiting.master and waiting.peers == []
+        assert tracker.locate(["c1"], peer="a:1")["c1"].master  # the leaseholder may ask again
+        tracker.announce("a:1", ["c1"])
+        assert tracker.locate(["c1"], peer="b:1")["c1"].peers == ["a:1"]
+        assert tracker.stats() == {"peers": 1, "chunks": 1, "leases": 0}
+
+    def test_expired_lease_passes_to_another_worker(self):
+        tracker = Tracker(lease_seconds=0)
+        tracker.locate(["c1"], peer="a:1")
+        assert tracker.locate(["c1"], peer="b:1")["c1"].master
+
+    def test_leases_per_request_are_bounded(self):
+        tracker = Tracker(max_leases=2)
+        answer = tracker.locate(["c1", "c2", "c3"], peer="a:1")
+        assert [answer[d].master for d in ("c1", "c2", "c3")] == [True, True, False]
+        assert tracker.locate(["c3"], peer="b:1")["c3"].master
+
+    def test_full_announce_and_ttl_forget_chunks(self):
+        tracker = Tracker()
+        tracker.announce("a:1", ["c1", "c2"])
+        tracker.announce("a:1", ["c2"], full=True)
+        assert tracker.holders("c1") == [] and tracker.holders("c2") == ["a:1"]
+        expiring = Tracker(ttl_seconds=0)
+        expiring.announce("a:1", ["c1"])
+        assert expiring.holders("c1") == []
+
+    def test_non_serving_workers_go_straight_to_the_master(self):
+        tracker = Tracker()
+        tracker.locate(["c1"], peer="a:1")
+        assert tracker.locate(["c1"])["c1"].master
+
+
+class TestSwarmAPI:
+    def test_announce_and_locate(self):
+        with TestClient(app) as client:
+            digest = "ab" * 32
+            client.post("/api/v1/swarm/announce", json={"peer": "10.0.0.5:8081", "digests": [digest]})
+            r = client.post("/api/v1/swarm/locate", json={"peer": "10.0.0.6:8081", "digests": [digest, "cd" * 32]})
+            assert r.json() == {
+                digest: {"peers": ["10.0.0.5:8081"], "master": False},
+                "cd" * 32: {"peers": [], "master": True},
+            }
+            assert client.get("/api/v1/swarm/stats").json()["chunks"] == 1
+
+    def test_disabled_with_several_master_processes(self, several_master_processes):
+        with TestClient(app) as client:
+            r = client.post("/api/v1/swarm/locate", json={"peer": "10.0.0.6:8081", "digests": ["ab" * 32]})
+            assert r.status_code == 404 and "MASTER_WORKERS=1" in r.json()["detail"]
+            assert client.post("/api/v1/swarm/announce", json={"peer": "10.0.0.5:8081", "digests": []}).status_code == 404
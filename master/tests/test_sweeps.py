@@ -0,0 +1,217 @@
+"""Tests for hyperparameter sweeps and job metrics.
+
+Run with: pytest master/tests/test_sweeps.py -v
+"""
+
+import os
+import sys
+
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from core.protocols.models import (
+    EarlyStopping,
+    EnvVar,
+    JobCreate,
+    JobSpec,
+    JobStatus,
+    JobUpdate,
+    MetricRecord,
+    MetricsReport,
+    ParameterRange,
+    SweepCreate,
+    SweepObjective,
+    SweepStatus,
+    TrialStatus,
+)
+from master.app.jobs import JobManager
+from master.app.storage import InMemoryStore
+from master.app.sweeps import SweepError, SweepManager
+
+
+@pytest.fixture
+def job_manager():
+    return JobManager(InMemoryStore())
+
+
+@pytest.fixture
+def sweeps(job_manager):
+    return SweepManager(job_manager)
+
+
+def _sweep(**overrides) -> SweepCreate:
+    fields = dict(
+        name="rf",
+        spec=JobSpec(
+            image="python:3.11-slim",
+            command=["python", "classify.py"],
+            args=["--n-estimators", "${n_estimators}"],
+            env=[EnvVar(name="DEPTH", value="${max_depth}")],
+        ),
+        parameters={
+            "n_estimators": ParameterRange(values=[10, 100, 1000]),
+            "max_depth": ParameterRange(values=[4, 8]),
+        },
+        objective=SweepObjective(metric="accuracy"),
+        algorithm="grid",
+        parallelism=2,
+    )
+    fields.update(overrides)
+    return SweepCreate(**fields)
+
+
+def _start(job_manager, job_id):
+    job_manager.mark_scheduled(job_id, "node-1")
+    job_manager.update(job_id, JobUpdate(status=JobStatus.RUNNING))
+
+
+def _report(job_manager, job_id, step, **values):
+    return job_manager.report_metrics(job_id, MetricsReport(records=[MetricRecord(step=step, values=values)]))
+
+
+class TestJobMetrics:
+    def test_latest_values_kept_and_old_steps_ignored(self, job_manager):
+        job = job_manager.create(JobCreate(name="train", spec=JobSpec(image="python:3.11-slim")))
+        with pytest.raises(ValueError):
+            _report(job_manager, job.id, 1, loss=1.0)  # not placed yet
+        _start(job_manager, job.id)
+        seen = []
+        job_manager.on_metrics(lambda j, records: seen.append([r.step for r in records]))
+
+        job_manager.report_metrics(job.id, MetricsReport(records=[
+            MetricRecord(step=2, values={"loss": 0.5}), MetricRecord(step=1, values={"loss": 0.9, "lr": 0.1}),
+        ]))
+        job = _report(job_manager, job.id, 2, loss=0.1)  # a retried report
+
+        assert job.metrics == {"loss": 0.5, "lr": 0.1} and job.metrics_step == 2
+        assert seen == [[1, 2]]
+        with pytest.raises(ValueError):
+            job_manager.report_metrics(job.id, MetricsReport(worker_id="other", records=[]))
+
+
+class TestSweeps:
+    def test_grid_trials_fill_freed_slots(self, job_manager, sweeps):
+        sweep = sweeps.create(_sweep())
+        assert [t.params for t in sweep.trials] == [
+            {"n_estimators": 10, "max_depth": 4}, {"n_estimators": 10, "max_depth": 8},
+        ]
+        first = job_manager.get(sweep.trials[0].job_id)
+        assert first.spec.args == ["--n-estimators", "10"]
+        env = {var.name: var.value for var in first.spec.env}
+        assert env["DEPTH"] == "4" and json.loads(env["CLUSTERML_SWEEP_PARAMS"]) == sweep.trials[0].params
+        assert first.labels == {"sweep": sweep.id, "trial": "0"}
+
+        accuracy = {10: 0.8, 100: 0.9, 1000: 0.85}
+        finished = 0
+        while sweeps.get(sweep.id).status == SweepStatus.RUNNING:
+            trial = next(t for t in sweeps.get(sweep.id).trials if t.status == TrialStatus.RUNNING)
+            _start(job_manager, trial.job_id)
+            _report(job_manager, trial.job_id, 1, accuracy=accuracy[trial.params["n_estimators"]])
+            job_manager.update(trial.job_id, JobUpdate(status=JobStatus.COMPLETED))
+            finished += 1
+            running = [t for t in sweeps.get(sweep.id).trials if t.status == TrialStatus.RUNNING]
+            assert len(running) == min(2, 6 - finished)
+
+        sweep = sweeps.get(sweep.id)
+        assert sweep.status == SweepStatus.COMPLETED and len(sweep.trials) == 6
+        assert sweep.trials[sweep.best_trial].params["n_estimators"] == 100
+
+    def test_random_search_is_seeded_and_grid_needs_values(self, sweeps):
+        space = {"lr": ParameterRange(min=1e-4, max=1e-1, scale="log"), "layers": ParameterRange(min=1, max=4, integer=True)}
+        runs = [sweeps.create(_sweep(parameters=space, algorithm="random", seed=7, parallelism=3)) for _ in range(2)]
+        params = [[t.params for t in run.trials] for run in runs]
+        assert params[0] == params[1]
+        assert all(1e-4 <= p["lr"] <= 1e-1 and p["layers"] in (1, 2, 3, 4) for p in params[0])
+        with pytest.raises(SweepError):
+            sweeps.create(_sweep(parameters=space))
+
+    def test_unpromising_trial_is_pruned_and_replaced(self, job_manager, sweeps):
+        sweep = sweeps.create(_sweep(
+            parameters={"lr": ParameterRange(values=[0.1, 0.2, 0.3, 0.4])},
+            early_stopping=EarlyStopping(min_step=1, reduction_factor=2, max_step=8),
+        ))
+        good, bad = sweep.trials
+        _start(job_manager, good.job_id)
+        _start(job_manager, bad.job_id)
+        _report(job_manager, good.job_id, 1, accuracy=0.7)
+        _report(job_manager, bad.job_id, 1, accuracy=0.5)
+
+        sweep = sweeps.get(sweep.id)
+        assert [t.status for t in sweep.trials] == [TrialStatus.RUNNING, TrialStatus.PRUNED, TrialStatus.RUNNING]
+        assert job_manager.get(bad.job_id).status == JobStatus.CANCELLED
+        assert sweep.trials[1].rungs == {1: 0.5}
+
+    def test_early_stopping_saves_steps_for_the_same_best(self, job_manager):
+        """27 trials whose curves keep their order: ASHA finds the same best in a fraction of the steps."""
+        def run(early_stopping):
+            sweeps = SweepManager(job_manager)
+            sweep = sweeps.create(_sweep(
+                parameters={"quality": ParameterRange(values=[(i * 7) % 27 for i in range(27)])},
+                max_trials=27, parallelism=27, early_stopping=early_stopping,
+            ))
+            steps = 0
+            for trial in sweep.trials:
+                _start(job_manager, trial.job_id)
+            for step in range(1, 28):
+                for trial in sweeps.get(sweep.id).trials:
+                    if trial.status != TrialStatus.RUNNING:
+                        continue
+                    steps += 1
+                    _report(job_manager, trial.job_id, step, accuracy=trial.params["quality"] * step / 27)
+                    if step == 27 and sweeps.get(sweep.id).trials[trial.number].status == TrialStatus.RUNNING:
+                        job_manager.update(trial.job_id, JobUpdate(status=JobStatus.COMPLETED))
+            sweep = sweeps.get(sweep.id)
+            return steps, sweep.trials[sweep.best_trial].params["quality"], sweep
+
+        full_steps, full_best, _ = run(None)
+        steps, best, sweep = run(EarlyStopping(min_step=1, reduction_factor=3, max_step=27))
+        assert best == full_best == 26
+        assert steps * 2 < full_steps
+        assert sweep.status == SweepStatus.COMPLETED
+        assert sum(t.status == TrialStatus.PRUNED for t in sweep.trials) >= 15
+
+    def test_cancel_stops_running_trials(self, job_manager, sweeps):
+        sweep = sweeps.create(_sweep())
+        sweep = sweeps.cancel(sweep.id)
+        assert sweep.status == SweepStatus.CANCELLED
+        assert all(t.status == TrialStatus.CANCELLED for t in sweep.trials)
+        assert len(sweep.trials) == 2
+
+
+class TestSweepsAPI:
+    def test_create_get_and_cancel(self):
+        import master.app.storage as storage_mod
+        from master.main import app
+
+        storage_mod._store = None
+        with TestClient(app) as client:
+            payload = json.loads(_sweep().model_dump_json())
+            r = client.post("/api/v1/sweeps", json=payload)
+            assert r.status_code == 201
+            sweep = r.json()
+            assert len(sweep["trials"]) == 2
+            job_id = sweep["trials"][0]["job_id"]
+            assert client.get(f"/api/v1/jobs?label=sweep={sweep['id']}").json()[0]["labels"]["sweep"] == sweep["id"]
+            r = client.post(f"/api/v1/jobs/{job_id}/metrics", json={"records": [{"step": 1, "values": {"accuracy": 0.5}}]})
+            assert r.status_code == 409  # not running
+            assert client.get(f"/api/v1/sweeps/{sweep['id']}").json()["status"] == "running"
+            assert client.delete(f"/api/v1/sweeps/{sweep['id']}").json()["status"] == "cancelled"
+            assert client.get("/api/v1/sweeps/nope").status_code == 404
+            payload["algorithm"] = "grid"
+            payload["parameters"] = {"lr": {"min": 0.1, "max": 1.0}}
+            assert client.post("/api/v1/sweeps", json=payload).status_code == 422
+        storage_mod._store = None
+
+    def test_disabled_with_several_master_processes(self, several_master_processes):
+        from master.main import app
+
+        with TestClient(app) as client:
+            r = client.get("/api/v1/sweeps")
+            assert r.status_code == 404 and r.json()["detail"].startswith("The sweep manager is disabled")
+            assert client.post("/api/v1/sweeps", json=json.loads(_sweep().model_dump_json())).status_code == 404
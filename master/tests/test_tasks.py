@@ -0,0 +1,169 @@
+"""Tests for the master's task queue and tasks API.
+
+Run with: pytest master/tests/test_tasks.py -v
+"""
+
+import os
+import sys
+
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from core.protocols.models import (
+    TaskCancel,
+    TaskLease,
+    TaskOutcome,
+    TaskResults,
+    TaskStatus,
+    TaskSubmit,
+    TaskWait,
+)
+from master.app.api import tasks as tasks_api
+from master.app.tasks import TaskQueue
+from master.main import app
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _done(task_id: str, result: str = "b2s=") -> TaskOutcome:
+    return TaskOutcome(id=task_id, status=TaskStatus.COMPLETED, result=result)
+
+
+class TestTaskQueue:
+    def test_tasks_flow_from_session_to_worker_and_back(self):
+        async def run():
+            queue = TaskQueue()
+            ids = queue.submit(TaskSubmit(session="s", payloads=["a", "b", "c"]))
+            lease = await queue.lease(TaskLease(worker_id="w1", capacity=2, wait_seconds=0))
+            assert [t.id for t in lease.tasks] == ids[:2] and [t.payload for t in lease.tasks] == ["a", "b"]
+
+            assert queue.finish(TaskResults(worker_id="w1", results=[_done(ids[1])])) == 1
+            first = await queue.wait(TaskWait(session="s", wait_seconds=0))
+            assert first.cursor == 1 and [o.id for o in first.results] == [ids[1]]
+
+            # The cursor acknowledges: that task is forgotten, the next outcome is what comes back
+            queue.finish(TaskResults(worker_id="w1", results=[_done(ids[0])]))
+            second = await queue.wait(TaskWait(session="s", cursor=first.cursor, wait_seconds=0))
+            assert second.cursor == 2 and [o.id for o in second.results] == [ids[0]]
+            assert queue.stats()["completed"] == 1 and queue.stats()["pending"] == 1
+
+        asyncio.run(run())
+
+    def test_waiting_requests_wake_on_work(self):
+        async def run():
+            queue = TaskQueue()
+            lease = asyncio.ensure_future(queue.lease(TaskLease(worker_id="w1", capacity=4, wait_seconds=5)))
+            outcomes = asyncio.ensure_future(queue.wait(TaskWait(session="s", wait_seconds=5)))
+            await asyncio.sleep(0.01)
+            assert not lease.done() and not outcomes.done()
+
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            (task_id,) = queue.submit(TaskSubmit(session="s", payloads=["x"]))
+            assert [t.id for t in (await lease).tasks] == [task_id]
+            queue.finish(TaskResults(worker_id="w1", results=[_done(task_id)]))
+            assert [o.id for o in (await outcomes).results] == [task_id]
+            assert loop.time() - started < 0.5
+
+        asyncio.run(run())
+
+    def test_tasks_of_lost_workers_are_requeued_then_failed(self):
+        async def run():
+            clock = Clock()
+            queue = TaskQueue(lease_seconds=30, max_attempts=2, clock=clock)
+            (task_id,) = queue.submit(TaskSubmit(session="s", payloads=["x"]))
+            assert (await queue.lease(TaskLease(worker_id="w1", capacity=1, wait_seconds=0))).tasks
+
+            # w1 renews by listing the task; a response it never got is requeued at once
+            clock.now += 20
+            assert not (await queue.lease(TaskLease(worker_id="w1", capacity=1, running=[task_id], wait_seconds=0))).tasks
+            clock.now += 20
+            assert not (await queue.lease(TaskLease(worker_id="w2", capacity=1, wait_seconds=0))).tasks
+
+            clock.now += 20  # w1 silent for 40s
+            retry = await queue.lease(TaskLease(worker_id="w2", capacity=1, wait_seconds=0))
+            assert [t.id for t in retry.tasks] == [task_id]
+
+            # A late outcome from w1 is ignored; w2 loses the task too, and it fails
+            assert queue.finish(TaskResults(worker_id="w1", results=[_done(task_id)])) == 0
+            await queue.lease(TaskLease(worker_id="w2", capacity=1, running=[], wait_seconds=0))
+            (outcome,) = (await queue.wait(TaskWait(session="s", wait_seconds=0))).results
+            assert outcome.status == TaskStatus.FAILED and "Lost with 2 workers" in outcome.error
+
+        asyncio.run(run())
+
+    def test_cancel_ends_pending_tasks_and_kills_running_ones(self):
+        async def run():
+            queue = TaskQueue()
+            running, pending = queue.submit(TaskSubmit(session="s", payloads=["a", "b"]))
+            await queue.lease(TaskLease(worker_id="w1", capacity=1, wait_seconds=0))
+            assert queue.cancel(TaskCancel(session="other", ids=[running, pending])) == 0
+            assert queue.cancel(TaskCancel(session="s", ids=[running, pending])) == 2
+
+            lease = await queue.lease(TaskLease(worker_id="w1", capacity=1, running=[running], wait_seconds=0))
+            assert lease.cancel == [running] and not lease.tasks
+            assert queue.finish(TaskResults(worker_id="w1", results=[_done(running)])) == 0
+            outcomes = (await queue.wait(TaskWait(session="s", wait_seconds=0))).results
+            assert {o.id: o.status for o in outcomes} == {running: TaskStatus.CANCELLED, pending: TaskStatus.CANCELLED}
+
+        asyncio.run(run())
+
+    def test_idle_sessions_are_dropped(self):
+        async def run():
+            clock = Clock()
+            queue = TaskQueue(session_ttl_seconds=60, clock=clock)
+            running, _ = queue.submit(TaskSubmit(session="s", payloads=["a", "b"]))
+            await queue.lease(TaskLease(worker_id="w1", capacity=1, wait_seconds=0))
+            clock.now += 61
+            lease = await queue.lease(TaskLease(worker_id="w1", capacity=1, running=[running], wait_seconds=0))
+            assert lease.cancel == [running] and not lease.tasks
+            assert queue.stats()["sessions"] == 0 and queue.stats()["pending"] == 0
+
+        asyncio.run(run())
+
+
+class TestTasksAPI:
+    def test_round_trip(self):
+        with TestClient(app) as client:
+            tasks_api.init(TaskQueue())
+            submitted = client.post("/api/v1/tasks", json={"session": "s", "payloads": ["cGF5bG9hZA=="]})
+            assert submitted.status_code == 201
+            (task_id,) = submitted.json()["ids"]
+
+            lease = client.post("/api/v1/tasks/lease", json={"worker_id": "w1", "capacity": 8, "wait_seconds": 0}).json()
+            assert lease["tasks"] == [{"id": task_id, "payload": "cGF5bG9hZA=="}]
+            bad = client.post("/api/v1/tasks/results", json={"worker_id": "w1", "results": [{"id": task_id, "status": "running"}]})
+            assert bad.status_code == 422
+            reported = client.post("/api/v1/tasks/results", json={
+                "worker_id": "w1", "results": [{"id": task_id, "status": "completed", "result": "cmVzdWx0"}],
+            })
+            assert reported.json() == {"accepted": 1}
+
+            outcomes = client.post("/api/v1/tasks/wait", json={"session": "s", "wait_seconds": 0}).json()
+            assert outcomes == {"cursor": 1, "results": [
+                {"id": task_id, "status": "completed", "result": "cmVzdWx0", "error": None},
+            ]}
+            assert client.get("/api/v1/tasks/stats").json()["completed"] == 1
+
+    def test_oversized_payloads_are_rejected(self):
+        with TestClient(app) as client:
+            tasks_api.init(TaskQueue())
+            payload = "A" * (tasks_api.MAX_TASK_PAYLOAD + 4)
+            assert client.post("/api/v1/tasks", json={"session": "s", "payloads": [payload]}).status_code == 413
+
+    def test_disabled_with_several_master_processes(self, several_master_processes):
+        with TestClient(app) as client:
+            r = client.post("/api/v1/tasks/lease", json={"worker_id": "w1", "capacity": 8, "wait_seconds": 0})
+            assert r.status_code == 404 and r.json()["detail"].startswith("The task queue is disabled")
+            assert client.get("/api/v1/tasks/stats").status_code == 404
@@ -0,0 +1,174 @@
+"""Tests for job lifecycle tracing and latency percentiles.
+
+Run with: pytest master/tests/test_tracing.py -v
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+import pytest
+from fastapi.testclient import TestClient
+
+from core.protocols.models import (
+    HeartbeatRequest,
+    JobCreate,
+    JobEvent,
+    JobPhase,
+    JobSpec,
+    JobStatus,
+    JobUpdate,
+    NodeRegister,
+    ResourceInfo,
+)
+from master.app.jobs import JobManager
+from master.app.nodes import NodeManager
+from master.app.scheduler import Scheduler
+from master.app.storage import InMemoryStore
+from master.app.tracing import LifecycleTracker, phase_durations
+from master.main import app
+
+T0 = datetime(2026, 1, 1)
+
+
+def _events(*offsets):
+    """Events for consecutive phases at ``T0 + offset`` seconds."""
+    return [
+        JobEvent(phase=phase, timestamp=T0 + timedelta(seconds=s))
+        for phase, s in zip(JobPhase, offsets)
+    ]
+
+
+class TestPhaseDurations:
+    def test_all_phases(self):
+        durations = phase_durations(_events(0, 1, 3, 4, 10, 70))
+        assert durations == {
+            "queue_wait": 2,
+            "dispatch": 1,
+            "startup": 6,
+            "time_to_start": 10,
+            "run": 60,
+            "total": 70,
+        }
+
+    def test_incomplete_trace_only_reports_finished_phases(self):
+        assert phase_durations(_events(0, 1, 3)) == {"queue_wait": 2}
+
+    def test_requeue_reports_last_attempt_from_original_submit(self):
+        events = _events(0, 1, 3)
+        events += [
+            JobEvent(phase=JobPhase.QUEUED, timestamp=T0 + timedelta(seconds=20)),
+            JobEvent(phase=JobPhase.SCHEDULED, timestamp=T0 + timedelta(seconds=25)),
+            JobEvent(phase=JobPhase.DISPATCHED, timestamp=T0 + timedelta(seconds=26)),
+            JobEvent(phase=JobPhase.STARTED, timestamp=T0 + timedelta(seconds=30)),
+        ]
+        durations = phase_durations(events)
+        assert durations["queue_wait"] == 5
+        assert durations["time_to_start"] == 30
+
+
+class TestLifecycleTracker:
+    def test_percentiles_overall_and_per_label(self):
+        store = InMemoryStore()
+        tracker = LifecycleTracker(window=100)
+        for i in range(1, 101):
+            job = store.create_job(
+                JobCreate(name=f"j{i}", spec=JobSpec(image="i"), labels={"team": "a" if i <= 50 else "b"})
+            )
+            job = store.update_job(job.id, events=_events(0, 0, i))
+            tracker.record(job, JobPhase.SCHEDULED)
+
+        overall = tracker.report().phases["queue_wait"]
+        assert overall.count == 100
+        assert (overall.p50, overall.p95, overall.p99) == (50, 95, 99)
+        team_b = tracker.report(label="team=b").phases["queue_wait"]
+        assert team_b.count == 50 and team_b.p50 == 75
+        assert tracker.report(label="team=zzz").phases["queue_wait"].count == 0
+
+    def test_window_is_rolling(self):
+        store = InMemoryStore()
+        tracker = LifecycleTracker(window=10)
+        job = store.create_job(JobCreate(name="j", spec=JobSpec(image="i")))
+        for i in range(25):
+            job = store.update_job(job.id, events=_events(0, 0, i))
+            tracker.record(job, JobPhase.SCHEDULED)
+        latency = tracker.report().phases["queue_wait"]
+        assert latency.count == 10 and latency.p50 == 19
+
+
+class TestLifecycleFlow:
+    def test_submit_schedule_dispatch_start_finish(self):
+        store = InMemoryStore()
+        job_manager = JobManager(store)
+        node_manager = NodeManager(store, job_manager=job_manager)
+        scheduler = Scheduler(store, job_manager, node_manager)
+        resources = ResourceInfo(cpu_cores=8, memory_total_mb=16384)
+        node = node_manager.register(
+            NodeRegister(hostname="w", ip_address="10.0.0.1", resources=resources)
+        )
+
+        job = job_manager.create(JobCreate(name="j", spec=JobSpec(image="i")))
+        scheduler._tick()
+        assert job_manager.get(job.id).status == JobStatus.SCHEDULED
+
+        # Assignment is re-sent until the worker reports the job, but the
+        # dispatch is only recorded once
+        for _ in range(2):
+            response = node_manager.heartbeat(HeartbeatRequest(worker_id=node.id, resources=resources))
+            assert [a.job_id for a in response.assigned_jobs] == [job.id]
+            assert store.get_node(node.id).current_jobs == [job.id]
+        response = node_manager.heartbeat(
+            HeartbeatRequest(worker_id=node.id, resources=resources, active_jobs=[job.id])
+        )
+        assert response.assigned_jobs == []
+
+        job_manager.update(job.id, JobUpdate(status=JobStatus.RUNNING))
+        job_manager.update(job.id, JobUpdate(status=JobStatus.RUNNING))  # repeated report
+        job_manager.update(job.id, JobUpdate(status=JobStatus.COMPLETED))
+
+        phases = [e.phase for e in job_manager.get(job.id).events]
+        assert phases == list(JobPhase)
+        report = job_manager.tracker.report()
+        assert all(report.phases[name].count == 1 for name in report.phases)
+
+    def test_several_processes_report_from_stored_events(self):
+        store = InMemoryStore()
+        # Two API processes over one shared store
+        handling, answering = (JobManager(store, latency_from_store=True) for _ in range(2))
+        for team in ("a", "b"):
+            job = handling.create(JobCreate(name="j", labels={"team": team}, spec=JobSpec(image="i")))
+            handling.mark_scheduled(job.id, "w1")
+            handling.mark_running(job.id, "w1")
+        handling.create(JobCreate(name="queued", spec=JobSpec(image="i")))
+
+        report = answering.latency()
+        assert report.phases["queue_wait"].count == 2 and report.phases["run"].count == 0
+        assert answering.latency(label="team=b").phases["time_to_start"].count == 1
+        assert handling.tracker is None
+
+
+class TestTracingAPI:
+    @pytest.fixture(autouse=True)
+    def reset_store(self):
+        import master.app.storage as storage_mod
+        storage_mod._store = None
+
+    def test_trace_and_latency_endpoints(self):
+        with TestClient(app) as client:
+            job_id = client.post(
+                "/api/v1/jobs", json={"name": "t", "spec": {"image": "i"}, "labels": {"team": "ml"}}
+            ).json()["id"]
+            client.put(f"/api/v1/jobs/{job_id}", json={"status": "cancelled"})
+
+            trace = client.get(f"/api/v1/jobs/{job_id}/trace").json()
+            assert [e["phase"] for e in trace["events"]] == ["submitted", "queued", "finished"]
+            assert trace["durations"]["total"] >= 0
+
+            latency = client.get("/api/v1/jobs/latency", params={"label": "team=ml"}).json()
+            assert latency["label"] == "team=ml"
+            assert latency["phases"]["total"]["count"] >= 1
+            assert client.get("/api/v1/jobs/missing/trace").status_code == 404
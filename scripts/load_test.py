@@ -0,0 +1,540 @@
+"""ClusterML Load Test - simulated workers, submitters and dashboard pollers.
+
+Drives a master over real HTTP the way a production cluster would:
+
+* **Workers** register, heartbeat at jittered intervals, pick up the jobs
+  returned in heartbeat responses, report them RUNNING and then COMPLETED.
+* **Submitters** post jobs open-loop at a fixed rate. Latency is measured
+  from the intended send time, so a slow master shows up as latency rather
+  than as a silently lower request rate.
+* **Dashboard pollers** fetch cluster status, the job list and job stats.
+
+At the end it prints throughput, latency percentiles and error rates per
+operation, plus the master's own job phase latencies
+(``GET /api/v1/jobs/latency``), and checks them against the release targets.
+
+Usage:
+    # Against a fresh local master
+    python scripts/load_test.py --spawn-master --workers 5000 --submit-rate 100 --duration 120
+
+    # Against a running master, split over 4 generator processes
+    python scripts/load_test.py --master-url http://master:8080 --processes 4 --json report.json
+
+One generator process sustains roughly 1-2k requests/s; use ``--processes``
+so the generator is not the bottleneck (5000 workers at a 5s heartbeat are
+already 1000 heartbeats/s).
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Set
+
+import httpx
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+@dataclass
+class LoadConfig:
+    master_url: str = "http://localhost:8080"
+    workers: int = 5000
+    submit_rate: float = 100.0
+    pollers: int = 20
+    duration: float = 60.0
+    heartbeat_interval: float = 5.0
+    poll_interval: float = 2.0
+    job_runtime: float = 2.0
+    jitter: float = 0.2
+    connections: int = 256
+    max_in_flight: int = 2000
+    worker_offset: int = 0
+    seed: Optional[int] = None
+
+
+# ─── Statistics ─────────────────────────────────────────────────────────────
+
+
+@dataclass
+class Stats:
+    """Raw observations of one generator process (mergeable across processes)."""
+    latencies: Dict[str, List[float]] = field(default_factory=dict)
+    errors: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    counters: Dict[str, int] = field(default_factory=dict)
+
+    def observe(self, op: str, seconds: float, error: Optional[str] = None) -> None:
+        self.latencies.setdefault(op, []).append(seconds)
+        if error is not None:
+            errors = self.errors.setdefault(op, {})
+            errors[error] = errors.get(error, 0) + 1
+
+    def count(self, name: str, amount: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def merge(self, other: "Stats") -> None:
+        for op, values in other.latencies.items():
+            self.latencies.setdefault(op, []).extend(values)
+        for op, errors in other.errors.items():
+            mine = self.errors.setdefault(op, {})
+            for kind, n in errors.items():
+                mine[kind] = mine.get(kind, 0) + n
+        for name, n in other.counters.items():
+            self.count(name, n)
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(q * len(sorted_values))
+    return sorted_values[min(len(sorted_values), max(rank, 1)) - 1]
+
+
+def summarize(stats: Stats, elapsed: float) -> Dict[str, Dict]:
+    """Per-operation throughput, latency percentiles (ms) and error rate."""
+    summary: Dict[str, Dict] = {}
+    for op in sorted(stats.latencies):
+        values = sorted(stats.latencies[op])
+        errors = stats.errors.get(op, {})
+        n_errors = sum(errors.values())
+        summary[op] = {
+            "requests": len(values),
+            "rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+            "error_rate": round(n_errors / len(values), 4) if values else 0.0,
+            "errors": dict(Counter(errors).most_common(5)),
+            "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(values, 0.99) * 1000, 2),
+            "max_ms": round(values[-1] * 1000, 2) if values else 0.0,
+        }
+    return summary
+
+
+async def _call(
+    client: httpx.AsyncClient,
+    stats: Stats,
+    op: str,
+    method: str,
+    url: str,
+    started: Optional[float] = None,
+    **kwargs,
+) -> Optional[httpx.Response]:
+    """Issue one request and record its latency and outcome."""
+    start = started if started is not None else time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+    except httpx.HTTPError as e:
+        stats.observe(op, time.perf_counter() - start, type(e).__name__)
+        return None
+    error = f"HTTP {response.status_code}" if response.status_code >= 400 else None
+    stats.observe(op, time.perf_counter() - start, error)
+    return response if error is None else None
+
+
+def _jittered(base: float, jitter: float) -> float:
+    return base * random.uniform(1.0 - jitter, 1.0 + jitter)
+
+
+# ─── Simulated Actors ───────────────────────────────────────────────────────
+
+
+class SimulatedWorker:
+    """A worker agent reduced to its protocol: register, heartbeat, run assignments."""
+
+    def __init__(self, index: int, cfg: LoadConfig, client: httpx.AsyncClient, stats: Stats):
+        self.index = index
+        self.cfg = cfg
+        self.client = client
+        self.stats = stats
+        self.worker_id: Optional[str] = None
+        self.active: Set[str] = set()
+        self.resources = {"cpu_cores": 8, "memory_total_mb": 32768, "gpu_count": 0}
+
+    async def register(self) -> bool:
+        response = await _call(
+            self.client,
+            self.stats,
+            "register",
+            "POST",
+            "/api/v1/nodes",
+            json={
+                "hostname": f"load-worker-{self.index}",
+                "ip_address": f"10.{(self.index >> 16) & 255}.{(self.index >> 8) & 255}.{self.index & 255}",
+                "resources": self.resources,
+                "labels": {"loadtest": "true"},
+            },
+        )
+        if response is None:
+            return False
+        self.worker_id = response.json()["id"]
+        return True
+
+    async def run(self, stop_at: float) -> None:
+        # Spread registrations and heartbeats like a fleet that came up over time
+        await asyncio.sleep(random.uniform(0, self.cfg.heartbeat_interval))
+        while time.monotonic() < stop_at and not await self.register():
+            await asyncio.sleep(_jittered(1.0, self.cfg.jitter))
+        while time.monotonic() < stop_at:
+            await self.heartbeat(stop_at)
+            await asyncio.sleep(_jittered(self.cfg.heartbeat_interval, self.cfg.jitter))
+
+    async def heartbeat(self, stop_at: float) -> None:
+        response = await _call(
+            self.client,
+            self.stats,
+            "heartbeat",
+            "POST",
+            "/api/v1/nodes/heartbeat",
+            json={
+                "worker_id": self.worker_id,
+                "resources": self.resources,
+                "active_jobs": sorted(self.active),
+            },
+        )
+        if response is None:
+            return
+        body = response.json()
+        if not body.get("acknowledged", True):
+            self.stats.count("reregistrations")
+            await self.register()
+            return
+        for assignment in body.get("assigned_jobs", []):
+            job_id = assignment["job_id"]
+            if job_id not in self.active:
+                self.active.add(job_id)
+                asyncio.create_task(self.run_job(job_id, stop_at))
+
+    async def run_job(self, job_id: str, stop_at: float) -> None:
+        self.stats.count("jobs_started")
+        await _call(self.client, self.stats, "report_running", "PUT", f"/api/v1/jobs/{job_id}", json={"status": "running"})
+        await asyncio.sleep(min(_jittered(self.cfg.job_runtime, self.cfg.jitter), max(0.0, stop_at - time.monotonic())))
+        response = await _call(
+            self.client,
+            self.stats,
+            "report_completed",
+            "PUT",
+            f"/api/v1/jobs/{job_id}",
+            json={"status": "completed", "result": {"worker": self.index}},
+        )
+        if response is not None:
+            self.stats.count("jobs_completed")
+        self.active.discard(job_id)
+
+
+async def submitter(cfg: LoadConfig, client: httpx.AsyncClient, stats: Stats, stop_at: float) -> None:
+    """Submit jobs open-loop at ``cfg.submit_rate`` per second."""
+    if cfg.submit_rate <= 0:
+        return
+    period = 1.0 / cfg.submit_rate
+    in_flight: Set[asyncio.Task] = set()
+    next_send = time.monotonic()
+    n = 0
+    while next_send < stop_at:
+        delay = next_send - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        # Latency counts from the intended send time
+        intended = time.perf_counter() + min(0.0, delay)
+        if len(in_flight) >= cfg.max_in_flight:
+            stats.observe("submit", 0.0, "client_backlog")
+        else:
+            task = asyncio.create_task(
+                _call(
+                    client,
+                    stats,
+                    "submit",
+                    "POST",
+                    "/api/v1/jobs",
+                    started=intended,
+                    json={
+                        "name": f"load-{cfg.worker_offset}-{n}",
+                        "spec": {"image": "python:3.11", "command": ["true"], "resources": {"cpu": "1", "memory": "1Gi"}},
+                        "labels": {"loadtest": "true"},
+                    },
+                )
+            )
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        n += 1
+        next_send += period
+    if in_flight:
+        await asyncio.wait(in_flight, timeout=30)
+
+
+async def dashboard_poller(cfg: LoadConfig, client: httpx.AsyncClient, stats: Stats, stop_at: float) -> None:
+    """Poll the endpoints the dashboard refreshes."""
+    await asyncio.sleep(random.uniform(0, cfg.poll_interval))
+    while time.monotonic() < stop_at:
+        await _call(client, stats, "dashboard_status", "GET", "/api/v1/nodes/status")
+        await _call(client, stats, "dashboard_jobs", "GET", "/api/v1/jobs", params={"limit": 50})
+        await _call(client, stats, "dashboard_stats", "GET", "/api/v1/jobs/stats")
+        await asyncio.sleep(_jittered(cfg.poll_interval, cfg.jitter))
+
+
+async def run_load(cfg: LoadConfig) -> Stats:
+    """Run one generator process's share of the load for ``cfg.duration`` seconds."""
+    if cfg.seed is not None:
+        random.seed(cfg.seed)
+    stats = Stats()
+    limits = httpx.Limits(max_connections=cfg.connections, max_keepalive_connections=cfg.connections)
+    timeout = httpx.Timeout(30.0, pool=30.0)
+    async with httpx.AsyncClient(base_url=cfg.master_url, limits=limits, timeout=timeout) as client:
+        stop_at = time.monotonic() + cfg.duration
+        workers = [SimulatedWorker(cfg.worker_offset + i, cfg, client, stats) for i in range(cfg.workers)]
+        tasks = [asyncio.create_task(w.run(stop_at)) for w in workers]
+        tasks.append(asyncio.create_task(submitter(cfg, client, stats, stop_at)))
+        tasks += [asyncio.create_task(dashboard_poller(cfg, client, stats, stop_at)) for _ in range(cfg.pollers)]
+        # Requests to an overloaded master can outlive the run; give them a
+        # grace period, then abandon them so the report still comes out
+        _, stuck = await asyncio.wait(tasks, timeout=cfg.duration + 30.0)
+        for task in stuck:
+            task.cancel()
+        if stuck:
+            stats.count("abandoned_actors", len(stuck))
+        stats.count("workers_registered", sum(1 for w in workers if w.worker_id))
+        # Let in-flight job reports drain
+        deadline = time.monotonic() + cfg.job_runtime * 2 + 5
+        while any(w.active for w in workers) and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+    return stats
+
+
+def _run_process(cfg: LoadConfig) -> Stats:
+    return asyncio.run(run_load(cfg))
+
+
+def _split(cfg: LoadConfig, processes: int) -> List[LoadConfig]:
+    """Divide workers, pollers and submission rate across generator processes."""
+    shares = []
+    offset = 0
+    for i in range(processes):
+        workers = cfg.workers // processes + (1 if i < cfg.workers % processes else 0)
+        pollers = cfg.pollers // processes + (1 if i < cfg.pollers % processes else 0)
+        share = LoadConfig(**{**asdict(cfg), "workers": workers, "pollers": pollers})
+        share.submit_rate = cfg.submit_rate / processes
+        share.connections = max(8, cfg.connections // processes)
+        share.worker_offset = offset
+        share.seed = None if cfg.seed is None else cfg.seed + i
+        offset += workers
+        shares.append(share)
+    return shares
+
+
+# ─── Report ─────────────────────────────────────────────────────────────────
+
+
+@dataclass
+class Targets:
+    nodes: int = 5000
+    submit_rate: float = 100.0
+    max_error_rate: float = 0.01
+    max_submit_p99_ms: float = 1000.0
+    max_heartbeat_p99_ms: float = 1000.0
+
+
+def check_targets(report: Dict, targets: Targets) -> List[str]:
+    """Return the list of failed target checks (empty means pass)."""
+    ops = report["operations"]
+    failures = []
+    if report["workers_registered"] < targets.nodes:
+        failures.append(f"registered {report['workers_registered']} workers < {targets.nodes}")
+    submit = ops.get("submit", {})
+    achieved = (submit.get("requests", 0) * (1 - submit.get("error_rate", 0))) / report["duration_seconds"]
+    if achieved < 0.95 * targets.submit_rate:
+        failures.append(f"accepted {achieved:.1f} submissions/s < {targets.submit_rate}")
+    if report["error_rate"] > targets.max_error_rate:
+        failures.append(f"error rate {report['error_rate']:.2%} > {targets.max_error_rate:.2%}")
+    if submit.get("p99_ms", 0) > targets.max_submit_p99_ms:
+        failures.append(f"submit p99 {submit['p99_ms']}ms > {targets.max_submit_p99_ms}ms")
+    heartbeat = ops.get("heartbeat", {})
+    if heartbeat.get("p99_ms", 0) > targets.max_heartbeat_p99_ms:
+        failures.append(f"heartbeat p99 {heartbeat['p99_ms']}ms > {targets.max_heartbeat_p99_ms}ms")
+    return failures
+
+
+def build_report(cfg: LoadConfig, stats: Stats, elapsed: float, master_latency: Optional[Dict]) -> Dict:
+    operations = summarize(stats, cfg.duration)
+    total = sum(op["requests"] for op in operations.values())
+    errors = sum(op["requests"] * op["error_rate"] for op in operations.values())
+    return {
+        "config": asdict(cfg),
+        "duration_seconds": cfg.duration,
+        "wall_seconds": round(elapsed, 2),
+        "workers_registered": stats.counters.get("workers_registered", 0),
+        "jobs_started": stats.counters.get("jobs_started", 0),
+        "jobs_completed": stats.counters.get("jobs_completed", 0),
+        "reregistrations": stats.counters.get("reregistrations", 0),
+        "abandoned_actors": stats.counters.get("abandoned_actors", 0),
+        "total_requests": total,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "operations": operations,
+        "master_job_latency": master_latency,
+    }
+
+
+def print_report(report: Dict, failures: List[str]) -> None:
+    print(f"\nLoad test: {report['config']['workers']} workers, "
+          f"{report['config']['submit_rate']} submissions/s, {report['config']['pollers']} pollers, "
+          f"{report['duration_seconds']}s")
+    print(f"Workers registered: {report['workers_registered']}  "
+          f"jobs started: {report['jobs_started']}  completed: {report['jobs_completed']}  "
+          f"requests: {report['total_requests']}  error rate: {report['error_rate']:.2%}\n")
+    header = f"{'operation':<20}{'requests':>10}{'rps':>10}{'err%':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for op, s in report["operations"].items():
+        print(f"{op:<20}{s['requests']:>10}{s['rps']:>10}{s['error_rate'] * 100:>8.2f}"
+              f"{s['p50_ms']:>10}{s['p95_ms']:>10}{s['p99_ms']:>10}{s['max_ms']:>10}")
+        if s["errors"]:
+            print(f"{'':<20}errors: {s['errors']}")
+    latency = report.get("master_job_latency")
+    if latency:
+        print("\nMaster job phase latency (s):")
+        for phase, p in latency["phases"].items():
+            if p["count"]:
+                print(f"  {phase:<15} n={p['count']:<6} p50={p['p50']:.3f} p95={p['p95']:.3f} p99={p['p99']:.3f}")
+    print("\nTargets: " + ("PASS" if not failures else "FAIL"))
+    for failure in failures:
+        print(f"  - {failure}")
+
+
+# ─── Local Master ───────────────────────────────────────────────────────────
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def spawn_master(cfg: LoadConfig, scheduler_interval: float) -> subprocess.Popen:
+    """Start a master on a free local port and point ``cfg`` at it."""
+    port = _free_port()
+    cfg.master_url = f"http://127.0.0.1:{port}"
+    env = dict(
+        os.environ,
+        LOG_LEVEL="WARNING",
+        SCHEDULER_INTERVAL=str(scheduler_interval),
+        NODE_TIMEOUT=str(max(90.0, cfg.heartbeat_interval * 6)),
+        MAX_CONCURRENT_JOBS="4",
+    )
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "master.main:app", "--port", str(port),
+         "--log-level", "warning", "--backlog", "4096"],
+        cwd=PROJECT_ROOT,
+        env=env,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{cfg.master_url}/health", timeout=1.0).status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            pass
+        if proc.poll() is not None:
+            break
+        time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError("Local master did not become healthy")
+
+
+def run(cfg: LoadConfig, processes: int = 1) -> Dict:
+    """Run the load test (optionally across processes) and return the report."""
+    start = time.monotonic()
+    if processes <= 1:
+        stats = _run_process(cfg)
+    else:
+        stats = Stats()
+        with multiprocessing.get_context("spawn").Pool(processes) as pool:
+            for part in pool.map(_run_process, _split(cfg, processes)):
+                stats.merge(part)
+    elapsed = time.monotonic() - start
+
+    master_latency = None
+    try:
+        r = httpx.get(f"{cfg.master_url}/api/v1/jobs/latency", params={"label": "loadtest=true"}, timeout=10)
+        if r.status_code == 200:
+            master_latency = r.json()
+    except httpx.HTTPError:
+        pass
+    return build_report(cfg, stats, elapsed, master_latency)
+
+
+def parse_args():
+    """Parse command line arguments."""
+    p = argparse.ArgumentParser(description="ClusterML master load test")
+    p.add_argument("--master-url", default=os.getenv("MASTER_URL", "http://localhost:8080"))
+    p.add_argument("--spawn-master", action="store_true", help="Start a fresh local master for the run")
+    p.add_argument("--scheduler-interval", type=float, default=1.0, help="SCHEDULER_INTERVAL of a spawned master")
+    p.add_argument("--workers", type=int, default=5000)
+    p.add_argument("--submit-rate", type=float, default=100.0, help="Job submissions per second")
+    p.add_argument("--pollers", type=int, default=20, help="Concurrent dashboard clients")
+    p.add_argument("--duration", type=float, default=60.0, help="Seconds of load")
+    p.add_argument("--heartbeat-interval", type=float, default=5.0)
+    p.add_argument("--poll-interval", type=float, default=2.0)
+    p.add_argument("--job-runtime", type=float, default=2.0, help="Simulated job run time in seconds")
+    p.add_argument("--jitter", type=float, default=0.2, help="Relative jitter of all intervals")
+    p.add_argument("--connections", type=int, default=256, help="HTTP connection pool size (split across processes)")
+    p.add_argument("--processes", type=int, default=1, help="Generator processes")
+    p.add_argument("--seed", type=int, default=None)
+    p.add_argument("--json", dest="json_path", help="Write the report as JSON to this path")
+    p.add_argument("--target-nodes", type=int, default=None, help="Default: --workers")
+    p.add_argument("--target-submit-rate", type=float, default=None, help="Default: --submit-rate")
+    p.add_argument("--max-error-rate", type=float, default=0.01)
+    p.add_argument("--max-p99-ms", type=float, default=1000.0, help="p99 bound for submit and heartbeat")
+    p.add_argument("--check", action="store_true", help="Exit non-zero if a target is missed")
+    return p.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    cfg = LoadConfig(
+        master_url=args.master_url,
+        workers=args.workers,
+        submit_rate=args.submit_rate,
+        pollers=args.pollers,
+        duration=args.duration,
+        heartbeat_interval=args.heartbeat_interval,
+        poll_interval=args.poll_interval,
+        job_runtime=args.job_runtime,
+        jitter=args.jitter,
+        connections=args.connections,
+        seed=args.seed,
+    )
+    targets = Targets(
+        nodes=args.target_nodes if args.target_nodes is not None else args.workers,
+        submit_rate=args.target_submit_rate if args.target_submit_rate is not None else args.submit_rate,
+        max_error_rate=args.max_error_rate,
+        max_submit_p99_ms=args.max_p99_ms,
+        max_heartbeat_p99_ms=args.max_p99_ms,
+    )
+
+    master = spawn_master(cfg, args.scheduler_interval) if args.spawn_master else None
+    try:
+        report = run(cfg, processes=args.processes)
+    finally:
+        if master is not None:
+            master.terminate()
+            master.wait(timeout=15)
+
+    failures = check_targets(report, targets)
+    report["targets"] = {**asdict(targets), "failures": failures}
+    print_report(report, failures)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if failures and args.check else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
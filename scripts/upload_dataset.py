@@ -0,0 +1,85 @@
+"""Upload a dataset to the ClusterML master.
+
+Every file given (or found under a given directory) becomes one shard,
+named by its path relative to that directory. Files are hashed in
+fixed-size chunks and only the chunks the master does not already have are
+sent, so re-running an interrupted upload resumes it.
+
+Usage:
+    python scripts/upload_dataset.py --name mnist data/mnist/
+    python scripts/upload_dataset.py --master-url http://master:8080 --name imagenet@v2 shards/*.tar
+
+Workers then read shards with the Range-capable
+``GET /api/v1/datasets/{name}/shards/{shard}``, or ask
+``GET /api/v1/datasets/{name}/manifest?shard_index=R&num_shards=N`` for
+the shards of reader R out of N.
+"""
+
+import argparse
+import os
+import sys
+from typing import List, Tuple
+
+import httpx
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from core.protocols.models import ArtifactManifest, DatasetCreate, DatasetUpload
+from worker.app.artifacts import DEFAULT_CHUNK_SIZE, hash_chunks, read_chunk
+
+
+def collect_files(paths: List[str]) -> List[Tuple[str, str]]:
+    """``(shard name, path)`` of every file: directories are walked, names are relative to them."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for dirpath, _, filenames in os.walk(path):
+                for filename in filenames:
+                    full = os.path.join(dirpath, filename)
+                    files.append((os.path.relpath(full, path), full))
+        else:
+            files.append((os.path.basename(path), path))
+    return sorted(files)
+
+
+def upload(client: httpx.Client, name: str, paths: List[str], chunk_size: int, description: str = None) -> dict:
+    files = collect_files(paths)
+    shards = []
+    locations = {}
+    for shard_name, path in files:
+        size, digests = hash_chunks(path, chunk_size)
+        shards.append(ArtifactManifest(name=shard_name, size=size, chunk_size=chunk_size, chunks=digests))
+        for index, digest in enumerate(digests):
+            locations.setdefault(digest, (path, index))
+    create = DatasetCreate(name=name, description=description, shards=shards)
+    response = client.post("/api/v1/datasets", content=create.model_dump_json(), headers={"Content-Type": "application/json"})
+    response.raise_for_status()
+    missing = DatasetUpload.model_validate_json(response.content).missing
+    print(f"{name}: {len(shards)} shards, {sum(s.size for s in shards)} bytes, {len(missing)}/{len(locations)} chunks to send")
+    for i, digest in enumerate(missing, 1):
+        path, index = locations[digest]
+        client.put(f"/api/v1/datasets/chunks/{digest}", content=read_chunk(path, index, chunk_size)).raise_for_status()
+        print(f"  sent chunk {i}/{len(missing)}", end="\r", flush=True)
+    response = client.post(f"/api/v1/datasets/{name}/complete")
+    response.raise_for_status()
+    return response.json()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Upload a dataset to the ClusterML master")
+    parser.add_argument("paths", nargs="+", help="Files or directories; each file becomes a shard")
+    parser.add_argument("--name", required=True, help="Dataset name, e.g. mnist or imagenet@v2")
+    parser.add_argument("--master-url", default=os.getenv("MASTER_URL", "http://localhost:8080"))
+    parser.add_argument("--description", default=None)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Bytes per chunk")
+    args = parser.parse_args()
+
+    with httpx.Client(base_url=args.master_url, timeout=60.0) as client:
+        dataset = upload(client, args.name, args.paths, args.chunk_size, args.description)
+    print(f"\n{dataset['name']} is complete")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+"""ClusterML Python SDK.
+
+Modules:
+    blobs           - content-addressed uploads of the files a job reads
+    errors          - exceptions raised for work that ran on the cluster
+    joblib_backend  - the ``clusterml`` joblib backend (importing it registers it)
+    runner          - the script that runs a joblib batch on a worker
+    tasks           - Python function calls run by warm worker processes, as futures
+"""
+
+__version__ = "0.1.0"
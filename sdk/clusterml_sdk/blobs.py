@@ -0,0 +1,85 @@
+"""Blobs - content-addressed uploads of the files a job reads.
+
+A blob is any byte string a job needs as an input volume (a pickled task,
+an array). It is named by its SHA-256 and uploaded at most once per
+process, and the master keeps one copy however often it is sent, so a
+blob shared by many jobs crosses the network once from the client.
+
+* Blobs up to ``CHUNK_SIZE`` are one chunk of the artifact store. Jobs
+  read them from the pinned URL ``.../artifacts/chunks/<sha>#sha256=<sha>``,
+  which a worker that has cached it resolves without any request.
+* Larger blobs become the dataset ``blob-<sha>`` with one shard, ``data``,
+  uploaded chunk by chunk (only the chunks the master is missing). Workers
+  fetch it as ``dataset://blob-<sha>/data``, through the swarm, so the
+  nodes of a cluster mostly copy it from each other.
+
+Both kinds of source are cached by content on the workers, and the
+scheduler prefers nodes that hold a job's inputs already.
+"""
+
+import hashlib
+import logging
+import threading
+from typing import Dict
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 8 * 1024 * 1024
+
+
+def digest(data) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class BlobStore:
+    """Uploads blobs to the master and remembers the ones already there."""
+
+    def __init__(self, http: httpx.Client):
+        self.http = http
+        self.uploaded_bytes = 0
+        self._sources: Dict[str, str] = {}  # sha256 -> volume source
+        self._lock = threading.Lock()
+
+    def put(self, data) -> str:
+        """Upload ``data`` unless it was before; returns the volume source jobs read it from."""
+        sha = digest(data)
+        with self._lock:
+            source = self._sources.get(sha)
+            if source is None:
+                source = self._upload_chunk(sha, data) if len(data) <= CHUNK_SIZE else self._upload_dataset(sha, data)
+                self._sources[sha] = source
+        return source
+
+    def _upload_chunk(self, sha: str, data) -> str:
+        response = self.http.put(
+            f"/api/v1/artifacts/chunks/{sha}", content=bytes(data),
+            headers={"Content-Type": "application/octet-stream"},
+        )
+        response.raise_for_status()
+        if response.json()["stored"]:
+            self.uploaded_bytes += len(data)
+        return f"{str(self.http.base_url).rstrip('/')}/api/v1/artifacts/chunks/{sha}#sha256={sha}"
+
+    def _upload_dataset(self, sha: str, data) -> str:
+        view = memoryview(data).cast("B")
+        order, chunks = [], {}
+        for start in range(0, len(view), CHUNK_SIZE):
+            chunk = view[start:start + CHUNK_SIZE]
+            order.append(digest(chunk))
+            chunks.setdefault(order[-1], chunk)
+        name = f"blob-{sha}"
+        shard = {"name": "data", "size": len(view), "chunk_size": CHUNK_SIZE, "chunks": order}
+        response = self.http.post("/api/v1/datasets", json={"name": name, "shards": [shard]})
+        response.raise_for_status()
+        for missing in response.json()["missing"]:
+            put = self.http.put(
+                f"/api/v1/datasets/chunks/{missing}", content=bytes(chunks[missing]),
+                headers={"Content-Type": "application/octet-stream"},
+            )
+            put.raise_for_status()
+            self.uploaded_bytes += len(chunks[missing])
+        self.http.post(f"/api/v1/datasets/{name}/complete").raise_for_status()
+        logger.debug(f"Blob {sha} stored as dataset {name} ({len(view)} bytes)")
+        return f"dataset://{name}/data"
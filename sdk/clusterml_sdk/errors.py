@@ -0,0 +1,25 @@
+"""Errors raised in the caller for work that ran on the cluster."""
+
+
+class ClusterMLError(RuntimeError):
+    """Work that ended on the cluster without a result."""
+
+
+class RemoteTraceback(Exception):
+    """The worker's traceback of a task's exception, attached as its ``__cause__``."""
+
+    def __init__(self, tb: str):
+        super().__init__(tb)
+        self.tb = tb
+
+    def __str__(self) -> str:
+        return self.tb
+
+
+def unpickled_outcome(outcome):
+    """The value of an ``("ok", value)`` outcome, or the exception of an ``("error", exception, traceback)`` one."""
+    if outcome[0] == "ok":
+        return outcome[1]
+    _, error, tb = outcome
+    error.__cause__ = RemoteTraceback(tb)
+    return error
@@ -0,0 +1,320 @@
+"""joblib backend that runs batches of tasks as ClusterML jobs.
+
+Importing this module registers the backend as ``clusterml``::
+
+    import clusterml_sdk.joblib_backend  # noqa: F401
+    from joblib import parallel_backend
+
+    with parallel_backend("clusterml", master_url="http://master:8080"):
+        GridSearchCV(model, grid, cv=5, n_jobs=-1).fit(X, y)
+
+Code that parallelizes through joblib (``cross_val_score``, ``GridSearchCV``,
+``Parallel`` itself) then runs on the cluster unchanged:
+
+* Every batch joblib dispatches becomes one job, started on a worker as
+  ``python runner.py`` (see ``clusterml_sdk.runner``), with the batch as
+  its ``task.pkl`` input and its outcome collected as the ``result.pkl``
+  output artifact.
+* Batches are pickled with cloudpickle, except numpy arrays of at least
+  ``array_threshold`` bytes: those are referenced by their SHA-256 and
+  uploaded once as ``.npy`` blobs (see ``clusterml_sdk.blobs``), however
+  many batches use them. Workers cache them by content and memory-map
+  them read-only, and the scheduler prefers nodes that hold them already.
+* ``n_jobs=-1`` is every job slot of the online nodes; a positive
+  ``n_jobs`` is the number of batches in flight.
+* A batch costs a job's scheduling and start (about a second), so batches
+  are sized automatically to take a few seconds each.
+* Results stream back: a poller thread lists the call's jobs every
+  ``poll_interval`` seconds and completes each batch as soon as its job
+  ends, so joblib dispatches the next one at once and
+  ``return_as="generator"`` yields as results arrive.
+* An exception raised by a task is raised in the caller, with the worker's
+  traceback as its cause. A job that ends without a result (killed, out of
+  memory, a module missing on the worker) raises ``ClusterMLError``. Either
+  way joblib aborts the call, which cancels the jobs still outstanding.
+* Nested joblib calls inside a batch run sequentially; the job's BLAS and
+  OpenMP thread pools are sized to its ``cpu`` by the worker.
+
+Workers need the batch's dependencies (joblib, numpy, sklearn, ...)
+installed for the ``python`` the jobs run with. Functions defined in
+``__main__`` or inside other functions are pickled by value; anything else
+is imported by name on the worker.
+"""
+
+import io
+import logging
+import os
+import pickle
+import sys
+import threading
+import uuid
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import cloudpickle
+import httpx
+from joblib import register_parallel_backend
+from joblib._parallel_backends import (
+    AutoBatchingMixin,
+    ParallelBackendBase,
+    SequentialBackend,
+)
+
+from clusterml_sdk.blobs import BlobStore, digest
+from clusterml_sdk.errors import ClusterMLError, RemoteTraceback, unpickled_outcome  # noqa: F401
+
+logger = logging.getLogger(__name__)
+
+_RUNNER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "runner.py")
+_TERMINAL = ("completed", "failed", "cancelled")
+_PAGE = 1000  # most jobs the master lists per request
+
+
+class _BatchPickler(cloudpickle.CloudPickler):
+    """Pickles a batch, leaving large arrays out as ``("ndarray", sha256)``."""
+
+    def __init__(self, file, backend: "ClusterMLBackend"):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        numpy = sys.modules.get("numpy")
+        self._types = (numpy.ndarray, numpy.memmap) if numpy is not None else ()
+        self._backend = backend
+        self.arrays: Set[str] = set()
+
+    def persistent_id(self, obj):
+        if type(obj) not in self._types:
+            return None
+        sha = self._backend._array_digest(obj)
+        if sha is None:
+            return None
+        self.arrays.add(sha)
+        return ("ndarray", sha)
+
+
+class ClusterMLBackend(AutoBatchingMixin, ParallelBackendBase):
+    """Runs joblib batches as jobs on a ClusterML cluster.
+
+    Args:
+        master_url: The master, by default ``CLUSTERML_MASTER_URL`` or ``http://localhost:8080``.
+        api_key: Sent as ``X-API-Key``, by default ``CLUSTERML_API_KEY``.
+        image: ``JobSpec.image`` of the batch jobs.
+        python: Interpreter the jobs run ``runner.py`` with.
+        cpu: CPU cores requested per batch, e.g. ``"4"`` for estimators that use threads.
+        memory: Memory requested per batch.
+        env: Extra environment variables of the jobs, e.g. ``{"CLUSTERML_TEMPLATE": "sklearn"}``.
+        labels: Extra labels of the jobs.
+        array_threshold: Bytes from which numpy arrays are uploaded once and referenced by hash.
+        poll_interval: Seconds between checks for finished batches.
+    """
+
+    MIN_IDEAL_BATCH_DURATION = 2.0
+    MAX_IDEAL_BATCH_DURATION = 30.0
+    default_n_jobs = -1
+    supports_retrieve_callback = True
+
+    def __init__(
+        self,
+        master_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        image: str = "python:3.11-slim",
+        python: str = "python",
+        cpu: str = "1",
+        memory: str = "1Gi",
+        env: Optional[Dict[str, str]] = None,
+        labels: Optional[Dict[str, str]] = None,
+        array_threshold: int = 1 << 20,
+        poll_interval: float = 0.5,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        master_url = master_url or os.getenv("CLUSTERML_MASTER_URL", "http://localhost:8080")
+        api_key = api_key or os.getenv("CLUSTERML_API_KEY")
+        self.http = httpx.Client(
+            base_url=master_url.rstrip("/"),
+            headers={"X-API-Key": api_key} if api_key else {},
+            timeout=httpx.Timeout(30.0, read=300.0),
+        )
+        self.blobs = BlobStore(self.http)
+        self.image = image
+        self.python = python
+        self.cpu = cpu
+        self.memory = memory
+        self.env = dict(env or {})
+        self.labels = dict(labels or {})
+        self.array_threshold = array_threshold
+        self.poll_interval = poll_interval
+        self.parallel = None
+        self._call_id = uuid.uuid4().hex[:12]
+        self._batches = 0
+        self._arrays: Dict[int, Tuple[Any, str]] = {}  # id(array) -> (array, sha256), for one call
+        self._array_sources: Dict[str, str] = {}  # sha256 -> volume source
+        self._pending: Dict[str, Tuple[str, Future]] = {}  # job id -> (call id, future)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._poller: Optional[threading.Thread] = None
+
+    # ─── joblib backend API ────────────────────────────────────────────────
+
+    def effective_n_jobs(self, n_jobs: int) -> int:
+        if n_jobs == 0:
+            raise ValueError("n_jobs == 0 in Parallel has no meaning")
+        if n_jobs > 0:
+            return n_jobs
+        return max(1, self.slots() + 1 + n_jobs)
+
+    def configure(self, n_jobs: int = 1, parallel=None, **backend_args) -> int:
+        self.parallel = parallel
+        self._call_id = uuid.uuid4().hex[:12]
+        self._batches = 0
+        return self.effective_n_jobs(n_jobs)
+
+    def submit(self, func, callback=None) -> Future:
+        future: Future = Future()
+        if callback is not None:
+            future.add_done_callback(callback)
+        job_id = self._launch(func)
+        with self._lock:
+            self._pending[job_id] = (self._call_id, future)
+            if self._poller is None or not self._poller.is_alive():
+                self._stop = threading.Event()
+                self._poller = threading.Thread(target=self._poll, args=(self._stop,), name="clusterml-joblib", daemon=True)
+                self._poller.start()
+        return future
+
+    def retrieve_result_callback(self, out: Future) -> List[Any]:
+        return out.result()
+
+    def get_nested_backend(self):
+        return SequentialBackend(nesting_level=(self.nesting_level or 0) + 1), None
+
+    def stop_call(self) -> None:
+        self._arrays.clear()
+
+    def abort_everything(self, ensure_ready: bool = True) -> None:
+        """Cancel the jobs of every batch joblib still waits for."""
+        with self._lock:
+            job_ids = list(self._pending)
+            self._pending.clear()
+        for job_id in job_ids:
+            try:
+                self.http.delete(f"/api/v1/jobs/{job_id}")
+            except httpx.HTTPError as e:
+                logger.warning(f"Cancelling batch job {job_id} failed: {e!r}")
+        if job_ids:
+            logger.info(f"Cancelled {len(job_ids)} outstanding batch jobs")
+
+    def terminate(self) -> None:
+        self.abort_everything()
+        self._stop.set()
+        if self._poller is not None and self._poller is not threading.current_thread():
+            self._poller.join()
+        self._poller = None
+        self.reset_batch_stats()
+
+    # ─── Cluster ───────────────────────────────────────────────────────────
+
+    def slots(self) -> int:
+        """Job slots of the nodes that take jobs."""
+        response = self.http.get("/api/v1/nodes")
+        response.raise_for_status()
+        return sum(node["max_concurrent_jobs"] for node in response.json() if node["status"] in ("online", "busy"))
+
+    def _array_digest(self, array) -> Optional[str]:
+        """SHA-256 of a large array's ``.npy`` blob, uploading it the first time; None for small arrays."""
+        if array.nbytes < self.array_threshold or array.dtype.hasobject:
+            return None
+        known = self._arrays.get(id(array))
+        if known is not None and known[0] is array:
+            return known[1]
+        buffer = io.BytesIO()
+        sys.modules["numpy"].save(buffer, array, allow_pickle=False)
+        data = buffer.getbuffer()
+        sha = digest(data)
+        self._array_sources[sha] = self.blobs.put(data)
+        self._arrays[id(array)] = (array, sha)
+        return sha
+
+    def _launch(self, batch) -> str:
+        """Submit a batch as a job; returns its id."""
+        buffer = io.BytesIO()
+        pickler = _BatchPickler(buffer, self)
+        pickler.dump(batch)
+        with open(_RUNNER, "rb") as f:
+            runner = self.blobs.put(f.read())
+        volumes = [
+            {"name": "runner", "mountPath": "runner.py", "source": runner},
+            {"name": "task", "mountPath": "task.pkl", "source": self.blobs.put(buffer.getbuffer())},
+        ]
+        volumes += [
+            {"name": f"array-{sha[:12]}", "mountPath": f"arrays/{sha}.npy", "source": self._array_sources[sha]}
+            for sha in sorted(pickler.arrays)
+        ]
+        self._batches += 1
+        response = self.http.post("/api/v1/jobs", json={
+            "name": f"joblib-{self._call_id}-{self._batches}",
+            "labels": {**self.labels, "joblib": self._call_id},
+            "spec": {
+                "image": self.image,
+                "command": [self.python, "runner.py"],
+                "resources": {"cpu": self.cpu, "memory": self.memory},
+                "env": [{"name": name, "value": value} for name, value in self.env.items()],
+                "volumes": volumes,
+                "outputs": ["result.pkl"],
+            },
+        })
+        response.raise_for_status()
+        return response.json()["id"]
+
+    def _jobs(self, call_id: str) -> List[Dict[str, Any]]:
+        jobs: List[Dict[str, Any]] = []
+        while True:
+            response = self.http.get("/api/v1/jobs", params={"label": f"joblib={call_id}", "limit": _PAGE, "offset": len(jobs)})
+            response.raise_for_status()
+            page = response.json()
+            jobs += page
+            if len(page) < _PAGE:
+                return jobs
+
+    def _poll(self, stop: threading.Event) -> None:
+        """Complete each batch whose job ended, until ``terminate``."""
+        while not stop.wait(self.poll_interval):
+            with self._lock:
+                calls = {call_id for call_id, _ in self._pending.values()}
+            try:
+                ended = [job for call_id in calls for job in self._jobs(call_id) if job["status"] in _TERMINAL]
+            except httpx.HTTPError as e:
+                logger.warning(f"Checking batch jobs failed ({e!r}), will retry")
+                continue
+            for job in ended:
+                with self._lock:
+                    entry = self._pending.pop(job["id"], None)
+                if entry is None:
+                    continue
+                try:
+                    outcome = self._outcome(job)
+                except httpx.HTTPError as e:
+                    logger.warning(f"Fetching the result of batch job {job['id']} failed ({e!r}), will retry")
+                    with self._lock:
+                        self._pending[job["id"]] = entry
+                    continue
+                # joblib's callback runs here and may submit the next batch
+                if isinstance(outcome, BaseException):
+                    entry[1].set_exception(outcome)
+                else:
+                    entry[1].set_result(outcome)
+
+    def _outcome(self, job: Dict[str, Any]):
+        """The batch's results, or the exception to raise for it."""
+        if job["status"] != "cancelled":
+            response = self.http.get(f"/api/v1/jobs/{job['id']}/artifacts/result.pkl")
+            if response.status_code != 404:
+                response.raise_for_status()
+                try:
+                    outcome = pickle.loads(response.content)
+                except Exception as e:
+                    return ClusterMLError(f"Result of batch job {job['id']} could not be unpickled: {e!r}")
+                return unpickled_outcome(outcome)
+        reason = f": {job['error']}" if job.get("error") else ""
+        return ClusterMLError(f"Batch job {job['id']} {job['status']} without a result{reason}")
+
+
+register_parallel_backend("clusterml", ClusterMLBackend)
@@ -0,0 +1,55 @@
+"""Runs one joblib batch on a ClusterML worker.
+
+``clusterml_sdk.joblib_backend`` ships this file as ``runner.py`` next to
+the pickled batch (``task.pkl``) and the arrays it references
+(``arrays/<sha256>.npy``, memory-mapped read-only straight from the
+worker's cache), and starts it as ``python runner.py``. Only the standard
+library is imported here: unpickling the batch imports what it needs.
+
+The outcome is written to ``result.pkl``: ``("ok", results)``, or
+``("error", exception, traceback)`` and exit code 1.
+"""
+
+import os
+import pickle
+import sys
+import traceback
+
+TASK = "task.pkl"
+RESULT = "result.pkl"
+ARRAYS = "arrays"
+
+
+class _Unpickler(pickle.Unpickler):
+    def persistent_load(self, pid):
+        kind, sha = pid
+        if kind != "ndarray":
+            raise pickle.UnpicklingError(f"Unknown persistent id {kind!r}")
+        import numpy
+
+        return numpy.load(os.path.join(ARRAYS, f"{sha}.npy"), mmap_mode="r")
+
+
+def _dumps(outcome) -> bytes:
+    try:
+        return pickle.dumps(outcome, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        error = RuntimeError(f"The batch's {'results' if outcome[0] == 'ok' else 'error'} could not be pickled")
+        return pickle.dumps(("error", error, traceback.format_exc()), protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def main() -> int:
+    try:
+        with open(TASK, "rb") as f:
+            batch = _Unpickler(f).load()
+        outcome = ("ok", batch())
+    except BaseException as e:  # whatever it is, the caller gets it
+        outcome = ("error", e, traceback.format_exc())
+    with open(RESULT + ".tmp", "wb") as f:
+        f.write(_dumps(outcome))
+    os.replace(RESULT + ".tmp", RESULT)
+    return 0 if outcome[0] == "ok" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
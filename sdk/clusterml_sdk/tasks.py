@@ -0,0 +1,210 @@
+"""Tasks - Python function calls run by warm worker processes, as futures.
+
+A job is a container run, and costs seconds before it starts. A task is
+a function call, pickled with cloudpickle and run by one of the task
+processes workers keep started, so it costs a few milliseconds::
+
+    from clusterml_sdk.tasks import TaskClient, as_completed
+
+    with TaskClient("http://master:8080") as client:
+        futures = client.map(score, candidates)
+        for future in as_completed(futures):
+            print(future.result())
+
+* ``submit`` sends one task; ``map`` sends a call per item, up to
+  ``batch_size`` in each request.
+* Futures are ``concurrent.futures.Future`` objects, so ``as_completed``
+  and ``wait`` (re-exported here) work on them, as do callbacks.
+* Results stream back: one thread per client long-polls the master for
+  the outcomes of its tasks, in the order they end, and completes each
+  future as soon as its task has.
+* An exception raised by a task is raised by ``result()``, with the
+  worker's traceback as its cause. A task that ends without a result
+  (its process died, its workers were lost) raises ``ClusterMLError``.
+* Cancelling a future cancels its task, killing it if it runs. Closing
+  the client cancels the tasks whose futures are not done.
+
+Workers need the task's dependencies (and cloudpickle) installed for the
+``python`` they run. Functions defined in ``__main__`` or inside other
+functions are pickled by value; anything else is imported by name.
+"""
+
+import base64
+import itertools
+import logging
+import os
+import pickle
+import threading
+import uuid
+from concurrent.futures import Future, InvalidStateError, as_completed, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import cloudpickle
+import httpx
+
+from clusterml_sdk.errors import ClusterMLError, unpickled_outcome
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["TaskClient", "as_completed", "wait"]
+
+
+class TaskClient:
+    """Submits tasks to a ClusterML master and completes their futures.
+
+    Args:
+        master_url: The master, by default ``CLUSTERML_MASTER_URL`` or ``http://localhost:8080``.
+        api_key: Sent as ``X-API-Key``, by default ``CLUSTERML_API_KEY``.
+        batch_size: Most tasks ``map`` sends in one request.
+        wait_seconds: How long one request for outcomes waits on the master.
+    """
+
+    def __init__(
+        self,
+        master_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        batch_size: int = 1000,
+        wait_seconds: float = 10.0,
+    ):
+        master_url = master_url or os.getenv("CLUSTERML_MASTER_URL", "http://localhost:8080")
+        api_key = api_key or os.getenv("CLUSTERML_API_KEY")
+        self.http = httpx.Client(
+            base_url=master_url.rstrip("/"),
+            headers={"X-API-Key": api_key} if api_key else {},
+            timeout=httpx.Timeout(30.0, read=30.0 + wait_seconds),
+        )
+        self.batch_size = batch_size
+        self.wait_seconds = wait_seconds
+        self.session = uuid.uuid4().hex
+        self._futures: Dict[str, Future] = {}  # task id -> future, until its outcome arrives
+        self._early: Dict[str, Any] = {}  # outcomes that came back before their submit request did
+        self._lock = threading.Lock()
+        self._submitted = threading.Condition(self._lock)
+        self._closed = False
+        self._collector: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "TaskClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def submit(self, fn: Callable, /, *args, **kwargs) -> Future:
+        """Run ``fn(*args, **kwargs)`` on a worker."""
+        return self._submit([(fn, args, kwargs)])[0]
+
+    def map(self, fn: Callable, *iterables: Iterable) -> List[Future]:
+        """Run ``fn`` on each item (or tuple of items, with several iterables); futures in order."""
+        futures: List[Future] = []
+        calls = ((fn, args, {}) for args in zip(*iterables))
+        while True:
+            batch = list(itertools.islice(calls, self.batch_size))
+            if not batch:
+                return futures
+            futures += self._submit(batch)
+
+    def close(self) -> None:
+        """Cancel the tasks not done yet and stop collecting outcomes."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            pending = list(self._futures.items())
+            self._futures.clear()
+            self._submitted.notify_all()
+        if pending:
+            self._cancel([task_id for task_id, _ in pending])
+        for _, future in pending:
+            future.cancel()
+        if self._collector is not None:
+            self._collector.join()
+        self.http.close()
+
+    # ─── Internals ─────────────────────────────────────────────────────────
+
+    def _submit(self, calls: List[Tuple[Callable, tuple, dict]]) -> List[Future]:
+        if self._closed:
+            raise RuntimeError("The task client is closed")
+        payloads = [
+            base64.b64encode(cloudpickle.dumps(call, protocol=pickle.HIGHEST_PROTOCOL)).decode("ascii")
+            for call in calls
+        ]
+        response = self.http.post("/api/v1/tasks", json={"session": self.session, "payloads": payloads})
+        response.raise_for_status()
+        futures = []
+        with self._lock:
+            for task_id in response.json()["ids"]:
+                future: Future = Future()
+                future.task_id = task_id
+                early = self._early.pop(task_id, None)
+                if early is None:
+                    self._futures[task_id] = future
+                else:
+                    self._resolve(future, early)
+                future.add_done_callback(self._on_done)
+                futures.append(future)
+            self._submitted.notify_all()
+            if self._collector is None:
+                self._collector = threading.Thread(target=self._collect, name="clusterml-tasks", daemon=True)
+                self._collector.start()
+        return futures
+
+    def _on_done(self, future: Future) -> None:
+        # The task's cancelled outcome still comes back, and is dropped then
+        if future.cancelled() and not self._closed:
+            self._cancel([future.task_id])
+
+    def _cancel(self, task_ids: List[str]) -> None:
+        try:
+            self.http.post("/api/v1/tasks/cancel", json={"session": self.session, "ids": task_ids}).raise_for_status()
+        except httpx.HTTPError as e:
+            logger.warning(f"Cancelling {len(task_ids)} tasks failed: {e!r}")
+
+    def _collect(self) -> None:
+        """Complete futures with the session's outcomes, until ``close``."""
+        cursor = 0
+        while True:
+            with self._lock:
+                while not self._futures and not self._closed:
+                    self._submitted.wait()
+                if self._closed:
+                    return
+            try:
+                response = self.http.post("/api/v1/tasks/wait", json={
+                    "session": self.session, "cursor": cursor, "wait_seconds": self.wait_seconds,
+                })
+                response.raise_for_status()
+            except httpx.HTTPError as e:
+                logger.warning(f"Waiting for task outcomes failed ({e!r}), will retry")
+                threading.Event().wait(1.0)
+                continue
+            body = response.json()
+            cursor = body["cursor"]
+            for outcome in body["results"]:
+                with self._lock:
+                    future = self._futures.pop(outcome["id"], None)
+                    if future is None:
+                        if not self._closed:
+                            self._early[outcome["id"]] = outcome
+                        continue
+                self._resolve(future, outcome)
+
+    @staticmethod
+    def _resolve(future: Future, outcome: Dict[str, Any]) -> None:
+        if outcome["status"] == "cancelled":
+            future.cancel()
+            return
+        if outcome.get("result") is not None:
+            try:
+                result = unpickled_outcome(pickle.loads(base64.b64decode(outcome["result"])))
+            except Exception as e:
+                result = ClusterMLError(f"Result of task {outcome['id']} could not be unpickled: {e!r}")
+        else:
+            result = ClusterMLError(f"Task {outcome['id']} {outcome['status']} without a result: {outcome.get('error')}")
+        try:
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+        except InvalidStateError:
+            pass  # cancelled meanwhile
@@ -0,0 +1,62 @@
+"""Fixtures shared by the SDK tests: a master and two workers run as processes."""
+
+import os
+import socket
+import subprocess
+import sys
+import time
+
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+for _path in (_project_root, os.path.join(_project_root, "sdk")):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+import httpx
+import pytest
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture(scope="session")
+def cluster(tmp_path_factory):
+    """URL of a master with two workers of two job slots and two task processes each."""
+    root = tmp_path_factory.mktemp("cluster")
+    port = _free_port()
+    env = dict(
+        os.environ, MASTER_PORT=str(port), LOG_LEVEL="WARNING", SCHEDULER_INTERVAL="0.5",
+        ARTIFACT_DIR=str(root / "artifacts"), DATASET_DIR=str(root / "datasets"),
+    )
+    processes = [subprocess.Popen(
+        [sys.executable, "main.py"], cwd=os.path.join(_project_root, "master"), env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )]
+    url = f"http://127.0.0.1:{port}"
+    try:
+        with httpx.Client(base_url=url, timeout=10.0) as http:
+            for _ in range(100):
+                try:
+                    http.get("/health").raise_for_status()
+                    break
+                except httpx.HTTPError:
+                    time.sleep(0.1)
+            for i in range(2):
+                workdir = root / f"worker-{i}"
+                processes.append(subprocess.Popen(
+                    [sys.executable, "worker/main.py", "--master-url", url, "--hostname", f"worker-{i}",
+                     "--heartbeat-interval", "0.5", "--max-concurrent-jobs", "2", "--peer-port", "0",
+                     "--work-dir", str(workdir / "jobs"), "--cache-dir", str(workdir / "cache"),
+                     "--outbox", str(workdir / "outbox.json"), "--log-spill-dir", ""],
+                    cwd=_project_root, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                ))
+            while len(http.get("/api/v1/nodes").json()) < 2:
+                time.sleep(0.1)
+        yield url
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=30)
@@ -0,0 +1,157 @@
+"""Tests for the ``clusterml`` joblib backend.
+
+The first tests pickle batches and run them with the runner locally; the
+others start a master and two worker processes and run ``joblib.Parallel``
+(and ``GridSearchCV``, with sklearn installed) on them. All are skipped
+without joblib and numpy.
+
+Run with: pytest sdk/tests/test_joblib_backend.py -v
+"""
+
+import hashlib
+import io
+import os
+import pickle
+import subprocess
+import sys
+
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+for _path in (_project_root, os.path.join(_project_root, "sdk")):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+import httpx
+import pytest
+
+joblib = pytest.importorskip("joblib")
+np = pytest.importorskip("numpy")
+
+from clusterml_sdk import runner
+from clusterml_sdk.joblib_backend import (
+    ClusterMLBackend,
+    ClusterMLError,
+    RemoteTraceback,
+    _BatchPickler,
+)
+from joblib.parallel import BatchedCalls, SequentialBackend
+
+
+def _sha(data) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+@pytest.fixture
+def offline_backend():
+    """A backend that keeps its uploads in ``uploads`` instead of sending them."""
+    backend = ClusterMLBackend(master_url="http://master", array_threshold=1000)
+    backend.uploads = {}
+
+    def put(data):
+        backend.uploads[_sha(data)] = bytes(data)
+        return f"blob://{_sha(data)}"
+
+    backend.blobs.put = put
+    return backend
+
+
+def _batch(func, *args):
+    return BatchedCalls([(func, args, {})], (SequentialBackend(nesting_level=1), None))
+
+
+class TestBatches:
+    def test_large_arrays_are_uploaded_once_and_referenced_by_hash(self, offline_backend):
+        big, small = np.arange(1000, dtype=np.float64), np.arange(10)
+        payloads, picklers = [], []
+        for offset in range(3):
+            buffer = io.BytesIO()
+            pickler = _BatchPickler(buffer, offline_backend)
+            pickler.dump(_batch(np.add, big, small + offset))
+            payloads.append(buffer.getvalue())
+            picklers.append(pickler)
+
+        assert len(offline_backend.uploads) == 1
+        assert picklers[0].arrays == picklers[2].arrays == set(offline_backend.uploads)
+        assert all(len(payload) < big.nbytes for payload in payloads)
+        offline_backend.stop_call()
+        assert not offline_backend._arrays  # the next call hashes its arrays again
+
+    def test_runner_maps_arrays_and_reports_errors(self, offline_backend, tmp_path):
+        big = np.arange(2000, dtype=np.float64)
+
+        def total(values, scale):
+            if scale < 0:
+                raise ValueError("negative scale")
+            return float(values.sum()) * scale
+
+        def run(batch):
+            (tmp_path / "arrays").mkdir(exist_ok=True)
+            with open(tmp_path / runner.TASK, "wb") as f:
+                pickler = _BatchPickler(f, offline_backend)
+                pickler.dump(batch)
+            for sha in pickler.arrays:
+                (tmp_path / "arrays" / f"{sha}.npy").write_bytes(offline_backend.uploads[sha])
+            code = subprocess.call([sys.executable, runner.__file__], cwd=tmp_path)
+            with open(tmp_path / runner.RESULT, "rb") as f:
+                return code, pickle.load(f)
+
+        assert run(_batch(total, big, 2)) == (0, ("ok", [big.sum() * 2]))
+        code, (kind, error, tb) = run(_batch(total, big, -1))
+        assert code == 1 and kind == "error" and isinstance(error, ValueError)
+        assert "negative scale" in tb
+
+
+def _backend(cluster):
+    return joblib.parallel_backend("clusterml", master_url=cluster, python=sys.executable, poll_interval=0.1)
+
+
+class TestCluster:
+    def test_batches_run_across_nodes_and_arrays_travel_once(self, cluster):
+        features = np.random.default_rng(0).random(500_000)  # 4 MB
+
+        def moment(values, power):
+            return float((values ** power).mean())
+
+        with _backend(cluster) as (backend, n_jobs):
+            assert backend.effective_n_jobs(n_jobs) == 4
+            results = joblib.Parallel(batch_size=1)(joblib.delayed(moment)(features, p) for p in range(1, 9))
+
+        assert results == pytest.approx([float((features ** p).mean()) for p in range(1, 9)])
+        assert backend.blobs.uploaded_bytes < 1.5 * features.nbytes
+        with httpx.Client(base_url=cluster) as http:
+            jobs = http.get("/api/v1/jobs", params={"label": f"joblib={backend._call_id}"}).json()
+        assert len(jobs) == 8 and all(job["status"] == "completed" for job in jobs)
+        assert len({job["worker_id"] for job in jobs}) == 2
+
+    def test_task_errors_are_raised_with_the_worker_traceback(self, cluster):
+        def check(fold):
+            if fold == 3:
+                raise ValueError(f"fold {fold} is empty")
+            return fold
+
+        with _backend(cluster):
+            with pytest.raises(ValueError, match="fold 3 is empty") as raised:
+                joblib.Parallel(batch_size=1)(joblib.delayed(check)(fold) for fold in range(5))
+        assert isinstance(raised.value.__cause__, RemoteTraceback)
+        assert "in check" in str(raised.value.__cause__)
+
+        with _backend(cluster):
+            with pytest.raises(ClusterMLError, match="without a result"):
+                joblib.Parallel(batch_size=1)(joblib.delayed(os._exit)(3) for _ in range(2))
+
+    def test_grid_search_matches_a_local_run(self, cluster):
+        pytest.importorskip("sklearn")
+        from sklearn.datasets import load_digits
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.model_selection import GridSearchCV
+
+        X, y = load_digits(return_X_y=True)
+        grid = {"C": [0.01, 0.1, 1.0], "fit_intercept": [True, False]}
+
+        def search():
+            return GridSearchCV(LogisticRegression(max_iter=200), grid, cv=5, n_jobs=-1).fit(X / 16.0, y)
+
+        local = search()
+        with _backend(cluster):
+            remote = search()
+        assert remote.best_params_ == local.best_params_
+        assert remote.cv_results_["mean_test_score"] == pytest.approx(local.cv_results_["mean_test_score"])
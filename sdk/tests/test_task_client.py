@@ -0,0 +1,85 @@
+"""Tests for Python tasks run through ``TaskClient``.
+
+They run on a master and two worker processes (see ``conftest.py``) and
+check futures, errors, cancellation and the per-task overhead. Skipped
+without cloudpickle.
+
+Run with: pytest sdk/tests/test_task_client.py -v
+"""
+
+import os
+import statistics
+import sys
+import time
+
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+for _path in (_project_root, os.path.join(_project_root, "sdk")):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+import pytest
+
+pytest.importorskip("cloudpickle")
+
+from clusterml_sdk.errors import ClusterMLError, RemoteTraceback
+from clusterml_sdk.tasks import TaskClient, as_completed
+
+
+@pytest.fixture
+def client(cluster):
+    with TaskClient(cluster, wait_seconds=2.0) as client:
+        yield client
+
+
+class TestTasks:
+    def test_map_and_as_completed(self, client):
+        def square(x):
+            return x * x
+
+        futures = client.map(square, range(100))
+        assert sorted(future.result(timeout=30) for future in as_completed(futures, timeout=30)) == [x * x for x in range(100)]
+        assert [future.result() for future in futures] == [x * x for x in range(100)]
+        assert client.submit(pow, 2, 10).result(timeout=30) == 1024
+
+    def test_errors_are_raised_with_the_worker_traceback(self, client):
+        def check(value):
+            if value < 0:
+                raise ValueError(f"{value} is negative")
+            return value
+
+        with pytest.raises(ValueError, match="-1 is negative") as raised:
+            client.submit(check, -1).result(timeout=30)
+        assert isinstance(raised.value.__cause__, RemoteTraceback)
+        assert "in check" in str(raised.value.__cause__)
+
+        with pytest.raises(ClusterMLError, match="exited with code 3"):
+            client.submit(os._exit, 3).result(timeout=30)
+        assert client.submit(abs, -5).result(timeout=30) == 5  # the dead process was replaced
+
+    def test_cancelling_a_future_kills_its_task(self, client):
+        sleeper = client.submit(time.sleep, 60)
+        time.sleep(0.5)
+        assert sleeper.cancel()
+        # The four task processes are free again well before the sleep would end
+        started = time.monotonic()
+        assert [f.result(timeout=10) for f in client.map(abs, range(-8, 0))] == list(range(8, 0, -1))
+        assert time.monotonic() - started < 10
+
+    def test_overhead_per_task_is_a_few_milliseconds(self, client):
+        client.map(abs, range(100))  # warm up connections
+        latencies = []
+        for i in range(20):
+            started = time.perf_counter()
+            client.submit(abs, -i).result(timeout=10)
+            latencies.append(time.perf_counter() - started)
+
+        count = 2000
+        started = time.perf_counter()
+        futures = client.map(abs, range(count))
+        for future in as_completed(futures, timeout=60):
+            future.result()
+        per_task = (time.perf_counter() - started) / count
+
+        print(f"round trip p50 {statistics.median(latencies) * 1000:.1f} ms, {per_task * 1000:.2f} ms per task in bulk")
+        assert statistics.median(latencies) < 0.05
+        assert per_task < 0.005
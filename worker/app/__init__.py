@@ -0,0 +1 @@
+"""ClusterML Worker Application Package."""
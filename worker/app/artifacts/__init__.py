@@ -0,0 +1,126 @@
+"""Artifact Uploader - sends job outputs to the master's artifact store.
+
+Files matching a job's ``spec.outputs`` patterns are uploaded from its
+working directory once it exits:
+
+1. The file is hashed in fixed-size chunks (SHA-256 per chunk) and the
+   manifest is sent to the master, which answers with the chunks it lacks.
+2. Only those chunks are sent, one request each, read from disk one at a
+   time: memory use is one chunk, whatever the size of the file.
+3. The artifact is completed. After a network error or a master restart
+   the loop starts again at step 1, so chunks that made it are not resent;
+   unchanged weights uploaded by an earlier job are not sent at all.
+"""
+
+import asyncio
+import glob
+import hashlib
+import logging
+import os
+from typing import Dict, List, Sequence, Tuple
+
+import httpx
+
+from core.protocols.models import Artifact, ArtifactManifest
+from worker.app.client import Backoff, MasterClient
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+class UploadError(Exception):
+    """An output that could not be uploaded."""
+
+
+def hash_chunks(path: str, chunk_size: int) -> Tuple[int, List[str]]:
+    """Size of a file and the SHA-256 of each of its ``chunk_size`` pieces."""
+    digests = []
+    size = 0
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(chunk_size)
+            if not data:
+                break
+            size += len(data)
+            digests.append(hashlib.sha256(data).hexdigest())
+    return size, digests
+
+
+def read_chunk(path: str, index: int, chunk_size: int) -> bytes:
+    with open(path, "rb") as f:
+        f.seek(index * chunk_size)
+        return f.read(chunk_size)
+
+
+def find_outputs(cwd: str, patterns: Sequence[str]) -> List[Tuple[str, str]]:
+    """``(name, path)`` of the files under ``cwd`` matching any glob pattern.
+
+    Names are relative to ``cwd``. Matches outside it (``../x``, absolute
+    patterns, symlinks pointing out) are skipped.
+    """
+    root = os.path.realpath(cwd)
+    found: Dict[str, str] = {}
+    for pattern in patterns:
+        for path in glob.glob(os.path.join(root, pattern), recursive=True):
+            real = os.path.realpath(path)
+            if not os.path.isfile(real) or os.path.commonpath([real, root]) != root:
+                continue
+            found.setdefault(os.path.relpath(os.path.normpath(path), root), real)
+    return sorted(found.items())
+
+
+class ArtifactUploader:
+    """Uploads files as chunked, resumable artifacts."""
+
+    def __init__(
+        self,
+        client: MasterClient,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        attempts: int = 5,
+        backoff_seconds: float = 1.0,
+    ):
+        self.client = client
+        self.chunk_size = chunk_size
+        self.attempts = attempts
+        self.backoff_seconds = backoff_seconds
+        self.chunks_sent = 0
+        self.chunks_skipped = 0
+        self.bytes_sent = 0
+
+    async def upload(self, job_id: str, path: str, name: str) -> Artifact:
+        """Upload one file, resuming after failures; raises ``UploadError`` when out of attempts."""
+        size, digests = await asyncio.to_thread(hash_chunks, path, self.chunk_size)
+        manifest = ArtifactManifest(name=name, size=size, chunk_size=self.chunk_size, chunks=digests)
+        first_index = {}
+        for index, digest in enumerate(digests):
+            first_index.setdefault(digest, index)
+        backoff = Backoff(self.backoff_seconds)
+        for attempt in range(1, self.attempts + 1):
+            try:
+                upload = await self.client.begin_artifact(job_id, manifest)
+                self.chunks_skipped += len(first_index) - len(upload.missing)
+                for digest in upload.missing:
+                    data = await asyncio.to_thread(read_chunk, path, first_index[digest], self.chunk_size)
+                    await self.client.put_chunk(digest, data)
+                    self.chunks_sent += 1
+                    self.bytes_sent += len(data)
+                artifact = await self.client.complete_artifact(job_id, name)
+                logger.info(f"Uploaded {name} of job {job_id}: {size} bytes, {len(upload.missing)}/{len(first_index)} chunks sent")
+                return artifact
+            except httpx.HTTPStatusError as e:
+                code = e.response.status_code
+                # 409: a chunk went missing between begin and complete; begin again
+                if code < 500 and code not in (408, 409, 429):
+                    raise UploadError(f"{name}: master rejected the upload ({code}): {e.response.text}") from e
+                error = f"{code}"
+            except httpx.HTTPError as e:
+                error = repr(e)
+            if attempt < self.attempts:
+                logger.warning(f"Upload of {name} for job {job_id} failed ({error}), resuming")
+                await asyncio.sleep(backoff.next_delay())
+        raise UploadError(f"{name}: gave up after {self.attempts} attempts ({error})")
+
+    async def upload_outputs(self, job_id: str, cwd: str, patterns: Sequence[str]) -> List[Artifact]:
+        """Upload every file in ``cwd`` matching ``patterns``."""
+        return [await self.upload(job_id, path, name) for name, path in find_outputs(cwd, patterns)]
@@ -0,0 +1,481 @@
+"""Artifact Cache - content-addressed, size-bounded store of job inputs on a worker.
+
+Job inputs (``VolumeMount.source``: datasets, pretrained weights, any file
+or directory) are stored once under their SHA-256 and hard-linked into each
+job's working directory, so a repeated job reads the same bytes without
+downloading or copying them again.
+
+Layout under ``root``::
+
+    objects/ab/abcdef...   one read-only file per content hash
+    tmp/                   downloads in progress
+    index.json             source -> digest (+ ETag / file stat for revalidation)
+
+* Sources are ``http(s)://`` URLs or local paths (``file://`` or plain). A
+  source may pin its content with ``#sha256=<hex>``; a pinned source that is
+  already cached starts with no network request at all. Unpinned URLs are
+  revalidated with ``If-None-Match``/``If-Modified-Since`` (a 304 transfers
+  nothing); unchanged local files are recognised by size and mtime.
+* ``dataset://<name>/<shard>`` is a shard of a dataset on the master, and
+  ``dataset://<name>`` all of its shards (``?shard_index=R&num_shards=N``:
+  those of reader R of N). Their chunks come through the swarm, from peers
+  where possible; datasets are immutable, so a cached shard is never
+  revalidated.
+* Installs are atomic: content is written to ``tmp/``, verified, fsynced
+  and then ``os.link``-ed into place, so readers never see a partial object
+  and two workers installing the same content both succeed.
+* Eviction is LRU and runs when the cache exceeds ``max_bytes``. The order
+  is kept in memory; it is rebuilt at startup from the objects' mtimes,
+  touched on every use. An object with more than one link is in use by a
+  job directory and is never evicted; since jobs hold hard links, even a
+  concurrently evicted object stays readable.
+* Writes, fsyncs, installs and evictions run in threads, off the event
+  loop that also serves heartbeats and job output.
+* Objects are mode 0444, so a job cannot modify the cached copy through
+  its link by accident. When the job directory is on another filesystem
+  the object is copied instead.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+
+import httpx
+
+from core.utils.locality import input_key
+from worker.app.swarm import SwarmError
+
+logger = logging.getLogger(__name__)
+
+_CHUNK = 1 << 20
+
+
+class CacheError(Exception):
+    """An input could not be fetched or verified."""
+
+
+def parse_source(source: str) -> Tuple[str, Optional[str]]:
+    """Split ``location#sha256=<hex>`` into (location, digest or None)."""
+    location, _, fragment = source.partition("#")
+    digest = None
+    if fragment.startswith("sha256="):
+        digest = fragment[len("sha256="):].lower()
+        if len(digest) != 64 or any(c not in "0123456789abcdef" for c in digest):
+            raise CacheError(f"Invalid sha256 in source {source!r}")
+    return location, digest
+
+
+class ArtifactCache:
+    """Content-addressed cache of job inputs with LRU eviction."""
+
+    def __init__(self, root: str, max_bytes: int, http: Optional[httpx.AsyncClient] = None, swarm=None):
+        self.root = root
+        self.swarm = swarm
+        self.max_bytes = max_bytes
+        self._http = http
+        self._own_http = http is None
+        self._objects = os.path.join(root, "objects")
+        self._tmp = os.path.join(root, "tmp")
+        self._index_path = os.path.join(root, "index.json")
+        os.makedirs(self._objects, exist_ok=True)
+        os.makedirs(self._tmp, exist_ok=True)
+        for name in os.listdir(self._tmp):  # leftovers of an interrupted install
+            os.unlink(os.path.join(self._tmp, name))
+        self._index: Dict[str, Dict] = self._load_index()
+        self._summary: Optional[Dict[str, int]] = None
+        self._summary_limit = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # digest -> size, least recently used first; installs and evictions
+        # update it from threads
+        self._lru: "OrderedDict[str, int]" = OrderedDict(
+            (digest, size) for _, digest, size in sorted(self._scan())
+        )
+        self._lock = threading.Lock()
+        self.size_bytes = sum(self._lru.values())
+        self.hits = 0
+        self.misses = 0
+        self.bytes_fetched = 0
+
+    # ── Objects ─────────────────────────────────────────────────────────
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self._objects, digest[:2], digest)
+
+    def has(self, digest: str) -> bool:
+        """Whether ``digest`` is cached; marks it as recently used."""
+        path = self.path(digest)
+        try:
+            os.utime(path)  # keeps the order across restarts
+            size = self._lru.get(digest)
+            if size is None:  # installed by another process sharing the cache
+                size = os.path.getsize(path)
+        except FileNotFoundError:
+            self._forget(digest)  # evicted by another process sharing the cache
+            return False
+        self._touch(digest, size)
+        return True
+
+    def _touch(self, digest: str, size: int) -> None:
+        """Mark ``digest`` as the most recently used object."""
+        with self._lock:
+            if digest in self._lru:
+                self._lru.move_to_end(digest)
+            else:
+                self._lru[digest] = size
+                self.size_bytes += size
+
+    def _forget(self, digest: str) -> int:
+        """Drop ``digest`` from the LRU order; returns its size (0 if unknown)."""
+        with self._lock:
+            size = self._lru.pop(digest, 0)
+            self.size_bytes -= size
+        return size
+
+    def _install(self, tmp_path: str, digest: str) -> None:
+        """Atomically move a verified temp file into the store; blocking, run in a thread."""
+        final = self.path(digest)
+        os.makedirs(os.path.dirname(final), exist_ok=True)
+        os.chmod(tmp_path, 0o444)
+        size = os.path.getsize(tmp_path)
+        try:
+            os.link(tmp_path, final)
+        except FileExistsError:
+            pass  # installed concurrently; same content by definition
+        finally:
+            os.unlink(tmp_path)
+        self._touch(digest, size)
+        self._evict(keep=digest)
+
+    def _new_tmp(self):
+        fd, path = tempfile.mkstemp(dir=self._tmp)
+        return os.fdopen(fd, "wb"), path
+
+    def _copy_to_tmp(self, path: str) -> Tuple[str, str]:
+        """Copy a file into ``tmp/`` while hashing it; touches no shared state."""
+        f, tmp_path = self._new_tmp()
+        h = hashlib.sha256()
+        try:
+            with f, open(path, "rb") as src:
+                for chunk in iter(lambda: src.read(_CHUNK), b""):
+                    _write(f, h, chunk)
+                _sync(f)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return tmp_path, h.hexdigest()
+
+    def _install_verified(self, tmp_path: str, actual: str, expected: Optional[str], name: str) -> str:
+        try:
+            digest = self._verify(actual, expected, name)
+        except CacheError:
+            os.unlink(tmp_path)
+            raise
+        self._install(tmp_path, digest)
+        return digest
+
+    def put_file(self, path: str, expected: Optional[str] = None) -> str:
+        """Copy a local file into the cache and return its digest."""
+        tmp_path, actual = self._copy_to_tmp(path)
+        return self._install_verified(tmp_path, actual, expected, path)
+
+    async def put_stream(self, chunks: AsyncIterator[bytes], expected: Optional[str] = None, name: str = "") -> str:
+        """Write a byte stream into the cache and return its digest."""
+        f, tmp_path = self._new_tmp()
+        h = hashlib.sha256()
+        try:
+            with f:
+                async for chunk in chunks:
+                    await asyncio.to_thread(_write, f, h, chunk)
+                    self.bytes_fetched += len(chunk)
+                await asyncio.to_thread(_sync, f)
+            digest = self._verify(h.hexdigest(), expected, name)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        await asyncio.to_thread(self._install, tmp_path, digest)
+        return digest
+
+    @staticmethod
+    def _verify(actual: str, expected: Optional[str], name: str) -> str:
+        if expected is not None and actual != expected:
+            raise CacheError(f"Content of {name} has sha256 {actual}, expected {expected}")
+        return actual
+
+    def link(self, digest: str, dest: str) -> None:
+        """Expose a cached object at ``dest`` (hard link, or copy across filesystems)."""
+        os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+        if os.path.lexists(dest):
+            os.unlink(dest)
+        try:
+            os.link(self.path(digest), dest)
+        except FileNotFoundError:
+            raise
+        except OSError:
+            shutil.copyfile(self.path(digest), dest)
+
+    # ── Eviction ────────────────────────────────────────────────────────
+
+    def _scan(self):
+        """(last use, digest, size) of every object; only read at startup."""
+        for shard in os.scandir(self._objects):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                st = entry.stat()
+                yield st.st_mtime, entry.name, st.st_size
+
+    def _evict(self, keep: Optional[str] = None) -> int:
+        """Remove least recently used objects until the cache fits; returns bytes freed.
+
+        Blocking; runs in a thread. Only the objects it considers are stat-ed.
+        """
+        with self._lock:
+            if self.size_bytes <= self.max_bytes:
+                return 0
+            candidates = [digest for digest in self._lru if digest != keep]
+        freed = 0
+        evicted = set()
+        for digest in candidates:
+            if self.size_bytes <= self.max_bytes:
+                break
+            path = self.path(digest)
+            try:
+                if os.stat(path).st_nlink > 1:
+                    continue  # linked into a job directory: removing it frees nothing
+                os.unlink(path)
+            except FileNotFoundError:
+                pass  # evicted by another process sharing the cache
+            freed += self._forget(digest)
+            evicted.add(digest)
+        if evicted:
+            with self._lock:
+                self._index = {k: v for k, v in self._index.items() if v["digest"] not in evicted}
+                self._save_index()
+            logger.info(f"Evicted {len(evicted)} cached artifacts ({freed} bytes)")
+        return freed
+
+    # ── Index ───────────────────────────────────────────────────────────
+
+    def _load_index(self) -> Dict[str, Dict]:
+        try:
+            with open(self._index_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _remember(self, location: str, entry: Dict) -> None:
+        """Index ``location``; evictions in threads rewrite the index too."""
+        with self._lock:
+            self._index[location] = entry
+            self._save_index()
+
+    def _save_index(self) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self._tmp)
+        with os.fdopen(fd, "w") as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, self._index_path)
+        self._summary = None
+
+    def summary(self, limit: int = 128) -> Dict[str, int]:
+        """Bytes cached per source, for the master's placement decisions.
+
+        Keys are ``core.utils.locality.input_key`` of the sources, so the
+        shards of a dataset add up under ``dataset://<name>``. Only the
+        ``limit`` largest are kept, bounding the heartbeat.
+        """
+        if self._summary is None or self._summary_limit != limit:
+            totals: Dict[str, int] = {}
+            for location, entry in self._index.items():
+                size = self._lru.get(entry["digest"])
+                if size is None:
+                    continue
+                key = input_key(location)
+                totals[key] = totals.get(key, 0) + size
+            largest = sorted(totals.items(), key=lambda item: item[1], reverse=True)[:limit]
+            self._summary, self._summary_limit = dict(largest), limit
+        return self._summary
+
+    # ── Sources ─────────────────────────────────────────────────────────
+
+    async def fetch(self, source: str) -> str:
+        """Make sure ``source`` (a file) is cached and return its digest.
+
+        Concurrent fetches of the same source share one transfer.
+        """
+        pending = self._inflight.get(source)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[source] = future
+        try:
+            digest = await self._fetch(source)
+            future.set_result(digest)
+            return digest
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else waits
+            raise
+        finally:
+            del self._inflight[source]
+
+    async def _fetch(self, source: str) -> str:
+        location, pinned = parse_source(source)
+        if pinned is not None and self.has(pinned):
+            self.hits += 1
+            return pinned
+        scheme = urlparse(location).scheme
+        if scheme in ("http", "https"):
+            return await self._fetch_url(location, pinned)
+        if scheme == "dataset":
+            return await self._fetch_shard(location, pinned)
+        return await self._fetch_path(_local_path(location), pinned)
+
+    async def _fetch_path(self, path: str, pinned: Optional[str]) -> str:
+        try:
+            st = os.stat(path)
+        except OSError as e:
+            raise CacheError(f"Input {path} is not readable: {e}") from e
+        entry = self._index.get(path)
+        if entry and entry.get("stat") == [st.st_size, st.st_mtime_ns] and self.has(entry["digest"]):
+            if pinned is None or entry["digest"] == pinned:
+                self.hits += 1
+                return entry["digest"]
+        self.misses += 1
+        try:
+            tmp_path, actual = await asyncio.to_thread(self._copy_to_tmp, path)
+        except OSError as e:
+            raise CacheError(f"Input {path} is not readable: {e}") from e
+        digest = await asyncio.to_thread(self._install_verified, tmp_path, actual, pinned, path)
+        self._remember(path, {"digest": digest, "stat": [st.st_size, st.st_mtime_ns]})
+        return digest
+
+    async def _fetch_url(self, url: str, pinned: Optional[str]) -> str:
+        if self._http is None:
+            self._http = httpx.AsyncClient(follow_redirects=True, timeout=httpx.Timeout(30.0, read=300.0))
+        headers = {}
+        entry = self._index.get(url)
+        if pinned is None and entry and self.has(entry["digest"]):
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        try:
+            async with self._http.stream("GET", url, headers=headers) as response:
+                if response.status_code == 304 and entry:
+                    self.hits += 1
+                    return entry["digest"]
+                response.raise_for_status()
+                self.misses += 1
+                digest = await self.put_stream(response.aiter_bytes(_CHUNK), pinned, url)
+                validators = {
+                    "etag": response.headers.get("etag"),
+                    "last_modified": response.headers.get("last-modified"),
+                }
+        except httpx.HTTPError as e:
+            raise CacheError(f"Download of {url} failed: {e}") from e
+        self._remember(url, {"digest": digest, **validators})
+        return digest
+
+    async def _fetch_shard(self, location: str, pinned: Optional[str]) -> str:
+        entry = self._index.get(location)
+        if entry and self.has(entry["digest"]) and (pinned is None or entry["digest"] == pinned):
+            self.hits += 1
+            return entry["digest"]
+        if self.swarm is None:
+            raise CacheError(f"{location}: dataset sources need the swarm to be configured")
+        name, shard = _dataset_location(location)
+        try:
+            dataset = await self.swarm.dataset(name)
+            manifest = next((s for s in dataset.shards if s.name == shard), None)
+            if manifest is None:
+                raise CacheError(f"Dataset {name} has no shard {shard!r}")
+            self.misses += 1
+            digest = await self.put_stream(self.swarm.read(manifest), pinned, location)
+        except (httpx.HTTPError, SwarmError) as e:
+            raise CacheError(f"Fetching {location} failed: {e}") from e
+        self._remember(location, {"digest": digest})
+        return digest
+
+    async def _dataset_shards(self, location: str) -> List[str]:
+        """Shard names of ``dataset://name`` (or this reader's share of them)."""
+        if self.swarm is None:
+            raise CacheError(f"{location}: dataset sources need the swarm to be configured")
+        name, _ = _dataset_location(location)
+        query = parse_qs(urlparse(location).query)
+        try:
+            manifest = await self.swarm.client.dataset_manifest(
+                name, int(query.get("shard_index", ["0"])[0]), int(query.get("num_shards", ["1"])[0])
+            )
+        except (httpx.HTTPError, ValueError) as e:
+            raise CacheError(f"Listing {location} failed: {e}") from e
+        return [shard.name for shard in manifest.shards]
+
+    async def materialize(self, source: str, dest: str) -> List[str]:
+        """Place ``source`` at ``dest``: a file, or a local directory (or dataset) file by file."""
+        location, _ = parse_source(source)
+        scheme = urlparse(location).scheme
+        if scheme == "dataset" and not _dataset_location(location)[1]:
+            name, _ = _dataset_location(location)
+            placed = []
+            for shard in await self._dataset_shards(location):
+                target = os.path.join(dest, shard)
+                await self._place(f"dataset://{name}/{shard}", target)
+                placed.append(target)
+            return placed
+        if scheme not in ("http", "https", "dataset"):
+            root = _local_path(location)
+            if os.path.isdir(root):
+                placed = []
+                for dirpath, _, files in os.walk(root):
+                    for name in files:
+                        src = os.path.join(dirpath, name)
+                        target = os.path.join(dest, os.path.relpath(src, root))
+                        await self._place(src, target)
+                        placed.append(target)
+                return placed
+        await self._place(source, dest)
+        return [dest]
+
+    async def _place(self, source: str, dest: str) -> None:
+        for attempt in range(2):
+            digest = await self.fetch(source)
+            try:
+                self.link(digest, dest)
+                return
+            except FileNotFoundError:
+                # Evicted by another process sharing the cache; fetch again
+                if attempt:
+                    raise CacheError(f"Cached copy of {source} disappeared while linking")
+
+    async def close(self) -> None:
+        if self._own_http and self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+
+def _dataset_location(location: str) -> Tuple[str, str]:
+    """``dataset://name/shard?query`` -> (name, shard); the shard is empty for a whole dataset."""
+    parsed = urlparse(location)
+    return unquote(parsed.netloc), unquote(parsed.path.lstrip("/"))
+
+
+def _local_path(location: str) -> str:
+    return urlparse(location).path if location.startswith("file://") else location
+
+
+def _write(f, h, chunk: bytes) -> None:
+    h.update(chunk)
+    f.write(chunk)
+
+
+def _sync(f) -> None:
+    f.flush()
+    os.fsync(f.fileno())
@@ -0,0 +1,183 @@
+"""Checkpoints - job state saved to the master while the job runs, restored when it is requeued.
+
+What a job sees:
+
+* ``CLUSTERML_CHECKPOINT_DIR`` is where it keeps its checkpoint. Each file
+  should be written under a temporary name and ``os.replace``-d into place;
+  names starting with ``.`` or ending in ``.tmp`` are ignored.
+* When the job was requeued (its node timed out, it was preempted, or its
+  worker shut down), the directory holds its last saved checkpoint when it
+  starts, on whichever node that is.
+* To stop it gracefully, its process group gets SIGTERM and has
+  ``CLUSTERML_STOP_GRACE_SECONDS`` to write a last checkpoint and exit
+  before SIGKILL.
+
+What the worker does:
+
+1. Every ``interval`` seconds while the job runs, and once more after a
+   graceful stop, the directory is compared with what was last saved. If a
+   file changed, the files are hard-linked into a snapshot, so the job can go
+   on writing, and uploaded as chunked artifacts ``checkpoint/<name>``: only
+   chunks the master lacks are sent.
+2. The set is then committed (``PUT /api/v1/jobs/{id}/checkpoint``) with the
+   next generation number. The master only accepts it from the job's current
+   worker, once every chunk is stored, so a checkpoint is all or nothing.
+3. A requeued job's assignment carries its last checkpoint. Before the job
+   starts, files are rebuilt from chunks already on disk where they match
+   and downloads of the others, each checked against its SHA-256.
+
+Work lost to a failure is thus at most one checkpoint interval plus the
+job's own interval between checkpoints, however long the job has run.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from core.protocols.models import ArtifactManifest, Checkpoint
+from worker.app.artifacts import ArtifactUploader, UploadError, hash_chunks, read_chunk
+from worker.app.client import MasterClient
+
+logger = logging.getLogger(__name__)
+
+Signature = Dict[str, Tuple[int, int]]
+
+
+class CheckpointError(Exception):
+    """A checkpoint that could not be saved or restored."""
+
+
+def scan(directory: str) -> Dict[str, str]:
+    """``name -> path`` of the checkpoint files under ``directory``."""
+    found = {}
+    for dirpath, dirnames, filenames in os.walk(directory):
+        dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+        for filename in filenames:
+            if filename.startswith(".") or filename.endswith(".tmp"):
+                continue
+            path = os.path.join(dirpath, filename)
+            found[os.path.relpath(path, directory)] = path
+    return found
+
+
+def _signature(files: Dict[str, str]) -> Signature:
+    signature = {}
+    for name, path in files.items():
+        st = os.stat(path)
+        signature[name] = (st.st_size, st.st_mtime_ns)
+    return signature
+
+
+class Checkpointer:
+    """Saves and restores the checkpoints of the jobs running on this worker."""
+
+    def __init__(self, client: MasterClient, uploader: ArtifactUploader, interval_seconds: float = 60.0):
+        self.client = client
+        self.uploader = uploader
+        self.interval = interval_seconds
+        # job id -> (last committed generation, signature of the files it holds)
+        self._saved: Dict[str, Tuple[int, Signature]] = {}
+
+    async def restore(self, job_id: str, checkpoint: Optional[Checkpoint], directory: str) -> None:
+        """Make ``directory`` hold exactly ``checkpoint`` (or leave it empty without one)."""
+        os.makedirs(directory, exist_ok=True)
+        generation = checkpoint.generation if checkpoint else 0
+        wanted = {f.name: f for f in checkpoint.files} if checkpoint else {}
+        for name, path in scan(directory).items():
+            if name not in wanted:
+                os.unlink(path)  # written after the checkpoint we resume from
+        for manifest in wanted.values():
+            path = os.path.join(directory, manifest.name)
+            if os.path.commonpath([os.path.realpath(path), os.path.realpath(directory)]) != os.path.realpath(directory):
+                raise CheckpointError(f"Checkpoint file {manifest.name!r} leaves the checkpoint directory")
+            await self._restore_file(manifest, path)
+        self._saved[job_id] = (generation, _signature(scan(directory)))
+        if checkpoint:
+            logger.info(f"Job {job_id}: restored checkpoint generation {generation} ({len(wanted)} files)")
+
+    async def _restore_file(self, manifest: ArtifactManifest, path: str) -> None:
+        local: Dict[str, int] = {}
+        if os.path.isfile(path):
+            size, digests = await asyncio.to_thread(hash_chunks, path, manifest.chunk_size)
+            if size == manifest.size and digests == manifest.chunks:
+                return
+            for index, digest in enumerate(digests):
+                local.setdefault(digest, index)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.restore")
+        try:
+            f = await asyncio.to_thread(open, tmp_path, "wb")
+            with f:
+                for digest in manifest.chunks:
+                    if digest in local:
+                        data = await asyncio.to_thread(read_chunk, path, local[digest], manifest.chunk_size)
+                    else:
+                        data = await self._download(digest)
+                    await asyncio.to_thread(f.write, data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    async def _download(self, digest: str) -> bytes:
+        try:
+            async with self.client.artifact_chunk_stream(digest) as response:
+                response.raise_for_status()
+                data = await response.aread()
+        except httpx.HTTPError as e:
+            raise CheckpointError(f"Chunk {digest[:12]} could not be downloaded: {e}") from e
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise CheckpointError(f"Chunk {digest[:12]} does not match its hash")
+        return data
+
+    async def save(self, job_id: str, directory: str, worker_id: Optional[str]) -> Optional[Checkpoint]:
+        """Upload and commit the directory if it changed since the last save; None if it did not."""
+        files = scan(directory)
+        generation, saved = self._saved.get(job_id, (0, {}))
+        signature = _signature(files)
+        if not files or signature == saved:
+            return None
+        snapshot = os.path.join(os.path.dirname(directory), ".checkpoint-snapshot")
+        shutil.rmtree(snapshot, ignore_errors=True)
+        try:
+            for name, path in files.items():
+                target = os.path.join(snapshot, name)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                try:
+                    os.link(path, target)
+                except OSError:
+                    shutil.copy2(path, target)
+            if _signature({name: os.path.join(snapshot, name) for name in files}) != signature:
+                logger.info(f"Job {job_id}: checkpoint changed while being saved, retrying later")
+                return None
+            manifests: List[ArtifactManifest] = []
+            for name in sorted(files):
+                artifact = await self.uploader.upload(job_id, os.path.join(snapshot, name), f"checkpoint/{name}")
+                manifests.append(ArtifactManifest(
+                    name=name, size=artifact.size, chunk_size=artifact.chunk_size, chunks=artifact.chunks
+                ))
+            checkpoint = Checkpoint(generation=generation + 1, files=manifests, worker_id=worker_id)
+            await self.client.commit_checkpoint(job_id, checkpoint)
+        finally:
+            shutil.rmtree(snapshot, ignore_errors=True)
+        self._saved[job_id] = (checkpoint.generation, signature)
+        logger.info(f"Job {job_id}: saved checkpoint generation {checkpoint.generation} ({len(manifests)} files)")
+        return checkpoint
+
+    async def watch(self, job_id: str, directory: str, worker_id: Optional[str]) -> None:
+        """Save the job's checkpoint every ``interval`` seconds until cancelled."""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.save(job_id, directory, worker_id)
+            except (UploadError, httpx.HTTPError, OSError) as e:
+                logger.warning(f"Job {job_id}: saving the checkpoint failed ({e}), retrying later")
+
+    def forget(self, job_id: str) -> None:
+        self._saved.pop(job_id, None)
@@ -0,0 +1,203 @@
+"""Master Client - the worker's persistent HTTP connection to the master.
+
+One ``httpx.AsyncClient`` is shared by every call the agent makes, so
+registration, heartbeats, job updates, log batches and artifact chunks reuse pooled keep-alive
+connections instead of opening a new TCP/TLS connection per request. The
+pool's keep-alive expiry is set above the heartbeat interval; the master's
+``KEEP_ALIVE_TIMEOUT`` must be too, or the server closes idle connections
+between heartbeats.
+
+``connections_opened`` counts TCP connects, so reuse can be verified.
+"""
+
+import logging
+import random
+from typing import Any, AsyncContextManager, Dict, Optional
+from urllib.parse import quote
+
+import httpx
+
+from core.protocols.models import (
+    Artifact,
+    ArtifactManifest,
+    ArtifactUpload,
+    Checkpoint,
+    ChunkSources,
+    Dataset,
+    DatasetManifest,
+    HeartbeatRequest,
+    HeartbeatResponse,
+    Job,
+    JobUpdate,
+    MetricsReport,
+    Node,
+    NodeRegister,
+    Rendezvous,
+    RendezvousJoin,
+    SwarmAnnounce,
+    SwarmLocate,
+    TaskLease,
+    TaskLeaseResponse,
+    TaskResults,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class NotRegistered(Exception):
+    """The master does not know this worker (e.g. it restarted); register again."""
+
+
+class Backoff:
+    """Exponential backoff with full jitter: ``uniform(0, min(cap, base * 2**n))``."""
+
+    def __init__(self, base_seconds: float = 1.0, max_seconds: float = 60.0):
+        self.base = base_seconds
+        self.max = max_seconds
+        self.attempts = 0
+
+    def next_delay(self) -> float:
+        ceiling = min(self.max, self.base * (2 ** self.attempts))
+        self.attempts += 1
+        return random.uniform(0, ceiling)
+
+    def reset(self) -> None:
+        self.attempts = 0
+
+
+def jittered(interval: float, jitter: float) -> float:
+    """``interval`` spread uniformly by ±``jitter`` (a fraction) so a fleet does not synchronize."""
+    return interval * random.uniform(1.0 - jitter, 1.0 + jitter)
+
+
+class MasterClient:
+    """Typed wrapper over the master's node and job endpoints."""
+
+    def __init__(
+        self,
+        master_url: str,
+        token: Optional[str] = None,
+        timeout_seconds: float = 10.0,
+        keepalive_seconds: float = 120.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        headers = {"Content-Type": "application/json"}
+        if token:
+            headers["X-API-Key"] = token
+        self.connections_opened = 0
+        self.http = httpx.AsyncClient(
+            base_url=master_url.rstrip("/"),
+            headers=headers,
+            timeout=httpx.Timeout(timeout_seconds),
+            # A worker talks to one host; a couple of connections cover a
+            # heartbeat overlapping a job update
+            limits=httpx.Limits(max_connections=4, max_keepalive_connections=2, keepalive_expiry=keepalive_seconds),
+            transport=transport,
+        )
+
+    async def close(self) -> None:
+        await self.http.aclose()
+
+    async def _trace(self, event: str, info: Dict[str, Any]) -> None:
+        if event == "connection.connect_tcp.complete":
+            self.connections_opened += 1
+
+    async def _request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        response = await self.http.request(method, path, extensions={"trace": self._trace}, **kwargs)
+        response.raise_for_status()
+        return response
+
+    async def register(self, registration: NodeRegister) -> Node:
+        response = await self._request("POST", "/api/v1/nodes", content=registration.model_dump_json())
+        return Node.model_validate_json(response.content)
+
+    async def heartbeat(self, request: HeartbeatRequest) -> HeartbeatResponse:
+        try:
+            response = await self._request(
+                "POST", "/api/v1/nodes/heartbeat", content=request.model_dump_json()
+            )
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                raise NotRegistered(request.worker_id) from e
+            raise
+        return HeartbeatResponse.model_validate_json(response.content)
+
+    async def update_job(self, job_id: str, update: JobUpdate) -> Job:
+        response = await self._request(
+            "PUT", f"/api/v1/jobs/{job_id}", content=update.model_dump_json(exclude_none=True)
+        )
+        return Job.model_validate_json(response.content)
+
+    async def ship_logs(self, body: bytes) -> None:
+        """Send a gzip-compressed ``LogBatch``."""
+        await self._request("POST", "/api/v1/jobs/logs", content=body, headers={"Content-Encoding": "gzip"})
+
+    async def begin_artifact(self, job_id: str, manifest: ArtifactManifest) -> ArtifactUpload:
+        """Send an artifact's manifest; the answer lists the chunks the master still needs."""
+        response = await self._request(
+            "POST", f"/api/v1/jobs/{job_id}/artifacts", content=manifest.model_dump_json()
+        )
+        return ArtifactUpload.model_validate_json(response.content)
+
+    async def put_chunk(self, digest: str, data: bytes) -> None:
+        await self._request(
+            "PUT", f"/api/v1/artifacts/chunks/{digest}", content=data,
+            headers={"Content-Type": "application/octet-stream"},
+        )
+
+    async def complete_artifact(self, job_id: str, name: str) -> Artifact:
+        response = await self._request("POST", f"/api/v1/jobs/{job_id}/artifacts/{quote(name)}/complete")
+        return Artifact.model_validate_json(response.content)
+
+    def artifact_chunk_stream(self, digest: str) -> AsyncContextManager[httpx.Response]:
+        """Streaming download of one artifact (or checkpoint) chunk."""
+        return self.http.stream("GET", f"/api/v1/artifacts/chunks/{digest}")
+
+    async def commit_checkpoint(self, job_id: str, checkpoint: Checkpoint) -> None:
+        """Make an uploaded checkpoint the one the job resumes from."""
+        await self._request("PUT", f"/api/v1/jobs/{job_id}/checkpoint", content=checkpoint.model_dump_json())
+
+    async def join_rendezvous(self, job_id: str, join: RendezvousJoin) -> Rendezvous:
+        """Reach the barrier of a distributed job's rank."""
+        response = await self._request("POST", f"/api/v1/jobs/{job_id}/rendezvous", content=join.model_dump_json())
+        return Rendezvous.model_validate_json(response.content)
+
+    async def get_rendezvous(self, job_id: str) -> Rendezvous:
+        response = await self._request("GET", f"/api/v1/jobs/{job_id}/rendezvous")
+        return Rendezvous.model_validate_json(response.content)
+
+    async def report_metrics(self, job_id: str, report: MetricsReport) -> None:
+        await self._request("POST", f"/api/v1/jobs/{job_id}/metrics", content=report.model_dump_json())
+
+    async def get_dataset(self, name: str) -> Dataset:
+        response = await self._request("GET", f"/api/v1/datasets/{quote(name)}")
+        return Dataset.model_validate_json(response.content)
+
+    async def dataset_manifest(self, name: str, shard_index: int = 0, num_shards: int = 1) -> DatasetManifest:
+        response = await self._request(
+            "GET", f"/api/v1/datasets/{quote(name)}/manifest",
+            params={"shard_index": shard_index, "num_shards": num_shards},
+        )
+        return DatasetManifest.model_validate_json(response.content)
+
+    def chunk_stream(self, digest: str) -> AsyncContextManager[httpx.Response]:
+        """Streaming download of one dataset chunk from the master."""
+        return self.http.stream("GET", f"/api/v1/datasets/chunks/{digest}")
+
+    async def locate_chunks(self, request: SwarmLocate) -> Dict[str, ChunkSources]:
+        response = await self._request("POST", "/api/v1/swarm/locate", content=request.model_dump_json())
+        return {digest: ChunkSources(**sources) for digest, sources in response.json().items()}
+
+    async def announce_chunks(self, announce: SwarmAnnounce) -> None:
+        await self._request("POST", "/api/v1/swarm/announce", content=announce.model_dump_json())
+
+    async def lease_tasks(self, request: TaskLease) -> TaskLeaseResponse:
+        """Take tasks, waiting up to ``request.wait_seconds`` on the master for them."""
+        response = await self._request(
+            "POST", "/api/v1/tasks/lease", content=request.model_dump_json(),
+            timeout=self.http.timeout.read + request.wait_seconds,
+        )
+        return TaskLeaseResponse.model_validate_json(response.content)
+
+    async def report_task_results(self, results: TaskResults) -> None:
+        await self._request("POST", "/api/v1/tasks/results", content=results.model_dump_json(exclude_none=True))
@@ -0,0 +1,360 @@
+"""Job Executor - runs assigned jobs as local subprocesses.
+
+Up to ``max_concurrent_jobs`` jobs run at once, each as an asyncio
+subprocess in its own session (so the whole process tree can be signalled)
+and its own working directory under ``work_dir``.
+
+Every job is pinned to a set of cores sized from
+``ResourceRequirements.cpu`` (rounded up). ``CoreAllocator`` hands out
+disjoint sets while enough cores are free and otherwise shares the least
+used ones. The affinity is applied in the child before ``exec``, so all
+threads and subprocesses of the job inherit it. ``OMP_NUM_THREADS``,
+``MKL_NUM_THREADS`` and friends are set to the number of pinned cores so
+numpy, sklearn and torch size their thread pools to the job rather than to
+the machine.
+
+stdout and stderr are read line by line by reader tasks on the event loop
+and passed to ``on_output``; the last ``tail_lines`` lines are kept for the
+final job update.
+
+Inputs listed in ``JobSpec.volumes`` are placed into the working directory
+at their ``mountPath`` (relative to it) from the ``ArtifactCache`` before the
+job starts.
+
+With a ``ForkServer``, Python jobs that match a warm template are forked
+from it instead of being started cold; everything above applies either way.
+
+``cancel`` and ``stop`` both send SIGTERM to the job's process group and
+SIGKILL after ``kill_grace_seconds``; a job that has no process yet
+(waiting for a slot, or staging its inputs) is not started. A stopped job is meant to resume
+elsewhere: it is told its deadline (``CLUSTERML_STOP_GRACE_SECONDS``) and
+where to keep its checkpoint (``CLUSTERML_CHECKPOINT_DIR``), see
+``worker.app.checkpoints``.
+
+Intermediate metrics go to the file named by ``CLUSTERML_METRICS_FILE``,
+see ``worker.app.progress``.
+
+A rank of a distributed job also gets the ``torch.distributed`` variables
+of its ``Rendezvous`` (``MASTER_ADDR``, ``RANK``, ...), see
+``worker.app.rendezvous``.
+"""
+
+import asyncio
+import logging
+import math
+import os
+import signal
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Sequence, Set
+
+from core.protocols.models import JobAssignment
+from core.utils.resources import parse_cpu
+from worker.app.cache import ArtifactCache, CacheError
+from worker.app.forkserver import ForkServer
+from worker.app.rendezvous import environment as rendezvous_environment
+
+logger = logging.getLogger(__name__)
+
+# Thread-pool sizes read by OpenMP, MKL, OpenBLAS, numexpr, Accelerate and torch
+THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+)
+
+OutputCallback = Callable[[str, str, str], Optional[Awaitable[None]]]
+StartCallback = Callable[[str, int], Optional[Awaitable[None]]]
+
+
+def _available_cores() -> List[int]:
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        return list(range(os.cpu_count() or 1))
+
+
+class CoreAllocator:
+    """Assigns CPU cores to jobs, disjoint while enough cores are free."""
+
+    def __init__(self, cores: Optional[Sequence[int]] = None):
+        self.cores = list(cores) if cores is not None else _available_cores()
+        self._users: Dict[int, int] = {core: 0 for core in self.cores}
+
+    def allocate(self, count: int) -> List[int]:
+        """Reserve ``count`` cores (at most all of them), least used first."""
+        count = max(1, min(count, len(self.cores)))
+        chosen = sorted(self.cores, key=lambda core: self._users[core])[:count]
+        for core in chosen:
+            self._users[core] += 1
+        return sorted(chosen)
+
+    def release(self, cores: Sequence[int]) -> None:
+        for core in cores:
+            self._users[core] -= 1
+
+    def free(self) -> int:
+        return sum(1 for users in self._users.values() if users == 0)
+
+
+@dataclass
+class JobResult:
+    """Outcome of one job run."""
+    exit_code: int
+    logs: str
+    cores: List[int]
+    cancelled: bool = False
+    stopped: bool = False
+    error: Optional[str] = None
+
+
+class JobExecutor:
+    """Runs jobs as pinned subprocesses, at most ``max_concurrent_jobs`` at a time."""
+
+    def __init__(
+        self,
+        max_concurrent_jobs: int = 2,
+        work_dir: str = "/tmp/clusterml/jobs",
+        on_output: Optional[OutputCallback] = None,
+        cores: Optional[Sequence[int]] = None,
+        tail_lines: int = 200,
+        kill_grace_seconds: float = 10.0,
+        fork_server: Optional[ForkServer] = None,
+        cache: Optional[ArtifactCache] = None,
+    ):
+        self.max_concurrent_jobs = max_concurrent_jobs
+        self.work_dir = work_dir
+        self.on_output = on_output
+        self.allocator = CoreAllocator(cores)
+        self.tail_lines = tail_lines
+        self.kill_grace_seconds = kill_grace_seconds
+        self.fork_server = fork_server
+        self.cache = cache
+        self._slots = asyncio.Semaphore(max_concurrent_jobs)
+        self._processes: Dict[str, asyncio.subprocess.Process] = {}
+        self._waiting: Set[str] = set()
+        self._starting: Set[str] = set()  # have a slot, inputs staging or process spawning
+        self._terminations: Set[asyncio.Task] = set()
+        self._cancelled: Set[str] = set()
+        self._stopped: Set[str] = set()
+
+    def job_dir(self, job_id: str) -> str:
+        """Working directory of a job (its outputs are collected from here)."""
+        return os.path.join(self.work_dir, job_id)
+
+    def checkpoint_dir(self, job_id: str) -> str:
+        """Where a job keeps the checkpoint it resumes from after a requeue."""
+        return os.path.join(self.job_dir(job_id), ".checkpoint")
+
+    def metrics_file(self, job_id: str) -> str:
+        """Where a job appends its intermediate metrics, one JSON object per line."""
+        return os.path.join(self.job_dir(job_id), ".metrics.jsonl")
+
+    def pids(self) -> Dict[str, int]:
+        """Root pid of every running job."""
+        return {job_id: proc.pid for job_id, proc in self._processes.items()}
+
+    def environment(self, assignment: JobAssignment, cores: Sequence[int]) -> Dict[str, str]:
+        """Environment of a job: the worker's, the spec's, then thread limits and job metadata."""
+        env = dict(os.environ)
+        env.update({var.name: var.value for var in assignment.spec.env})
+        for name in THREAD_ENV_VARS:
+            env[name] = str(len(cores))
+        env["CLUSTERML_JOB_ID"] = assignment.job_id
+        env["CLUSTERML_CPU_CORES"] = ",".join(map(str, cores))
+        env["CLUSTERML_CHECKPOINT_DIR"] = self.checkpoint_dir(assignment.job_id)
+        env["CLUSTERML_STOP_GRACE_SECONDS"] = f"{self.kill_grace_seconds:g}"
+        env["CLUSTERML_METRICS_FILE"] = self.metrics_file(assignment.job_id)
+        if assignment.rendezvous is not None:
+            env.update(rendezvous_environment(assignment.rendezvous))
+        return env
+
+    @staticmethod
+    def cores_for(assignment: JobAssignment) -> int:
+        return max(1, math.ceil(parse_cpu(assignment.spec.resources.cpu)))
+
+    async def run(self, assignment: JobAssignment, on_start: Optional[StartCallback] = None) -> JobResult:
+        """Run a job to completion, waiting for a free slot first.
+
+        ``on_start(job_id, pid)`` is called once the process has been spawned.
+        """
+        self._waiting.add(assignment.job_id)
+        try:
+            async with self._slots:
+                self._waiting.discard(assignment.job_id)
+                self._starting.add(assignment.job_id)
+                return await self._run(assignment, on_start)
+        finally:
+            self._waiting.discard(assignment.job_id)
+            self._starting.discard(assignment.job_id)
+
+    async def _run(self, assignment: JobAssignment, on_start: Optional[StartCallback]) -> JobResult:
+        job_id = assignment.job_id
+        argv = list(assignment.spec.command) + list(assignment.spec.args)
+        if not argv:
+            return JobResult(exit_code=-1, logs="", cores=[], error="Job spec has no command")
+        skipped = self._skipped(job_id)
+        if skipped is not None:
+            return skipped
+
+        cwd = self.job_dir(job_id)
+        os.makedirs(cwd, exist_ok=True)
+        try:
+            await self.stage_inputs(assignment, cwd)
+        except (CacheError, OSError) as e:
+            logger.error(f"Job {job_id} inputs could not be staged: {e}")
+            return JobResult(exit_code=-1, logs="", cores=[], error=f"Failed to stage inputs: {e}")
+        # Cancelled or stopped while its inputs were staging
+        skipped = self._skipped(job_id)
+        if skipped is not None:
+            return skipped
+        cores = self.allocator.allocate(self.cores_for(assignment))
+        tail: Deque[str] = deque(maxlen=self.tail_lines)
+        env = self.environment(assignment, cores)
+        proc = None
+        try:
+            try:
+                proc, how = await self._start(argv, env, cwd, cores)
+            except OSError as e:
+                logger.error(f"Job {job_id} failed to start: {e}")
+                return JobResult(exit_code=-1, logs="", cores=cores, error=f"Failed to start: {e}")
+
+            self._processes[job_id] = proc
+            self._starting.discard(job_id)
+            for marks in (self._cancelled, self._stopped):
+                if job_id in marks:
+                    # Cancelled or stopped while the process was being spawned
+                    task = asyncio.ensure_future(self._terminate(job_id, marks))
+                    self._terminations.add(task)
+                    task.add_done_callback(self._terminations.discard)
+                    break
+            logger.info(f"Job {job_id} started as pid {proc.pid} on cores {cores} ({how})")
+            if on_start is not None:
+                result = on_start(job_id, proc.pid)
+                if result is not None:
+                    await result
+            await asyncio.gather(
+                self._pump(job_id, "stdout", proc.stdout, tail),
+                self._pump(job_id, "stderr", proc.stderr, tail),
+            )
+            exit_code = await proc.wait()
+        finally:
+            if proc is not None and proc.returncode is None:
+                # The caller was cancelled mid-run: don't leave the job behind
+                _signal_group(proc.pid, signal.SIGKILL)
+            self._processes.pop(job_id, None)
+            self.allocator.release(cores)
+
+        cancelled = job_id in self._cancelled
+        stopped = job_id in self._stopped and not cancelled
+        self._cancelled.discard(job_id)
+        self._stopped.discard(job_id)
+        logger.info(f"Job {job_id} exited with code {exit_code}")
+        return JobResult(
+            exit_code=exit_code, logs="".join(tail), cores=cores, cancelled=cancelled, stopped=stopped
+        )
+
+    def _skipped(self, job_id: str) -> Optional[JobResult]:
+        """Result of a job cancelled or stopped before its process was spawned, if it was."""
+        if job_id in self._cancelled:
+            self._cancelled.discard(job_id)
+            return JobResult(exit_code=-1, logs="", cores=[], cancelled=True)
+        if job_id in self._stopped:
+            self._stopped.discard(job_id)
+            return JobResult(exit_code=-1, logs="", cores=[], stopped=True)
+        return None
+
+    async def stage_inputs(self, assignment: JobAssignment, cwd: str) -> None:
+        """Link every volume's source into the job directory at its mount path."""
+        if not assignment.spec.volumes:
+            return
+        if self.cache is None:
+            raise CacheError("job has volumes but the worker has no artifact cache")
+        for volume in assignment.spec.volumes:
+            dest = os.path.normpath(os.path.join(cwd, volume.mount_path.lstrip("/")))
+            if os.path.commonpath([dest, cwd]) != cwd or dest == cwd:
+                raise CacheError(f"mountPath {volume.mount_path!r} of {volume.name} leaves the job directory")
+            await self.cache.materialize(volume.source, dest)
+
+    async def _start(self, argv: List[str], env: Dict[str, str], cwd: str, cores: List[int]):
+        """Fork from a warm template when one matches, else spawn a new process."""
+        match = self.fork_server.match(argv, env, cwd) if self.fork_server is not None else None
+        if match is not None:
+            name, command = match
+            try:
+                return await self.fork_server.spawn(name, command, env, cwd, cores), f"forked from {name}"
+            except OSError as e:
+                logger.warning(f"Fork from template {name} failed ({e}), starting cold")
+        proc = await asyncio.create_subprocess_exec(
+            *argv,
+            cwd=cwd,
+            env=env,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=True,
+            preexec_fn=_pin(cores),
+        )
+        return proc, "cold start"
+
+    async def _pump(self, job_id: str, stream: str, reader: asyncio.StreamReader, tail: Deque[str]) -> None:
+        while True:
+            try:
+                raw = await reader.readline()
+            except ValueError:
+                # Line longer than the stream limit; asyncio has dropped it
+                raw = b"[clusterml: line too long, dropped]\n"
+            if not raw:
+                return
+            line = raw.decode(errors="replace")
+            tail.append(line)
+            if self.on_output is not None:
+                result = self.on_output(job_id, stream, line)
+                if result is not None:
+                    await result
+
+    async def cancel(self, job_id: str) -> bool:
+        """Terminate a job's process group, killing it after the grace period."""
+        return await self._terminate(job_id, self._cancelled)
+
+    async def stop(self, job_id: str) -> bool:
+        """Like ``cancel``, but the job's result is ``stopped``: it is to resume from its checkpoint."""
+        if job_id in self._stopped:
+            return True  # already stopping
+        return await self._terminate(job_id, self._stopped)
+
+    async def _terminate(self, job_id: str, marks: Set[str]) -> bool:
+        proc = self._processes.get(job_id)
+        if proc is None:
+            if job_id not in self._waiting and job_id not in self._starting:
+                return False
+            marks.add(job_id)  # skipped before its process is spawned
+            return True
+        marks.add(job_id)
+        _signal_group(proc.pid, signal.SIGTERM)
+        try:
+            await asyncio.wait_for(proc.wait(), timeout=self.kill_grace_seconds)
+        except asyncio.TimeoutError:
+            _signal_group(proc.pid, signal.SIGKILL)
+        return True
+
+    async def shutdown(self) -> None:
+        """Stop every running or waiting job, so each can be requeued."""
+        jobs = list(self._processes) + list(self._starting) + list(self._waiting)
+        await asyncio.gather(*(self.stop(job_id) for job_id in jobs))
+
+
+def _pin(cores: Sequence[int]) -> Optional[Callable[[], None]]:
+    if not hasattr(os, "sched_setaffinity"):
+        return None
+    core_set = set(cores)
+    return lambda: os.sched_setaffinity(0, core_set)
+
+
+def _signal_group(pid: int, sig: int) -> None:
+    try:
+        os.killpg(pid, sig)
+    except ProcessLookupError:
+        pass
@@ -0,0 +1,296 @@
+"""Fork Server - pre-warmed template interpreters for fast Python job startup.
+
+Importing numpy, sklearn or torch often takes longer than a short job runs.
+``ForkServer`` keeps one template interpreter per configured module set
+(``template.py``), each with its modules already imported. A Python job
+whose command is ``python script.py``, ``python -m module`` or
+``python -c code`` is forked from the best matching template instead of
+being started cold, so it begins running in milliseconds with those modules
+in ``sys.modules``.
+
+Templates are matched by the job's imports (top-level ``import`` statements
+of the script or code, read with ``ast``) against each template's preload
+list; the template covering most of them wins. A template with an empty
+preload list matches any Python job. Setting ``CLUSTERML_TEMPLATE`` in the
+job's env picks a template by name, or ``none`` forces a cold start.
+
+Anything else (other commands, unknown interpreter flags, a template that is
+still starting or has died) falls back to an ordinary subprocess.
+"""
+
+import ast
+import asyncio
+import json
+import logging
+import os
+import shutil
+import socket
+import sys
+import tempfile
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+_TEMPLATE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "template.py")
+
+# Interpreter flags a forked job can honour; anything else starts cold
+_SUPPORTED_FLAGS = {"-u", "-B"}
+
+
+def parse_templates(value: str) -> Dict[str, List[str]]:
+    """Parse ``sklearn=numpy,sklearn.ensemble;torch=torch`` into name -> modules."""
+    templates: Dict[str, List[str]] = {}
+    for item in filter(None, (part.strip() for part in value.split(";"))):
+        name, _, modules = item.partition("=")
+        templates[name.strip()] = [m.strip() for m in modules.split(",") if m.strip()]
+    return templates
+
+
+@dataclass
+class PythonCommand:
+    """A ``python ...`` job command broken into what the template needs."""
+    kind: str  # "script", "module" or "code"
+    target: str
+    args: List[str]
+    unbuffered: bool = False
+
+
+def _is_python(executable: str) -> bool:
+    if executable == sys.executable:
+        return True
+    name = os.path.basename(executable)
+    return name in ("python", "python3", f"python{sys.version_info.major}.{sys.version_info.minor}")
+
+
+def parse_python_command(argv: Sequence[str]) -> Optional[PythonCommand]:
+    """Recognise ``python [-u] (script | -m module | -c code) args...``."""
+    if not argv or not _is_python(argv[0]):
+        return None
+    unbuffered = False
+    i = 1
+    while i < len(argv) and argv[i].startswith("-") and argv[i] not in ("-m", "-c"):
+        if argv[i] not in _SUPPORTED_FLAGS:
+            return None
+        unbuffered = unbuffered or argv[i] == "-u"
+        i += 1
+    if i >= len(argv):
+        return None  # interactive interpreter
+    if argv[i] in ("-m", "-c"):
+        if i + 1 >= len(argv):
+            return None
+        kind = "module" if argv[i] == "-m" else "code"
+        return PythonCommand(kind, argv[i + 1], list(argv[i + 2 :]), unbuffered)
+    return PythonCommand("script", argv[i], list(argv[i + 1 :]), unbuffered)
+
+
+_import_cache: Dict[Tuple[str, float], Set[str]] = {}
+
+
+def _imports_of_source(source: str) -> Set[str]:
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return set()
+    names: Set[str] = set()
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+            names.add(node.module.split(".")[0])
+    return names
+
+
+def job_imports(command: PythonCommand, cwd: str) -> Set[str]:
+    """Top-level packages a job imports at module level (best effort)."""
+    if command.kind == "code":
+        return _imports_of_source(command.target)
+    if command.kind == "module":
+        return {command.target.split(".")[0]}
+    path = os.path.join(cwd, command.target)
+    try:
+        key = (path, os.stat(path).st_mtime)
+    except OSError:
+        return set()
+    names = _import_cache.get(key)
+    if names is None:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            names = _import_cache[key] = _imports_of_source(f.read())
+    return names
+
+
+class ForkedProcess:
+    """A job forked by a template; quacks like ``asyncio.subprocess.Process``."""
+
+    def __init__(self, pid: int, conn: socket.socket, stdout: asyncio.StreamReader, stderr: asyncio.StreamReader):
+        self.pid = pid
+        self.stdout = stdout
+        self.stderr = stderr
+        self.returncode: Optional[int] = None
+        self._conn = conn
+        self._done = asyncio.ensure_future(self._wait_exit())
+
+    async def _wait_exit(self) -> int:
+        loop = asyncio.get_running_loop()
+        try:
+            data = await loop.sock_recv(self._conn, 4096)
+        finally:
+            self._conn.close()
+        if data:
+            self.returncode = json.loads(data)["exit_code"]
+        else:
+            logger.warning(f"Template exited before job pid {self.pid}; exit code unknown")
+            self.returncode = -1
+        return self.returncode
+
+    async def wait(self) -> int:
+        return await asyncio.shield(self._done)
+
+
+class _Template:
+    def __init__(self, name: str, preload: List[str]):
+        self.name = name
+        self.preload = preload
+        self.packages = {m.split(".")[0] for m in preload}
+        self.socket_path = ""
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.ready = False
+
+    @property
+    def alive(self) -> bool:
+        return self.ready and self.process is not None and self.process.returncode is None
+
+
+class ForkServer:
+    """Starts template interpreters and forks Python jobs from them."""
+
+    def __init__(
+        self,
+        templates: Dict[str, List[str]],
+        python: str = sys.executable,
+        start_timeout_seconds: float = 120.0,
+    ):
+        self.python = python
+        self.start_timeout_seconds = start_timeout_seconds
+        self.templates = {name: _Template(name, modules) for name, modules in templates.items()}
+        self._dir: Optional[str] = None
+
+    async def start(self) -> None:
+        """Start every template and wait until each is ready (or failed)."""
+        if self._dir is None:
+            self._dir = tempfile.mkdtemp(prefix="clusterml-forkserver-")
+        await asyncio.gather(*(self._start(t) for t in self.templates.values()))
+
+    async def _start(self, template: _Template) -> None:
+        template.ready = False
+        template.socket_path = os.path.join(self._dir, f"{template.name}.sock")
+        if os.path.exists(template.socket_path):
+            os.unlink(template.socket_path)
+        env = dict(os.environ)
+        # Native thread pools are sized at import; keep the template's at one
+        # thread and let each job resize its own after the fork
+        env.update(OMP_NUM_THREADS="1", MKL_NUM_THREADS="1", OPENBLAS_NUM_THREADS="1")
+        template.process = await asyncio.create_subprocess_exec(
+            self.python, _TEMPLATE_SCRIPT, "--socket", template.socket_path, "--preload", ",".join(template.preload),
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            env=env,
+        )
+        try:
+            line = await asyncio.wait_for(template.process.stdout.readline(), self.start_timeout_seconds)
+        except asyncio.TimeoutError:
+            line = b""
+        if line.strip() != b"ready":
+            logger.error(f"Fork-server template {template.name} failed to start (preload {template.preload})")
+            if template.process.returncode is None:
+                template.process.kill()
+            await template.process.wait()
+            return
+        template.ready = True
+        logger.info(f"Fork-server template {template.name} ready (preloaded {template.preload})")
+
+    def match(self, argv: Sequence[str], env: Dict[str, str], cwd: str) -> Optional[Tuple[str, PythonCommand]]:
+        """Template to fork ``argv`` from, or None to start it cold."""
+        command = parse_python_command(argv)
+        if command is None:
+            return None
+        requested = env.get("CLUSTERML_TEMPLATE")
+        if requested:
+            template = self.templates.get(requested)
+            return (requested, command) if template is not None and template.alive else None
+
+        imports = job_imports(command, cwd)
+        best: Optional[_Template] = None
+        best_score = 0
+        for template in self.templates.values():
+            if not template.alive:
+                continue
+            score = len(template.packages & imports)
+            if template.packages and score == 0:
+                continue
+            if best is None or score > best_score or (score == best_score and len(template.packages) < len(best.packages)):
+                best, best_score = template, score
+        return (best.name, command) if best is not None else None
+
+    async def spawn(
+        self,
+        name: str,
+        command: PythonCommand,
+        env: Dict[str, str],
+        cwd: str,
+        cores: Sequence[int] = (),
+    ) -> ForkedProcess:
+        """Fork a job from template ``name``; raises ``OSError`` if the template is unreachable."""
+        template = self.templates[name]
+        loop = asyncio.get_running_loop()
+        request = {
+            "kind": command.kind,
+            "target": command.target,
+            "args": command.args,
+            "unbuffered": command.unbuffered,
+            "env": env,
+            "cwd": cwd,
+            "cores": list(cores),
+        }
+        out_r, out_w = os.pipe()
+        err_r, err_w = os.pipe()
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        try:
+            try:
+                conn.connect(template.socket_path)
+                socket.send_fds(conn, [json.dumps(request).encode()], [out_w, err_w])
+            finally:
+                os.close(out_w)
+                os.close(err_w)
+            conn.setblocking(False)
+            reply = await loop.sock_recv(conn, 4096)
+            if not reply:
+                raise ConnectionResetError(f"template {name} closed the connection")
+        except OSError:
+            conn.close()
+            os.close(out_r)
+            os.close(err_r)
+            template.ready = False
+            logger.warning(f"Fork-server template {name} is unreachable, restarting it")
+            asyncio.ensure_future(self._start(template))
+            raise
+
+        stdout = await _reader(loop, out_r)
+        stderr = await _reader(loop, err_r)
+        return ForkedProcess(json.loads(reply)["pid"], conn, stdout, stderr)
+
+    async def stop(self) -> None:
+        for template in self.templates.values():
+            template.ready = False
+            if template.process is not None and template.process.returncode is None:
+                template.process.terminate()
+                await template.process.wait()
+        if self._dir is not None:
+            shutil.rmtree(self._dir, ignore_errors=True)
+            self._dir = None
+
+
+async def _reader(loop: asyncio.AbstractEventLoop, fd: int) -> asyncio.StreamReader:
+    reader = asyncio.StreamReader()
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), os.fdopen(fd, "rb", 0))
+    return reader
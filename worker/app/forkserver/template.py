@@ -0,0 +1,183 @@
+"""Template interpreter of the fork server.
+
+Run as ``python worker/app/forkserver/template.py --socket PATH --preload
+numpy,sklearn`` (as a script, so no ClusterML package is imported into the
+template). It imports the preload modules once, prints ``ready`` and
+then serves fork requests on a Unix ``SOCK_SEQPACKET`` socket. Each
+connection carries one job:
+
+    worker   -> template   JSON request + (stdout, stderr) fds via SCM_RIGHTS
+    template -> worker     {"pid": 1234}
+    template -> worker     {"exit_code": 0}        when the job exits
+
+The job runs in a forked child, so it starts with every preloaded module
+already imported. The template is single threaded (a selector over the
+listening socket and a SIGCHLD wakeup pipe), which keeps ``fork`` safe.
+
+Only the standard library is imported here, before the preload modules.
+"""
+
+import argparse
+import contextlib
+import importlib
+import json
+import os
+import runpy
+import selectors
+import signal
+import socket
+import sys
+import traceback
+from typing import Dict, List, Optional
+
+_MAX_REQUEST = 1 << 20
+
+
+def _limit_threads(count: int) -> None:
+    """Resize thread pools of preloaded native libraries (env vars are read too early)."""
+    if "threadpoolctl" in sys.modules or "numpy" in sys.modules:
+        try:
+            from threadpoolctl import threadpool_limits
+
+            threadpool_limits(count)
+        except ImportError:
+            pass
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(count)
+
+
+def _run_job(request: Dict, stdout_fd: int, stderr_fd: int) -> int:
+    """Body of the forked child; returns the exit code."""
+    os.setsid()
+    if request.get("cores") and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, set(request["cores"]))
+    os.chdir(request["cwd"])
+    os.environ.clear()
+    os.environ.update(request["env"])
+
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    os.dup2(stdout_fd, 1)
+    os.dup2(stderr_fd, 2)
+    for fd in (devnull, stdout_fd, stderr_fd):
+        os.close(fd)
+    if request.get("unbuffered") or request["env"].get("PYTHONUNBUFFERED"):
+        sys.stdout.reconfigure(write_through=True)
+        sys.stderr.reconfigure(write_through=True)
+    if request.get("cores"):
+        _limit_threads(len(request["cores"]))
+
+    kind, target = request["kind"], request["target"]
+    sys.argv = [target if kind != "code" else "-c"] + request["args"]
+    sys.path[0] = os.path.dirname(os.path.abspath(target)) if kind == "script" else os.getcwd()
+    try:
+        if kind == "script":
+            runpy.run_path(target, run_name="__main__")
+        elif kind == "module":
+            runpy.run_module(target, run_name="__main__", alter_sys=True)
+        else:
+            exec(compile(target, "<string>", "exec"), {"__name__": "__main__", "__builtins__": __builtins__})
+        code = 0
+    except SystemExit as e:
+        if e.code is None:
+            code = 0
+        elif isinstance(e.code, int):
+            code = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            code = 1
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    for stream in (sys.stdout, sys.stderr):
+        with contextlib.suppress(OSError, ValueError):  # closed, or the reader went away
+            stream.flush()
+    return code
+
+
+def serve(path: str) -> None:
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+    listener.bind(path)
+    listener.listen(64)
+    wake_r, wake_w = os.pipe()
+    os.set_blocking(wake_w, False)
+    signal.set_wakeup_fd(wake_w)
+    signal.signal(signal.SIGCHLD, lambda *_: None)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    selector = selectors.DefaultSelector()
+    selector.register(listener, selectors.EVENT_READ, "accept")
+    selector.register(wake_r, selectors.EVENT_READ, "child")
+    jobs: Dict[int, socket.socket] = {}
+
+    print("ready", flush=True)
+    while True:
+        for key, _ in selector.select():
+            if key.data == "child":
+                os.read(wake_r, 4096)
+                _reap(jobs)
+                continue
+            conn, _ = listener.accept()
+            try:
+                data, fds, _, _ = socket.recv_fds(conn, _MAX_REQUEST, 2)
+                request = json.loads(data)
+            except (OSError, ValueError):
+                conn.close()
+                continue
+            sys.stdout.flush()
+            sys.stderr.flush()
+            pid = os.fork()
+            if pid == 0:
+                code = 1
+                try:
+                    signal.set_wakeup_fd(-1)
+                    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                    selector.close()
+                    for fd in (listener.fileno(), wake_r, wake_w, conn.fileno()):
+                        os.close(fd)
+                    code = _run_job(request, *fds)
+                finally:
+                    os._exit(code)
+            for fd in fds:
+                os.close(fd)
+            jobs[pid] = conn
+            _send(conn, {"pid": pid})
+        # A SIGCHLD may have arrived while forking
+        _reap(jobs)
+
+
+def _reap(jobs: Dict[int, socket.socket]) -> None:
+    while jobs:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+        conn = jobs.pop(pid, None)
+        if conn is not None:
+            _send(conn, {"exit_code": os.waitstatus_to_exitcode(status)})
+            conn.close()
+
+
+def _send(conn: socket.socket, message: Dict) -> None:
+    try:
+        conn.send(json.dumps(message).encode())
+    except OSError:
+        pass  # the worker went away; the job keeps running
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="ClusterML fork-server template")
+    parser.add_argument("--socket", required=True)
+    parser.add_argument("--preload", default="")
+    args = parser.parse_args(argv)
+    for module in filter(None, args.preload.split(",")):
+        importlib.import_module(module)
+    serve(args.socket)
+
+
+if __name__ == "__main__":
+    main()
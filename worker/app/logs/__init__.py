@@ -0,0 +1,308 @@
+"""Log Shipper - batched, compressed delivery of job output to the master.
+
+``LogShipper.write`` is the executor's ``on_output`` callback. It only
+appends the line to the job's buffer; a background loop ships whatever is
+buffered every ``flush_seconds``, or sooner once ``flush_bytes`` have
+accumulated, as one gzip-compressed ``LogBatch`` covering all jobs, over
+the agent's pooled ``MasterClient`` connection. Each batch holds at most
+``batch_bytes`` of output; the jobs sent in one batch go to the back of the
+line for the next, so one chatty job cannot starve the others.
+
+Every chunk carries its offset in the job's output stream, so a batch that
+is retried after a timeout is not duplicated on the master, and output that
+had to be dropped shows up there as a marked gap.
+
+Memory is bounded by ``max_buffer_bytes``. When the master is slow or down
+and the buffer is full, new output is appended to a per-job spill file
+under ``spill_dir`` (up to ``max_spill_bytes`` in total) and shipped, in
+order, once the master catches up. Without a spill directory, or once the
+spill budget is used up, new lines are dropped and counted.
+
+A master that answers 404 to a batch does not take shipped output (it runs
+several processes, or predates log shipping): the shipper then stops
+buffering, and job logs are the tail sent with each job's final status.
+"""
+
+import asyncio
+import gzip
+import json
+import logging
+import os
+from collections import OrderedDict, deque
+from typing import Deque, List, Optional, Tuple
+
+import httpx
+
+from core.protocols.models import LogBatch, LogChunk
+from worker.app.client import Backoff, MasterClient
+
+logger = logging.getLogger(__name__)
+
+# Batches larger than this are compressed off the event loop
+_INLINE_COMPRESS_BYTES = 64 * 1024
+
+
+class _JobOutput:
+    __slots__ = ("pending", "written", "spill", "spill_path", "spill_pos", "finished")
+
+    def __init__(self) -> None:
+        self.pending: Deque[Tuple[int, str]] = deque()  # (offset, text), in memory
+        self.written = 0  # offset of the next character the job writes
+        self.spill = None  # binary file of JSON [offset, text] records, once spilling
+        self.spill_path = ""
+        self.spill_pos = 0  # read position in the spill file
+        self.finished = False
+
+    @property
+    def empty(self) -> bool:
+        return not self.pending and self.spill is None
+
+
+class LogShipper:
+    """Buffers job output per job and ships it to the master in compressed batches."""
+
+    def __init__(
+        self,
+        client: MasterClient,
+        flush_bytes: int = 256 * 1024,
+        flush_seconds: float = 1.0,
+        batch_bytes: int = 1024 * 1024,
+        max_buffer_bytes: int = 16 * 1024 * 1024,
+        spill_dir: Optional[str] = None,
+        max_spill_bytes: int = 1024 * 1024 * 1024,
+        compresslevel: int = 1,
+    ):
+        self.client = client
+        self.flush_bytes = flush_bytes
+        self.flush_seconds = flush_seconds
+        self.batch_bytes = batch_bytes
+        self.max_buffer_bytes = max_buffer_bytes
+        self.spill_dir = spill_dir
+        self.max_spill_bytes = max_spill_bytes
+        # Level 1 is several times faster than the default and shrinks
+        # typical training logs about 5x
+        self.compresslevel = compresslevel
+        self.worker_id: Optional[str] = None
+        self._jobs: "OrderedDict[str, _JobOutput]" = OrderedDict()
+        self._lock = asyncio.Lock()
+        self._wake = asyncio.Event()
+        self._stop = asyncio.Event()
+        self.buffered_bytes = 0
+        self.spilled_bytes = 0  # on disk and not yet shipped
+        self.lines_dropped = 0
+        self.bytes_dropped = 0
+        self.batches_sent = 0
+        self.bytes_sent = 0  # compressed, on the wire
+        self.raw_bytes_sent = 0
+        self.disabled = False  # the master does not take shipped output
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+            for name in os.listdir(spill_dir):  # left by a previous run; their jobs are gone
+                if name.endswith(".spill"):
+                    os.unlink(os.path.join(spill_dir, name))
+
+    # ── Producer side ───────────────────────────────────────────────────
+
+    def write(self, job_id: str, stream: str, line: str) -> None:
+        """Buffer one line of output (stdout and stderr are interleaved as written)."""
+        if self.disabled:
+            return
+        job = self._jobs.get(job_id)
+        if job is None:
+            job = self._jobs[job_id] = _JobOutput()
+        offset = job.written
+        job.written += len(line)
+
+        if job.spill is None and self.buffered_bytes + len(line) <= self.max_buffer_bytes:
+            job.pending.append((offset, line))
+            self.buffered_bytes += len(line)
+        elif not self._spill(job_id, job, offset, line):
+            # Dropped; the master sees the gap in offsets and marks it
+            self.lines_dropped += 1
+            self.bytes_dropped += len(line)
+        if self.buffered_bytes >= self.flush_bytes:
+            self._wake.set()
+
+    def _spill(self, job_id: str, job: _JobOutput, offset: int, line: str) -> bool:
+        if not self.spill_dir or self.spilled_bytes + len(line) > self.max_spill_bytes:
+            return False
+        try:
+            if job.spill is None:
+                job.spill_path = os.path.join(self.spill_dir, f"{job_id}.spill")
+                job.spill = open(job.spill_path, "w+b")  # noqa: SIM115 - open until _close_spill
+                job.spill_pos = 0
+                logger.warning(f"Log buffer full, spilling output of job {job_id} to {job.spill_path}")
+            job.spill.seek(0, os.SEEK_END)
+            job.spill.write(json.dumps([offset, line]).encode() + b"\n")
+        except OSError as e:
+            logger.error(f"Cannot spill output of job {job_id}: {e}")
+            return False
+        self.spilled_bytes += len(line)
+        return True
+
+    def _unspill(self, job: _JobOutput) -> None:
+        """Move the next ``flush_bytes`` of spilled output back into memory."""
+        job.spill.flush()
+        job.spill.seek(job.spill_pos)
+        loaded = 0
+        while loaded < self.flush_bytes:
+            record = job.spill.readline()
+            if not record:
+                break
+            offset, line = json.loads(record)
+            job.pending.append((offset, line))
+            loaded += len(line)
+        job.spill_pos = job.spill.tell()
+        self.buffered_bytes += loaded
+        self.spilled_bytes -= loaded
+        if job.spill_pos >= os.fstat(job.spill.fileno()).st_size:
+            self._close_spill(job)
+
+    @staticmethod
+    def _close_spill(job: _JobOutput) -> None:
+        job.spill.close()
+        job.spill = None
+        try:
+            os.unlink(job.spill_path)
+        except OSError:
+            pass
+
+    def finish(self, job_id: str) -> None:
+        """The job will write no more; forget it once its output is shipped."""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            job.finished = True
+            if job.empty:
+                del self._jobs[job_id]
+        self._wake.set()
+
+    @property
+    def has_pending(self) -> bool:
+        return any(not job.empty for job in self._jobs.values())
+
+    # ── Shipping ────────────────────────────────────────────────────────
+
+    def _collect(self) -> Tuple[List[LogChunk], List[Tuple[str, int]]]:
+        """Chunks for the next batch and, per job, how many buffered lines they cover."""
+        chunks: List[LogChunk] = []
+        taken: List[Tuple[str, int]] = []
+        size = 0
+        for job_id, job in self._jobs.items():
+            if size >= self.batch_bytes:
+                break
+            if not job.pending and job.spill is not None:
+                self._unspill(job)
+            count = 0
+            parts: List[str] = []
+            start = end = -1
+            for offset, line in job.pending:
+                if size >= self.batch_bytes:
+                    break
+                if offset != end:  # gap left by dropped output: start a new chunk
+                    if parts:
+                        chunks.append(LogChunk(job_id=job_id, offset=start, data="".join(parts)))
+                    parts, start = [], offset
+                parts.append(line)
+                end = offset + len(line)
+                size += len(line)
+                count += 1
+            if parts:
+                chunks.append(LogChunk(job_id=job_id, offset=start, data="".join(parts)))
+            if count:
+                taken.append((job_id, count))
+        return chunks, taken
+
+    def _commit(self, taken: List[Tuple[str, int]]) -> None:
+        """Forget lines the master has acknowledged."""
+        for job_id, count in taken:
+            job = self._jobs[job_id]
+            for _ in range(count):
+                _, line = job.pending.popleft()
+                self.buffered_bytes -= len(line)
+            if job.finished and job.empty:
+                del self._jobs[job_id]
+            else:
+                self._jobs.move_to_end(job_id)
+
+    async def _send_batch(self) -> bool:
+        """Ship one batch; False if the master could not be reached."""
+        chunks, taken = self._collect()
+        if not chunks:
+            return True
+        raw = LogBatch(worker_id=self.worker_id, chunks=chunks).model_dump_json().encode()
+        if len(raw) > _INLINE_COMPRESS_BYTES:
+            body = await asyncio.to_thread(gzip.compress, raw, self.compresslevel)
+        else:
+            body = gzip.compress(raw, self.compresslevel)
+        try:
+            await self.client.ship_logs(body)
+        except httpx.HTTPStatusError as e:
+            code = e.response.status_code
+            if code == 404:
+                logger.warning("The master does not take shipped job output; only final tails are reported")
+                self._disable()
+                return True
+            if code < 500 and code not in (408, 429):
+                # The master will never take this batch; do not let it block the rest
+                logger.error(f"Master rejected a log batch ({code}); dropping {len(raw)} bytes of output")
+                self._commit(taken)
+                return True
+            logger.warning(f"Shipping logs failed ({code})")
+            return False
+        except httpx.HTTPError as e:
+            logger.warning(f"Shipping logs failed ({e!r})")
+            return False
+        self._commit(taken)
+        self.batches_sent += 1
+        self.bytes_sent += len(body)
+        self.raw_bytes_sent += len(raw)
+        return True
+
+    def _disable(self) -> None:
+        """Stop shipping for good and drop everything buffered."""
+        self.disabled = True
+        for job in self._jobs.values():
+            if job.spill is not None:
+                self._close_spill(job)
+        self._jobs.clear()
+        self.buffered_bytes = 0
+        self.spilled_bytes = 0
+
+    async def flush(self) -> bool:
+        """Ship everything buffered now; False if the master could not be reached."""
+        async with self._lock:
+            while self.has_pending:
+                if not await self._send_batch():
+                    return False
+            return True
+
+    async def run(self) -> None:
+        """Ship batches until ``close``; backs off while the master is unreachable."""
+        backoff = Backoff(max_seconds=30.0)
+        while not self._stop.is_set():
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            if await self.flush():
+                backoff.reset()
+                continue
+            # Keep buffering (and spilling) instead of retrying on every wakeup
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=backoff.next_delay())
+            except asyncio.TimeoutError:
+                pass
+
+    async def close(self) -> None:
+        """Stop the loop after one last attempt to ship what is buffered."""
+        self._stop.set()
+        self._wake.set()
+        if not await self.flush():
+            logger.warning(f"Discarding {self.buffered_bytes + self.spilled_bytes} bytes of unshipped job output")
+        for job in self._jobs.values():
+            if job.spill is not None:
+                self._close_spill(job)
+        self._jobs.clear()
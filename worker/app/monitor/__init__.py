@@ -0,0 +1,403 @@
+"""Resource Monitor - cheap /proc and cgroup sampling for worker heartbeats.
+
+``ResourceSampler.sample()`` fills a ``ResourceInfo`` from kernel files
+kept open between samples and re-read with ``pread`` at offset 0, so a
+sample is a few syscalls and a few small parses, with no imports of psutil,
+torch or similar:
+
+* CPU usage is the delta of ``/proc/stat`` (or of the cgroup's
+  ``usage_usec`` when a CPU quota applies) since the previous sample.
+* Memory comes from ``/proc/meminfo`` (``MemTotal - MemAvailable``), or from
+  the cgroup when its memory limit is below the host's RAM.
+* Capacity honours CPU affinity and cgroup CPU quota / memory limits
+  (cgroup v2, with a v1 fallback), so a worker in a container reports what
+  it can actually use.
+* GPUs are probed on first use and cached: NVML via ``pynvml`` if it is
+  installed, else ``nvidia-smi`` (static info once, memory use at most every
+  ``gpu_refresh_seconds``), else none.
+
+``job_usage()`` reports CPU and RSS per running job, summed over each job's
+process tree.
+"""
+
+import logging
+import math
+import os
+import shutil
+import subprocess
+import time
+from typing import Dict, List, Optional, Tuple
+
+from core.protocols.models import JobResourceUsage, ResourceInfo
+
+logger = logging.getLogger(__name__)
+
+_CLK_TCK = os.sysconf("SC_CLK_TCK")
+_PAGE_MB = os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+_NO_LIMIT = 1 << 60  # cgroup v1 reports "no limit" as a huge number
+
+
+class _KernelFile:
+    """A /proc or /sys file kept open and re-read from offset 0."""
+
+    __slots__ = ("path", "size", "_fd")
+
+    def __init__(self, path: str, size: int = 4096):
+        self.path = path
+        self.size = size
+        self._fd: Optional[int] = None
+
+    def read(self) -> Optional[bytes]:
+        try:
+            if self._fd is None:
+                self._fd = os.open(self.path, os.O_RDONLY)
+            return os.pread(self._fd, self.size, 0)
+        except OSError:
+            self.close()
+            return None
+
+    def close(self) -> None:
+        if self._fd is not None:
+            try:
+                os.close(self._fd)
+            except OSError:
+                pass
+            self._fd = None
+
+
+def _field_kb(data: bytes, key: bytes) -> Optional[int]:
+    """Value of ``key:   123 kB`` in /proc/meminfo, in kB."""
+    start = data.find(key)
+    if start < 0:
+        return None
+    end = data.find(b"\n", start)
+    return int(data[start + len(key) : end].split()[0])
+
+
+def _cgroup_dirs(proc_root: str, cgroup_root: str) -> Tuple[Optional[str], Dict[str, str]]:
+    """Locate this process's cgroup: (v2 dir, {v1 controller: dir})."""
+    try:
+        with open(os.path.join(proc_root, "self", "cgroup")) as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None, {}
+    v2: Optional[str] = None
+    v1: Dict[str, str] = {}
+    for line in lines:
+        _, controllers, path = line.split(":", 2)
+        path = path.lstrip("/")
+        if controllers == "":
+            candidate = os.path.join(cgroup_root, path)
+            if os.path.exists(os.path.join(cgroup_root, "cgroup.controllers")):
+                # Inside a cgroup namespace the path may not exist: use the root
+                v2 = candidate if os.path.isdir(candidate) else cgroup_root
+        else:
+            for controller in controllers.split(","):
+                base = os.path.join(cgroup_root, controller)
+                candidate = os.path.join(base, path)
+                v1[controller] = candidate if os.path.isdir(candidate) else base
+    return v2, v1
+
+
+class _GpuProbe:
+    """Lazily detects GPUs once; afterwards only memory use is refreshed."""
+
+    def __init__(self, refresh_seconds: float = 30.0):
+        self.refresh_seconds = refresh_seconds
+        self._probed = False
+        self._nvml = None
+        self._handles: List = []
+        self._smi: Optional[str] = None
+        self.names: List[str] = []
+        self.memory_total_mb = 0
+        self.memory_used_mb = 0
+        self._refreshed_at = 0.0
+
+    def _probe(self) -> None:
+        self._probed = True
+        try:
+            import pynvml  # optional
+
+            pynvml.nvmlInit()
+            self._handles = [pynvml.nvmlDeviceGetHandleByIndex(i) for i in range(pynvml.nvmlDeviceGetCount())]
+            self.names = [_decode(pynvml.nvmlDeviceGetName(h)) for h in self._handles]
+            self.memory_total_mb = sum(pynvml.nvmlDeviceGetMemoryInfo(h).total for h in self._handles) // (1024 * 1024)
+            self._nvml = pynvml
+        except Exception:
+            self._smi = shutil.which("nvidia-smi")
+            if self._smi:
+                rows = self._query_smi("name,memory.total,memory.used")
+                self.names = [r[0] for r in rows]
+                self.memory_total_mb = sum(int(float(r[1])) for r in rows)
+                self.memory_used_mb = sum(int(float(r[2])) for r in rows)
+                self._refreshed_at = time.monotonic()
+        if self.names:
+            logger.info(f"Detected GPUs: {self.names}")
+
+    def _query_smi(self, fields: str) -> List[List[str]]:
+        try:
+            out = subprocess.run(
+                [self._smi, f"--query-gpu={fields}", "--format=csv,noheader,nounits"],
+                capture_output=True, text=True, timeout=5,
+            ).stdout
+        except (OSError, subprocess.SubprocessError):
+            return []
+        return [[c.strip() for c in line.split(",")] for line in out.splitlines() if line.strip()]
+
+    def refresh(self) -> None:
+        if not self._probed:
+            self._probe()
+        if self._nvml is not None:
+            self.memory_used_mb = sum(self._nvml.nvmlDeviceGetMemoryInfo(h).used for h in self._handles) // (1024 * 1024)
+        elif self._smi and time.monotonic() - self._refreshed_at >= self.refresh_seconds:
+            rows = self._query_smi("memory.used")
+            self.memory_used_mb = sum(int(float(r[0])) for r in rows)
+            self._refreshed_at = time.monotonic()
+
+
+def _decode(value) -> str:
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+class ResourceSampler:
+    """Samples node capacity and usage from /proc and cgroup files."""
+
+    def __init__(
+        self,
+        proc_root: str = "/proc",
+        cgroup_root: str = "/sys/fs/cgroup",
+        gpu: bool = True,
+        gpu_refresh_seconds: float = 30.0,
+    ):
+        self.proc_root = proc_root
+        self._stat = _KernelFile(os.path.join(proc_root, "stat"), size=256)  # first line only
+        self._meminfo = _KernelFile(os.path.join(proc_root, "meminfo"), size=512)
+        self._gpu = _GpuProbe(gpu_refresh_seconds) if gpu else None
+        self._prev_cpu: Optional[Tuple[int, int]] = None  # (busy, total) jiffies
+        self._prev_cgroup_cpu: Optional[Tuple[int, float]] = None  # (usage usec, monotonic)
+        self._prev_jobs: Dict[int, Tuple[int, float]] = {}  # pid -> (ticks, monotonic)
+        self._proc_files: Dict[Tuple[int, str], _KernelFile] = {}
+        self._children_supported: Optional[bool] = None
+
+        v2, v1 = _cgroup_dirs(proc_root, cgroup_root)
+        self.cpu_limit = self._read_cpu_limit(v2, v1)
+        self.memory_limit_mb = self._read_memory_limit(v2, v1)
+        self._cg_cpu_usage: Optional[_KernelFile] = None
+        self._cg_cpu_usage_v2 = False
+        if self.cpu_limit is not None:
+            if v2:
+                self._cg_cpu_usage, self._cg_cpu_usage_v2 = _KernelFile(os.path.join(v2, "cpu.stat"), 256), True
+            elif "cpuacct" in v1:
+                self._cg_cpu_usage = _KernelFile(os.path.join(v1["cpuacct"], "cpuacct.usage"), 64)
+        self._cg_memory: Optional[_KernelFile] = None
+        if self.memory_limit_mb is not None:
+            path = os.path.join(v2, "memory.current") if v2 else os.path.join(v1["memory"], "memory.usage_in_bytes")
+            self._cg_memory = _KernelFile(path, 64)
+
+        try:
+            affinity = len(os.sched_getaffinity(0))
+        except AttributeError:
+            affinity = os.cpu_count() or 1
+        self.cpu_cores = max(1, min(affinity, math.ceil(self.cpu_limit))) if self.cpu_limit else affinity
+
+    # ── Limits (read once) ──────────────────────────────────────────────
+
+    @staticmethod
+    def _read_text(path: str) -> Optional[str]:
+        try:
+            with open(path) as f:
+                return f.read().strip()
+        except OSError:
+            return None
+
+    def _read_cpu_limit(self, v2: Optional[str], v1: Dict[str, str]) -> Optional[float]:
+        """CPU quota in cores, or None when unlimited."""
+        if v2:
+            text = self._read_text(os.path.join(v2, "cpu.max"))
+            if text:
+                quota, _, period = text.partition(" ")
+                if quota != "max":
+                    return int(quota) / int(period or 100000)
+            return None
+        if "cpu" in v1:
+            quota = self._read_text(os.path.join(v1["cpu"], "cpu.cfs_quota_us"))
+            period = self._read_text(os.path.join(v1["cpu"], "cpu.cfs_period_us"))
+            if quota and period and int(quota) > 0:
+                return int(quota) / int(period)
+        return None
+
+    def _read_memory_limit(self, v2: Optional[str], v1: Dict[str, str]) -> Optional[int]:
+        """Memory limit in MB, or None when unlimited or not below host RAM."""
+        if v2:
+            text = self._read_text(os.path.join(v2, "memory.max"))
+        elif "memory" in v1:
+            text = self._read_text(os.path.join(v1["memory"], "memory.limit_in_bytes"))
+        else:
+            text = None
+        if not text or text == "max" or int(text) >= _NO_LIMIT:
+            return None
+        meminfo = self._meminfo.read()
+        host_kb = _field_kb(meminfo, b"MemTotal:") if meminfo else None
+        limit_mb = int(text) // (1024 * 1024)
+        if host_kb is not None and limit_mb >= host_kb // 1024:
+            return None
+        return limit_mb
+
+    # ── Sampling ────────────────────────────────────────────────────────
+
+    def _cpu_percent(self) -> float:
+        if self._cg_cpu_usage is not None:
+            data = self._cg_cpu_usage.read()
+            if data:
+                if self._cg_cpu_usage_v2:
+                    start = data.find(b"usage_usec")
+                    usage = int(data[start + 10 : data.find(b"\n", start)])
+                else:
+                    usage = int(data) // 1000  # ns -> us
+                now = time.monotonic()
+                prev, self._prev_cgroup_cpu = self._prev_cgroup_cpu, (usage, now)
+                if prev is None or now <= prev[1]:
+                    return 0.0
+                return min(100.0, (usage - prev[0]) / ((now - prev[1]) * 1e6 * self.cpu_limit) * 100)
+
+        data = self._stat.read()
+        if not data:
+            return 0.0
+        # cpu  user nice system idle iowait irq softirq steal guest guest_nice
+        fields = data[: data.find(b"\n")].split()
+        values = [int(v) for v in fields[1:9]]
+        total = sum(values)
+        busy = total - values[3] - values[4]
+        prev, self._prev_cpu = self._prev_cpu, (busy, total)
+        if prev is None or total <= prev[1]:
+            return 0.0
+        return (busy - prev[0]) / (total - prev[1]) * 100
+
+    def _memory_mb(self) -> Tuple[int, int]:
+        data = self._meminfo.read() or b""
+        total_kb = _field_kb(data, b"MemTotal:") or 0
+        available_kb = _field_kb(data, b"MemAvailable:")
+        if available_kb is None:
+            available_kb = _field_kb(data, b"MemFree:") or 0
+        total, used = total_kb // 1024, (total_kb - available_kb) // 1024
+        if self._cg_memory is not None:
+            current = self._cg_memory.read()
+            if current:
+                return self.memory_limit_mb, int(current) // (1024 * 1024)
+        return total, used
+
+    def sample(self) -> ResourceInfo:
+        """Current capacity and usage of this node.
+
+        The first call's CPU usage is 0; later calls report usage since the
+        previous call.
+        """
+        total_mb, used_mb = self._memory_mb()
+        gpu = self._gpu
+        if gpu is not None:
+            gpu.refresh()
+        return ResourceInfo(
+            cpu_cores=self.cpu_cores,
+            cpu_usage_percent=round(self._cpu_percent(), 1),
+            memory_total_mb=total_mb,
+            memory_used_mb=used_mb,
+            gpu_count=len(gpu.names) if gpu else 0,
+            gpu_names=list(gpu.names) if gpu else [],
+            gpu_memory_total_mb=gpu.memory_total_mb if gpu else 0,
+            gpu_memory_used_mb=gpu.memory_used_mb if gpu else 0,
+        )
+
+    # ── Per-job usage ───────────────────────────────────────────────────
+
+    def _proc_file(self, pid: int, name: str, size: int = 1024) -> _KernelFile:
+        key = (pid, name)
+        f = self._proc_files.get(key)
+        if f is None:
+            f = self._proc_files[key] = _KernelFile(os.path.join(self.proc_root, str(pid), name), size)
+        return f
+
+    def _children(self, pid: int) -> Optional[List[int]]:
+        """Direct children via /proc/<pid>/task/<pid>/children (None if unsupported)."""
+        if self._children_supported is False:
+            return None
+        data = self._proc_file(pid, f"task/{pid}/children").read()
+        if data is None:
+            if self._children_supported is None:
+                self._children_supported = os.path.exists(os.path.join(self.proc_root, "self", "task", str(os.getpid()), "children"))
+            return [] if self._children_supported else None
+        self._children_supported = True
+        return [int(c) for c in data.split()]
+
+    def _parent_map(self) -> Dict[int, List[int]]:
+        """ppid -> children for every process (fallback when `children` is unavailable)."""
+        tree: Dict[int, List[int]] = {}
+        for entry in os.scandir(self.proc_root):
+            if not entry.name.isdigit():
+                continue
+            try:
+                with open(os.path.join(entry.path, "stat"), "rb") as f:
+                    data = f.read()
+            except OSError:
+                continue
+            ppid = int(data[data.rfind(b")") + 2 :].split(None, 2)[1])
+            tree.setdefault(ppid, []).append(int(entry.name))
+        return tree
+
+    def _tree(self, root: int, parents: Optional[Dict[int, List[int]]]) -> List[int]:
+        pids, stack = [], [root]
+        while stack:
+            pid = stack.pop()
+            pids.append(pid)
+            children = parents.get(pid, []) if parents is not None else self._children(pid)
+            stack.extend(children or [])
+        return pids
+
+    def job_usage(self, job_pids: Dict[str, int]) -> Dict[str, JobResourceUsage]:
+        """CPU (% of one core, since the previous call) and RSS of each job's process tree."""
+        if not job_pids:
+            return {}
+        parents = None
+        if self._children_supported is not True:
+            first = next(iter(job_pids.values()))
+            if self._children(first) is None:
+                parents = self._parent_map()
+
+        now = time.monotonic()
+        seen = set()
+        usage: Dict[str, JobResourceUsage] = {}
+        for job_id, root in job_pids.items():
+            cpu = 0.0
+            rss_pages = 0
+            processes = 0
+            for pid in self._tree(root, parents):
+                stat = self._proc_file(pid, "stat").read()
+                statm = self._proc_file(pid, "statm", 128).read()
+                if not stat or not statm:
+                    continue
+                seen.add(pid)
+                processes += 1
+                # Fields after "(comm) ": state ppid ... utime(12th) stime(13th)
+                fields = stat[stat.rfind(b")") + 2 :].split(None, 14)
+                ticks = int(fields[11]) + int(fields[12])
+                prev = self._prev_jobs.get(pid)
+                self._prev_jobs[pid] = (ticks, now)
+                if prev is not None and now > prev[1]:
+                    cpu += (ticks - prev[0]) / _CLK_TCK / (now - prev[1]) * 100
+                rss_pages += int(statm.split(None, 2)[1])
+            usage[job_id] = JobResourceUsage(
+                cpu_percent=round(cpu, 1),
+                memory_rss_mb=int(rss_pages * _PAGE_MB),
+                processes=processes,
+            )
+
+        for key in [k for k in self._proc_files if k[0] not in seen]:
+            self._proc_files.pop(key).close()
+        for pid in [p for p in self._prev_jobs if p not in seen]:
+            del self._prev_jobs[pid]
+        return usage
+
+    def close(self) -> None:
+        for f in [self._stat, self._meminfo, self._cg_cpu_usage, self._cg_memory, *self._proc_files.values()]:
+            if f is not None:
+                f.close()
+        self._proc_files.clear()
@@ -0,0 +1,123 @@
+"""Outbox - durable, coalescing queue of job updates for the master.
+
+Status changes and results are recorded here before they are sent, so a
+master restart or a network outage delays them instead of losing them, and
+a worker restart replays them from disk.
+
+* At most one update is pending per job: a newer update is merged into the
+  pending one (its fields win), so after an outage the master receives only
+  each job's final state, not every intermediate step.
+* Every update gets a sequence number, larger than any before it, even
+  across restarts (it never falls behind the clock in microseconds). The
+  master ignores an update whose number is not above the last it applied
+  for the job, which makes replays and retries harmless.
+* The state lives in one small JSON file, rewritten atomically (temp file,
+  fsync, rename) on every change. Updates are rare (a few per job), so
+  this costs far less than the job itself. The write runs in a thread, so
+  the event loop never waits on the disk; writes never overlap, and one
+  that finds its change already written by a later one is skipped.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+from core.protocols.models import JobUpdate
+
+logger = logging.getLogger(__name__)
+
+
+class Outbox:
+    """Pending job updates, at most one per job, in sequence order."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.seq = 0
+        self._pending: Dict[str, JobUpdate] = {}
+        self._version = 0  # changes made
+        self._written = 0  # changes on disk
+        self._writing = asyncio.Lock()
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def __contains__(self, job_id: str) -> bool:
+        return job_id in self._pending
+
+    def job_ids(self) -> List[str]:
+        return list(self._pending)
+
+    async def put(self, job_id: str, update: JobUpdate) -> int:
+        """Queue ``update``, merged into any pending one for the job; returns its sequence number once saved."""
+        self.seq = seq = max(self.seq + 1, time.time_ns() // 1000)
+        previous = self._pending.get(job_id)
+        fields = update.model_dump(exclude_none=True)
+        fields["seq"] = seq
+        self._pending[job_id] = previous.model_copy(update=fields) if previous is not None else JobUpdate(**fields)
+        await self._save()
+        return seq
+
+    def pending(self) -> List[Tuple[str, JobUpdate]]:
+        """Updates to send, oldest first."""
+        return sorted(self._pending.items(), key=lambda item: item[1].seq)
+
+    async def ack(self, job_id: str, seq: int) -> bool:
+        """Forget the job's update if ``seq`` is still its latest; False if it changed meanwhile."""
+        update = self._pending.get(job_id)
+        if update is None or update.seq != seq:
+            return False
+        del self._pending[job_id]
+        await self._save()
+        return True
+
+    # ── Persistence ─────────────────────────────────────────────────────
+
+    def _load(self) -> None:
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.error(f"Cannot read outbox {self.path}, starting empty: {e}")
+            return
+        self.seq = state.get("seq", 0)
+        self._pending = {job_id: JobUpdate(**update) for job_id, update in state.get("pending", {}).items()}
+        if self._pending:
+            logger.info(f"Outbox holds {len(self._pending)} undelivered job updates")
+
+    async def _save(self) -> None:
+        if not self.path:
+            return
+        self._version += 1
+        version = self._version
+        async with self._writing:
+            if self._written >= version:
+                return  # a later write already holds this change
+            version = self._version
+            state = {
+                "seq": self.seq,
+                "pending": {job_id: u.model_dump(mode="json", exclude_none=True) for job_id, u in self._pending.items()},
+            }
+            await asyncio.to_thread(self._write, state)
+            self._written = version
+
+    def _write(self, state: Dict) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)), prefix=".outbox-")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(state, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
@@ -0,0 +1,97 @@
+"""Progress - intermediate metrics reported by running jobs.
+
+A job appends one JSON object per line to the file named by
+``CLUSTERML_METRICS_FILE``, e.g. ``{"step": 3, "accuracy": 0.91}``: an
+integer ``step`` (epoch, iteration, ...) and numeric values. While the job
+runs, its worker reads what was appended every ``interval_seconds`` and
+sends the new records to the master in one request
+(``POST /api/v1/jobs/{id}/metrics``); a last read follows the job's exit,
+before its final status, so the last values always arrive. Sweeps decide
+from them whether a trial is worth continuing (see ``master.app.sweeps``).
+
+Lines that are not such an object are skipped; a line still being written
+(no newline yet) waits for the next read. Records the master could not be
+reached for are sent with the next batch.
+"""
+
+import asyncio
+import json
+import logging
+import math
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from core.protocols.models import MetricRecord, MetricsReport
+from worker.app.client import MasterClient
+
+logger = logging.getLogger(__name__)
+
+
+def parse(line: str) -> Optional[MetricRecord]:
+    """The record on one line of a metrics file, or None if it is not one."""
+    try:
+        data = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    step = data.pop("step", None)
+    if not isinstance(step, int) or isinstance(step, bool) or step < 0:
+        return None
+    values = {
+        name: float(value) for name, value in data.items()
+        if isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+    }
+    return MetricRecord(step=step, values=values) if values else None
+
+
+def read_new(path: str, offset: int) -> Tuple[List[MetricRecord], int]:
+    """Records in complete lines after ``offset``, and the offset to read from next."""
+    try:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+    except FileNotFoundError:
+        return [], offset
+    end = data.rfind(b"\n") + 1
+    records = [record for record in map(parse, data[:end].decode(errors="replace").splitlines()) if record]
+    return records, offset + end
+
+
+class MetricsReporter:
+    """Ships the metrics files of the jobs running on this worker."""
+
+    def __init__(self, client: MasterClient, interval_seconds: float = 5.0):
+        self.client = client
+        self.interval = interval_seconds
+        self._offsets: Dict[str, int] = {}
+        self._unsent: Dict[str, List[MetricRecord]] = {}
+
+    async def watch(self, job_id: str, path: str, worker_id: Optional[str] = None) -> None:
+        """Report what the job appends, every interval, until cancelled."""
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush(job_id, path, worker_id)
+
+    async def flush(self, job_id: str, path: str, worker_id: Optional[str] = None) -> None:
+        """Send the records appended since the last call, with any that could not be sent before."""
+        records, self._offsets[job_id] = read_new(path, self._offsets.get(job_id, 0))
+        pending = self._unsent.pop(job_id, []) + records
+        if not pending:
+            return
+        try:
+            await self.client.report_metrics(job_id, MetricsReport(worker_id=worker_id, records=pending))
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code >= 500:
+                self._unsent[job_id] = pending
+            else:
+                # The job is no longer this worker's to report on
+                logger.warning(f"Master refused metrics of job {job_id} ({e.response.status_code})")
+        except httpx.HTTPError as e:
+            logger.warning(f"Reporting metrics of job {job_id} failed ({e!r}), will retry")
+            self._unsent[job_id] = pending
+
+    def forget(self, job_id: str) -> None:
+        self._offsets.pop(job_id, None)
+        self._unsent.pop(job_id, None)
@@ -0,0 +1,110 @@
+"""Rendezvous - starting the ranks of a distributed PyTorch job together.
+
+Each rank of a distributed job is assigned to a worker as a job of its own,
+with its ``Rendezvous``: rank, world size, local rank and the address of
+rank 0's node. Before the rank starts, its worker:
+
+1. joins the barrier on the master (``meet``); rank 0's worker first picks
+   a free port on its node, which becomes ``MASTER_PORT`` for every rank;
+2. polls until all ranks have joined, then starts the rank with
+   ``MASTER_ADDR``, ``MASTER_PORT``, ``RANK``, ``WORLD_SIZE``,
+   ``LOCAL_RANK`` and ``LOCAL_WORLD_SIZE`` set, so
+   ``torch.distributed.init_process_group(init_method="env://")`` works;
+3. while the rank runs, polls the barrier every second (``wait_for_abort``):
+   once another rank has failed the master marks the job aborted, and the
+   rank is cancelled instead of waiting for a collective to time out.
+
+A rank whose barrier is aborted before it starts is not started at all.
+"""
+
+import asyncio
+import logging
+import socket
+from typing import Dict, Optional
+
+import httpx
+
+from core.protocols.models import Rendezvous, RendezvousJoin, RendezvousState
+from worker.app.client import Backoff, MasterClient
+
+logger = logging.getLogger(__name__)
+
+
+class RendezvousAborted(Exception):
+    """The distributed job was aborted: the rank must not run."""
+
+
+def free_port() -> int:
+    """A TCP port nothing listens on right now, for rank 0 to listen on."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("", 0))
+        return s.getsockname()[1]
+
+
+def environment(rendezvous: Rendezvous) -> Dict[str, str]:
+    """Variables read by ``torch.distributed`` for ``env://`` initialisation."""
+    return {
+        "MASTER_ADDR": rendezvous.master_addr,
+        "MASTER_PORT": str(rendezvous.master_port),
+        "RANK": str(rendezvous.rank),
+        "WORLD_SIZE": str(rendezvous.world_size),
+        "LOCAL_RANK": str(rendezvous.local_rank),
+        "LOCAL_WORLD_SIZE": str(rendezvous.local_world_size),
+    }
+
+
+async def meet(
+    client: MasterClient,
+    job_id: str,
+    rendezvous: Rendezvous,
+    worker_id: Optional[str] = None,
+    poll_seconds: float = 0.25,
+) -> Rendezvous:
+    """Join the barrier and wait until every rank has; raises ``RendezvousAborted``.
+
+    The master aborts the job when the barrier is not complete in time, so
+    this does not need a timeout of its own.
+    """
+    join = RendezvousJoin(worker_id=worker_id, master_port=free_port() if rendezvous.rank == 0 else None)
+    backoff = Backoff(poll_seconds, max_seconds=5.0)
+    current = None
+    while current is None or current.state == RendezvousState.WAITING:
+        try:
+            if current is None:
+                current = await client.join_rendezvous(job_id, join)
+            else:
+                current = await client.get_rendezvous(job_id)
+            backoff.reset()
+            delay = poll_seconds
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code < 500:
+                raise RendezvousAborted(f"Master refused the rendezvous ({e.response.status_code}): {e.response.text}")
+            delay = backoff.next_delay()
+        except httpx.HTTPError as e:
+            logger.warning(f"Job {job_id}: rendezvous poll failed ({e!r}), retrying")
+            delay = backoff.next_delay()
+        if current is None or current.state == RendezvousState.WAITING:
+            await asyncio.sleep(delay)
+    if current.state == RendezvousState.ABORTED:
+        raise RendezvousAborted(f"Distributed job {rendezvous.gang_id} was aborted")
+    logger.info(
+        f"Job {job_id}: rank {current.rank}/{current.world_size} ready, "
+        f"master {current.master_addr}:{current.master_port}"
+    )
+    return current
+
+
+async def wait_for_abort(client: MasterClient, job_id: str, interval_seconds: float = 1.0) -> None:
+    """Return once the rank's distributed job is aborted (or forgotten by the master)."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            current = await client.get_rendezvous(job_id)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                return
+            continue
+        except httpx.HTTPError:
+            continue  # the heartbeat still delivers cancel commands
+        if current.state == RendezvousState.ABORTED:
+            return
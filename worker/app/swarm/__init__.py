@@ -0,0 +1,380 @@
+"""Swarm - peer-to-peer distribution of dataset chunks between workers.
+
+A dataset read by many workers at once would otherwise be pulled from the
+master by each of them. Instead, every worker keeps the chunks it fetched
+in a local ``ChunkDir`` and serves them to its peers (``PeerServer``); the
+master's tracker (``/api/v1/swarm``) says who holds what:
+
+1. The worker asks the tracker for sources of the chunks it lacks.
+2. Each chunk comes from a random peer holding it or, if no peer does and
+   the tracker leased it to this worker, from the master. Chunks with no
+   source yet are asked for again shortly, after the others.
+3. Every chunk is checked against its SHA-256 before it is stored, then
+   announced, so a worker becomes a source as soon as it has a chunk.
+
+Workers are visited in random chunk order, so they fetch different chunks
+from the master and trade them. Master egress is then roughly one copy of
+each dataset, not one per worker.
+
+The peer server answers ``GET /chunks/<sha256>`` with ``sendfile`` and a
+bounded number of concurrent uploads; a busy peer answers 503 and the
+fetcher tries another source.
+
+A master that answers 404 on the tracker has none (it runs several
+processes): the worker then stops announcing and fetches every chunk from
+the master.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import random
+import tempfile
+from typing import AsyncIterator, Dict, List, Optional, Sequence
+
+import httpx
+
+from core.protocols.models import (
+    ArtifactManifest,
+    ChunkSources,
+    Dataset,
+    SwarmAnnounce,
+    SwarmLocate,
+)
+from worker.app.client import Backoff, MasterClient
+
+logger = logging.getLogger(__name__)
+
+_IO_SIZE = 1 << 20
+
+
+class SwarmError(Exception):
+    """Chunks could not be fetched from any source."""
+
+
+def _is_digest(value: str) -> bool:
+    return len(value) == 64 and all(c in "0123456789abcdef" for c in value)
+
+
+class ChunkDir:
+    """Verified chunks on the worker's disk, evicted least recently used first."""
+
+    def __init__(self, root: str, max_bytes: Optional[int] = None):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._tmp = os.path.join(root, "tmp")
+        os.makedirs(self._tmp, exist_ok=True)
+        for name in os.listdir(self._tmp):  # leftovers of interrupted fetches
+            os.unlink(os.path.join(self._tmp, name))
+        self.size_bytes = sum(os.path.getsize(self.path(d)) for d in self.digests())
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest)
+
+    def has(self, digest: str) -> bool:
+        """Whether ``digest`` is stored; marks it as recently used."""
+        try:
+            os.utime(self.path(digest))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def digests(self) -> List[str]:
+        found = []
+        for prefix in os.listdir(self.root):
+            if len(prefix) == 2:
+                found.extend(d for d in os.listdir(os.path.join(self.root, prefix)) if _is_digest(d))
+        return found
+
+    async def put(self, digest: str, body: AsyncIterator[bytes], max_bytes: int = 64 * 1024 * 1024) -> int:
+        """Store a streamed chunk if it hashes to ``digest``; returns its size."""
+        fd, tmp_path = tempfile.mkstemp(dir=self._tmp)
+        h = hashlib.sha256()
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as f:
+                async for piece in body:
+                    size += len(piece)
+                    if size > max_bytes:
+                        raise SwarmError(f"Chunk {digest} is larger than {max_bytes} bytes")
+                    h.update(piece)
+                    f.write(piece)
+            if h.hexdigest() != digest:
+                raise SwarmError(f"Chunk content has sha256 {h.hexdigest()}, expected {digest}")
+            final = self.path(digest)
+            os.makedirs(os.path.dirname(final), exist_ok=True)
+            os.chmod(tmp_path, 0o444)
+            try:
+                os.link(tmp_path, final)
+                self.size_bytes += size
+            except FileExistsError:
+                pass  # fetched concurrently; same content by definition
+        finally:
+            os.unlink(tmp_path)
+        self._evict(keep=digest)
+        return size
+
+    def read(self, digest: str) -> AsyncIterator[bytes]:
+        return _read_file(self.path(digest))
+
+    def _evict(self, keep: str) -> List[str]:
+        if self.max_bytes is None or self.size_bytes <= self.max_bytes:
+            return []
+        entries = []
+        for digest in self.digests():
+            try:
+                st = os.stat(self.path(digest))
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, digest, st.st_size))
+        evicted = []
+        for _, digest, size in sorted(entries):
+            if self.size_bytes <= self.max_bytes:
+                break
+            if digest == keep:
+                continue
+            os.unlink(self.path(digest))
+            self.size_bytes -= size
+            evicted.append(digest)
+        return evicted
+
+
+async def _read_file(path: str) -> AsyncIterator[bytes]:
+    f = await asyncio.to_thread(open, path, "rb")
+    with f:
+        while True:
+            piece = await asyncio.to_thread(f.read, _IO_SIZE)
+            if not piece:
+                return
+            yield piece
+
+
+class PeerServer:
+    """Serves stored chunks to other workers over plain HTTP/1.1."""
+
+    def __init__(self, chunks: ChunkDir, host: str = "0.0.0.0", port: int = 8081, max_uploads: int = 8):
+        self.chunks = chunks
+        self.host = host
+        self.port = port
+        self.max_uploads = max_uploads
+        self.uploads = 0
+        self.bytes_served = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"Serving chunks to peers on port {self.port}")
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    return
+                headers = {}
+                for _ in range(100):
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip().lower()
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                keep_alive = headers.get("connection") != "close"
+                await self._respond(writer, method, target, keep_alive)
+                if not keep_alive:
+                    return
+        except (ConnectionError, ValueError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer: asyncio.StreamWriter, method: str, target: str, keep_alive: bool) -> None:
+        digest = target[len("/chunks/"):] if target.startswith("/chunks/") else ""
+        connection = b"keep-alive" if keep_alive else b"close"
+        if method not in ("GET", "HEAD") or not _is_digest(digest) or not self.chunks.has(digest):
+            writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: " + connection + b"\r\n\r\n")
+            await writer.drain()
+            return
+        if self.uploads >= self.max_uploads:
+            writer.write(b"HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\nConnection: " + connection + b"\r\n\r\n")
+            await writer.drain()
+            return
+        self.uploads += 1
+        try:
+            f = await asyncio.to_thread(open, self.chunks.path(digest), "rb")
+            with f:
+                size = os.fstat(f.fileno()).st_size
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/octet-stream\r\n"
+                    + f"Content-Length: {size}\r\n".encode()
+                    + b"Connection: " + connection + b"\r\n\r\n"
+                )
+                await writer.drain()
+                if method == "GET":
+                    await asyncio.get_running_loop().sendfile(writer.transport, f)
+                    self.bytes_served += size
+        finally:
+            self.uploads -= 1
+
+
+class Swarm:
+    """Fetches dataset chunks from peers or the master and serves them on."""
+
+    def __init__(
+        self,
+        client: MasterClient,
+        root: str,
+        max_bytes: Optional[int] = None,
+        port: Optional[int] = 8081,
+        host: str = "0.0.0.0",
+        parallel: int = 4,
+        announce_interval: float = 60.0,
+        stall_seconds: float = 300.0,
+    ):
+        self.client = client
+        self.chunks = ChunkDir(root, max_bytes)
+        self.server = PeerServer(self.chunks, host, port) if port is not None else None
+        self.parallel = parallel
+        self.announce_interval = announce_interval
+        self.stall_seconds = stall_seconds
+        self.address: Optional[str] = None
+        self.bytes_from_peers = 0
+        self.bytes_from_master = 0
+        self.disabled = False  # the master has no tracker
+        self._peers = httpx.AsyncClient(
+            timeout=httpx.Timeout(10.0, read=60.0),
+            limits=httpx.Limits(max_connections=4 * parallel, max_keepalive_connections=2 * parallel),
+        )
+        self._stop = asyncio.Event()
+
+    async def start(self, advertise_host: str) -> None:
+        """Start serving chunks and tell the tracker which ones this worker has."""
+        if self.server is None:
+            return
+        await self.server.start()
+        self.address = f"{advertise_host}:{self.server.port}"
+        await self.announce(self.chunks.digests(), full=True)
+
+    async def run(self) -> None:
+        """Repeat the full announcement, so the tracker's view does not expire."""
+        while not self._stop.is_set():
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=self.announce_interval)
+            except asyncio.TimeoutError:
+                await self.announce(self.chunks.digests(), full=True)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    async def close(self) -> None:
+        self.stop()
+        if self.server is not None:
+            await self.server.stop()
+        await self._peers.aclose()
+
+    async def announce(self, digests: Sequence[str], full: bool = False) -> None:
+        if self.address is None or self.disabled:
+            return
+        try:
+            await self.client.announce_chunks(SwarmAnnounce(peer=self.address, digests=list(digests), full=full))
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                self._disable()
+            else:
+                logger.warning(f"Announcing {len(digests)} chunks failed: {e!r}")
+        except httpx.HTTPError as e:
+            logger.warning(f"Announcing {len(digests)} chunks failed: {e!r}")
+
+    def _disable(self) -> None:
+        if not self.disabled:
+            logger.warning("The master has no swarm tracker; fetching every chunk from the master")
+        self.disabled = True
+
+    async def _locate(self, digests: List[str]) -> Dict[str, ChunkSources]:
+        if not self.disabled:
+            try:
+                return await self.client.locate_chunks(SwarmLocate(peer=self.address, digests=digests))
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code != 404:
+                    raise
+                self._disable()
+        return {digest: ChunkSources(master=True) for digest in digests}
+
+    # ── Fetching ────────────────────────────────────────────────────────
+
+    async def fetch(self, digests: Sequence[str]) -> None:
+        """Make sure every chunk in ``digests`` is stored locally."""
+        missing = [d for d in dict.fromkeys(digests) if not self.chunks.has(d)]
+        random.shuffle(missing)  # peers start on different chunks and trade them
+        failures: Dict[str, int] = {}
+        backoff = Backoff(0.05, 2.0)
+        stalled = 0.0
+        slots = asyncio.Semaphore(self.parallel)
+
+        async def fetch_one(digest: str, source: ChunkSources) -> bool:
+            async with slots:
+                return await self._fetch_chunk(digest, source)
+
+        while missing:
+            sources = await self._locate(missing)
+            for digest in missing:
+                # Peers that keep failing for a chunk (evicted it, went away) are skipped
+                if failures.get(digest, 0) >= 2:
+                    sources[digest] = ChunkSources(master=True)
+            ready = [(d, sources[d]) for d in missing if d in sources and (sources[d].peers or sources[d].master)]
+            results = await asyncio.gather(*(fetch_one(d, s) for d, s in ready))
+            fetched = {d for (d, _), ok in zip(ready, results) if ok}
+            for (digest, _), ok in zip(ready, results):
+                if not ok:
+                    failures[digest] = failures.get(digest, 0) + 1
+            missing = [d for d in missing if d not in fetched]
+            if fetched:
+                backoff.reset()
+                stalled = 0.0
+            elif missing:
+                delay = backoff.next_delay()
+                stalled += delay
+                if stalled > self.stall_seconds:
+                    raise SwarmError(f"No progress on {len(missing)} chunks for {self.stall_seconds}s")
+                await asyncio.sleep(delay)
+
+    async def _fetch_chunk(self, digest: str, source: ChunkSources) -> bool:
+        for peer in random.sample(source.peers, len(source.peers)):
+            try:
+                async with self._peers.stream("GET", f"http://{peer}/chunks/{digest}") as response:
+                    response.raise_for_status()
+                    size = await self.chunks.put(digest, response.aiter_bytes(_IO_SIZE))
+                self.bytes_from_peers += size
+                await self.announce([digest])
+                return True
+            except (httpx.HTTPError, SwarmError) as e:
+                logger.debug(f"Chunk {digest[:12]} from peer {peer} failed: {e!r}")
+        if source.master:
+            try:
+                async with self.client.chunk_stream(digest) as response:
+                    response.raise_for_status()
+                    size = await self.chunks.put(digest, response.aiter_bytes(_IO_SIZE))
+                self.bytes_from_master += size
+                await self.announce([digest])
+                return True
+            except (httpx.HTTPError, SwarmError) as e:
+                logger.warning(f"Chunk {digest[:12]} from the master failed: {e!r}")
+        return False
+
+    async def read(self, manifest: ArtifactManifest) -> AsyncIterator[bytes]:
+        """The bytes of a shard, fetching its chunks first."""
+        await self.fetch(manifest.chunks)
+        for digest in manifest.chunks:
+            async for piece in self.chunks.read(digest):
+                yield piece
+
+    async def dataset(self, name: str) -> Dataset:
+        return await self.client.get_dataset(name)
@@ -0,0 +1,51 @@
+"""Prefetch a dataset into a worker's chunk store through the swarm, then seed it.
+
+Usage:
+    python -m worker.app.swarm --master-url http://master:8080 --dataset imagenet@v2 --seed
+
+Prints ``ready <address>`` once serving and
+``done <bytes from master> <bytes from peers>`` once every chunk is stored.
+With ``--seed`` it keeps serving chunks to peers until interrupted.
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+
+from worker.app.client import MasterClient
+from worker.app.swarm import Swarm
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Fetch a dataset through the ClusterML swarm")
+    parser.add_argument("--master-url", default=os.getenv("MASTER_URL", "http://localhost:8080"))
+    parser.add_argument("--dataset", required=True)
+    parser.add_argument("--root", default=os.getenv("WORKER_CACHE_DIR", "/tmp/clusterml/cache") + "/chunks")
+    parser.add_argument("--host", default="0.0.0.0", help="Interface the chunk server listens on")
+    parser.add_argument("--advertise", default="127.0.0.1", help="Host peers use to reach this one")
+    parser.add_argument("--port", type=int, default=0, help="Chunk server port (0: any free port)")
+    parser.add_argument("--seed", action="store_true", help="Keep serving after the fetch")
+    args = parser.parse_args()
+
+    client = MasterClient(args.master_url)
+    swarm = Swarm(client, args.root, port=args.port, host=args.host)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+    try:
+        await swarm.start(args.advertise)
+        print(f"ready {swarm.address}", flush=True)
+        dataset = await client.get_dataset(args.dataset)
+        await swarm.fetch([digest for shard in dataset.shards for digest in shard.chunks])
+        print(f"done {swarm.bytes_from_master} {swarm.bytes_from_peers}", flush=True)
+        if args.seed:
+            await stop.wait()
+    finally:
+        await swarm.close()
+        await client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,311 @@
+"""Task Runner - runs lightweight Python tasks in warm processes.
+
+Tasks (see ``master.app.tasks``) are pickled function calls, too short to
+be worth a job. The runner keeps ``processes`` task processes
+(``process.py``) started, with the ``preload`` modules imported, and feeds
+them tasks one at a time over pipes:
+
+* A lease loop long-polls the master for tasks. It holds one task per
+  process at once, and up to ``prefetch`` per process while tasks take
+  less than ``short_task_seconds`` on average, so a process that finishes
+  a short task finds the next one already here, while slow tasks are not
+  hoarded by one worker. Each request lists the tasks held, which renews
+  their leases; with every slot taken it is repeated every ``wait_seconds``.
+* Outcomes are reported by a second loop, which sends the ones that ended
+  while its previous request was in flight together in the next. A task
+  stays held (and counts against ``prefetch``) until its outcome is
+  delivered, so the master never requeues a task that has ended.
+* A process that dies fails its task and is replaced. A task the master
+  cancels is killed the same way, or skipped if it has not started.
+* A lease request the master refuses for good (a 4xx other than 408/429,
+  such as the 404 of a master running several processes) stops the lease
+  loop: the tasks held still run and are reported, and no more are taken.
+
+Tasks use their own ``MasterClient``, so a waiting lease request never
+holds a connection the agent's heartbeats need. Native thread pools are
+limited to one thread per process, like fork-server templates.
+"""
+
+import asyncio
+import base64
+import logging
+import os
+import struct
+import sys
+import time
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import httpx
+
+from core.protocols.models import (
+    TaskAssignment,
+    TaskLease,
+    TaskOutcome,
+    TaskResults,
+    TaskStatus,
+)
+from worker.app.client import Backoff, MasterClient
+
+logger = logging.getLogger(__name__)
+
+_PROCESS_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "process.py")
+_HEADER = struct.Struct(">Q")
+
+
+class TaskProcess:
+    """One warm task process and its request/reply pipes."""
+
+    def __init__(self, python: str, preload: Sequence[str], cwd: str):
+        self.python = python
+        self.preload = list(preload)
+        self.cwd = cwd
+        self.process: Optional[asyncio.subprocess.Process] = None
+
+    async def start(self) -> None:
+        env = dict(os.environ)
+        env.update(OMP_NUM_THREADS="1", MKL_NUM_THREADS="1", OPENBLAS_NUM_THREADS="1")
+        self.process = await asyncio.create_subprocess_exec(
+            self.python, _PROCESS_SCRIPT, "--preload", ",".join(self.preload),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            cwd=self.cwd,
+            env=env,
+        )
+
+    async def run(self, payload: bytes) -> Tuple[bool, bytes]:
+        """Run one task: (whether it returned, pickled outcome).
+
+        Raises ``ConnectionError`` or ``asyncio.IncompleteReadError`` if the process dies.
+        """
+        self.process.stdin.write(_HEADER.pack(len(payload)) + payload)
+        await self.process.stdin.drain()
+        size = _HEADER.unpack(await self.process.stdout.readexactly(_HEADER.size))[0]
+        reply = await self.process.stdout.readexactly(size)
+        return reply[0] == 0, reply[1:]
+
+    def kill(self) -> None:
+        if self.process is not None and self.process.returncode is None:
+            self.process.kill()
+
+    async def stop(self) -> None:
+        if self.process is None:
+            return
+        self.kill()
+        await self.process.wait()
+
+
+class TaskRunner:
+    """Takes tasks from the master and runs them in warm processes."""
+
+    def __init__(
+        self,
+        client: MasterClient,
+        processes: int = 2,
+        preload: Sequence[str] = (),
+        work_dir: str = "/tmp/clusterml/tasks",
+        python: str = sys.executable,
+        prefetch: int = 8,
+        short_task_seconds: float = 0.1,
+        wait_seconds: float = 10.0,
+    ):
+        self.client = client
+        self.processes = processes
+        self.preload = list(preload)
+        self.work_dir = work_dir
+        self.python = python
+        self.prefetch = prefetch
+        self.short_task_seconds = short_task_seconds
+        self.wait_seconds = wait_seconds
+        self.worker_id: Optional[str] = None
+        self.completed = 0  # tasks whose outcome was delivered
+        self.mean_task_seconds: Optional[float] = None  # moving average of run times
+        self._pool: List[TaskProcess] = []
+        self._idle: "asyncio.Queue[TaskProcess]" = asyncio.Queue()
+        self._busy: Dict[str, TaskProcess] = {}  # task id -> process running it
+        self._held: Set[str] = set()  # leased, outcome not yet delivered
+        self._cancelled: Set[str] = set()
+        self._results: List[TaskOutcome] = []
+        self._results_ready = asyncio.Event()
+        self._freed = asyncio.Event()
+        self._stop = asyncio.Event()
+        self._running: Set[asyncio.Task] = set()
+
+    @property
+    def slots(self) -> int:
+        """Most tasks held at once."""
+        if self.mean_task_seconds is not None and self.mean_task_seconds < self.short_task_seconds:
+            return self.prefetch * self.processes
+        return self.processes
+
+    async def start(self) -> None:
+        """Start the task processes (their preloads import in the background)."""
+        os.makedirs(self.work_dir, exist_ok=True)
+        await asyncio.gather(*(self._add_process() for _ in range(self.processes)))
+        logger.info(f"Started {self.processes} task processes (preloading {self.preload})")
+
+    async def run(self) -> None:
+        """Lease and run tasks until ``stop``; ``worker_id`` must be set."""
+        if not self._pool:
+            await self.start()
+        await asyncio.gather(self._lease_loop(), self._report_loop())
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._results_ready.set()
+
+    async def close(self) -> None:
+        """Stop the task processes; outcomes not yet delivered are sent once more.
+
+        Tasks still running are not reported: the master requeues them once
+        their leases lapse.
+        """
+        self.stop()
+        for task in self._running:
+            task.cancel()
+        await asyncio.gather(*self._running, return_exceptions=True)
+        if self._results and self.worker_id is not None:
+            try:
+                await self.client.report_task_results(TaskResults(worker_id=self.worker_id, results=self._results))
+            except httpx.HTTPError as e:
+                logger.warning(f"Reporting {len(self._results)} task outcomes failed ({e!r}); the master will requeue them")
+        await asyncio.gather(*(process.stop() for process in self._pool))
+        self._pool.clear()
+
+    async def _add_process(self) -> None:
+        process = TaskProcess(self.python, self.preload, self.work_dir)
+        await process.start()
+        self._pool.append(process)
+        self._idle.put_nowait(process)
+
+    async def _until_stopped(self, awaitable):
+        """Result of ``awaitable``, or None if the runner stops first."""
+        work = asyncio.ensure_future(awaitable)
+        stop = asyncio.ensure_future(self._stop.wait())
+        try:
+            await asyncio.wait({work, stop}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            stop.cancel()
+        if not work.done():
+            work.cancel()
+            return None
+        return work.result()
+
+    async def _lease_loop(self) -> None:
+        backoff = Backoff()
+        while not self._stop.is_set():
+            capacity = max(0, self.slots - len(self._held))
+            request = TaskLease(
+                worker_id=self.worker_id,
+                capacity=capacity,
+                running=sorted(self._held),
+                wait_seconds=self.wait_seconds if capacity else 0,
+            )
+            try:
+                response = await self._until_stopped(self.client.lease_tasks(request))
+            except httpx.HTTPStatusError as e:
+                code = e.response.status_code
+                if code < 500 and code not in (408, 429):
+                    logger.error(f"Master refused to lease tasks ({code}: {e.response.text}); no longer taking tasks")
+                    return
+                delay = backoff.next_delay()
+                logger.warning(f"Leasing tasks failed ({code}), retrying in {delay:.1f}s")
+                await self._until_stopped(asyncio.sleep(delay))
+                continue
+            except httpx.HTTPError as e:
+                delay = backoff.next_delay()
+                logger.warning(f"Leasing tasks failed ({e!r}), retrying in {delay:.1f}s")
+                await self._until_stopped(asyncio.sleep(delay))
+                continue
+            if response is None:
+                return
+            backoff.reset()
+            for task_id in response.cancel:
+                self._cancelled.add(task_id)
+                if task_id in self._busy:
+                    logger.info(f"Task {task_id} was cancelled, killing its process")
+                    self._busy[task_id].kill()
+            for assignment in response.tasks:
+                self._held.add(assignment.id)
+                task = asyncio.create_task(self._execute(assignment), name=f"task-{assignment.id}")
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+            self._freed.clear()
+            if len(self._held) >= self.slots:
+                # Every slot is taken: renew the leases now and then until one frees
+                try:
+                    await self._until_stopped(asyncio.wait_for(self._freed.wait(), self.wait_seconds))
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _execute(self, assignment: TaskAssignment) -> None:
+        process = await self._idle.get()
+        if assignment.id in self._cancelled:
+            self._idle.put_nowait(process)
+            self._finish(TaskOutcome(id=assignment.id, status=TaskStatus.CANCELLED))
+            return
+        self._busy[assignment.id] = process
+        started = time.perf_counter()
+        try:
+            ok, outcome = await process.run(base64.b64decode(assignment.payload))
+            elapsed = time.perf_counter() - started
+            self.mean_task_seconds = elapsed if self.mean_task_seconds is None else 0.8 * self.mean_task_seconds + 0.2 * elapsed
+            result = TaskOutcome(
+                id=assignment.id,
+                status=TaskStatus.COMPLETED if ok else TaskStatus.FAILED,
+                result=base64.b64encode(outcome).decode("ascii"),
+            )
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            code = await process.process.wait()
+            if assignment.id in self._cancelled:
+                result = TaskOutcome(id=assignment.id, status=TaskStatus.CANCELLED)
+            else:
+                logger.warning(f"Task process exited with code {code} running task {assignment.id} ({e!r})")
+                result = TaskOutcome(
+                    id=assignment.id, status=TaskStatus.FAILED, error=f"Task process exited with code {code}",
+                )
+            self._pool.remove(process)
+            process = None
+            if not self._stop.is_set():
+                await self._add_process()
+        finally:
+            self._busy.pop(assignment.id, None)
+        if process is not None:
+            self._idle.put_nowait(process)
+        self._finish(result)
+
+    def _finish(self, outcome: TaskOutcome) -> None:
+        self._results.append(outcome)
+        self._results_ready.set()
+
+    async def _report_loop(self) -> None:
+        backoff = Backoff()
+        while True:
+            await self._results_ready.wait()
+            self._results_ready.clear()
+            if self._stop.is_set():
+                return  # close() sends what is left
+            batch, self._results = self._results, []
+            try:
+                await self.client.report_task_results(TaskResults(worker_id=self.worker_id, results=batch))
+            except httpx.HTTPStatusError as e:
+                code = e.response.status_code
+                if code >= 500 or code in (408, 429):
+                    self._retry(batch)
+                    await self._until_stopped(asyncio.sleep(backoff.next_delay()))
+                    continue
+                logger.warning(f"Master rejected {len(batch)} task outcomes ({code}), dropping them")
+            except httpx.HTTPError as e:
+                logger.warning(f"Reporting task outcomes failed ({e!r}), will retry")
+                self._retry(batch)
+                await self._until_stopped(asyncio.sleep(backoff.next_delay()))
+                continue
+            backoff.reset()
+            self.completed += len(batch)
+            for outcome in batch:
+                self._held.discard(outcome.id)
+                self._cancelled.discard(outcome.id)
+            self._freed.set()
+
+    def _retry(self, batch: List[TaskOutcome]) -> None:
+        self._results[:0] = batch
+        self._results_ready.set()
@@ -0,0 +1,90 @@
+"""Task process of the worker: runs pickled Python tasks, one after another.
+
+Run as ``python worker/app/tasks/process.py --preload numpy,sklearn`` (as
+a script, so no ClusterML package is imported into it). It imports the
+preload modules once and then serves tasks for as long as it lives, so a
+task starts with them imported and pays no interpreter start.
+
+Every message on stdin and stdout is an 8-byte big-endian length and a body:
+
+    worker  -> process   pickle of (function, args, kwargs)
+    process -> worker    status byte (0: returned, 1: raised) + pickle of
+                         ("ok", value) or ("error", exception, traceback)
+
+The messages use copies of the original stdin and stdout; a task's fd 0
+reads ``/dev/null`` and its fd 1 writes to stderr (the worker's), so what
+a task prints cannot corrupt them.
+
+Only the standard library is imported here: unpickling a task imports what
+it needs (``cloudpickle`` for functions pickled by value).
+"""
+
+import argparse
+import contextlib
+import importlib
+import os
+import pickle
+import struct
+import sys
+import traceback
+from typing import BinaryIO, List, Optional
+
+_HEADER = struct.Struct(">Q")
+
+
+def _read(stream: BinaryIO, size: int) -> Optional[bytes]:
+    data = stream.read(size)
+    return data if data is not None and len(data) == size else None
+
+
+def _dumps(outcome) -> bytes:
+    try:
+        return pickle.dumps(outcome, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        error = RuntimeError(f"The task's {'result' if outcome[0] == 'ok' else 'exception'} could not be pickled")
+        return pickle.dumps(("error", error, traceback.format_exc()), protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def run(payload: bytes):
+    """Outcome of one task."""
+    try:
+        function, args, kwargs = pickle.loads(payload)
+        return ("ok", function(*args, **kwargs))
+    except BaseException as e:  # whatever it is, the caller gets it
+        return ("error", e, traceback.format_exc())
+
+
+def serve(requests: BinaryIO, replies: BinaryIO) -> None:
+    while True:
+        header = _read(requests, _HEADER.size)
+        if header is None:
+            return  # the worker closed stdin
+        payload = _read(requests, _HEADER.unpack(header)[0])
+        if payload is None:
+            return
+        outcome = run(payload)
+        body = _dumps(outcome)
+        for stream in (sys.stdout, sys.stderr):
+            with contextlib.suppress(OSError, ValueError):  # closed, or the reader went away
+                stream.flush()
+        replies.write(_HEADER.pack(len(body) + 1) + (b"\0" if outcome[0] == "ok" else b"\1") + body)
+        replies.flush()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="ClusterML task process")
+    parser.add_argument("--preload", default="")
+    args = parser.parse_args(argv)
+    requests = os.fdopen(os.dup(0), "rb")
+    replies = os.fdopen(os.dup(1), "wb")
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    os.close(devnull)
+    os.dup2(2, 1)
+    for module in filter(None, args.preload.split(",")):
+        importlib.import_module(module)
+    serve(requests, replies)
+
+
+if __name__ == "__main__":
+    main()
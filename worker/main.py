@@ -4,9 +4,45 @@ import argparse
 import asyncio
 import logging
 import os
+import random
 import signal
+import socket
 import sys
-from typing import Optional
+import time
+from typing import Dict, List, Optional, Set
+from urllib.parse import urlparse
+
+import httpx
+
+# Ensure project root is on sys.path so `core.*` and `worker.*` imports work
+# when running with `python main.py` from the worker/ directory.
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+from core.protocols.models import (
+    HeartbeatRequest,
+    JobAssignment,
+    JobResourceUsage,
+    JobStatus,
+    JobUpdate,
+    NodeRegister,
+    ResourceInfo,
+)
+from core.utils.resources import parse_memory
+from worker.app.artifacts import ArtifactUploader, UploadError
+from worker.app.cache import ArtifactCache
+from worker.app.checkpoints import Checkpointer, CheckpointError
+from worker.app.client import Backoff, MasterClient, NotRegistered, jittered
+from worker.app.executor import JobExecutor, JobResult
+from worker.app.forkserver import ForkServer, parse_templates
+from worker.app.logs import LogShipper
+from worker.app.monitor import ResourceSampler
+from worker.app.outbox import Outbox
+from worker.app.progress import MetricsReporter
+from worker.app.rendezvous import RendezvousAborted, meet, wait_for_abort
+from worker.app.swarm import Swarm
+from worker.app.tasks import TaskRunner
 
 # Configure logging
 logging.basicConfig(
@@ -16,65 +52,389 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def _local_ip(master_url: str) -> str:
+    """Address of the interface that routes to the master (no packets are sent)."""
+    host = urlparse(master_url).hostname or "127.0.0.1"
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.connect((host, 9))
+            return s.getsockname()[0]
+    except OSError:
+        return "127.0.0.1"
+
+
 class WorkerAgent:
     """ClusterML Worker Agent."""
 
-    def __init__(self, master_url: str, token: Optional[str] = None):
+    def __init__(
+        self,
+        master_url: str,
+        token: Optional[str] = None,
+        heartbeat_interval: float = 15.0,
+        jitter: float = 0.1,
+        hostname: Optional[str] = None,
+        labels: Optional[Dict[str, str]] = None,
+        client: Optional[MasterClient] = None,
+        sampler: Optional[ResourceSampler] = None,
+        max_concurrent_jobs: int = 2,
+        work_dir: str = "/tmp/clusterml/jobs",
+        executor: Optional[JobExecutor] = None,
+        fork_server: Optional[ForkServer] = None,
+        cache: Optional[ArtifactCache] = None,
+        log_shipper: Optional[LogShipper] = None,
+        outbox: Optional[Outbox] = None,
+        uploader: Optional[ArtifactUploader] = None,
+        swarm: Optional[Swarm] = None,
+        checkpointer: Optional[Checkpointer] = None,
+        reporter: Optional[MetricsReporter] = None,
+        tasks: Optional[TaskRunner] = None,
+    ):
         self.master_url = master_url
         self.token = token or os.getenv("WORKER_TOKEN")
+        self.heartbeat_interval = heartbeat_interval
+        self.jitter = jitter
+        self.hostname = hostname or socket.gethostname()
+        self.labels = labels or {}
+        self.client = client or MasterClient(
+            master_url,
+            token=self.token,
+            # Keep the pooled connection alive across heartbeats
+            keepalive_seconds=max(120.0, 3 * heartbeat_interval),
+        )
+        self.sampler = sampler or ResourceSampler()
+        self.fork_server = fork_server
+        self.cache = cache
+        self.swarm = swarm
+        self.log_shipper = log_shipper or LogShipper(self.client)
+        self.outbox = outbox if outbox is not None else Outbox()
+        self.uploader = uploader or ArtifactUploader(self.client)
+        self.checkpointer = checkpointer or Checkpointer(self.client, self.uploader)
+        self.reporter = reporter or MetricsReporter(self.client)
+        self.tasks = tasks
+        self.executor = executor or JobExecutor(
+            max_concurrent_jobs, work_dir, on_output=self.log_shipper.write, fork_server=fork_server, cache=cache
+        )
         self.running = False
         self.worker_id: Optional[str] = None
+        self.assignments: "asyncio.Queue[JobAssignment]" = asyncio.Queue()
+        self._active_jobs: List[str] = []
+        self._job_tasks: Set[asyncio.Task] = set()
+        self._started = time.monotonic()
+        self._stop = asyncio.Event()
+        self._outbox_ready = asyncio.Event()
+
+    def collect_resources(self) -> ResourceInfo:
+        """Snapshot of this node's capacity and usage."""
+        return self.sampler.sample()
+
+    def collect_job_usage(self) -> Dict[str, JobResourceUsage]:
+        """CPU and memory of each running job's process tree."""
+        return self.sampler.job_usage(self.executor.pids())
+
+    def active_jobs(self) -> List[str]:
+        """IDs of jobs this worker has accepted and not finished, or whose final update is undelivered.
+
+        Listing the latter keeps the master from assigning a job again while
+        its completion is still in the outbox.
+        """
+        return self._active_jobs + [job_id for job_id in self.outbox.job_ids() if job_id not in self._active_jobs]
+
+    async def _sleep(self, seconds: float) -> None:
+        """Sleep that ends early when the agent stops."""
+        try:
+            await asyncio.wait_for(self._stop.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
 
     async def register(self) -> bool:
-        """Register with the master node."""
+        """Register with the master node, retrying with backoff until it succeeds or the agent stops."""
         logger.info(f"Registering with master at {self.master_url}")
-        # TODO: Implement registration logic
-        # - Send worker capabilities (CPU, memory, GPU)
-        # - Receive worker ID and configuration
-        self.worker_id = "worker-001"  # Placeholder
-        logger.info(f"Registered as {self.worker_id}")
-        return True
+        registration = NodeRegister(
+            hostname=self.hostname,
+            ip_address=_local_ip(self.master_url),
+            resources=self.collect_resources(),
+            labels=self.labels,
+            max_concurrent_jobs=self.executor.max_concurrent_jobs,
+        )
+        if self.swarm is not None and self.swarm.server is not None:
+            registration.port = self.swarm.server.port
+        backoff = Backoff()
+        while self.running:
+            try:
+                node = await self.client.register(registration)
+            except httpx.HTTPError as e:
+                delay = backoff.next_delay()
+                logger.warning(f"Registration failed ({e!r}), retrying in {delay:.1f}s")
+                await self._sleep(delay)
+                continue
+            self.worker_id = node.id
+            self.log_shipper.worker_id = node.id
+            if self.tasks is not None:
+                self.tasks.worker_id = node.id
+            logger.info(f"Registered as {self.worker_id}")
+            return True
+        return False
 
     async def heartbeat(self):
         """Send periodic heartbeat to master."""
+        backoff = Backoff()
+        # Spread the first heartbeat so a fleet restarted together starts apart
+        await self._sleep(random.uniform(0, self.heartbeat_interval))
+        reported_cache = None  # cache summary the master has; only changes are sent
         while self.running:
+            cached = self.cache.summary() if self.cache is not None else None
             try:
-                # TODO: Send heartbeat with resource usage
-                logger.debug("Sending heartbeat...")
-                await asyncio.sleep(30)
-            except Exception as e:
-                logger.error(f"Heartbeat failed: {e}")
-                await asyncio.sleep(5)
+                response = await self.client.heartbeat(
+                    HeartbeatRequest(
+                        worker_id=self.worker_id,
+                        resources=self.collect_resources(),
+                        active_jobs=self.active_jobs(),
+                        job_usage=self.collect_job_usage(),
+                        uptime_seconds=time.monotonic() - self._started,
+                        cached=None if cached == reported_cache else cached,
+                    )
+                )
+            except NotRegistered:
+                logger.warning("Master does not know this worker, re-registering")
+                await self.register()
+                reported_cache = None
+                continue
+            except httpx.HTTPError as e:
+                delay = backoff.next_delay()
+                logger.warning(f"Heartbeat failed ({e!r}), retrying in {delay:.1f}s")
+                await self._sleep(delay)
+                continue
+
+            backoff.reset()
+            reported_cache = cached
+            for command in response.commands:
+                if command.startswith("cancel:"):
+                    job_id = command.split(":", 1)[1]
+                    logger.info(f"Master cancelled job {job_id}")
+                    self._spawn(self.executor.cancel(job_id), f"cancel-{job_id}")
+                elif command.startswith("stop:"):
+                    job_id = command.split(":", 1)[1]
+                    logger.info(f"Master asked to stop job {job_id}")
+                    self._spawn(self.executor.stop(job_id), f"stop-{job_id}")
+            for assignment in response.assigned_jobs:
+                if assignment.job_id not in self._active_jobs and assignment.job_id not in self.outbox:
+                    self._active_jobs.append(assignment.job_id)
+                    self.assignments.put_nowait(assignment)
+            await self._sleep(jittered(self.heartbeat_interval, self.jitter))
 
     async def poll_jobs(self):
-        """Poll for and execute jobs."""
+        """Take assignments delivered by heartbeats and execute them."""
         while self.running:
+            get = asyncio.ensure_future(self.assignments.get())
+            stop = asyncio.ensure_future(self._stop.wait())
+            done, _ = await asyncio.wait({get, stop}, return_when=asyncio.FIRST_COMPLETED)
+            if get not in done:
+                get.cancel()
+                return
+            stop.cancel()
+            assignment = get.result()
+            logger.info(f"Received job {assignment.job_id}")
+            self._spawn(self.execute(assignment), f"job-{assignment.job_id}")
+
+    def _spawn(self, coro, name: str) -> None:
+        task = asyncio.create_task(coro, name=name)
+        self._job_tasks.add(task)
+        task.add_done_callback(self._job_tasks.discard)
+
+    async def execute(self, assignment: JobAssignment) -> JobResult:
+        """Run one job and report its progress to the master."""
+        job_id = assignment.job_id
+
+        checkpoint_dir = self.executor.checkpoint_dir(job_id)
+        metrics_file = self.executor.metrics_file(job_id)
+        helpers: List[asyncio.Task] = []  # run alongside the job
+
+        async def on_start(job_id: str, pid: int) -> None:
+            await self.report(job_id, JobUpdate(status=JobStatus.RUNNING))
+            helpers.append(asyncio.create_task(
+                self.checkpointer.watch(job_id, checkpoint_dir, self.worker_id), name=f"checkpoint-{job_id}"
+            ))
+            helpers.append(asyncio.create_task(
+                self.reporter.watch(job_id, metrics_file, self.worker_id), name=f"metrics-{job_id}"
+            ))
+            if assignment.rendezvous is not None:
+                helpers.append(asyncio.create_task(self._abort_with_group(job_id), name=f"rendezvous-{job_id}"))
+
+        try:
+            try:
+                await self.checkpointer.restore(job_id, assignment.checkpoint, checkpoint_dir)
+            except (CheckpointError, OSError) as e:
+                logger.error(f"Job {job_id} checkpoint could not be restored: {e}")
+                await self.report(job_id, JobUpdate(
+                    status=JobStatus.FAILED, result={"error": f"Failed to restore checkpoint: {e}"}
+                ))
+                return JobResult(exit_code=-1, logs="", cores=[], error=str(e))
+            if assignment.rendezvous is not None:
+                try:
+                    ready = await meet(self.client, job_id, assignment.rendezvous, self.worker_id)
+                except RendezvousAborted as e:
+                    logger.warning(f"Job {job_id} not started: {e}")
+                    await self.report(job_id, JobUpdate(status=JobStatus.CANCELLED, result={"error": str(e)}))
+                    return JobResult(exit_code=-1, logs="", cores=[], cancelled=True, error=str(e))
+                assignment = assignment.model_copy(update={"rendezvous": ready})
             try:
-                # TODO: Poll master for assigned jobs
-                # TODO: Execute jobs using executor
-                await asyncio.sleep(5)
-            except Exception as e:
-                logger.error(f"Job polling failed: {e}")
-                await asyncio.sleep(5)
+                result = await self.executor.run(assignment, on_start=on_start)
+            finally:
+                for helper in helpers:
+                    helper.cancel()
+                await asyncio.gather(*helpers, return_exceptions=True)
+            if not result.cancelled:
+                # Last metrics before the final status: the master takes none after it
+                await self.reporter.flush(job_id, metrics_file, self.worker_id)
+            # Ship the rest of the output first, so a finished job's log is complete
+            self.log_shipper.finish(job_id)
+            await self.log_shipper.flush()
+            if result.stopped:
+                await self.requeue(job_id, result, checkpoint_dir)
+                return result
+            if result.cancelled:
+                status = JobStatus.CANCELLED
+            elif result.exit_code == 0:
+                status = JobStatus.COMPLETED
+            else:
+                status = JobStatus.FAILED
+            outcome = {"exit_code": result.exit_code, "cpu_cores": result.cores}
+            if result.error:
+                outcome["error"] = result.error
+            if assignment.spec.outputs and not result.cancelled:
+                # Failed jobs too: a partial checkpoint is still worth keeping
+                try:
+                    artifacts = await self.uploader.upload_outputs(
+                        job_id, self.executor.job_dir(job_id), assignment.spec.outputs
+                    )
+                    outcome["artifacts"] = [{"name": a.name, "size": a.size} for a in artifacts]
+                except (UploadError, OSError) as e:
+                    logger.error(f"Job {job_id} outputs were not uploaded: {e}")
+                    outcome["artifact_error"] = str(e)
+            await self.report(job_id, JobUpdate(status=status, result=outcome, logs=result.logs))
+            return result
+        finally:
+            self.checkpointer.forget(job_id)
+            self.reporter.forget(job_id)
+            if job_id in self._active_jobs:
+                self._active_jobs.remove(job_id)
+
+    async def _abort_with_group(self, job_id: str) -> None:
+        """Cancel a rank as soon as its distributed job is aborted (another rank failed)."""
+        await wait_for_abort(self.client, job_id)
+        logger.info(f"Distributed job of {job_id} was aborted, cancelling the rank")
+        await self.executor.cancel(job_id)
+
+    async def requeue(self, job_id: str, result: JobResult, checkpoint_dir: str) -> None:
+        """Save what a stopped job left in its checkpoint directory and hand it back to the queue."""
+        outcome = {"exit_code": result.exit_code, "stopped": True}
+        try:
+            checkpoint = await self.checkpointer.save(job_id, checkpoint_dir, self.worker_id)
+            if checkpoint is not None:
+                outcome["checkpoint_generation"] = checkpoint.generation
+        except (CheckpointError, UploadError, httpx.HTTPError, OSError) as e:
+            # The previous checkpoint, if any, is still the one resumed from
+            logger.error(f"Job {job_id} final checkpoint was not saved: {e}")
+            outcome["checkpoint_error"] = str(e)
+        logger.info(f"Job {job_id} stopped, handing it back to the master")
+        await self.report(job_id, JobUpdate(status=JobStatus.QUEUED, result=outcome, logs=result.logs))
+
+    async def report(self, job_id: str, update: JobUpdate) -> int:
+        """Queue a job update in the outbox for delivery; returns its sequence number."""
+        seq = await self.outbox.put(job_id, update)
+        self._outbox_ready.set()
+        return seq
+
+    async def deliver(self):
+        """Send outbox updates in order, backing off while the master is unreachable."""
+        backoff = Backoff()
+        while self.running:
+            if await self.flush_outbox():
+                backoff.reset()
+                await self._outbox_ready.wait()
+            else:
+                await self._sleep(backoff.next_delay())
+
+    async def flush_outbox(self) -> bool:
+        """Try to deliver every queued update once; False if the master could not be reached."""
+        self._outbox_ready.clear()
+        for job_id, update in self.outbox.pending():
+            try:
+                await self.client.update_job(job_id, update.model_copy(update={"worker_id": self.worker_id}))
+            except httpx.HTTPStatusError as e:
+                code = e.response.status_code
+                if code >= 500 or code in (408, 429):
+                    logger.warning(f"Updating job {job_id} failed ({code}), will retry")
+                    return False
+                # 404: the master no longer knows the job; other 4xx will never succeed
+                logger.warning(f"Master rejected update {update.seq} of job {job_id} ({code}), dropping it")
+            except httpx.HTTPError as e:
+                logger.warning(f"Updating job {job_id} failed ({e!r}), will retry")
+                return False
+            await self.outbox.ack(job_id, update.seq)
+        return True
 
     async def run(self):
         """Main worker loop."""
         self.running = True
+        if self.fork_server is not None:
+            # Jobs arriving before the templates are warm start cold
+            self._spawn(self.fork_server.start(), "fork-server")
+        shipping = asyncio.create_task(self.log_shipper.run(), name="log-shipper")
+        try:
+            if self.swarm is not None:
+                await self.swarm.start(_local_ip(self.master_url))
+            if not await self.register():
+                logger.error("Failed to register with master")
+                return
 
-        if not await self.register():
-            logger.error("Failed to register with master")
-            return
-
-        # Run heartbeat and job polling concurrently
-        await asyncio.gather(
-            self.heartbeat(),
-            self.poll_jobs()
-        )
+            # Run heartbeat and job polling concurrently
+            loops = [self.heartbeat(), self.poll_jobs(), self.deliver()]
+            if self.swarm is not None:
+                loops.append(self.swarm.run())
+            if self.tasks is not None:
+                loops.append(self.tasks.run())
+            await asyncio.gather(*loops)
+        finally:
+            await self.executor.shutdown()
+            if self._job_tasks:
+                # Stopped jobs still upload their last checkpoint
+                await asyncio.wait(self._job_tasks, timeout=self.executor.kill_grace_seconds + 60)
+            await self.log_shipper.close()
+            await shipping
+            if self.worker_id is not None and len(self.outbox):
+                # Last attempt; anything left is replayed on the next start
+                await self.flush_outbox()
+            if self.tasks is not None:
+                await self.tasks.close()
+                await self.tasks.client.close()
+            if self.fork_server is not None:
+                await self.fork_server.stop()
+            if self.cache is not None:
+                await self.cache.close()
+            if self.swarm is not None:
+                await self.swarm.close()
+            await self.client.close()
+            self.sampler.close()
 
     def stop(self):
         """Stop the worker."""
         logger.info("Stopping worker...")
         self.running = False
+        self._stop.set()
+        self._outbox_ready.set()
+        if self.swarm is not None:
+            self.swarm.stop()
+        if self.tasks is not None:
+            self.tasks.stop()
+
+
+def _parse_labels(value: str) -> Dict[str, str]:
+    labels = {}
+    for item in filter(None, value.split(",")):
+        key, _, val = item.partition("=")
+        labels[key.strip()] = val.strip()
+    return labels
 
 
 def parse_args():
@@ -90,6 +450,103 @@ def parse_args():
         default=os.getenv("WORKER_TOKEN"),
         help="Worker authentication token"
     )
+    parser.add_argument(
+        "--heartbeat-interval",
+        type=float,
+        default=float(os.getenv("HEARTBEAT_INTERVAL", "15")),
+        help="Seconds between heartbeats (jittered by ±10%%)"
+    )
+    parser.add_argument(
+        "--hostname",
+        default=os.getenv("WORKER_HOSTNAME"),
+        help="Name to register under (default: the machine's); distinct per worker on one machine"
+    )
+    parser.add_argument(
+        "--labels",
+        default=os.getenv("WORKER_LABELS", ""),
+        help="Node labels, e.g. gpu=a100,region=us-west-1"
+    )
+    parser.add_argument(
+        "--max-concurrent-jobs",
+        type=int,
+        default=int(os.getenv("MAX_CONCURRENT_JOBS", "2")),
+        help="Jobs to run at once"
+    )
+    parser.add_argument(
+        "--work-dir",
+        default=os.getenv("WORKER_WORK_DIR", "/tmp/clusterml/jobs"),
+        help="Directory for per-job working directories"
+    )
+    parser.add_argument(
+        "--preload",
+        default=os.getenv("WORKER_PRELOAD", ""),
+        help="Fork-server templates, e.g. 'base=;sklearn=numpy,sklearn.ensemble;torch=torch'"
+    )
+    parser.add_argument(
+        "--task-processes",
+        type=int,
+        default=int(os.getenv("WORKER_TASK_PROCESSES", "2")),
+        help="Warm processes running lightweight Python tasks (0: take no tasks)"
+    )
+    parser.add_argument(
+        "--task-preload",
+        default=os.getenv("WORKER_TASK_PRELOAD", ""),
+        help="Modules the task processes import at start, e.g. numpy,sklearn"
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=os.getenv("WORKER_CACHE_DIR", "/tmp/clusterml/cache"),
+        help="Directory of the content-addressed input cache"
+    )
+    parser.add_argument(
+        "--cache-size",
+        default=os.getenv("WORKER_CACHE_SIZE", "20Gi"),
+        help="Cache size limit, e.g. 20Gi"
+    )
+    parser.add_argument(
+        "--peer-port",
+        type=int,
+        default=int(os.getenv("WORKER_PEER_PORT", "8081")),
+        help="Port serving dataset chunks to other workers (0: fetch only, never serve)"
+    )
+    parser.add_argument(
+        "--swarm-size",
+        default=os.getenv("WORKER_SWARM_SIZE", "20Gi"),
+        help="Disk kept for dataset chunks shared with peers, e.g. 20Gi"
+    )
+    parser.add_argument(
+        "--outbox",
+        default=os.getenv("WORKER_OUTBOX", "/tmp/clusterml/outbox.json"),
+        help="File holding job updates not yet delivered to the master"
+    )
+    parser.add_argument(
+        "--log-spill-dir",
+        default=os.getenv("WORKER_LOG_SPILL_DIR", "/tmp/clusterml/log-spill"),
+        help="Where job output is spilled while the master is slow (empty: drop instead)"
+    )
+    parser.add_argument(
+        "--log-buffer",
+        default=os.getenv("WORKER_LOG_BUFFER", "16Mi"),
+        help="Job output kept in memory before spilling, e.g. 16Mi"
+    )
+    parser.add_argument(
+        "--checkpoint-interval",
+        type=float,
+        default=float(os.getenv("WORKER_CHECKPOINT_INTERVAL", "60")),
+        help="Seconds between uploads of a running job's checkpoint directory"
+    )
+    parser.add_argument(
+        "--stop-grace",
+        type=float,
+        default=float(os.getenv("WORKER_STOP_GRACE", "30")),
+        help="Seconds a stopped or cancelled job gets to exit before it is killed"
+    )
+    parser.add_argument(
+        "--metrics-interval",
+        type=float,
+        default=float(os.getenv("WORKER_METRICS_INTERVAL", "5")),
+        help="Seconds between reports of a running job's intermediate metrics"
+    )
     parser.add_argument(
         "--dev-mode",
         action="store_true",
@@ -102,9 +559,58 @@ async def main():
     """Main entry point."""
     args = parse_args()
 
+    client = MasterClient(
+        args.master_url,
+        token=args.token,
+        keepalive_seconds=max(120.0, 3 * args.heartbeat_interval),
+    )
+    swarm = Swarm(
+        client,
+        os.path.join(args.cache_dir, "chunks"),
+        max_bytes=parse_memory(args.swarm_size) * 1024 * 1024,
+        port=args.peer_port or None,
+    )
+    uploader = ArtifactUploader(client)
+    fork_server = ForkServer(parse_templates(args.preload)) if args.preload else None
+    cache = ArtifactCache(args.cache_dir, parse_memory(args.cache_size) * 1024 * 1024, swarm=swarm)
+    tasks = None
+    if args.task_processes > 0:
+        tasks = TaskRunner(
+            # Own connections: a waiting lease request must not hold one a heartbeat needs
+            MasterClient(args.master_url, token=args.token),
+            processes=args.task_processes,
+            preload=[m.strip() for m in args.task_preload.split(",") if m.strip()],
+            work_dir=os.path.join(args.work_dir, "tasks"),
+        )
+    log_shipper = LogShipper(
+        client,
+        max_buffer_bytes=parse_memory(args.log_buffer) * 1024 * 1024,
+        spill_dir=args.log_spill_dir or None,
+    )
     worker = WorkerAgent(
         master_url=args.master_url,
-        token=args.token
+        token=args.token,
+        heartbeat_interval=args.heartbeat_interval,
+        hostname=args.hostname,
+        labels=_parse_labels(args.labels),
+        client=client,
+        executor=JobExecutor(
+            args.max_concurrent_jobs,
+            args.work_dir,
+            on_output=log_shipper.write,
+            kill_grace_seconds=args.stop_grace,
+            fork_server=fork_server,
+            cache=cache,
+        ),
+        fork_server=fork_server,
+        cache=cache,
+        swarm=swarm,
+        outbox=Outbox(args.outbox),
+        log_shipper=log_shipper,
+        uploader=uploader,
+        checkpointer=Checkpointer(client, uploader, interval_seconds=args.checkpoint_interval),
+        reporter=MetricsReporter(client, interval_seconds=args.metrics_interval),
+        tasks=tasks,
     )
 
     # Handle shutdown signals
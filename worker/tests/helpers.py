@@ -0,0 +1,116 @@
+"""Helpers shared by the worker tests: a fake master, a free port, running an agent."""
+
+import asyncio
+import gzip
+import json
+import os
+import socket
+import sys
+import time
+from typing import Optional
+
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+import httpx
+
+from core.protocols.models import JobAssignment, LogBatch, Node, ResourceInfo
+from master.app.logs import LogStore
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def run_until(agent, condition, timeout: float = 10.0) -> None:
+    """Run ``agent`` until ``condition()`` holds (or ``timeout``), then stop it."""
+    task = asyncio.create_task(agent.run())
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+    agent.stop()
+    await asyncio.wait_for(task, timeout=5)
+
+
+class FakeMaster:
+    """The master's worker-facing API, served in-process through ``httpx.MockTransport``.
+
+    * Registration records the node (``nodes``, ``registrations``) and the
+      last request body (``registration``); ``node_id`` fixes the id given out.
+    * Heartbeats answer the scripted ``heartbeat_failures`` status codes
+      first, and 404 for a worker it does not know; then they are counted in
+      ``heartbeats`` and hand out ``assignment`` once.
+    * Log batches are ingested into ``store`` (a real ``LogStore``) and their
+      text appended to ``shipped``. With ``reject`` they get 422; with
+      ``fail_after_store`` a 500 after storing, that many times; without
+      ``logs_enabled`` a 404, as from a master running several processes.
+    * Job updates are recorded in ``updates``, each with the output shipped
+      before it.
+    * While ``up`` is False, log batches and job updates get 503.
+    """
+
+    def __init__(self, assignment: Optional[JobAssignment] = None, heartbeat_failures=(), node_id: Optional[str] = None):
+        self.assignment = assignment
+        self.failures = list(heartbeat_failures)
+        self.node_id = node_id
+        self.nodes = {}
+        self.registration = None
+        self.registrations = 0
+        self.heartbeats = 0
+        self.store = LogStore()
+        self.requests = []
+        self.shipped = []
+        self.updates = []
+        self.up = True
+        self.reject = False
+        self.fail_after_store = 0
+        self.logs_enabled = True
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        path = request.url.path
+        if path == "/api/v1/jobs/logs":
+            return self._logs(request)
+        body = json.loads(request.content) if request.content else {}
+        if path == "/api/v1/nodes":
+            self.registration = body
+            self.registrations += 1
+            fields = {} if self.node_id is None else {"id": self.node_id}
+            node = Node(hostname=body["hostname"], ip_address=body["ip_address"], resources=ResourceInfo(**body["resources"]), **fields)
+            self.nodes[node.id] = node
+            return httpx.Response(201, content=node.model_dump_json())
+        if path == "/api/v1/nodes/heartbeat":
+            if self.failures:
+                return httpx.Response(self.failures.pop(0))
+            if body["worker_id"] not in self.nodes:
+                return httpx.Response(404, json={"detail": "not registered"})
+            self.heartbeats += 1
+            assigned = []
+            if self.assignment is not None:
+                assigned, self.assignment = [json.loads(self.assignment.model_dump_json())], None
+            return httpx.Response(200, json={"acknowledged": True, "assigned_jobs": assigned})
+        if path.startswith("/api/v1/jobs/"):
+            if not self.up:
+                return httpx.Response(503)
+            # The job's output is shipped before its final status
+            self.updates.append(dict(body, shipped="".join(self.shipped)))
+            return httpx.Response(200, json={"id": path.rsplit("/", 1)[1], "name": "job", "spec": {"image": "x"}})
+        return httpx.Response(404)
+
+    def _logs(self, request: httpx.Request) -> httpx.Response:
+        if not self.up:
+            return httpx.Response(503)
+        if not self.logs_enabled:
+            return httpx.Response(404)
+        if self.reject:
+            return httpx.Response(422)
+        batch = LogBatch.model_validate_json(gzip.decompress(request.content))
+        self.store.ingest(batch)
+        self.shipped.extend(chunk.data for chunk in batch.chunks)
+        if self.fail_after_store:
+            self.fail_after_store -= 1
+            return httpx.Response(500)  # stored, but the worker cannot know
+        return httpx.Response(200, json={"chunks": len(batch.chunks)})
@@ -0,0 +1,255 @@
+"""Tests for the worker's content-addressed artifact cache.
+
+Run with: pytest worker/tests/test_artifact_cache.py -v
+"""
+
+import asyncio
+import hashlib
+import os
+import stat
+import sys
+import threading
+
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+import httpx
+import pytest
+
+import worker.app.cache as cache_mod
+from core.protocols.models import JobAssignment, JobSpec, VolumeMount
+from worker.app.cache import ArtifactCache, CacheError, parse_source
+from worker.app.executor import JobExecutor
+
+
+def _sha(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class FakeServer:
+    """Serves fixed files with ETags and counts requests and bytes sent."""
+
+    def __init__(self, files):
+        self.files = files
+        self.requests = []
+        self.bytes_sent = 0
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        body = self.files.get(request.url.path)
+        if body is None:
+            return httpx.Response(404)
+        etag = f'"{_sha(body)[:16]}"'
+        if request.headers.get("if-none-match") == etag:
+            return httpx.Response(304)
+        self.bytes_sent += len(body)
+        return httpx.Response(200, content=body, headers={"ETag": etag})
+
+    async def slow_handler(self, request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(0.05)
+        return self.handler(request)
+
+
+def _cache(tmp_path, max_bytes=1 << 30, server=None, slow=False):
+    http = None
+    if server is not None:
+        http = httpx.AsyncClient(transport=httpx.MockTransport(server.slow_handler if slow else server.handler))
+    return ArtifactCache(str(tmp_path / "cache"), max_bytes, http=http)
+
+
+class TestArtifactCache:
+    def test_parse_source(self):
+        digest = "ab" * 32
+        assert parse_source(f"https://h/x.bin#sha256={digest}") == ("https://h/x.bin", digest)
+        assert parse_source("/data/x.bin") == ("/data/x.bin", None)
+        with pytest.raises(CacheError):
+            parse_source("https://h/x.bin#sha256=nothex")
+
+    def test_local_file_is_linked_read_only_and_reused(self, tmp_path):
+        src = tmp_path / "weights.pt"
+        src.write_bytes(b"w" * 1000)
+        cache = _cache(tmp_path)
+
+        async def run():
+            await cache.materialize(str(src), str(tmp_path / "job-1" / "model.pt"))
+            await cache.materialize(str(src), str(tmp_path / "job-2" / "model.pt"))
+
+        asyncio.run(run())
+        first, second = tmp_path / "job-1" / "model.pt", tmp_path / "job-2" / "model.pt"
+        assert first.read_bytes() == b"w" * 1000
+        assert os.stat(first).st_ino == os.stat(second).st_ino == os.stat(cache.path(_sha(b"w" * 1000))).st_ino
+        assert not os.stat(first).st_mode & (stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH)
+        assert (cache.misses, cache.hits) == (1, 1)
+
+    def test_changed_local_file_is_recached(self, tmp_path):
+        src = tmp_path / "data.csv"
+        src.write_text("a,b\n")
+        cache = _cache(tmp_path)
+        first = asyncio.run(cache.fetch(str(src)))
+        src.write_text("a,b\n1,2\n")
+        os.utime(src, ns=(0, os.stat(src).st_mtime_ns + 1_000_000))
+        assert asyncio.run(cache.fetch(str(src))) != first
+
+    def test_pinned_digest_mismatch_installs_nothing(self, tmp_path):
+        src = tmp_path / "x.bin"
+        src.write_bytes(b"actual")
+        cache = _cache(tmp_path)
+        with pytest.raises(CacheError, match="expected"):
+            asyncio.run(cache.fetch(f"{src}#sha256={_sha(b'other')}"))
+        assert cache.size_bytes == 0
+        assert os.listdir(tmp_path / "cache" / "tmp") == []
+
+    def test_lru_eviction_skips_linked_objects(self, tmp_path):
+        cache = _cache(tmp_path, max_bytes=250)
+        files = {}
+        for name in "abcd":
+            files[name] = tmp_path / name
+            files[name].write_bytes(name.encode() * 100)
+
+        async def run():
+            await cache.materialize(str(files["a"]), str(tmp_path / "job" / "a"))  # stays linked
+            await cache.fetch(str(files["b"]))
+            await cache.fetch(str(files["c"]))  # evicts b: a is in use
+            await cache.fetch(str(files["b"]))  # evicts c
+            await cache.fetch(str(files["d"]))  # evicts b
+
+        asyncio.run(run())
+        present = {name for name in "abcd" if cache.has(_sha(name.encode() * 100))}
+        assert present == {"a", "d"}
+        assert cache.size_bytes == 200
+        assert (tmp_path / "job" / "a").read_bytes() == b"a" * 100
+
+    def test_stream_installs_off_the_event_loop_without_rescanning(self, tmp_path, monkeypatch):
+        cache = _cache(tmp_path, max_bytes=250)
+        loop_thread = threading.get_ident()
+        threads = set()
+        real_write = cache_mod._write
+
+        def write(f, h, chunk):
+            threads.add(threading.get_ident())
+            real_write(f, h, chunk)
+
+        def scan():
+            raise AssertionError("eviction rescanned the objects directory")
+
+        monkeypatch.setattr(cache_mod, "_write", write)
+        monkeypatch.setattr(cache, "_scan", scan)
+
+        async def stream(data: bytes):
+            yield data
+
+        async def run():
+            for name in "abc":
+                await cache.put_stream(stream(name.encode() * 100))
+
+        asyncio.run(run())
+        assert threads and loop_thread not in threads
+        assert cache.size_bytes == 200
+        assert [cache.has(_sha(name.encode() * 100)) for name in "abc"] == [False, True, True]
+
+    def test_state_survives_restart(self, tmp_path):
+        src = tmp_path / "x.bin"
+        src.write_bytes(b"x" * 64)
+        asyncio.run(_cache(tmp_path).fetch(str(src)))
+        cache = _cache(tmp_path)
+        assert cache.size_bytes == 64
+        asyncio.run(cache.fetch(str(src)))
+        assert (cache.misses, cache.hits) == (0, 1)
+
+    def test_directory_source(self, tmp_path):
+        root = tmp_path / "mnist" / "raw"
+        root.mkdir(parents=True)
+        (root / "train.idx").write_bytes(b"train")
+        (root / "test.idx").write_bytes(b"test")
+        cache = _cache(tmp_path)
+        placed = asyncio.run(cache.materialize(str(tmp_path / "mnist"), str(tmp_path / "job" / "data")))
+        assert len(placed) == 2
+        assert (tmp_path / "job" / "data" / "raw" / "train.idx").read_bytes() == b"train"
+
+    def test_summary_reports_bytes_per_source(self, tmp_path):
+        root = tmp_path / "mnist"
+        root.mkdir()
+        (root / "train.idx").write_bytes(b"t" * 100)
+        (root / "test.idx").write_bytes(b"t" * 10)
+        cache = _cache(tmp_path)
+        asyncio.run(cache.materialize(str(root), str(tmp_path / "job")))
+        assert cache.summary() == {str(root / "train.idx"): 100, str(root / "test.idx"): 10}
+        assert cache.summary(limit=1) == {str(root / "train.idx"): 100}
+
+
+class TestRemoteSources:
+    def test_revalidates_with_etag(self, tmp_path):
+        server = FakeServer({"/mnist.tar": b"m" * 5000})
+        cache = _cache(tmp_path, server=server)
+
+        async def run():
+            first = await cache.fetch("https://data.example/mnist.tar")
+            second = await cache.fetch("https://data.example/mnist.tar")
+            await cache.close()
+            return first, second
+
+        first, second = asyncio.run(run())
+        assert first == second == _sha(b"m" * 5000)
+        assert len(server.requests) == 2 and server.bytes_sent == 5000
+        assert "if-none-match" in server.requests[1].headers
+
+    def test_pinned_cached_source_needs_no_request(self, tmp_path):
+        body = b"p" * 100
+        server = FakeServer({"/weights.pt": body})
+        cache = _cache(tmp_path, server=server)
+        source = f"https://data.example/weights.pt#sha256={_sha(body)}"
+
+        async def run():
+            await cache.fetch(source)
+            await cache.fetch(source)
+
+        asyncio.run(run())
+        assert len(server.requests) == 1
+
+    def test_concurrent_fetches_share_one_download(self, tmp_path):
+        server = FakeServer({"/big.bin": b"b" * 10000})
+        cache = _cache(tmp_path, server=server, slow=True)
+
+        async def run():
+            return await asyncio.gather(*(cache.fetch("https://data.example/big.bin") for _ in range(5)))
+
+        assert len(set(asyncio.run(run()))) == 1
+        assert len(server.requests) == 1
+
+    def test_http_errors_raise_cache_error(self, tmp_path):
+        cache = _cache(tmp_path, server=FakeServer({}))
+        with pytest.raises(CacheError):
+            asyncio.run(cache.fetch("https://data.example/missing.bin"))
+
+
+class TestExecutorStaging:
+    def _job(self, job_id, source, mount_path="data/input.txt"):
+        return JobAssignment(
+            job_id=job_id,
+            spec=JobSpec(
+                image="python:3.11-slim",
+                command=[sys.executable, "-c", "print(open('data/input.txt').read())"],
+                volumes=[VolumeMount(name="input", mount_path=mount_path, source=source)],
+            ),
+        )
+
+    def test_repeated_job_transfers_nothing(self, tmp_path):
+        server = FakeServer({"/input.txt": b"hello"})
+        cache = _cache(tmp_path, server=server)
+        executor = JobExecutor(work_dir=str(tmp_path / "jobs"), cache=cache)
+        source = f"https://data.example/input.txt#sha256={_sha(b'hello')}"
+
+        async def run():
+            return [await executor.run(self._job(f"job-{i}", source)) for i in range(3)]
+
+        results = asyncio.run(run())
+        assert [r.logs for r in results] == ["hello\n"] * 3
+        assert server.bytes_sent == 5 and len(server.requests) == 1
+
+    def test_mount_path_must_stay_in_job_directory(self, tmp_path):
+        src = tmp_path / "x"
+        src.write_text("x")
+        executor = JobExecutor(work_dir=str(tmp_path / "jobs"), cache=_cache(tmp_path))
+        result = asyncio.run(executor.run(self._job("job-9", str(src), mount_path="../../escape")))
+        assert result.exit_code == -1 and "leaves the job directory" in result.error
@@ -0,0 +1,150 @@
+"""Tests for uploading job outputs to the master's artifact store.
+
+The uploader talks to the real master API in-process (``httpx.ASGITransport``).
+
+Run with: pytest worker/tests/test_artifact_upload.py -v
+"""
+
+import asyncio
+import os
+import sys
+
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+import httpx
+import pytest
+
+from core.protocols.models import JobAssignment, JobCreate, JobSpec, JobStatus
+from master.app.api import artifacts as artifacts_api
+from master.app.api import jobs as jobs_api
+from master.app.artifacts import ArtifactStore
+from master.app.jobs import JobManager
+from master.app.logs import LogStore
+from master.app.storage import InMemoryStore
+from master.main import app
+from worker.app.artifacts import ArtifactUploader, UploadError, find_outputs
+from worker.app.client import MasterClient
+from worker.app.outbox import Outbox
+from worker.main import WorkerAgent
+
+CHUNK = 4096
+
+
+class Interrupting(httpx.AsyncBaseTransport):
+    """Passes requests to the master until ``chunk_budget`` chunk uploads have gone through."""
+
+    def __init__(self):
+        self.inner = httpx.ASGITransport(app=app)
+        self.chunk_budget = None
+        self.chunk_puts = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if request.method == "PUT":
+            if self.chunk_budget == 0:
+                raise httpx.ConnectError("connection lost", request=request)
+            if self.chunk_budget is not None:
+                self.chunk_budget -= 1
+            self.chunk_puts += 1
+        return await self.inner.handle_async_request(request)
+
+
+@pytest.fixture
+def master(tmp_path):
+    job_manager = JobManager(InMemoryStore())
+    jobs_api.init(job_manager, None, LogStore())
+    store = ArtifactStore(str(tmp_path / "master"))
+    artifacts_api.init(store, job_manager)
+    return job_manager, store
+
+
+def _job(job_manager) -> str:
+    return job_manager.create(JobCreate(name="train", spec=JobSpec(image="python:3.11-slim"))).id
+
+
+def _file(path, size: int) -> bytes:
+    data = os.urandom(size)
+    path.write_bytes(data)
+    return data
+
+
+def _uploader(transport: Interrupting, **kwargs) -> ArtifactUploader:
+    client = MasterClient("http://master", transport=transport)
+    return ArtifactUploader(client, chunk_size=CHUNK, backoff_seconds=0.001, **kwargs)
+
+
+class TestArtifactUploader:
+    def test_interrupted_upload_resumes_where_it_stopped(self, master, tmp_path):
+        job_manager, store = master
+        job_id = _job(job_manager)
+        data = _file(tmp_path / "model.pt", CHUNK * 5 + 11)
+        transport = Interrupting()
+        transport.chunk_budget = 2
+
+        with pytest.raises(UploadError):
+            asyncio.run(_uploader(transport, attempts=1).upload(job_id, str(tmp_path / "model.pt"), "model.pt"))
+        transport.chunk_budget = None
+        uploader = _uploader(transport)
+        artifact = asyncio.run(uploader.upload(job_id, str(tmp_path / "model.pt"), "model.pt"))
+
+        assert (uploader.chunks_sent, uploader.chunks_skipped) == (4, 2)
+        assert artifact.complete and b"".join(store.read(artifact)) == data
+
+    def test_retries_through_a_dropped_connection(self, master, tmp_path):
+        job_manager, store = master
+        job_id = _job(job_manager)
+        data = _file(tmp_path / "model.pt", CHUNK * 3)
+        transport = Interrupting()
+        transport.chunk_budget = 1
+
+        async def heal():
+            await asyncio.sleep(0.05)
+            transport.chunk_budget = None
+
+        async def run():
+            healing = asyncio.create_task(heal())
+            uploader = _uploader(transport, attempts=50)
+            artifact = await uploader.upload(job_id, str(tmp_path / "model.pt"), "model.pt")
+            await healing
+            return artifact
+
+        artifact = asyncio.run(run())
+        assert b"".join(store.read(artifact)) == data
+        assert transport.chunk_puts == 3
+
+    def test_unchanged_weights_are_not_uploaded_again(self, master, tmp_path):
+        job_manager, _ = master
+        _file(tmp_path / "model.pt", CHUNK * 4)
+        transport = Interrupting()
+        asyncio.run(_uploader(transport).upload(_job(job_manager), str(tmp_path / "model.pt"), "model.pt"))
+        uploader = _uploader(transport)
+        asyncio.run(uploader.upload(_job(job_manager), str(tmp_path / "model.pt"), "weights.pt"))
+        assert uploader.chunks_sent == 0 and transport.chunk_puts == 4
+
+    def test_outputs_stay_inside_the_job_directory(self, tmp_path):
+        job = tmp_path / "job"
+        (job / "ckpt").mkdir(parents=True)
+        (job / "ckpt" / "epoch1.pt").write_bytes(b"1")
+        (job / "model.pt").write_bytes(b"m")
+        (tmp_path / "secret").write_bytes(b"s")
+        os.symlink(tmp_path / "secret", job / "link.pt")
+        found = find_outputs(str(job), ["*.pt", "ckpt/**/*.pt", "../secret", str(tmp_path / "secret")])
+        assert [name for name, _ in found] == ["ckpt/epoch1.pt", "model.pt"]
+
+
+class TestAgentOutputs:
+    def test_outputs_are_uploaded_and_listed_in_the_result(self, master, tmp_path):
+        job_manager, store = master
+        job_id = _job(job_manager)
+        client = MasterClient("http://master", transport=Interrupting())
+        agent = WorkerAgent("http://master", client=client, work_dir=str(tmp_path / "jobs"), outbox=Outbox())
+        script = "open('model.pt', 'wb').write(b'w' * 10000); print('saved')"
+        spec = JobSpec(image="python:3.11-slim", command=[sys.executable, "-c", script], outputs=["model.pt", "*.missing"])
+
+        asyncio.run(agent.execute(JobAssignment(job_id=job_id, spec=spec)))
+
+        update = dict(agent.outbox.pending())[job_id]
+        assert update.status == JobStatus.COMPLETED
+        assert update.result["artifacts"] == [{"name": "model.pt", "size": 10000}]
+        assert b"".join(store.read(store.get(job_id, "model.pt"))) == b"w" * 10000
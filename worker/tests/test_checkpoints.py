@@ -0,0 +1,189 @@
+"""Tests for job checkpoints: incremental saves, restores and resuming a stopped job.
+
+The worker talks to the real master API in-process (``httpx.ASGITransport``).
+
+Run with: pytest worker/tests/test_checkpoints.py -v
+"""
+
+import asyncio
+import os
+import sys
+
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+import httpx
+import pytest
+
+from core.protocols.models import JobAssignment, JobCreate, JobSpec, JobStatus
+from master.app.api import artifacts as artifacts_api
+from master.app.api import jobs as jobs_api
+from master.app.artifacts import ArtifactStore
+from master.app.jobs import JobManager
+from master.app.logs import LogStore
+from master.app.storage import InMemoryStore
+from master.main import app
+from worker.app.artifacts import ArtifactUploader
+from worker.app.checkpoints import Checkpointer
+from worker.app.client import MasterClient
+from worker.app.executor import JobExecutor
+from worker.app.outbox import Outbox
+from worker.main import WorkerAgent
+
+CHUNK = 4096
+
+# Counts epochs in $CLUSTERML_CHECKPOINT_DIR/state, resuming from what is there
+TRAIN = """
+import os, signal, sys, time
+path = os.path.join(os.environ["CLUSTERML_CHECKPOINT_DIR"], "state")
+epoch = int(open(path).read()) if os.path.exists(path) else 0
+print("resuming from epoch", epoch, flush=True)
+stop = []
+signal.signal(signal.SIGTERM, lambda *_: stop.append(True))
+while not stop and epoch < 60:
+    epoch += 1
+    with open(path + ".tmp", "w") as f:
+        f.write(str(epoch))
+    os.replace(path + ".tmp", path)
+    time.sleep(0.02)
+"""
+
+
+class Counting(httpx.AsyncBaseTransport):
+    """Passes requests to the master, counting chunk uploads and downloads."""
+
+    def __init__(self):
+        self.inner = httpx.ASGITransport(app=app)
+        self.chunk_puts = 0
+        self.chunk_gets = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if "/artifacts/chunks/" in request.url.path:
+            if request.method == "PUT":
+                self.chunk_puts += 1
+            elif request.method == "GET":
+                self.chunk_gets += 1
+        return await self.inner.handle_async_request(request)
+
+
+@pytest.fixture
+def master(tmp_path):
+    job_manager = JobManager(InMemoryStore())
+    jobs_api.init(job_manager, None, LogStore())
+    artifacts_api.init(ArtifactStore(str(tmp_path / "master")), job_manager)
+    return job_manager
+
+
+def _placed_job(job_manager, spec: JobSpec = None) -> str:
+    job = job_manager.create(JobCreate(name="train", spec=spec or JobSpec(image="python:3.11-slim")))
+    job_manager.mark_scheduled(job.id, "w1")
+    return job.id
+
+
+def _epoch(state: str) -> int:
+    """The epoch the training script last saved (0 before its first checkpoint)."""
+    try:
+        with open(state) as f:
+            return int(f.read() or 0)
+    except FileNotFoundError:
+        return 0
+
+
+def _checkpointer(transport: Counting) -> Checkpointer:
+    client = MasterClient("http://master", transport=transport)
+    return Checkpointer(client, ArtifactUploader(client, chunk_size=CHUNK, backoff_seconds=0.001))
+
+
+class TestCheckpointer:
+    def test_only_changed_chunks_are_uploaded(self, master, tmp_path):
+        job_id = _placed_job(master)
+        directory = tmp_path / "ckpt"
+        directory.mkdir()
+        weights = bytearray(os.urandom(CHUNK * 4))
+        (directory / "model.pt").write_bytes(weights)
+        (directory / "optimizer.pt").write_bytes(os.urandom(CHUNK))
+        (directory / "model.pt.tmp").write_bytes(b"half written")
+        transport = Counting()
+        checkpointer = _checkpointer(transport)
+
+        async def run():
+            first = await checkpointer.save(job_id, str(directory), "w1")
+            assert await checkpointer.save(job_id, str(directory), "w1") is None  # unchanged
+            weights[CHUNK:CHUNK + 10] = b"0123456789"
+            (directory / "model.pt").write_bytes(weights)
+            second = await checkpointer.save(job_id, str(directory), "w1")
+            return first, second
+
+        first, second = asyncio.run(run())
+        assert first.generation == 1 and [f.name for f in first.files] == ["model.pt", "optimizer.pt"]
+        assert second.generation == 2 and transport.chunk_puts == 5 + 1
+        assert master.get(job_id).checkpoint == second
+        assert not (tmp_path / ".checkpoint-snapshot").exists()
+
+    def test_restore_downloads_only_missing_chunks(self, master, tmp_path):
+        job_id = _placed_job(master)
+        saved = tmp_path / "saved"
+        saved.mkdir()
+        weights = os.urandom(CHUNK * 4)
+        (saved / "model.pt").write_bytes(weights)
+        checkpoint = asyncio.run(_checkpointer(Counting()).save(job_id, str(saved), "w1"))
+
+        # The new node has an older copy differing in the last chunk, and a stray file
+        target = tmp_path / "target"
+        target.mkdir()
+        (target / "model.pt").write_bytes(weights[:CHUNK * 3] + os.urandom(CHUNK))
+        (target / "later.pt").write_bytes(b"written after the checkpoint")
+        transport = Counting()
+        asyncio.run(_checkpointer(transport).restore(job_id, checkpoint, str(target)))
+
+        assert (target / "model.pt").read_bytes() == weights
+        assert sorted(os.listdir(target)) == ["model.pt"]
+        assert transport.chunk_gets == 1
+
+
+class TestResume:
+    def _agent(self, tmp_path, name: str) -> WorkerAgent:
+        client = MasterClient("http://master", transport=Counting())
+        uploader = ArtifactUploader(client, chunk_size=CHUNK)
+        executor = JobExecutor(work_dir=str(tmp_path / name), kill_grace_seconds=5)
+        return WorkerAgent(
+            "http://master",
+            client=client,
+            executor=executor,
+            outbox=Outbox(),
+            uploader=uploader,
+            checkpointer=Checkpointer(client, uploader, interval_seconds=0.05),
+        )
+
+    def test_stopped_job_resumes_from_its_checkpoint_elsewhere(self, master, tmp_path):
+        spec = JobSpec(image="python:3.11-slim", command=[sys.executable, "-c", TRAIN])
+        job_id = _placed_job(master, spec)
+        first = self._agent(tmp_path, "node-a")
+
+        async def preempt():
+            state = os.path.join(first.executor.checkpoint_dir(job_id), "state")
+            while await asyncio.to_thread(_epoch, state) < 10:
+                await asyncio.sleep(0.01)
+            await first.executor.stop(job_id)
+
+        async def run_first():
+            stopping = asyncio.create_task(preempt())
+            result = await first.execute(JobAssignment(job_id=job_id, spec=spec))
+            await stopping
+            return result
+
+        assert asyncio.run(run_first()).stopped
+        update = dict(first.outbox.pending())[job_id]
+        assert update.status == JobStatus.QUEUED and update.result["stopped"]
+        job = master.update(job_id, update)
+        assert job.status == JobStatus.QUEUED and job.restarts == 1
+        stopped_at = _epoch(os.path.join(first.executor.checkpoint_dir(job_id), "state"))
+        assert job.checkpoint.files[0].size == len(str(stopped_at))
+
+        master.mark_scheduled(job_id, "w2")
+        second = self._agent(tmp_path, "node-b")
+        result = asyncio.run(second.execute(JobAssignment(job_id=job_id, spec=spec, checkpoint=job.checkpoint)))
+        assert result.exit_code == 0
+        assert f"resuming from epoch {stopped_at}" in result.logs
+        assert dict(second.outbox.pending())[job_id].status == JobStatus.COMPLETED
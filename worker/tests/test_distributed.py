@@ -0,0 +1,186 @@
+"""Tests for distributed PyTorch jobs: the rendezvous, rank environment and group abort.
+
+Workers talk to the real master API in-process (``httpx.ASGITransport``);
+the last test runs a master and two worker processes training with the CPU
+``gloo`` backend, and is skipped without torch.
+
+Run with: pytest worker/tests/test_distributed.py -v
+"""
+
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+import httpx
+import pytest
+
+from core.protocols.models import (
+    DistributedConfig,
+    JobAssignment,
+    JobCreate,
+    JobSpec,
+    JobStatus,
+    NodeRegister,
+    ResourceInfo,
+)
+from master.app.api import jobs as jobs_api
+from master.app.jobs import JobManager
+from master.app.logs import LogStore
+from master.app.nodes import NodeManager
+from master.app.scheduler import Scheduler
+from master.app.storage import InMemoryStore
+from master.main import app
+from worker.app.client import MasterClient
+from worker.app.executor import JobExecutor
+from worker.app.outbox import Outbox
+from worker.main import WorkerAgent
+from worker.tests.helpers import free_port
+
+SHOW_ENV = "import os; print(*(os.environ[k] for k in ('RANK', 'WORLD_SIZE', 'LOCAL_RANK', 'MASTER_ADDR', 'MASTER_PORT')))"
+
+# Rank 1 fails at once; the others would run for a minute
+ONE_FAILS = "import os, sys, time; sys.exit(1) if os.environ['RANK'] == '1' else time.sleep(60)"
+
+ALL_REDUCE = """
+import torch, torch.distributed as dist
+dist.init_process_group("gloo")
+t = torch.tensor([dist.get_rank() + 1.0])
+dist.all_reduce(t)
+print("sum", int(t.item()), "world", dist.get_world_size(), flush=True)
+dist.destroy_process_group()
+"""
+
+
+@pytest.fixture
+def master():
+    store = InMemoryStore()
+    job_manager = JobManager(store)
+    node_manager = NodeManager(store, job_manager=job_manager)
+    jobs_api.init(job_manager, None, LogStore())
+    return store, job_manager, node_manager
+
+
+def _place(master, command: str, workers: int, nodes: int):
+    """Submit a distributed job and gang-schedule it on ``nodes`` local nodes."""
+    store, job_manager, node_manager = master
+    for i in range(nodes):
+        node_manager.register(NodeRegister(
+            hostname=f"node-{i}", ip_address="127.0.0.1",
+            resources=ResourceInfo(cpu_cores=8, memory_total_mb=16384), max_concurrent_jobs=2,
+        ))
+    spec = JobSpec(
+        image="python:3.11-slim",
+        command=[sys.executable, "-c", command],
+        distributed=DistributedConfig(workers=workers, type="pytorch"),
+    )
+    job = job_manager.create(JobCreate(name="ddp", spec=spec))
+    Scheduler(store, job_manager, node_manager)._tick()
+    job = job_manager.get(job.id)
+    return job, [job_manager.get(rank_id) for rank_id in job.ranks]
+
+
+def _agent(tmp_path, name: str) -> WorkerAgent:
+    client = MasterClient("http://master", transport=httpx.ASGITransport(app=app))
+    executor = JobExecutor(work_dir=str(tmp_path / name), kill_grace_seconds=2)
+    agent = WorkerAgent("http://master", client=client, executor=executor, outbox=Outbox())
+    return agent
+
+
+async def _run_ranks(tmp_path, ranks):
+    agents = [_agent(tmp_path, f"rank-{r.rendezvous.rank}") for r in ranks]
+    for agent, rank in zip(agents, ranks):
+        agent.worker_id = rank.worker_id
+
+    async def run(agent, rank):
+        result = await agent.execute(JobAssignment(job_id=rank.id, spec=rank.spec, rendezvous=rank.rendezvous))
+        await agent.flush_outbox()  # report at once, as the delivery loop would
+        return result
+
+    return await asyncio.gather(*(run(agent, rank) for agent, rank in zip(agents, ranks)))
+
+
+class TestRendezvous:
+    def test_ranks_start_together_with_torch_environment(self, master, tmp_path):
+        _, job_manager, _ = master
+        job, ranks = _place(master, SHOW_ENV, workers=3, nodes=2)
+        results = asyncio.run(_run_ranks(tmp_path, ranks))
+
+        lines = [result.logs.split() for result in results]
+        ports = {line[4] for line in lines}
+        assert [line[:4] for line in lines] == [
+            ["0", "3", "0", "127.0.0.1"], ["1", "3", "1", "127.0.0.1"], ["2", "3", "0", "127.0.0.1"],
+        ]
+        assert len(ports) == 1 and ports != {"None"}
+        assert job_manager.get(job.id).status == JobStatus.COMPLETED
+
+    def test_failing_rank_stops_the_others(self, master, tmp_path):
+        _, job_manager, _ = master
+        job, ranks = _place(master, ONE_FAILS, workers=3, nodes=2)
+        started = time.monotonic()
+        results = asyncio.run(_run_ranks(tmp_path, ranks))
+
+        assert time.monotonic() - started < 15
+        assert [(r.exit_code, r.cancelled) for r in results][1] == (1, False)
+        assert results[0].cancelled and results[2].cancelled
+        failed = job_manager.get(job.id)
+        assert failed.status == JobStatus.FAILED and failed.error == "Rank 1 failed (exit code 1)"
+
+
+class TestGlooProcesses:
+    def test_all_reduce_across_local_workers(self, tmp_path):
+        pytest.importorskip("torch")
+        port = free_port()
+        env = dict(os.environ, MASTER_PORT=str(port), LOG_LEVEL="WARNING")
+        master = subprocess.Popen(
+            [sys.executable, "main.py"], cwd=os.path.join(_project_root, "master"), env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        url = f"http://127.0.0.1:{port}"
+        workers = []
+        try:
+            with httpx.Client(base_url=url, timeout=10.0) as http:
+                for _ in range(100):
+                    try:
+                        http.get("/health").raise_for_status()
+                        break
+                    except httpx.HTTPError:
+                        time.sleep(0.1)
+                for i in range(2):
+                    root = tmp_path / f"worker-{i}"
+                    workers.append(subprocess.Popen(
+                        [sys.executable, "worker/main.py", "--master-url", url, "--hostname", f"worker-{i}",
+                         "--heartbeat-interval", "0.5", "--max-concurrent-jobs", "2", "--peer-port", "0",
+                         "--work-dir", str(root / "jobs"), "--cache-dir", str(root / "cache"),
+                         "--outbox", str(root / "outbox.json"), "--log-spill-dir", ""],
+                        cwd=_project_root, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                    ))
+                while len(http.get("/api/v1/nodes").json()) < 2:
+                    time.sleep(0.1)
+
+                spec = {
+                    "image": "python:3.11-slim",
+                    "command": [sys.executable, "-c", ALL_REDUCE],
+                    "distributed": {"workers": 4, "type": "pytorch"},
+                }
+                job_id = http.post("/api/v1/jobs", json={"name": "ddp", "spec": spec}).json()["id"]
+                deadline = time.monotonic() + 120
+                while time.monotonic() < deadline:
+                    job = http.get(f"/api/v1/jobs/{job_id}").json()
+                    if job["status"] in ("completed", "failed", "cancelled"):
+                        break
+                    time.sleep(0.2)
+                assert job["status"] == "completed", job.get("error")
+                for rank_id in job["ranks"]:
+                    logs = http.get(f"/api/v1/jobs/{rank_id}/logs").json()["logs"]
+                    assert "sum 10 world 4" in logs
+        finally:
+            for process in workers + [master]:
+                process.terminate()
+            for process in workers + [master]:
+                process.wait(timeout=30)
@@ -0,0 +1,222 @@
+"""Tests for the subprocess job executor and its use by the worker agent.
+
+Run with: pytest worker/tests/test_executor.py -v
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+import httpx
+
+from core.protocols.models import (
+    JobAssignment,
+    JobSpec,
+    ResourceRequirements,
+    VolumeMount,
+)
+from worker.app.client import MasterClient
+from worker.app.executor import CoreAllocator, JobExecutor
+from worker.main import WorkerAgent
+from worker.tests.helpers import FakeMaster
+
+CORES = sorted(os.sched_getaffinity(0))
+
+
+def _job(job_id: str, code: str, cpu: str = "1", env=None) -> JobAssignment:
+    return JobAssignment(
+        job_id=job_id,
+        spec=JobSpec(
+            image="python:3.11-slim",
+            command=[sys.executable, "-c"],
+            args=[code],
+            resources=ResourceRequirements(cpu=cpu),
+            env=[{"name": k, "value": v} for k, v in (env or {}).items()],
+        ),
+    )
+
+
+class TestCoreAllocator:
+    def test_disjoint_until_exhausted_then_shares_least_used(self):
+        allocator = CoreAllocator(range(8))
+        a = allocator.allocate(4)
+        b = allocator.allocate(2)
+        assert not set(a) & set(b)
+        assert allocator.free() == 2
+        c = allocator.allocate(4)
+        assert c == [0, 1, 6, 7]  # the two idle cores, then shared ones
+        allocator.release(a)
+        assert allocator.allocate(2) == [2, 3]  # released and now unused
+
+    def test_request_capped_at_available_cores(self):
+        allocator = CoreAllocator([0, 1])
+        assert allocator.allocate(16) == [0, 1]
+        assert allocator.allocate(0) in ([0], [1])
+
+
+class TestJobExecutor:
+    def test_runs_pinned_with_thread_limits(self, tmp_path):
+        code = (
+            "import os; print(os.environ['OMP_NUM_THREADS'], os.environ['MKL_NUM_THREADS'], "
+            "sorted(os.sched_getaffinity(0)), os.environ['GREETING'], os.getcwd())"
+        )
+        executor = JobExecutor(work_dir=str(tmp_path))
+        result = asyncio.run(executor.run(_job("job-1", code, cpu="2000m", env={"GREETING": "hi"})))
+        expected = CORES[:2]
+        assert result.exit_code == 0
+        assert result.cores == expected
+        n = len(expected)
+        assert result.logs.strip() == f"{n} {n} {expected} hi {tmp_path / 'job-1'}"
+
+    def test_streams_output_while_running(self, tmp_path):
+        lines = []
+        seen_running = asyncio.Event()
+
+        def on_output(job_id, stream, line):
+            lines.append((job_id, stream, line.strip()))
+            if len(lines) == 2:
+                seen_running.set()
+
+        async def run():
+            executor = JobExecutor(work_dir=str(tmp_path), on_output=on_output)
+            code = "import sys, time; print('ready', flush=True); print('oops', file=sys.stderr, flush=True); time.sleep(30)"
+            task = asyncio.create_task(executor.run(_job("job-2", code)))
+            await asyncio.wait_for(seen_running.wait(), timeout=10)
+            assert "job-2" in executor.pids()
+            await executor.cancel("job-2")
+            return await task
+
+        result = asyncio.run(run())
+        assert result.cancelled
+        assert ("job-2", "stdout", "ready") in lines
+        assert ("job-2", "stderr", "oops") in lines
+
+    def test_limits_concurrency(self, tmp_path):
+        running = 0
+        peak = 0
+
+        async def run():
+            executor = JobExecutor(max_concurrent_jobs=2, work_dir=str(tmp_path))
+
+            async def one(i):
+                nonlocal running, peak
+
+                def on_start(job_id, pid):
+                    nonlocal running, peak
+                    running += 1
+                    peak = max(peak, running)
+
+                result = await executor.run(_job(f"job-{i}", "import time; time.sleep(0.3)"), on_start=on_start)
+                running -= 1
+                return result
+
+            return await asyncio.gather(*(one(i) for i in range(4)))
+
+        start = time.monotonic()
+        results = asyncio.run(run())
+        assert [r.exit_code for r in results] == [0, 0, 0, 0]
+        assert peak == 2
+        assert time.monotonic() - start >= 0.6
+
+    def test_cancel_kills_process_tree(self, tmp_path):
+        pid_file = tmp_path / "child.pid"
+        code = (
+            "import subprocess, sys, time; "
+            "p = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)']); "
+            f"open({str(pid_file)!r}, 'w').write(str(p.pid)); time.sleep(60)"
+        )
+
+        async def run():
+            executor = JobExecutor(work_dir=str(tmp_path), kill_grace_seconds=2)
+            task = asyncio.create_task(executor.run(_job("job-3", code)))
+            while not pid_file.exists() or not pid_file.read_text():
+                await asyncio.sleep(0.02)
+            assert await executor.cancel("job-3")
+            return await task
+
+        result = asyncio.run(run())
+        assert result.cancelled and result.exit_code != 0
+        child = int(pid_file.read_text())
+        deadline = time.monotonic() + 5
+        while os.path.exists(f"/proc/{child}") and time.monotonic() < deadline:
+            with open(f"/proc/{child}/stat") as f:
+                if f.read().rsplit(")", 1)[1].split()[0] == "Z":
+                    break  # exited, waiting for init to reap it
+            time.sleep(0.05)
+        else:
+            assert not os.path.exists(f"/proc/{child}")
+
+    def test_cancel_before_start_skips_job(self, tmp_path):
+        async def run():
+            executor = JobExecutor(max_concurrent_jobs=1, work_dir=str(tmp_path))
+            first = asyncio.create_task(executor.run(_job("job-4", "import time; time.sleep(0.3)")))
+            second = asyncio.create_task(executor.run(_job("job-5", "print('should not run')")))
+            await asyncio.sleep(0.1)
+            assert await executor.cancel("job-5")
+            return await asyncio.gather(first, second)
+
+        first, second = asyncio.run(run())
+        assert first.exit_code == 0
+        assert second.cancelled and second.logs == ""
+
+    def test_cancel_while_staging_inputs_skips_job(self, tmp_path):
+        class SlowCache:
+            def __init__(self):
+                self.staging = asyncio.Event()
+                self.release = asyncio.Event()
+
+            async def materialize(self, source, dest):
+                self.staging.set()
+                await self.release.wait()
+
+        async def run():
+            cache = SlowCache()
+            executor = JobExecutor(work_dir=str(tmp_path), cache=cache)
+            job = _job("job-7", "print('should not run')")
+            job.spec.volumes = [VolumeMount(name="data", mountPath="data", source="dataset://mnist")]
+            started = []
+            task = asyncio.create_task(executor.run(job, on_start=lambda job_id, pid: started.append(pid)))
+            await cache.staging.wait()
+            assert await executor.cancel("job-7")
+            cache.release.set()
+            return await task, started
+
+        result, started = asyncio.run(run())
+        assert result.cancelled and result.logs == "" and started == []
+
+    def test_missing_command_fails(self, tmp_path):
+        executor = JobExecutor(work_dir=str(tmp_path))
+        job = JobAssignment(job_id="job-6", spec=JobSpec(image="python:3.11-slim"))
+        result = asyncio.run(executor.run(job))
+        assert result.exit_code == -1 and result.error
+
+
+class TestAgentExecution:
+    def test_assignment_runs_and_is_reported(self, tmp_path):
+        master = FakeMaster(_job("job-7", "print('trained')"))
+        client = MasterClient("http://master", transport=httpx.MockTransport(master.handler))
+        agent = WorkerAgent(
+            "http://master", heartbeat_interval=0.01, client=client,
+            max_concurrent_jobs=3, work_dir=str(tmp_path),
+        )
+
+        async def run():
+            task = asyncio.create_task(agent.run())
+            deadline = time.monotonic() + 10
+            while len(master.updates) < 2 and time.monotonic() < deadline:
+                await asyncio.sleep(0.01)
+            agent.stop()
+            await asyncio.wait_for(task, timeout=5)
+
+        asyncio.run(run())
+        assert master.registration["max_concurrent_jobs"] == 3
+        assert [u["status"] for u in master.updates] == ["running", "completed"]
+        assert master.updates[1]["result"]["exit_code"] == 0
+        assert master.updates[1]["logs"] == "trained\n"
+        assert master.updates[1]["shipped"] == "trained\n"
+        assert agent.active_jobs() == []
@@ -0,0 +1,150 @@
+"""Tests for the fork-server template interpreters.
+
+Run with: pytest worker/tests/test_forkserver.py -v
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+from core.protocols.models import JobAssignment, JobSpec
+from worker.app.executor import JobExecutor
+from worker.app.forkserver import (
+    ForkServer,
+    PythonCommand,
+    parse_python_command,
+    parse_templates,
+)
+
+# Stand-ins for numpy/sklearn: installed, and slow enough to import to matter
+TEMPLATES = {"base": [], "web": ["fastapi", "pydantic"], "mail": ["email.mime.text"]}
+
+
+def _job(job_id: str, command, env=None) -> JobAssignment:
+    return JobAssignment(
+        job_id=job_id,
+        spec=JobSpec(image="python:3.11-slim", command=command, env=[{"name": k, "value": v} for k, v in (env or {}).items()]),
+    )
+
+
+def _with_server(templates, body):
+    async def run():
+        server = ForkServer(templates)
+        await server.start()
+        try:
+            return await body(server)
+        finally:
+            await server.stop()
+
+    return asyncio.run(run())
+
+
+class TestCommandParsing:
+    def test_forms(self):
+        assert parse_python_command(["python", "train.py", "--lr", "0.1"]) == PythonCommand("script", "train.py", ["--lr", "0.1"])
+        assert parse_python_command(["python3", "-u", "-m", "pkg.main", "x"]) == PythonCommand("module", "pkg.main", ["x"], True)
+        assert parse_python_command([sys.executable, "-c", "print(1)"]) == PythonCommand("code", "print(1)", [])
+
+    def test_unsupported(self):
+        assert parse_python_command(["bash", "-c", "echo"]) is None
+        assert parse_python_command(["python", "-X", "importtime", "a.py"]) is None
+        assert parse_python_command(["python"]) is None
+        assert parse_python_command([]) is None
+
+    def test_parse_templates(self):
+        assert parse_templates("base=;sk=numpy, sklearn.ensemble") == {"base": [], "sk": ["numpy", "sklearn.ensemble"]}
+
+
+class TestForkServer:
+    def test_match_by_imports(self, tmp_path):
+        (tmp_path / "app.py").write_text("import fastapi\nfrom pydantic import BaseModel\n")
+        (tmp_path / "plain.py").write_text("import json\n")
+
+        async def body(server):
+            return (
+                server.match(["python", "app.py"], {}, str(tmp_path)),
+                server.match(["python", "plain.py"], {}, str(tmp_path)),
+                server.match(["python", "-c", "from email.mime.text import MIMEText"], {}, str(tmp_path)),
+                server.match(["python", "app.py"], {"CLUSTERML_TEMPLATE": "none"}, str(tmp_path)),
+                server.match(["python", "plain.py"], {"CLUSTERML_TEMPLATE": "web"}, str(tmp_path)),
+                server.match(["sh", "-c", "true"], {}, str(tmp_path)),
+            )
+
+        app, plain, mail, forced_cold, forced_web, shell = _with_server(TEMPLATES, body)
+        assert app[0] == "web"
+        assert plain[0] == "base"
+        assert mail[0] == "mail"
+        assert forced_cold is None
+        assert forced_web[0] == "web"
+        assert shell is None
+
+    def test_forked_job_runs_with_preloaded_modules(self, tmp_path):
+        script = tmp_path / "job-1" / "job.py"
+        script.parent.mkdir()
+        script.write_text(
+            "import os, sys\n"
+            "print('preloaded' if 'fastapi' in sys.modules else 'cold', sys.argv[1:], os.getcwd(), os.environ['OMP_NUM_THREADS'])\n"
+            "print('to stderr', file=sys.stderr)\n"
+            "sys.exit(3)\n"
+        )
+
+        async def body(server):
+            executor = JobExecutor(work_dir=str(tmp_path), fork_server=server)
+            return await executor.run(_job("job-1", ["python", "job.py", "--epochs", "2"], {"CLUSTERML_TEMPLATE": "web"}))
+
+        result = _with_server(TEMPLATES, body)
+        assert result.exit_code == 3
+        assert f"preloaded ['--epochs', '2'] {script.parent} 1\n" in result.logs
+        assert "to stderr\n" in result.logs
+
+    def test_exceptions_and_cancel(self, tmp_path):
+        async def body(server):
+            executor = JobExecutor(work_dir=str(tmp_path), fork_server=server, kill_grace_seconds=1)
+            crashed = await executor.run(_job("job-2", ["python", "-c", "raise ValueError('boom')"]))
+            task = asyncio.create_task(executor.run(_job("job-3", ["python", "-c", "import time; time.sleep(60)"])))
+            while "job-3" not in executor.pids():
+                await asyncio.sleep(0.01)
+            await executor.cancel("job-3")
+            return crashed, await task
+
+        crashed, cancelled = _with_server({"base": []}, body)
+        assert crashed.exit_code == 1 and "ValueError: boom" in crashed.logs
+        assert cancelled.cancelled and cancelled.exit_code < 0
+
+    def test_falls_back_to_cold_start_when_template_dies(self, tmp_path):
+        async def body(server):
+            executor = JobExecutor(work_dir=str(tmp_path), fork_server=server)
+            server.templates["base"].process.kill()
+            await server.templates["base"].process.wait()
+            return await executor.run(_job("job-4", ["python", "-c", "print('ran')"]))
+
+        result = _with_server({"base": []}, body)
+        assert result.exit_code == 0 and result.logs == "ran\n"
+
+    def test_broken_template_is_skipped(self, tmp_path):
+        async def body(server):
+            return server.templates["bad"].alive, server.match(["python", "-c", "import json"], {}, str(tmp_path))
+
+        alive, match = _with_server({"bad": ["no_such_module_xyz"]}, body)
+        assert not alive and match is None
+
+    def test_forked_start_is_faster_than_cold(self, tmp_path):
+        code = "import fastapi; print('ok')"
+
+        async def body(server):
+            executor = JobExecutor(work_dir=str(tmp_path), fork_server=server)
+            timings = {}
+            for name, env in (("cold", {"CLUSTERML_TEMPLATE": "none"}), ("forked", {})):
+                start = time.perf_counter()
+                result = await executor.run(_job(f"job-{name}", ["python", "-c", code], env))
+                assert result.exit_code == 0
+                timings[name] = time.perf_counter() - start
+            return timings
+
+        timings = _with_server({"web": ["fastapi"]}, body)
+        assert timings["forked"] < timings["cold"] / 2
@@ -0,0 +1,179 @@
+"""Tests for batched, compressed shipping of job output to the master.
+
+Run with: pytest worker/tests/test_log_shipper.py -v
+"""
+
+import asyncio
+import os
+import sys
+
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+import httpx
+
+from worker.app.client import MasterClient
+from worker.app.logs import LogShipper
+from worker.tests.helpers import FakeMaster
+
+
+def _shipper(master: FakeMaster, **kwargs) -> LogShipper:
+    client = MasterClient("http://master", transport=httpx.MockTransport(master.handler))
+    return LogShipper(client, **kwargs)
+
+
+def _lines(n: int, job: str = "job-1"):
+    return [f"{job} step {i} loss=0.{i:04d}\n" for i in range(n)]
+
+
+class TestLogShipper:
+    def test_many_lines_become_few_compressed_requests(self):
+        master = FakeMaster()
+        shipper = _shipper(master, flush_seconds=0.05)
+        lines = _lines(2000)
+
+        async def run():
+            task = asyncio.create_task(shipper.run())
+            for i, line in enumerate(lines):
+                shipper.write("job-1", "stderr" if i % 10 == 0 else "stdout", line)
+            await asyncio.sleep(0.2)
+            await shipper.close()
+            await task
+
+        asyncio.run(run())
+        assert master.store.read("job-1") == "".join(lines)
+        assert len(master.requests) <= 2
+        assert all(r.headers["content-encoding"] == "gzip" for r in master.requests)
+        assert shipper.bytes_sent * 3 < shipper.raw_bytes_sent
+
+    def test_size_threshold_flushes_before_the_timer(self):
+        master = FakeMaster()
+        shipper = _shipper(master, flush_seconds=30, flush_bytes=1000)
+
+        async def run():
+            task = asyncio.create_task(shipper.run())
+            for line in _lines(100):
+                shipper.write("job-1", "stdout", line)
+            for _ in range(100):
+                if master.requests:
+                    break
+                await asyncio.sleep(0.01)
+            shipped = len(master.requests)
+            await shipper.close()
+            await task
+            return shipped
+
+        assert asyncio.run(run()) >= 1
+
+    def test_jobs_share_batches_and_finished_jobs_are_forgotten(self):
+        master = FakeMaster()
+        shipper = _shipper(master)
+
+        async def run():
+            for job in ("a", "b", "c"):
+                for line in _lines(3, job):
+                    shipper.write(job, "stdout", line)
+                shipper.finish(job)
+            return await shipper.flush()
+
+        assert asyncio.run(run())
+        assert len(master.requests) == 1
+        assert [master.store.read(job) for job in "abc"] == ["".join(_lines(3, job)) for job in "abc"]
+        assert not shipper.has_pending and shipper.buffered_bytes == 0
+
+    def test_retried_batch_is_not_duplicated(self):
+        master = FakeMaster()
+        master.fail_after_store = 1
+        shipper = _shipper(master)
+        lines = _lines(10)
+
+        async def run():
+            for line in lines:
+                shipper.write("job-1", "stdout", line)
+            assert not await shipper.flush()
+            shipper.write("job-1", "stdout", "last\n")
+            assert await shipper.flush()
+
+        asyncio.run(run())
+        assert master.store.read("job-1") == "".join(lines) + "last\n"
+
+    def test_drops_when_buffer_is_full_and_marks_the_gap(self):
+        master = FakeMaster()
+        master.up = False
+        lines = _lines(100)
+        cap = sum(len(line) for line in lines[:10])
+        shipper = _shipper(master, max_buffer_bytes=cap)
+
+        async def run():
+            for line in lines:
+                shipper.write("job-1", "stdout", line)
+            assert shipper.buffered_bytes <= cap
+            assert not await shipper.flush()
+            master.up = True
+            assert await shipper.flush()
+            shipper.write("job-1", "stdout", "after recovery\n")
+            assert await shipper.flush()
+
+        asyncio.run(run())
+        assert shipper.lines_dropped == 90
+        dropped = sum(len(line) for line in lines[10:])
+        assert master.store.read("job-1") == (
+            "".join(lines[:10]) + f"[clusterml: {dropped} characters of output dropped]\nafter recovery\n"
+        )
+
+    def test_spills_to_disk_and_ships_everything_in_order(self, tmp_path):
+        master = FakeMaster()
+        master.up = False
+        lines = _lines(500)
+        cap = sum(len(line) for line in lines[:20])
+        shipper = _shipper(master, max_buffer_bytes=cap, flush_bytes=cap, spill_dir=str(tmp_path))
+
+        async def run():
+            for line in lines[:400]:
+                shipper.write("job-1", "stdout", line)
+            assert shipper.buffered_bytes <= cap and shipper.spilled_bytes > 0
+            assert os.listdir(tmp_path) == ["job-1.spill"]
+            assert not await shipper.flush()
+            master.up = True
+            for line in lines[400:]:
+                shipper.write("job-1", "stdout", line)
+            assert await shipper.flush()
+
+        asyncio.run(run())
+        assert shipper.lines_dropped == 0
+        assert master.store.read("job-1") == "".join(lines)
+        assert os.listdir(tmp_path) == []
+
+    def test_rejected_batch_does_not_block_later_output(self):
+        master = FakeMaster()
+        master.reject = True
+        shipper = _shipper(master)
+
+        async def run():
+            shipper.write("job-1", "stdout", "bad\n")
+            assert await shipper.flush()
+            master.reject = False
+            shipper.write("job-1", "stdout", "good\n")
+            assert await shipper.flush()
+
+        asyncio.run(run())
+        assert master.store.read("job-1") == "[clusterml: 4 characters of output dropped]\ngood\n"
+
+    def test_stops_shipping_when_the_master_does_not_take_logs(self, tmp_path):
+        master = FakeMaster()
+        master.logs_enabled = False
+        shipper = _shipper(master, max_buffer_bytes=4, spill_dir=str(tmp_path))
+
+        async def run():
+            for line in _lines(3):
+                shipper.write("job-1", "stdout", line)
+            assert await shipper.flush()
+            shipper.write("job-1", "stdout", "later\n")
+            assert await shipper.flush()
+
+        asyncio.run(run())
+        assert shipper.disabled and not shipper.has_pending
+        assert shipper.buffered_bytes == 0 and shipper.spilled_bytes == 0
+        assert os.listdir(tmp_path) == []
+        assert len([r for r in master.requests if r.url.path == "/api/v1/jobs/logs"]) == 1
@@ -0,0 +1,121 @@
+"""Tests for the worker's durable outbox of job updates.
+
+Run with: pytest worker/tests/test_outbox.py -v
+"""
+
+import asyncio
+import os
+import sys
+import threading
+
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+import httpx
+
+from core.protocols.models import JobAssignment, JobSpec, JobStatus, JobUpdate
+from worker.app.client import MasterClient
+from worker.app.outbox import Outbox
+from worker.main import WorkerAgent
+from worker.tests.helpers import FakeMaster, run_until
+
+
+class TestOutbox:
+    def test_updates_for_a_job_are_coalesced(self):
+        outbox = Outbox()
+        first = asyncio.run(outbox.put("job-1", JobUpdate(status=JobStatus.RUNNING)))
+        asyncio.run(outbox.put("job-2", JobUpdate(status=JobStatus.RUNNING)))
+        last = asyncio.run(outbox.put("job-1", JobUpdate(status=JobStatus.COMPLETED, result={"exit_code": 0})))
+        assert last > first
+        pending = outbox.pending()
+        assert [job_id for job_id, _ in pending] == ["job-2", "job-1"]
+        update = pending[1][1]
+        assert (update.status, update.result, update.seq) == (JobStatus.COMPLETED, {"exit_code": 0}, last)
+
+    def test_ack_of_a_superseded_update_keeps_the_newer_one(self):
+        async def run():
+            outbox = Outbox()
+            sent = await outbox.put("job-1", JobUpdate(status=JobStatus.RUNNING))
+            await outbox.put("job-1", JobUpdate(status=JobStatus.FAILED))
+            assert not await outbox.ack("job-1", sent)
+            assert outbox.pending()[0][1].status == JobStatus.FAILED
+            assert await outbox.ack("job-1", outbox.pending()[0][1].seq)
+            assert len(outbox) == 0
+
+        asyncio.run(run())
+
+    def test_survives_restart_and_sequence_keeps_growing(self, tmp_path):
+        path = str(tmp_path / "state" / "outbox.json")
+        outbox = Outbox(path)
+        asyncio.run(outbox.put("job-1", JobUpdate(status=JobStatus.COMPLETED, logs="done\n")))
+        outbox.seq += 10**12  # as if the clock had run ahead before the restart
+        asyncio.run(outbox.put("job-2", JobUpdate(status=JobStatus.RUNNING)))
+        reopened = Outbox(path)
+        assert [(j, u.status) for j, u in reopened.pending()] == [("job-1", JobStatus.COMPLETED), ("job-2", JobStatus.RUNNING)]
+        assert asyncio.run(reopened.put("job-3", JobUpdate(status=JobStatus.RUNNING))) > outbox.seq
+        assert sorted(os.listdir(tmp_path / "state")) == ["outbox.json"]
+
+    def test_writes_run_off_the_event_loop_and_coalesce(self, tmp_path, monkeypatch):
+        path = str(tmp_path / "outbox.json")
+        outbox = Outbox(path)
+        write = outbox._write
+        threads = []
+
+        def recorded(state):
+            threads.append(threading.current_thread())
+            write(state)
+
+        monkeypatch.setattr(outbox, "_write", recorded)
+
+        async def run():
+            await asyncio.gather(*(outbox.put(f"job-{i}", JobUpdate(status=JobStatus.RUNNING)) for i in range(20)))
+
+        asyncio.run(run())
+        assert 1 <= len(threads) <= 2 and threading.main_thread() not in threads
+        assert len(Outbox(path)) == 20
+
+
+def _agent(master, tmp_path, outbox_path=None):
+    client = MasterClient("http://master", transport=httpx.MockTransport(master.handler))
+    return WorkerAgent(
+        "http://master", heartbeat_interval=0.01, client=client, work_dir=str(tmp_path / "jobs"),
+        outbox=Outbox(outbox_path),
+    )
+
+
+class TestAgentOutbox:
+    def test_outage_delivers_only_the_final_state(self, tmp_path):
+        job = JobAssignment(job_id="job-1", spec=JobSpec(image="python:3.11-slim", command=[sys.executable, "-c", "print('hi')"]))
+        master = FakeMaster(job, node_id="w-1")
+        master.up = False
+        agent = _agent(master, tmp_path)
+        seen = {}
+
+        def recovered():
+            pending = agent.outbox.pending()
+            if not seen and pending and pending[0][1].status == JobStatus.COMPLETED:
+                seen["active"] = agent.active_jobs()
+                master.up = True
+            return bool(seen) and len(agent.outbox) == 0
+
+        asyncio.run(run_until(agent, recovered))
+        # RUNNING was superseded while the master was down
+        assert [u["status"] for u in master.updates] == ["completed"]
+        assert master.updates[0]["logs"] == "hi\n" and master.updates[0]["worker_id"] == "w-1"
+        assert seen["active"] == ["job-1"]  # not reassignable while undelivered
+
+    def test_undelivered_updates_are_replayed_after_restart(self, tmp_path):
+        path = str(tmp_path / "outbox.json")
+        master = FakeMaster(node_id="w-1")
+        master.up = False
+        first = _agent(master, tmp_path, path)
+        asyncio.run(first.report("job-9", JobUpdate(status=JobStatus.FAILED, result={"exit_code": 1})))
+        asyncio.run(run_until(first, lambda: False, timeout=0.2))
+        assert master.updates == []
+
+        master.up = True
+        second = _agent(master, tmp_path, path)
+        asyncio.run(run_until(second, lambda: master.updates))
+        assert [(u["status"], u["result"]) for u in master.updates] == [("failed", {"exit_code": 1})]
+        assert len(Outbox(path)) == 0
@@ -0,0 +1,115 @@
+"""Tests for intermediate job metrics: reading the metrics file and reporting it.
+
+The worker talks to the real master API in-process (``httpx.ASGITransport``).
+
+Run with: pytest worker/tests/test_progress.py -v
+"""
+
+import asyncio
+import os
+import sys
+
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+import httpx
+import pytest
+
+from core.protocols.models import JobAssignment, JobCreate, JobSpec, JobStatus
+from master.app.api import jobs as jobs_api
+from master.app.jobs import JobManager
+from master.app.logs import LogStore
+from master.app.storage import InMemoryStore
+from master.main import app
+from worker.app.client import MasterClient
+from worker.app.executor import JobExecutor
+from worker.app.outbox import Outbox
+from worker.app.progress import MetricsReporter, parse, read_new
+from worker.main import WorkerAgent
+
+# Reports accuracy for 5 epochs, the last one just before exiting
+TRAIN = """
+import json, os, time
+with open(os.environ["CLUSTERML_METRICS_FILE"], "a") as f:
+    for epoch in range(1, 6):
+        f.write(json.dumps({"step": epoch, "accuracy": epoch / 10}) + "\\n")
+        f.flush()
+        time.sleep(0.05)
+"""
+
+
+@pytest.fixture
+def master():
+    job_manager = JobManager(InMemoryStore())
+    jobs_api.init(job_manager, None, LogStore())
+    return job_manager
+
+
+class TestMetricsFile:
+    def test_parse_skips_what_is_not_a_record(self):
+        assert parse('{"step": 2, "loss": 0.5, "note": "x", "done": true}').values == {"loss": 0.5}
+        assert parse('{"step": "2", "loss": 0.5}') is None
+        assert parse('{"loss": 0.5}') is None
+        assert parse("epoch 2 loss 0.5") is None
+        assert parse('{"step": 2, "loss": NaN}') is None
+
+    def test_incomplete_line_waits_for_the_next_read(self, tmp_path):
+        path = str(tmp_path / "metrics.jsonl")
+        assert read_new(path, 0) == ([], 0)
+        with open(path, "w") as f:
+            f.write('{"step": 1, "loss": 0.9}\n{"step": 2, "lo')
+        records, offset = read_new(path, 0)
+        assert [r.step for r in records] == [1]
+        with open(path, "a") as f:
+            f.write('ss": 0.7}\n')
+        records, offset = read_new(path, offset)
+        assert [(r.step, r.values) for r in records] == [(2, {"loss": 0.7})]
+        assert offset == os.path.getsize(path)
+
+
+class TestMetricsReporter:
+    def test_job_metrics_reach_the_master_before_it_completes(self, master, tmp_path):
+        job = master.create(JobCreate(name="train", spec=JobSpec(image="python:3.11-slim")))
+        master.mark_scheduled(job.id, "w1")
+        seen = []
+        master.on_metrics(lambda j, records: seen.extend(r.step for r in records))
+        client = MasterClient("http://master", transport=httpx.ASGITransport(app=app))
+        agent = WorkerAgent(
+            "http://master",
+            client=client,
+            executor=JobExecutor(work_dir=str(tmp_path / "jobs")),
+            outbox=Outbox(),
+            reporter=MetricsReporter(client, interval_seconds=0.1),
+        )
+        agent.worker_id = "w1"
+
+        async def run():
+            spec = JobSpec(image="python:3.11-slim", command=[sys.executable, "-c", TRAIN])
+            await agent.execute(JobAssignment(job_id=job.id, spec=spec))
+            await agent.flush_outbox()
+
+        asyncio.run(run())
+        finished = master.get(job.id)
+        assert finished.status == JobStatus.COMPLETED
+        assert finished.metrics == {"accuracy": 0.5} and finished.metrics_step == 5
+        assert seen == [1, 2, 3, 4, 5]
+
+    def test_unsent_records_are_retried(self, master, tmp_path):
+        job = master.create(JobCreate(name="train", spec=JobSpec(image="python:3.11-slim")))
+        master.mark_scheduled(job.id, "w1")
+        path = str(tmp_path / "metrics.jsonl")
+        with open(path, "w") as f:
+            f.write('{"step": 1, "loss": 0.9}\n')
+
+        class Down(httpx.AsyncBaseTransport):
+            async def handle_async_request(self, request):
+                raise httpx.ConnectError("master unreachable")
+
+        reporter = MetricsReporter(MasterClient("http://master", transport=Down()))
+        asyncio.run(reporter.flush(job.id, path))
+        reporter.client = MasterClient("http://master", transport=httpx.ASGITransport(app=app))
+        with open(path, "a") as f:
+            f.write('{"step": 2, "loss": 0.7}\n')
+        asyncio.run(reporter.flush(job.id, path))
+        assert master.get(job.id).metrics_step == 2
@@ -0,0 +1,209 @@
+"""Tests for the /proc and cgroup resource sampler.
+
+Run with: pytest worker/tests/test_resource_sampler.py -v
+"""
+
+import os
+import subprocess
+import sys
+import tracemalloc
+
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+import pytest
+
+from worker.app import monitor
+from worker.app.monitor import ResourceSampler
+
+MEMINFO = "MemTotal:       16384000 kB\nMemFree:         1000000 kB\nMemAvailable:    8192000 kB\n"
+
+
+def _write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+
+def _stat_line(user, system, idle):
+    return f"cpu  {user} 0 {system} {idle} 0 0 0 0 0 0\ncpu0 {user} 0 {system} {idle} 0 0 0 0 0 0\n"
+
+
+def _proc_stat(pid, ppid, ticks):
+    utime, stime = ticks // 2, ticks - ticks // 2
+    rest = " ".join(["0"] * 30)
+    return f"{pid} (python -c) S {ppid} {pid} {pid} 0 -1 4194304 0 0 0 0 {utime} {stime} {rest}\n"
+
+
+@pytest.fixture
+def fake_proc(tmp_path):
+    proc = tmp_path / "proc"
+    _write(proc / "stat", _stat_line(100, 100, 800))
+    _write(proc / "meminfo", MEMINFO)
+    _write(proc / "self" / "cgroup", "0::/\n")
+    return proc
+
+
+def _add_process(proc, pid, ppid, ticks, rss_pages, children=None):
+    _write(proc / str(pid) / "stat", _proc_stat(pid, ppid, ticks))
+    _write(proc / str(pid) / "statm", f"1000 {rss_pages} 100 1 0 100 0\n")
+    if children is not None:
+        _write(proc / str(pid) / "task" / str(pid) / "children", " ".join(map(str, children)))
+
+
+class TestHostSampling:
+    def test_cpu_delta_and_memory(self, fake_proc, tmp_path):
+        sampler = ResourceSampler(str(fake_proc), str(tmp_path / "nocgroup"), gpu=False)
+        first = sampler.sample()
+        assert first.cpu_usage_percent == 0.0
+        assert first.memory_total_mb == 16000
+        assert first.memory_used_mb == 8000
+
+        # 300 of the next 1000 jiffies were busy
+        _write(fake_proc / "stat", _stat_line(250, 250, 1500))
+        assert sampler.sample().cpu_usage_percent == 30.0
+        sampler.close()
+
+    def test_cgroup_v2_limits(self, fake_proc, tmp_path):
+        cgroup = tmp_path / "cgroup"
+        _write(cgroup / "cgroup.controllers", "cpu memory\n")
+        _write(cgroup / "cpu.max", "150000 100000\n")
+        _write(cgroup / "memory.max", str(2 * 1024 ** 3))
+        _write(cgroup / "memory.current", str(512 * 1024 ** 2))
+        _write(cgroup / "cpu.stat", "usage_usec 1000\nuser_usec 800\n")
+
+        sampler = ResourceSampler(str(fake_proc), str(cgroup), gpu=False)
+        info = sampler.sample()
+        assert sampler.cpu_limit == 1.5
+        assert info.cpu_cores == min(2, len(os.sched_getaffinity(0)))
+        assert info.memory_total_mb == 2048
+        assert info.memory_used_mb == 512
+        sampler.close()
+
+    def test_cgroup_v1_unlimited_falls_back_to_host(self, fake_proc, tmp_path):
+        cgroup = tmp_path / "cgroup"
+        _write(fake_proc / "self" / "cgroup", "4:memory:/job\n3:cpu,cpuacct:/job\n")
+        _write(cgroup / "memory" / "job" / "memory.limit_in_bytes", "9223372036854771712\n")
+        _write(cgroup / "cpu,cpuacct" / "job" / "cpu.cfs_quota_us", "-1\n")
+        _write(cgroup / "cpu" / "job" / "cpu.cfs_quota_us", "-1\n")
+        _write(cgroup / "cpu" / "job" / "cpu.cfs_period_us", "100000\n")
+
+        sampler = ResourceSampler(str(fake_proc), str(cgroup), gpu=False)
+        info = sampler.sample()
+        assert sampler.cpu_limit is None and sampler.memory_limit_mb is None
+        assert info.memory_total_mb == 16000
+        sampler.close()
+
+    def test_real_proc(self):
+        sampler = ResourceSampler()
+        sampler.sample()
+        info = sampler.sample()
+        assert info.cpu_cores >= 1
+        assert 0 < info.memory_used_mb <= info.memory_total_mb
+        assert 0.0 <= info.cpu_usage_percent <= 100.0
+        sampler.close()
+
+    def test_sampling_allocates_little(self, fake_proc, tmp_path):
+        sampler = ResourceSampler(str(fake_proc), str(tmp_path / "nocgroup"), gpu=False)
+        for _ in range(10):
+            sampler.sample()
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            for _ in range(200):
+                sampler.sample()
+            retained = tracemalloc.get_traced_memory()[0] - before
+        finally:
+            tracemalloc.stop()
+        assert retained < 4096
+        sampler.close()
+
+
+class TestGpuProbe:
+    def test_probed_once_and_skipped_when_absent(self, fake_proc, tmp_path, monkeypatch):
+        calls = []
+        monkeypatch.setattr(monitor.shutil, "which", lambda name: calls.append(name))
+        monkeypatch.setitem(sys.modules, "pynvml", None)  # import fails
+        sampler = ResourceSampler(str(fake_proc), str(tmp_path / "nocgroup"))
+        for _ in range(3):
+            info = sampler.sample()
+        assert info.gpu_count == 0 and info.gpu_names == []
+        assert calls == ["nvidia-smi"]
+        sampler.close()
+
+    def test_nvidia_smi_fallback(self, fake_proc, tmp_path, monkeypatch):
+        monkeypatch.setitem(sys.modules, "pynvml", None)
+        monkeypatch.setattr(monitor.shutil, "which", lambda name: "/usr/bin/nvidia-smi")
+        queries = []
+
+        def fake_query(self, fields):
+            queries.append(fields)
+            if fields == "memory.used":
+                return [["2000"], ["1000"]]
+            return [["A100", "40960", "100"], ["A100", "40960", "0"]]
+
+        monkeypatch.setattr(monitor._GpuProbe, "_query_smi", fake_query)
+        sampler = ResourceSampler(str(fake_proc), str(tmp_path / "nocgroup"), gpu_refresh_seconds=3600)
+        info = sampler.sample()
+        sampler.sample()
+        assert info.gpu_count == 2
+        assert info.gpu_memory_total_mb == 81920
+        assert info.gpu_memory_used_mb == 100
+        assert queries == ["name,memory.total,memory.used"]  # refresh not due yet
+        sampler.close()
+
+
+class TestJobUsage:
+    @pytest.mark.parametrize("with_children_file", [True, False])
+    def test_sums_process_tree(self, fake_proc, tmp_path, with_children_file, monkeypatch):
+        if with_children_file:
+            _write(fake_proc / "self" / "task" / str(os.getpid()) / "children", "")
+        children = (lambda *c: list(c)) if with_children_file else (lambda *c: None)
+        _add_process(fake_proc, 100, 1, 0, 256, children(101))
+        _add_process(fake_proc, 101, 100, 0, 256, children())
+        _add_process(fake_proc, 200, 1, 0, 512, children())
+
+        clock = [1000.0]
+        monkeypatch.setattr(monitor.time, "monotonic", lambda: clock[0])
+        sampler = ResourceSampler(str(fake_proc), str(tmp_path / "nocgroup"), gpu=False)
+        jobs = {"job-a": 100, "job-b": 200}
+        first = sampler.job_usage(jobs)
+        assert first["job-a"].processes == 2
+        assert first["job-a"].cpu_percent == 0.0
+
+        # One second later: job-a's tree used 1.5 CPU-seconds, job-b 0.5
+        clock[0] += 1.0
+        tck = monitor._CLK_TCK
+        _add_process(fake_proc, 100, 1, tck, 256, children(101))
+        _add_process(fake_proc, 101, 100, tck // 2, 256, children())
+        _add_process(fake_proc, 200, 1, tck // 2, 512, children())
+        usage = sampler.job_usage(jobs)
+        assert usage["job-a"].cpu_percent == 150.0
+        assert usage["job-b"].cpu_percent == 50.0
+        assert usage["job-a"].memory_rss_mb == int(512 * monitor._PAGE_MB)
+        sampler.close()
+
+    def test_exited_job_is_forgotten(self):
+        proc = subprocess.Popen(
+            [sys.executable, "-c", "import time; print('up', flush=True); time.sleep(30)"], stdout=subprocess.PIPE
+        )
+        proc.stdout.readline()  # past exec, so its memory is mapped
+        sampler = ResourceSampler(gpu=False)
+        try:
+            assert sampler.job_usage({"job-c": proc.pid})["job-c"].memory_rss_mb > 0
+        finally:
+            proc.kill()
+            proc.wait()
+            proc.stdout.close()
+        usage = sampler.job_usage({"job-c": proc.pid})
+        assert usage["job-c"].memory_rss_mb == 0
+        assert usage["job-c"].processes == 0
+        assert not sampler._prev_jobs and not sampler._proc_files
+        sampler.close()
+
+    def test_own_process(self):
+        sampler = ResourceSampler(gpu=False)
+        usage = sampler.job_usage({"self": os.getpid()})
+        assert usage["self"].memory_rss_mb > 0
+        assert usage["self"].processes >= 1
+        sampler.close()
@@ -0,0 +1,221 @@
+"""Tests for fetching dataset chunks through the swarm.
+
+Peers are real ``PeerServer``s on localhost; the master API runs in-process
+(``httpx.ASGITransport``), except in the multi-process test, which starts a
+master and several ``python -m worker.app.swarm`` processes.
+
+Run with: pytest worker/tests/test_swarm.py -v
+"""
+
+import asyncio
+import hashlib
+import os
+import subprocess
+import sys
+import time
+
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from core.protocols.models import ArtifactManifest, DatasetCreate
+from master.app.api import datasets as datasets_api
+from master.app.api import swarm as swarm_api
+from master.app.datasets import DatasetStore
+from master.app.swarm import Tracker
+from master.main import app
+from worker.app.cache import ArtifactCache
+from worker.app.client import MasterClient
+from worker.app.swarm import Swarm
+from worker.tests.helpers import free_port
+
+CHUNK = 4096
+
+
+def _sha(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _corrupt(path: str) -> None:
+    os.chmod(path, 0o644)
+    with open(path, "r+b") as f:
+        f.write(b"\0" * 16)
+
+
+def _publish(http, name: str, shards: dict) -> None:
+    create = DatasetCreate(name=name, shards=[
+        ArtifactManifest(name=shard, size=len(data), chunk_size=CHUNK,
+                         chunks=[_sha(data[i:i + CHUNK]) for i in range(0, len(data), CHUNK)])
+        for shard, data in shards.items()
+    ])
+    http.post("/api/v1/datasets", json=create.model_dump()).raise_for_status()
+    for data in shards.values():
+        for i in range(0, len(data), CHUNK):
+            http.put(f"/api/v1/datasets/chunks/{_sha(data[i:i + CHUNK])}", content=data[i:i + CHUNK]).raise_for_status()
+    http.post(f"/api/v1/datasets/{name}/complete").raise_for_status()
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    datasets_api.init(DatasetStore(str(tmp_path / "master")))
+    swarm_api.init(Tracker())
+    shards = {f"train-{i}.tar": os.urandom(CHUNK * 4 + i) for i in range(2)}
+    _publish(TestClient(app), "mnist", shards)  # no lifespan: keeps the stores set up above
+    return shards
+
+
+def _swarm(tmp_path, name: str) -> Swarm:
+    client = MasterClient("http://master", transport=httpx.ASGITransport(app=app))
+    return Swarm(client, str(tmp_path / name), port=0, host="127.0.0.1")
+
+
+async def _close(*swarms: Swarm) -> None:
+    for swarm in swarms:
+        await swarm.close()
+        await swarm.client.close()
+
+
+class TestSwarm:
+    def test_second_worker_fetches_everything_from_the_first(self, dataset, tmp_path):
+        async def scenario():
+            first, second = _swarm(tmp_path, "a"), _swarm(tmp_path, "b")
+            try:
+                await first.start("127.0.0.1")
+                await second.start("127.0.0.1")
+                digests = [d for s in (await first.dataset("mnist")).shards for d in s.chunks]
+                await first.fetch(digests)
+                await second.fetch(digests)
+                manifest = (await second.dataset("mnist")).shards[1]
+                data = b"".join([piece async for piece in second.read(manifest)])
+                return first, second, data
+            finally:
+                await _close(first, second)
+
+        first, second, data = asyncio.run(scenario())
+        total = sum(len(d) for d in dataset.values())
+        assert first.bytes_from_master == total and first.bytes_from_peers == 0
+        assert second.bytes_from_master == 0 and second.bytes_from_peers == total
+        assert first.server.bytes_served == total
+        assert data == dataset["train-1.tar"]
+
+    def test_corrupt_peer_chunk_is_rejected(self, dataset, tmp_path):
+        async def scenario():
+            first, second = _swarm(tmp_path, "a"), _swarm(tmp_path, "b")
+            try:
+                await first.start("127.0.0.1")
+                await second.start("127.0.0.1")
+                digest = (await first.dataset("mnist")).shards[0].chunks[0]
+                await first.fetch([digest])
+                await asyncio.to_thread(_corrupt, first.chunks.path(digest))
+                await second.fetch([digest])
+                return digest, second.chunks.path(digest), second.bytes_from_master
+            finally:
+                await _close(first, second)
+
+        digest, path, from_master = asyncio.run(scenario())
+        with open(path, "rb") as f:
+            stored = f.read()
+        assert _sha(stored) == digest and from_master == len(stored)
+
+    def test_without_a_tracker_chunks_come_from_the_master(self, dataset, tmp_path):
+        swarm_api.init(None)  # as with MASTER_WORKERS > 1
+
+        async def scenario():
+            swarm = _swarm(tmp_path, "a")
+            try:
+                await swarm.start("127.0.0.1")
+                manifest = (await swarm.dataset("mnist")).shards[0]
+                data = b"".join([piece async for piece in swarm.read(manifest)])
+                return swarm, data
+            finally:
+                await _close(swarm)
+
+        swarm, data = asyncio.run(scenario())
+        assert swarm.disabled
+        assert data == dataset["train-0.tar"] and swarm.bytes_from_master == len(data)
+
+    def test_chunk_dir_evicts_least_recently_used(self, dataset, tmp_path):
+        async def scenario():
+            swarm = _swarm(tmp_path, "a")
+            swarm.chunks.max_bytes = 2 * CHUNK
+            try:
+                digests = (await swarm.dataset("mnist")).shards[0].chunks[:3]
+                for digest in digests:
+                    await swarm.fetch([digest])
+                    await asyncio.sleep(0.01)  # distinct mtimes
+                return digests, swarm.chunks.digests()
+            finally:
+                await _close(swarm)
+
+        digests, kept = asyncio.run(scenario())
+        assert sorted(kept) == sorted(digests[1:])
+
+    def test_cache_materializes_dataset_sources(self, dataset, tmp_path):
+        async def scenario():
+            swarm = _swarm(tmp_path, "a")
+            cache = ArtifactCache(str(tmp_path / "cache"), 1 << 30, swarm=swarm)
+            try:
+                await cache.materialize("dataset://mnist/train-0.tar", str(tmp_path / "one.tar"))
+                return await cache.materialize("dataset://mnist?shard_index=1&num_shards=2", str(tmp_path / "mine"))
+            finally:
+                await cache.close()
+                await _close(swarm)
+
+        placed = asyncio.run(scenario())
+        assert (tmp_path / "one.tar").read_bytes() == dataset["train-0.tar"]
+        assert placed == [str(tmp_path / "mine" / "train-1.tar")]
+        assert (tmp_path / "mine" / "train-1.tar").read_bytes() == dataset["train-1.tar"]
+
+
+class TestSwarmProcesses:
+    def test_master_egress_does_not_grow_with_workers(self, tmp_path):
+        port = free_port()
+        env = dict(os.environ, MASTER_PORT=str(port), DATASET_DIR=str(tmp_path / "master"), LOG_LEVEL="WARNING")
+        master = subprocess.Popen(
+            [sys.executable, "main.py"], cwd=os.path.join(_project_root, "master"), env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        workers = []
+        try:
+            url = f"http://127.0.0.1:{port}"
+            with httpx.Client(base_url=url, timeout=10.0) as http:
+                for _ in range(100):
+                    try:
+                        http.get("/health").raise_for_status()
+                        break
+                    except httpx.HTTPError:
+                        time.sleep(0.1)
+                shards = {f"train-{i}.tar": os.urandom(CHUNK * 16) for i in range(4)}
+                _publish(http, "mnist", shards)
+            total = sum(len(d) for d in shards.values())
+
+            for i in range(4):
+                workers.append(subprocess.Popen(
+                    [sys.executable, "-m", "worker.app.swarm", "--master-url", url, "--dataset", "mnist",
+                     "--root", str(tmp_path / f"worker-{i}"), "--host", "127.0.0.1", "--seed"],
+                    cwd=_project_root, stdout=subprocess.PIPE, text=True,
+                ))
+            from_master = from_peers = 0
+            for worker in workers:
+                assert worker.stdout.readline().startswith("ready ")
+                done, got_master, got_peers = worker.stdout.readline().split()
+                assert done == "done"
+                from_master += int(got_master)
+                from_peers += int(got_peers)
+
+            assert from_master + from_peers == 4 * total
+            assert from_master <= 1.5 * total
+            for i in range(4):
+                for data in shards.values():
+                    for j in range(0, len(data), CHUNK):
+                        digest = _sha(data[j:j + CHUNK])
+                        assert (tmp_path / f"worker-{i}" / digest[:2] / digest).exists()
+        finally:
+            for process in workers + [master]:
+                process.terminate()
+            for process in workers + [master]:
+                process.wait(timeout=10)
@@ -0,0 +1,149 @@
+"""Tests for the worker's task processes and task runner.
+
+The runner talks to the real master API in-process (``httpx.ASGITransport``).
+Tasks are pickled with the standard library, so only importable functions
+are used.
+
+Run with: pytest worker/tests/test_task_runner.py -v
+"""
+
+import asyncio
+import base64
+import logging
+import math
+import operator
+import os
+import pickle
+import sys
+import time
+
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+import httpx
+
+from core.protocols.models import TaskCancel, TaskStatus, TaskSubmit, TaskWait
+from master.app.api import tasks as tasks_api
+from master.app.tasks import TaskQueue
+from master.main import app
+from worker.app.client import MasterClient
+from worker.app.tasks import TaskProcess, TaskRunner
+
+
+def _payload(function, *args, **kwargs) -> str:
+    return base64.b64encode(pickle.dumps((function, args, kwargs))).decode("ascii")
+
+
+def _outcome(result: str):
+    return pickle.loads(base64.b64decode(result))
+
+
+class TestTaskProcess:
+    def test_runs_tasks_and_survives_their_output_and_errors(self, tmp_path):
+        async def run():
+            process = TaskProcess(sys.executable, ["json"], str(tmp_path))
+            await process.start()
+            try:
+                assert await process.run(pickle.dumps((operator.add, (2, 3), {}))) == (True, pickle.dumps(("ok", 5), protocol=pickle.HIGHEST_PROTOCOL))
+                # A task that prints must not corrupt the reply
+                ok, body = await process.run(pickle.dumps((print, ("noise",), {"flush": True})))
+                assert ok and pickle.loads(body) == ("ok", None)
+                ok, body = await process.run(pickle.dumps((int, ("x",), {})))
+                kind, error, tb = pickle.loads(body)
+                assert not ok and kind == "error" and isinstance(error, ValueError) and "invalid literal" in tb
+                ok, body = await process.run(pickle.dumps((math.factorial, (20,), {})))
+                assert pickle.loads(body) == ("ok", math.factorial(20))
+            finally:
+                await process.stop()
+
+        asyncio.run(run())
+
+
+def _with_runner(body, **kwargs):
+    async def run():
+        queue = TaskQueue()
+        tasks_api.init(queue)
+        client = MasterClient("http://master", transport=httpx.ASGITransport(app=app))
+        runner = TaskRunner(client, wait_seconds=0.5, **kwargs)
+        runner.worker_id = "w1"
+        running = asyncio.create_task(runner.run())
+        try:
+            return await body(queue, runner)
+        finally:
+            runner.stop()
+            await running
+            await runner.close()
+            await client.close()
+
+    return asyncio.run(run())
+
+
+async def _outcomes(queue: TaskQueue, count: int, timeout: float = 30.0):
+    outcomes, cursor = {}, 0
+    deadline = time.monotonic() + timeout
+    while len(outcomes) < count and time.monotonic() < deadline:
+        response = await queue.wait(TaskWait(session="s", cursor=cursor, wait_seconds=1))
+        cursor = response.cursor
+        outcomes.update((o.id, o) for o in response.results)
+    return outcomes
+
+
+class TestTaskRunner:
+    def test_runs_a_burst_of_tasks_in_warm_processes(self, tmp_path):
+        async def body(queue, runner):
+            await runner.start()
+            ids = queue.submit(TaskSubmit(session="s", payloads=[_payload(operator.mul, i, i) for i in range(200)]))
+            outcomes = await _outcomes(queue, len(ids))
+            assert [_outcome(outcomes[task_id].result) for task_id in ids] == [("ok", i * i) for i in range(200)]
+            assert queue.stats()["workers"] == 1
+
+        _with_runner(body, processes=2, work_dir=str(tmp_path))
+
+    def test_a_dying_process_fails_its_task_and_is_replaced(self, tmp_path):
+        async def body(queue, runner):
+            crash, after = queue.submit(TaskSubmit(session="s", payloads=[_payload(os._exit, 3), _payload(abs, -7)]))
+            outcomes = await _outcomes(queue, 2)
+            assert outcomes[crash].status == TaskStatus.FAILED and "exited with code 3" in outcomes[crash].error
+            assert _outcome(outcomes[after].result) == ("ok", 7)
+            assert len(runner._pool) == 1
+
+        _with_runner(body, processes=1, work_dir=str(tmp_path))
+
+    def test_cancelled_tasks_are_killed(self, tmp_path):
+        async def body(queue, runner):
+            slow, quick = queue.submit(TaskSubmit(session="s", payloads=[_payload(time.sleep, 60), _payload(abs, -1)]))
+            while slow not in runner._busy:
+                await asyncio.sleep(0.01)
+            started = time.monotonic()
+            queue.cancel(TaskCancel(session="s", ids=[slow]))
+            outcomes = await _outcomes(queue, 2)
+            assert outcomes[slow].status == TaskStatus.CANCELLED
+            assert _outcome(outcomes[quick].result) == ("ok", 1)
+            assert time.monotonic() - started < 5
+
+        _with_runner(body, processes=1, prefetch=1, work_dir=str(tmp_path))
+
+    def test_lease_loop_stops_when_the_master_refuses_for_good(self, tmp_path, caplog):
+        async def run():
+            tasks_api.init(None)  # as on a master running several processes
+            client = MasterClient("http://master", transport=httpx.ASGITransport(app=app))
+            runner = TaskRunner(client, processes=1, wait_seconds=0.5, work_dir=str(tmp_path))
+            runner.worker_id = "w1"
+            leases = []
+            lease_tasks = client.lease_tasks
+
+            async def counted(request):
+                leases.append(request)
+                return await lease_tasks(request)
+
+            client.lease_tasks = counted
+            try:
+                await asyncio.wait_for(runner._lease_loop(), 5)
+            finally:
+                await client.close()
+            return leases
+
+        with caplog.at_level(logging.ERROR, logger="worker.app.tasks"):
+            assert len(asyncio.run(run())) == 1
+        assert "no longer taking tasks" in caplog.text
@@ -0,0 +1,126 @@
+"""Tests for worker registration, heartbeats and the master client.
+
+Run with: pytest worker/tests/test_worker_agent.py -v
+"""
+
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+import httpx
+import pytest
+
+from worker.app.client import Backoff, MasterClient, jittered
+from worker.main import WorkerAgent
+from worker.tests.helpers import FakeMaster, free_port, run_until
+
+
+class TestBackoff:
+    def test_exponential_with_cap_and_reset(self, monkeypatch):
+        monkeypatch.setattr("random.uniform", lambda lo, hi: hi)
+        backoff = Backoff(base_seconds=1.0, max_seconds=5.0)
+        assert [backoff.next_delay() for _ in range(5)] == [1.0, 2.0, 4.0, 5.0, 5.0]
+        backoff.reset()
+        assert backoff.next_delay() == 1.0
+
+    def test_jitter_stays_in_band(self):
+        values = [jittered(10.0, 0.1) for _ in range(200)]
+        assert all(9.0 <= v <= 11.0 for v in values)
+        assert len(set(values)) > 1
+
+
+def _agent(master: FakeMaster, interval: float = 0.01) -> WorkerAgent:
+    client = MasterClient("http://master", transport=httpx.MockTransport(master.handler))
+    return WorkerAgent("http://master", heartbeat_interval=interval, client=client)
+
+
+class TestWorkerAgent:
+    def test_reregisters_when_master_forgets_worker(self):
+        master = FakeMaster()
+
+        async def run():
+            agent = _agent(master)
+
+            def forget_after_first_heartbeats():
+                if master.heartbeats == 3 and master.registrations == 1:
+                    master.nodes.clear()  # master restarted with empty state
+                return master.registrations == 2 and master.heartbeats >= 5
+
+            await run_until(agent, forget_after_first_heartbeats)
+            assert agent.worker_id in master.nodes
+
+        asyncio.run(run())
+        assert master.registrations == 2
+
+    def test_backs_off_on_errors(self, monkeypatch):
+        master = FakeMaster(heartbeat_failures=[503, 503, 503])
+        delays = []
+        original = Backoff.next_delay
+
+        def record(self):
+            delays.append(original(self))
+            return 0.0
+
+        monkeypatch.setattr(Backoff, "next_delay", record)
+
+        async def run():
+            await run_until(_agent(master), lambda: master.heartbeats >= 1)
+
+        asyncio.run(run())
+        assert len(delays) == 3
+        assert master.heartbeats >= 1
+
+
+# ── Against a real master over TCP ─────────────────────────────────────────
+
+
+@pytest.fixture
+def master_url():
+    port = free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "master.main:app", "--port", str(port),
+         "--log-level", "warning", "--timeout-keep-alive", "75"],
+        cwd=_project_root,
+        env=dict(os.environ, LOG_LEVEL="WARNING"),
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 20
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{url}/health", timeout=1.0).status_code == 200:
+                break
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    yield url
+    proc.terminate()
+    proc.wait(timeout=15)
+
+
+def test_heartbeats_reuse_one_connection(master_url):
+    async def run():
+        agent = WorkerAgent(master_url, heartbeat_interval=0.05, hostname="pooled-worker")
+        beats = 0
+        original = agent.client.heartbeat
+
+        async def counting(request):
+            nonlocal beats
+            beats += 1
+            return await original(request)
+
+        agent.client.heartbeat = counting
+        client = agent.client
+        await run_until(agent, lambda: beats >= 10)
+        return agent.worker_id, client.connections_opened
+
+    worker_id, connections = asyncio.run(run())
+    node = httpx.get(f"{master_url}/api/v1/nodes/{worker_id}").json()
+    assert node["hostname"] == "pooled-worker"
+    assert node["status"] == "online"
+    # Registration and every heartbeat went over a single TCP connection
+    assert connections == 1